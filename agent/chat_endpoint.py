@@ -13,6 +13,7 @@ import json
 import os
 import re
 import uuid
+from collections import Counter
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
@@ -21,10 +22,12 @@ from agent.interview.session_manager import (
     STAGE_INTERVIEW,
     STAGE_RECOMMENDATIONS,
 )
-from agent.universal_agent import UniversalAgent, AgentState
+from agent.universal_agent import UniversalAgent, AgentState, _NO_PREFERENCE_VALUES
 from agent.domain_registry import get_domain_schema
 from agent.comparison_agent import detect_post_rec_intent, generate_comparison_narrative, generate_targeted_answer
+from app.query_parse import parse_query
 from app.structured_logger import StructuredLogger
+from app.tracing import record_llm_usage, set_attributes, span, start_trace, traced
 
 logger = StructuredLogger("chat_endpoint")
 
@@ -95,6 +98,7 @@ _LLM_GUARD_SYSTEM = (
 )
 
 
+@traced("llm.injection_check")
 async def _llm_injection_check(message: str) -> bool:
     """Call gpt-4o-mini to classify ambiguous messages. Fails open (returns False) on error."""
     try:
@@ -109,6 +113,7 @@ async def _llm_injection_check(message: str) -> bool:
             max_tokens=20,
             temperature=0,
         )
+        record_llm_usage(resp)
         result = json.loads(resp.choices[0].message.content.strip())
         return bool(result.get("is_injection", False))
     except Exception:
@@ -158,6 +163,7 @@ async def _is_prompt_injection(message: str) -> bool:
 # Called by UniversalAgent._entropy_next_slot() via dependency injection.
 # ============================================================================
 
+@traced("probe_search")
 def _probe_search(slot_filters: dict, limit: int = 30) -> list:
     """
     Run a quick search with the current slot filters and return raw product dicts.
@@ -167,23 +173,79 @@ def _probe_search(slot_filters: dict, limit: int = 30) -> list:
     try:
         from app.tools.supabase_product_store import get_product_store
 
-        f: dict = {"product_type": "laptop"}
-        if "price_max_cents" in slot_filters:
-            f["price_max"] = int(slot_filters["price_max_cents"]) // 100
-        elif "budget" in slot_filters:
-            raw = int(slot_filters["budget"])
-            f["price_max"] = raw // 100 if raw > 10_000 else raw
-        if "brand" in slot_filters:
-            f["brand"] = str(slot_filters["brand"])
-        if "min_ram_gb" in slot_filters:
-            f["min_ram_gb"] = int(slot_filters["min_ram_gb"])
-
         store = get_product_store()
-        return store.search_products(f, limit=limit)
+        results = store.search_products(_probe_filters(slot_filters), limit=limit)
+        set_attributes(results=len(results))
+        return results
     except Exception:
         return []
 
 
+def _probe_filters(slot_filters: dict) -> dict:
+    """
+    Product filters for the probe from the agent's slot filters. Placeholder
+    answers ("any", "no preference", ...) and unparseable numbers are skipped,
+    as in UniversalAgent.get_search_filters().
+    """
+    slots = {
+        k: v for k, v in slot_filters.items()
+        if v and str(v).strip().lower() not in _NO_PREFERENCE_VALUES
+    }
+    f: dict = {"product_type": "laptop"}
+    if "price_max_cents" in slots:
+        f["price_max"] = _probe_int(slots["price_max_cents"]) // 100 or None
+    elif "budget" in slots:
+        raw = _probe_int(slots["budget"])
+        f["price_max"] = (raw // 100 if raw > 10_000 else raw) or None
+    if "brand" in slots:
+        f["brand"] = str(slots["brand"])
+    if "min_ram_gb" in slots:
+        f["min_ram_gb"] = _probe_int(slots["min_ram_gb"]) or None
+    return {k: v for k, v in f.items() if v is not None}
+
+
+def _probe_int(value) -> int:
+    """Leading number of a slot value ("1500", "$1,500", 16); 0 if there is none."""
+    match = re.search(r"\d+", str(value).replace(",", ""))
+    return int(match.group()) if match else 0
+
+
+# Agent entropy attribute -> facet (app.facets) holding its distribution
+_FACET_FOR_ATTR = {
+    "price": "price_band",
+    "brand": "brand",
+    "ram_gb": "ram_gb",
+    "screen_size": "screen_size",
+    "storage_type": "storage_type",
+}
+
+
+@traced("probe_facets")
+def _probe_facets(slot_filters: dict) -> Optional[dict]:
+    """
+    Slot value distributions over every matching laptop, from the in-memory
+    facet index. Returns None when the index cannot answer or fewer than 5
+    laptops match strictly; the agent then samples with _probe_search, whose
+    store search relaxes filters that match too little.
+    """
+    try:
+        from app.facets import facet_index
+
+        facets = facet_index.counts(_probe_filters(slot_filters))
+    except Exception:
+        return None
+    if facets is None:
+        return None
+    set_attributes(results=facets["total"])
+    if facets["total"] < 5:
+        return None
+    return {
+        attr: Counter(facets[name])
+        for attr, name in _FACET_FOR_ATTR.items()
+        if sum(facets[name].values()) >= 3
+    }
+
+
 # ============================================================================
 # Popular-question cache — instant answers for frequently asked questions
 # Keys are lowercase canonical forms; values are (message, quick_replies) tuples.
@@ -266,16 +328,6 @@ _POPULAR_QA: dict[str, tuple[str, list[str]]] = {
 _CACHE_STRIP_RE = re.compile(r"[^a-z0-9\s]")
 _CACHE_FILLER_RE = re.compile(r"\b(please|can you|could you|tell me|explain|what's|whats|i want to know)\b")
 
-# Specific-product lookup fast-path: matches model-number-like tokens.
-#   \b[A-Za-z]\d{1,4}\b  →  X1, M3, G16, i7, i9, T14, E15, H16
-#   \b\d{4,}\b            →  4070, 4090, 9530, 1000 (budget), 13700
-_MODEL_NUMBER_RE = re.compile(r"\b[A-Za-z]\d{1,4}\b|\b\d{4,}\b", re.IGNORECASE)
-
-# Compare-first trigger: any form of "compare / comparison / comparing / compared"
-# anywhere in the message (not just at the start).
-# Guards ("not session.active_domain" + domain hint) prevent mid-session false positives.
-_COMPARE_RE = re.compile(r"\bcompar\w*\b", re.IGNORECASE)
-
 # ---------------------------------------------------------------------------
 # Fast-path keyword / regex constants for post-recommendation intent routing.
 # Defined at module level so tests can import and verify against production.
@@ -477,6 +529,7 @@ _FAQ_CONTEXT: dict[str, str] = {
 }
 
 
+@traced("llm.faq_answer")
 async def _generate_faq_answer(category: str, original_message: str) -> str:
     """Generate a clear, factual answer for a service/FAQ question using LLM.
 
@@ -505,6 +558,7 @@ async def _generate_faq_answer(category: str, original_message: str) -> str:
             max_tokens=200,
             temperature=0.3,
         )
+        record_llm_usage(completion)
         return completion.choices[0].message.content.strip()
     except Exception:
         # Fallback to static context — still a useful answer
@@ -630,6 +684,24 @@ def _build_preferences_summary(filters: Dict[str, Any]) -> Dict[str, Any]:
 # ============================================================================
 
 async def process_chat(request: ChatRequest) -> ChatResponse:
+    """
+    Handle one chat turn.
+
+    The turn is the root "chat" span of a trace (see app.tracing); stages
+    below annotate child spans when the request is sampled.
+    """
+    with start_trace("chat", session_id=request.session_id) as root:
+        response = await _process_chat(request)
+        root.set_attributes(
+            session_id=response.session_id,
+            response_type=response.response_type,
+            route=response.route_taken,
+            domain=response.domain,
+        )
+        return response
+
+
+async def _process_chat(request: ChatRequest) -> ChatResponse:
     import time
     timings = {}
     t_start = time.perf_counter()
@@ -784,9 +856,16 @@ async def process_chat(request: ChatRequest) -> ChatResponse:
     t_agent = time.perf_counter()
     # Restore agent from session or create new
     if session.active_domain:
-        agent = UniversalAgent.restore_from_session(session_id, session, probe_search_fn=_probe_search)
+        agent = UniversalAgent.restore_from_session(
+            session_id, session, probe_search_fn=_probe_search, probe_facets_fn=_probe_facets
+        )
     else:
-        agent = UniversalAgent(session_id=session_id, max_questions=request.k if request.k is not None else 3, probe_search_fn=_probe_search)
+        agent = UniversalAgent(
+            session_id=session_id,
+            max_questions=request.k if request.k is not None else 3,
+            probe_search_fn=_probe_search,
+            probe_facets_fn=_probe_facets,
+        )
 
     # Ablation: zero the accumulated slot dict while preserving conversation history.
     # Session history still flows to the LLM so context is kept; only the slot-tracking
@@ -820,12 +899,14 @@ async def process_chat(request: ChatRequest) -> ChatResponse:
     # _compare_first_vs: detect "X vs Y" or "compare X [and/with/abd/...] Y".
     # Exact parsing of the two products and focus features is done by the LLM in
     # run_search_for_session — this is just a coarse yes/no trigger.
+    # Compare / model-number checks read the shared per-message parse.
+    parsed = parse_query(msg)
+    _has_domain_hint = not session.active_domain and any(hint in msg_lower for hint in _DOMAIN_HINTS)
     _compare_first_vs = (
-        not session.active_domain
-        and any(hint in msg_lower for hint in _DOMAIN_HINTS)
+        _has_domain_hint
         and (
             any(pat in msg_lower for pat in (" vs ", " versus ", " vs.", " compared to "))
-            or bool(_COMPARE_RE.search(msg_lower))
+            or parsed.mentions_compare
         )
     )
     if _compare_first_vs:
@@ -837,18 +918,17 @@ async def process_chat(request: ChatRequest) -> ChatResponse:
     # Specific-product lookup fast-path: first message has a domain hint AND a
     # model-number-like token (X1, M3, 4070, $1000 budget, etc.) → skip interview.
     _specific_lookup = (
-        not session.active_domain
+        _has_domain_hint
         and not _compare_first_vs
-        and any(hint in msg_lower for hint in _DOMAIN_HINTS)
-        and bool(_MODEL_NUMBER_RE.search(msg_lower))
+        and bool(parsed.model_numbers)
     )
     if _specific_lookup:
         agent.max_questions = 0
-        _tok = _MODEL_NUMBER_RE.search(msg_lower)
         logger.info("specific_lookup_detected", "Skipping interview for specific-product query", {
-            "msg": msg_lower[:80], "matched_token": _tok.group(0) if _tok else "",
+            "msg": msg_lower[:80], "matched_token": parsed.model_numbers[0],
         })
 
+    set_attributes(compare_first=_compare_first_vs, specific_lookup=_specific_lookup)
     previous_domain = session.active_domain
     # process_message makes synchronous OpenAI calls; run in a thread so the
     # asyncio event loop stays free to serve other requests while waiting.
@@ -1383,6 +1463,7 @@ def _message_references_shown_recommendation_set(message: str) -> bool:
 # Post-Recommendation Handlers
 # ============================================================================
 
+@traced("post_recommendation")
 async def _handle_post_recommendation(
     request: ChatRequest, session, session_id: str, session_manager
 ) -> Optional[ChatResponse]:
@@ -3184,6 +3265,7 @@ async def _handle_post_recommendation(
 # Search Dispatchers
 # ============================================================================
 
+@traced("search_and_respond_vehicles")
 async def _search_and_respond_vehicles(
     search_filters: Dict[str, Any],
     session_id: str,
@@ -3381,6 +3463,7 @@ def _build_preference_ack(filters: Dict[str, Any], domain: str) -> str:
     return f"Got it — {sentence_body}. Here's what I found:"
 
 
+@traced("search_and_respond_ecommerce")
 async def _search_and_respond_ecommerce(
     search_filters: Dict[str, Any],
     category: str,
@@ -4210,6 +4293,7 @@ def _generate_why_picked(product: Dict[str, Any], tier: str, position: int, buck
     return bullets[:4]  # cap at 4 so the card stays compact
 
 
+@traced("search_ecommerce_products")
 async def _search_ecommerce_products(
     filters: Dict[str, Any],
     category: str,
@@ -4241,14 +4325,24 @@ async def _search_ecommerce_products(
 
     limit = n_rows * n_per_row * 3   # fetch a larger pool for bucketing
 
+    # KG re-ranking runs alongside the store search and is merged only if it
+    # answers within KG_RERANK_BUDGET_MS (see app/kg_rerank.py).
+    from app.kg_rerank import kg_reranker
+    kg_lookup = kg_reranker.start(_build_kg_search_query(filters, category), search_filters, limit)
+
     # ── Agent-side search cache (Redis) ──────────────────────────────────────
     # The MCP HTTP cache only fires when accessed via HTTP; direct store calls
     # bypass it.  We cache here too so repeated identical searches skip Supabase.
+    # search_key() folds in the category's invalidation generation, so catalog
+    # writes retire these pages too.
     _excl_key = ",".join(sorted(exclude_ids)) if exclude_ids else ""
-    _cache_key = _cc.make_search_key(
+    _cache_key = _cc.search_key(
         {**search_filters, "_excl": _excl_key}, category, page=1, limit=limit
     )
-    _cached = _cc.get_search_results(_cache_key)
+    with span("search_cache.get") as _cache_span:
+        _cached = _cc.get_search_results(_cache_key)
+        _cache_span.set_attribute("cache_hit", _cached is not None)
+    set_attributes(cache_hit=_cached is not None)
     if _cached is not None:
         logger.info("search_ecommerce_cache_hit", f"Agent search cache HIT ({len(_cached)} items)", {})
         product_dicts = _cached
@@ -4257,12 +4351,14 @@ async def _search_ecommerce_products(
             "category": category, "filters": search_filters,
             "n_rows": n_rows, "n_per_row": n_per_row,
         })
-        store = get_product_store()
-        product_dicts = store.search_products(
-            search_filters,
-            limit=limit,
-            exclude_ids=exclude_ids,
-        )
+        with span("product_store.search", limit=limit) as _store_span:
+            store = get_product_store()
+            product_dicts = store.search_products(
+                search_filters,
+                limit=limit,
+                exclude_ids=exclude_ids,
+            )
+            _store_span.set_attribute("results", len(product_dicts or []))
         if product_dicts:
             _cc.set_search_results(_cache_key, product_dicts, adaptive=True)
 
@@ -4274,22 +4370,14 @@ async def _search_ecommerce_products(
             })
             return [], []
 
-        # KG re-ranking (best-effort, non-blocking)
+        # KG re-ranking (best-effort, bounded by the latency budget)
         kg_candidate_ids: List[str] = []
-        try:
-            from app.kg_service import get_kg_service
-            kg = get_kg_service()
-            if kg.is_available():
-                kg_filters = {**search_filters}
-                search_query = _build_kg_search_query(filters, category)
-                kg_candidate_ids, _ = kg.search_candidates(
-                    query=search_query, filters=kg_filters, limit=limit,
-                )
-                if kg_candidate_ids and exclude_ids:
-                    exclude_set = set(exclude_ids)
-                    kg_candidate_ids = [p for p in kg_candidate_ids if p not in exclude_set]
-        except Exception as e:
-            logger.warning("kg_search_skipped", f"KG search skipped: {e}", {"error": str(e)})
+        with span("kg_rerank") as _kg_span:
+            kg_candidate_ids = await kg_reranker.collect(kg_lookup)
+            if kg_candidate_ids and exclude_ids:
+                exclude_set = set(exclude_ids)
+                kg_candidate_ids = [p for p in kg_candidate_ids if p not in exclude_set]
+            _kg_span.set_attribute("kg_candidates", len(kg_candidate_ids))
 
         # Sort: KG-ranked first, then by price
         if kg_candidate_ids:
@@ -4321,65 +4409,66 @@ async def _search_ecommerce_products(
         except Exception:
             pass
 
-        # Bucket into rows — stride by n_per_row so no product appears in two buckets.
-        # Bug fixed: old code used bucket_size=total//n_rows as stride but took n_per_row
-        # items per bucket, causing overlap (e.g. product at index 1 appeared in both
-        # bucket-0[0:3] and bucket-1[1:2] when total=2, n_rows=2, n_per_row=3).
-        buckets = []
-        bucket_labels = []
-        fmt_domain = "books" if category.lower() == "books" else "laptops"
-
-        # Determine whether the result set has a meaningful price spread.
-        # "Budget-Friendly / Mid-Range / Premium" labels are only truthful when the
-        # most expensive result costs ≥30% more than the cheapest.  Below that
-        # threshold (e.g. $199 vs $209) the labels are positional lies — use neutral
-        # names instead so the UI doesn't misrepresent similarly-priced products.
-        _all_prices = [float(p.get("price", 0) or 0) for p in product_dicts if p.get("price")]
-        _min_all = min(_all_prices) if _all_prices else 0.0
-        _max_all = max(_all_prices) if _all_prices else 0.0
-        _price_spread = (_max_all / _min_all) if _min_all > 0 else 1.0
-        _SPREAD_THRESHOLD = 1.30   # 30 % gap needed before tier labels are meaningful
-        _use_tier_labels = _price_spread >= _SPREAD_THRESHOLD
-
-        for i in range(n_rows):
-            start = i * n_per_row          # non-overlapping stride
-            bucket_products = product_dicts[start:start + n_per_row]
-            if not bucket_products:
-                break                      # fewer products than buckets → stop early
-            min_price = min(float(p.get("price", 0) or 0) for p in bucket_products)
-            max_price = max(float(p.get("price", 0) or 0) for p in bucket_products)
-            price_range = f"${min_price:.0f}–${max_price:.0f}" if min_price != max_price else f"${min_price:.0f}"
-
-            # "similar" tier suppresses misleading tier-specific bullets in _generate_why_picked
-            if _use_tier_labels:
-                tier = "budget" if i == 0 else ("premium" if i == n_rows - 1 else "mid")
-            else:
-                tier = "similar"
-
-            formatted_bucket = []
-            for j, p in enumerate(bucket_products):
-                fp = format_product(p, fmt_domain).model_dump(mode="json", exclude_none=True)
-                # Inject "Why we picked this" bullets — rule-based, no LLM needed.
-                fp["why_picked"] = _generate_why_picked(p, tier=tier, position=j,
-                                                         bucket_size=len(bucket_products))
-                formatted_bucket.append(fp)
-
-            buckets.append(formatted_bucket)
-            if _use_tier_labels:
-                if i == 0:
-                    bucket_labels.append(f"Budget-Friendly ({price_range})")
-                elif i == n_rows - 1:
-                    bucket_labels.append(f"Premium ({price_range})")
+        with span("format_buckets", n_rows=n_rows, n_per_row=n_per_row):
+            # Bucket into rows — stride by n_per_row so no product appears in two buckets.
+            # Bug fixed: old code used bucket_size=total//n_rows as stride but took n_per_row
+            # items per bucket, causing overlap (e.g. product at index 1 appeared in both
+            # bucket-0[0:3] and bucket-1[1:2] when total=2, n_rows=2, n_per_row=3).
+            buckets = []
+            bucket_labels = []
+            fmt_domain = "books" if category.lower() == "books" else "laptops"
+
+            # Determine whether the result set has a meaningful price spread.
+            # "Budget-Friendly / Mid-Range / Premium" labels are only truthful when the
+            # most expensive result costs ≥30% more than the cheapest.  Below that
+            # threshold (e.g. $199 vs $209) the labels are positional lies — use neutral
+            # names instead so the UI doesn't misrepresent similarly-priced products.
+            _all_prices = [float(p.get("price", 0) or 0) for p in product_dicts if p.get("price")]
+            _min_all = min(_all_prices) if _all_prices else 0.0
+            _max_all = max(_all_prices) if _all_prices else 0.0
+            _price_spread = (_max_all / _min_all) if _min_all > 0 else 1.0
+            _SPREAD_THRESHOLD = 1.30   # 30 % gap needed before tier labels are meaningful
+            _use_tier_labels = _price_spread >= _SPREAD_THRESHOLD
+
+            for i in range(n_rows):
+                start = i * n_per_row          # non-overlapping stride
+                bucket_products = product_dicts[start:start + n_per_row]
+                if not bucket_products:
+                    break                      # fewer products than buckets → stop early
+                min_price = min(float(p.get("price", 0) or 0) for p in bucket_products)
+                max_price = max(float(p.get("price", 0) or 0) for p in bucket_products)
+                price_range = f"${min_price:.0f}–${max_price:.0f}" if min_price != max_price else f"${min_price:.0f}"
+
+                # "similar" tier suppresses misleading tier-specific bullets in _generate_why_picked
+                if _use_tier_labels:
+                    tier = "budget" if i == 0 else ("premium" if i == n_rows - 1 else "mid")
                 else:
-                    bucket_labels.append(f"Mid-Range ({price_range})")
-            else:
-                # Neutral positional labels — convey rank without implying price tier
-                if i == 0:
-                    bucket_labels.append(f"Value Pick ({price_range})")
-                elif i == n_rows - 1:
-                    bucket_labels.append(f"Performance Pick ({price_range})")
+                    tier = "similar"
+
+                formatted_bucket = []
+                for j, p in enumerate(bucket_products):
+                    fp = format_product(p, fmt_domain).model_dump(mode="json", exclude_none=True)
+                    # Inject "Why we picked this" bullets — rule-based, no LLM needed.
+                    fp["why_picked"] = _generate_why_picked(p, tier=tier, position=j,
+                                                             bucket_size=len(bucket_products))
+                    formatted_bucket.append(fp)
+
+                buckets.append(formatted_bucket)
+                if _use_tier_labels:
+                    if i == 0:
+                        bucket_labels.append(f"Budget-Friendly ({price_range})")
+                    elif i == n_rows - 1:
+                        bucket_labels.append(f"Premium ({price_range})")
+                    else:
+                        bucket_labels.append(f"Mid-Range ({price_range})")
                 else:
-                    bucket_labels.append(f"Balanced Pick ({price_range})")
+                    # Neutral positional labels — convey rank without implying price tier
+                    if i == 0:
+                        bucket_labels.append(f"Value Pick ({price_range})")
+                    elif i == n_rows - 1:
+                        bucket_labels.append(f"Performance Pick ({price_range})")
+                    else:
+                        bucket_labels.append(f"Balanced Pick ({price_range})")
 
         return buckets, bucket_labels
 
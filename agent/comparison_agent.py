@@ -16,6 +16,15 @@ import os
 import re
 from typing import Any, Dict, List, Optional
 
+try:
+    from app.tracing import record_llm_usage, traced
+except ImportError:  # agent used without mcp-server on sys.path: tracing is a no-op
+    def record_llm_usage(completion, target=None):
+        pass
+
+    def traced(name=None):
+        return lambda fn: fn
+
 # Model configuration — single model for all LLM calls, set via environment
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 # Default is "" (disabled). Set OPENAI_REASONING_EFFORT=low in .env only if using an o-series model.
@@ -49,6 +58,7 @@ _REFINE_KEYWORDS = {
 }
 
 
+@traced("llm.parse_compare_query")
 async def parse_compare_query(message: str) -> Dict[str, Any]:
     """
     LLM-based parser for any compare phrasing.
@@ -84,6 +94,7 @@ async def parse_compare_query(message: str) -> Dict[str, Any]:
             ],
             max_completion_tokens=80,
         )
+        record_llm_usage(completion)
         data = json.loads(completion.choices[0].message.content)
         # Validate — both sides must be non-empty
         if data.get("left") and data.get("right"):
@@ -117,6 +128,7 @@ async def parse_compare_query(message: str) -> Dict[str, Any]:
         return {"left": message, "right": "", "focus_features": None}
 
 
+@traced("llm.post_rec_intent")
 async def detect_post_rec_intent(message: str) -> str:
     """
     LLM-based intent detection for post-recommendation messages.
@@ -191,6 +203,7 @@ async def detect_post_rec_intent(message: str) -> str:
             ],
             max_completion_tokens=20,
         )
+        record_llm_usage(completion)
 
         data = json.loads(completion.choices[0].message.content)
         intent = data.get("intent", "targeted_qa")
@@ -303,6 +316,7 @@ def _build_spec_sheet(products: List[Dict[str, Any]], domain: str) -> str:
 # LLM narrative generation
 # ---------------------------------------------------------------------------
 
+@traced("llm.comparison_narrative")
 async def generate_comparison_narrative(
     products: List[Dict[str, Any]],
     user_message: str,
@@ -417,6 +431,7 @@ async def generate_comparison_narrative(
                         {"role": "user", "content": user_prompt},
                     ],
                 )
+                record_llm_usage(completion)
                 narrative = completion.choices[0].message.content.strip()
             except Exception as _bc_err:
                 logger.warning(f"brand_compare LLM failed: {_bc_err}")
@@ -484,6 +499,7 @@ async def generate_comparison_narrative(
                             {"role": "user", "content": usr_p},
                         ],
                     )
+                    record_llm_usage(comp)
                     body = comp.choices[0].message.content.strip()
                 except Exception as ex:
                     logger.error(f"Feature gen failed for {name}: {ex}")
@@ -612,6 +628,7 @@ async def generate_comparison_narrative(
             # No previous cap allowed the model to be verbose (observed 13 s).
             max_completion_tokens=1000,
         )
+        record_llm_usage(completion)
 
         response_text = completion.choices[0].message.content.strip()
         data = json.loads(response_text)
@@ -631,6 +648,7 @@ async def generate_comparison_narrative(
         )
 
 
+@traced("llm.targeted_answer")
 async def generate_targeted_answer(
     products: List[Dict[str, Any]],
     user_message: str,
@@ -727,6 +745,7 @@ async def generate_targeted_answer(
             # 1-2 products × ~150 tokens each + JSON overhead = ~500 tokens max
             max_completion_tokens=600,
         )
+        record_llm_usage(completion)
 
         data = json.loads(completion.choices[0].message.content.strip())
         return (
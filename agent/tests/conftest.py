@@ -8,3 +8,11 @@ import pytest
 
 # Set before any imports so OpenAI client doesn't raise on init
 os.environ.setdefault("OPENAI_API_KEY", "test-dummy-key-for-unit-tests")
+
+
+@pytest.fixture(autouse=True)
+def _clear_kg_rerank_cache():
+    """KG boosts are cached per query in a process-wide singleton; isolate tests."""
+    from app.kg_rerank import kg_reranker
+    kg_reranker.clear()
+    yield
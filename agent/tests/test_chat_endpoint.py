@@ -13,6 +13,8 @@ from agent.chat_endpoint import (
     _PURCHASE_IDIOMS_RE,
     _CASUAL_TAKE_DEFAULT_RE,
     _message_references_shown_recommendation_set,
+    _probe_facets,
+    _probe_filters,
 )
 from agent.interview.session_manager import InterviewSessionState, STAGE_RECOMMENDATIONS
 
@@ -22,6 +24,45 @@ def test_chat_endpoint_basic():
     assert req.message == "Hello"
 
 
+# ---------------------------------------------------------------------------
+# _probe_filters / _probe_facets
+# ---------------------------------------------------------------------------
+
+def test_probe_filters_skip_placeholder_answers():
+    filters = _probe_filters({"brand": "Any", "budget": "no preference", "min_ram_gb": 16, "use_case": "gaming"})
+    assert filters == {"product_type": "laptop", "min_ram_gb": 16}
+
+
+def test_probe_filters_parse_budget_strings():
+    assert _probe_filters({"budget": "$1,500"})["price_max"] == 1500
+    assert _probe_filters({"price_max_cents": 120000, "brand": "Dell"}) == {
+        "product_type": "laptop", "price_max": 1200, "brand": "Dell",
+    }
+
+
+def _facet_counts(total):
+    return {
+        "total": total,
+        "brand": {"Dell": total},
+        "price_band": {"under_500": total},
+        "ram_gb": {},
+        "screen_size": {},
+        "storage_type": {},
+    }
+
+
+def test_probe_facets_falls_back_to_sampling_when_few_match():
+    with patch("app.facets.facet_index.counts", return_value=_facet_counts(3)):
+        assert _probe_facets({"brand": "Dell"}) is None
+
+
+def test_probe_facets_uses_counts_for_any_brand():
+    with patch("app.facets.facet_index.counts", return_value=_facet_counts(40)) as counts:
+        result = _probe_facets({"brand": "any"})
+    counts.assert_called_once_with({"product_type": "laptop"})
+    assert result["brand"] == {"Dell": 40} and "ram_gb" not in result
+
+
 # ---------------------------------------------------------------------------
 # _compute_diversity_score
 # ---------------------------------------------------------------------------
@@ -538,3 +579,26 @@ def test_anaphora_veto_false_positive_guard(phrase):
         assert not _message_references_shown_recommendation_set(phrase), (
             f"anaphora veto false-positive on non-referencing phrase: {phrase!r}"
         )
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------------
+
+def test_process_chat_emits_root_trace(tmp_path, monkeypatch):
+    """A sampled turn exports one trace whose root carries the route taken."""
+    import json
+    import app.tracing as tracing
+    from app.latency_log import BufferedJsonlSink
+
+    path = tmp_path / "traces.jsonl"
+    tracer = tracing.Tracer(sample_rate=1.0, sink=BufferedJsonlSink(path=path))
+    monkeypatch.setattr(tracing, "tracer", tracer)
+
+    resp = asyncio.run(process_chat(ChatRequest(message="5 stars")))
+    tracer.sink.flush()
+
+    [trace] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert trace["name"] == "chat"
+    assert trace["attributes"]["session_id"] == resp.session_id
+    assert trace["attributes"]["response_type"] == "question"
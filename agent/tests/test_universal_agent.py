@@ -461,3 +461,75 @@ def test_faster_bumps_ram_and_removes_budget_ceiling():
     assert "price_max_cents" not in result, (
         f"price_max_cents should be removed for 'more powerful': {result}"
     )
+
+
+def test_entropy_next_slot_reuses_cached_distributions():
+    """A second agent with the same probe, domain and filters needs no probe search."""
+    probe_fn = MagicMock(return_value=_make_laptop_candidates(n=20))
+    schema = get_domain_schema("laptops")
+
+    slots = []
+    for _ in range(2):
+        agent = UniversalAgent(session_id="test", probe_search_fn=probe_fn)
+        agent.domain = "laptops"
+        agent.question_count = 1
+        agent.questions_asked = ["use_case"]
+        agent.filters = {"use_case": "video editing", "budget": 1500}
+        slots.append(agent._entropy_next_slot(schema))
+
+    probe_fn.assert_called_once()
+    assert slots[0] is not None and slots[0].name == slots[1].name
+
+    agent.filters = {"use_case": "video editing", "budget": 900}
+    agent._entropy_next_slot(schema)
+    assert probe_fn.call_count == 2
+
+
+def test_entropy_next_slot_does_not_cache_empty_probe():
+    probe_fn = MagicMock(return_value=[])
+    schema = get_domain_schema("laptops")
+    agent = UniversalAgent(session_id="test", probe_search_fn=probe_fn)
+    agent.domain = "laptops"
+    agent.question_count = 1
+    agent.filters = {"use_case": "school"}
+
+    agent._entropy_next_slot(schema)
+    agent._entropy_next_slot(schema)
+    assert probe_fn.call_count == 2
+
+
+def test_entropy_next_slot_prefers_facet_counts():
+    """With a facets probe, distributions come from catalog-wide counts, not a probe search."""
+    from collections import Counter
+
+    probe_fn = MagicMock(return_value=_make_laptop_candidates(n=20))
+    facets_fn = MagicMock(return_value={
+        "price": Counter({"under_500": 40, "500_1000": 35, "1000_1500": 30}),
+        "brand": Counter({"Dell": 100}),
+    })
+    schema = get_domain_schema("laptops")
+    agent = UniversalAgent(session_id="test", probe_search_fn=probe_fn, probe_facets_fn=facets_fn)
+    agent.domain = "laptops"
+    agent.question_count = 1
+    agent.questions_asked = ["use_case"]
+    agent.filters = {"use_case": "gaming"}
+
+    slot = agent._entropy_next_slot(schema)
+
+    facets_fn.assert_called_once_with(agent.filters)
+    probe_fn.assert_not_called()
+    assert slot is not None and slot.name == "budget"
+
+
+def test_entropy_next_slot_samples_when_facets_unavailable():
+    probe_fn = MagicMock(return_value=_make_laptop_candidates(n=20))
+    facets_fn = MagicMock(return_value=None)
+    schema = get_domain_schema("laptops")
+    agent = UniversalAgent(session_id="test", probe_search_fn=probe_fn, probe_facets_fn=facets_fn)
+    agent.domain = "laptops"
+    agent.question_count = 1
+    agent.questions_asked = ["use_case"]
+    agent.filters = {"use_case": "creative work", "budget": 2100}
+
+    assert agent._entropy_next_slot(schema) is not None
+    probe_fn.assert_called_once()
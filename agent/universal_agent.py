@@ -22,11 +22,21 @@ import logging
 import json
 import os
 import re
+from collections import Counter
 from typing import Dict, Any, List, Optional
 from enum import Enum
 from openai import OpenAI
 from pydantic import BaseModel, Field
 
+try:
+    from app.tracing import record_llm_usage, traced
+except ImportError:  # agent used without mcp-server on sys.path: tracing is a no-op
+    def record_llm_usage(completion, target=None):
+        pass
+
+    def traced(name=None):
+        return lambda fn: fn
+
 from .domain_registry import get_domain_schema, DomainSchema, SlotPriority, PreferenceSlot
 from .query_rewriter import rewrite as _rewrite_query
 from .prompts import (
@@ -195,6 +205,7 @@ _BRAND_EXCLUDE_SYSTEM = (
 )
 
 
+@traced("llm.extract_brand")
 def _extract_brand_semantic(message: str) -> Optional[str]:
     """
     Use a tiny LLM call to extract the canonical brand from free-form text.
@@ -216,6 +227,7 @@ def _extract_brand_semantic(message: str) -> Optional[str]:
             max_tokens=10,
             temperature=0,
         )
+        record_llm_usage(resp)
         raw = (resp.choices[0].message.content or "").strip().strip('"').strip("'")
         if raw.lower() in ("none", "no brand", "unknown", ""):
             return None
@@ -330,6 +342,7 @@ _BRAND_UNEXCLUDE_SYSTEM = (
 )
 
 
+@traced("llm.detect_allowed_brands")
 def _detect_allowed_brands_semantic(
     message: str, currently_excluded: List[str]
 ) -> List[str]:
@@ -353,6 +366,7 @@ def _detect_allowed_brands_semantic(
             max_tokens=20,
             temperature=0,
         )
+        record_llm_usage(resp)
         raw = (resp.choices[0].message.content or "").strip()
         if raw.lower() in ("none", "no brand", "no brands", ""):
             return []
@@ -399,6 +413,7 @@ def _detect_allowed_brands(message: str, currently_excluded: List[str]) -> List[
     return [b for b in mentioned_excl if b.lower() in msg_lower]
 
 
+@traced("llm.extract_excluded_brands")
 def _extract_excluded_brands_semantic(message: str) -> List[str]:
     """
     Use a tiny LLM call to detect brands the user wants to EXCLUDE.
@@ -420,6 +435,7 @@ def _extract_excluded_brands_semantic(message: str) -> List[str]:
             max_tokens=20,
             temperature=0,
         )
+        record_llm_usage(resp)
         raw = (resp.choices[0].message.content or "").strip()
         if raw.lower() in ("none", "no brand", "no brands", ""):
             return []
@@ -450,6 +466,98 @@ def _extract_excluded_screen_sizes_from_text(message: str) -> List[float]:
     return out
 
 
+# ---------------------------------------------------------------------------
+# Rule-based slot extraction (_regex_extract_criteria), compiled once at import
+# ---------------------------------------------------------------------------
+
+# Budget: "$900", "under $900", "budget $900", "$800-$1,500", "500 bucks"
+# Slot values that mean "no constraint" and must not become search filters
+_NO_PREFERENCE_VALUES = frozenset({"no preference", "any", "either", "any price"})
+
+_BUDGET_RANGE_RE = re.compile(r'\$(\d[\d,]*)\s*[-–to]+\s*\$?(\d[\d,]*k?)', re.IGNORECASE)
+_BUDGET_UNDER_RE = re.compile(
+    r'(?:under|below|less than|at most|up to|max|budget[:\s]+)\s*\$\s*(\d[\d,]*)', re.IGNORECASE
+)
+_BUDGET_OVER_RE = re.compile(
+    r'(?:over|above|more than|at least|minimum|starting(?:\s+from)?|from)\s*\$\s*(\d[\d,]*)', re.IGNORECASE
+)
+_BUDGET_PLAIN_RE = re.compile(r'\$\s*(\d[\d,]+)')
+# "500 bucks", "500 dollars", "500 usd" (without dollar sign)
+_BUDGET_BUCKS_RE = re.compile(r'(?:^|[\s,])(\d{2,5})\s*(?:bucks?|dollars?|usd)\b', re.IGNORECASE)
+
+_RAM_RE = re.compile(r'(?:at\s+least\s+)?(\d{1,3})\s*(?:gb|g)\s*(?:of\s+)?(?:ram|memory)', re.IGNORECASE)
+_RAM_GIGS_RE = re.compile(r'(\d{1,3})\s*(?:gigs?)\s*(?:of\s+)?(?:ram|memory)?', re.IGNORECASE)
+
+# "no Chromebook", "not a Chromebook", "Windows or macOS", "real OS", etc.
+# These mean "exclude ChromeOS" — NOT a positive ChromeOS request.
+_CHROMEBOOK_EXCLUSION_RE = re.compile(
+    r"(?:no|not\s+a?|don'?t\s+want|avoid|without)\s+chromebook"
+    r"|chromebook[s]?\s+(?:are\s+)?(?:not|won'?t)\s+work"
+    r"|\breal\s+os\b"                          # "I need a real OS"
+    r"|\bwindows\s+or\s+ma?c"                  # "Windows or Mac/macOS"
+    r"|\bma?c\s+or\s+windows\b",               # "Mac or Windows"
+    re.IGNORECASE,
+)
+# Professional / medical use cases where Chromebooks are inherently unsuitable
+# (clinical software, IDE, engineering tools, etc.)
+_PROFESSIONAL_CHROMEBOOK_EXCL_RE = re.compile(
+    r'\b(?:medical\s+school|med\s+school|nursing\s+school|pharmacy\s+school'
+    r'|law\s+school|dental\s+school|engineering\s+school'
+    r'|for\s+(?:work|office|business|professional|corporate|enterprise|hospital|clinic)'
+    r'|software\s+(?:developer|engineer|development)'
+    r'|programming|coding\s+bootcamp|computer\s+science\s+(?:major|degree|program)'
+    r'|data\s+science|machine\s+learning|graphic\s+design|video\s+editing'
+    r'|autocad|solidworks|matlab|visual\s+studio)\b',
+    re.IGNORECASE,
+)
+_OS_PATTERNS = [
+    (re.compile(r'\bwindows\s*10\b', re.I), "Windows 10"),
+    (re.compile(r'\bwindows\s*11\b', re.I), "Windows 11"),
+    (re.compile(r'\bwindows\b', re.I),      "Windows 11"),
+    (re.compile(r'\blinux\b|\bubuntu\b|\bdebian\b|\bfedora\b', re.I), "Linux"),
+    (re.compile(r'\bmacos\b|\bos\s*x\b|\bapple\s+os\b', re.I), "macOS"),
+    (re.compile(r'\bchrome\s*os\b|\bchromebook\b', re.I), "Chrome OS"),
+]
+_WINDOWS_OR_MAC_RE = re.compile(r'\bwindows\s+or\s+ma?c|\bma?c\s+or\s+windows\b', re.I)
+
+_SCREEN_RE = re.compile(
+    r'(\d{2}(?:\.\d)?)\s*(?:"|″|inch(?:es)?|-inch)(?:\s+(?:screen|display|laptop))?', re.IGNORECASE
+)
+_SCREEN_NEGATION_RE = re.compile(r'(?:no|not|don.t\s+want|don.t\s+like|avoid|hate)', re.IGNORECASE)
+
+_SSD_RE = re.compile(r'\bssd\b')
+_HDD_RE = re.compile(r'\bhdd\b|\bhard\s+drive\b')
+
+_USE_CASE_PATTERNS = [
+    (re.compile(r'\bgaming\b', re.I), "gaming"),
+    (re.compile(r'\bml\b|\bmachine\s+learning\b|\bai\b|\bdeep\s+learning\b|\bpytorch\b|\btensorflow\b', re.I), "machine_learning"),
+    (re.compile(r'\bcreative\b|\bdesign\b|\bvideo\s+edit\b|\bphoto\s+edit\b|\bfigma\b', re.I), "creative"),
+    (re.compile(r'\bweb\s*dev\b|\bprogramm\b|\bcod(e|ing)\b|\bsoftware\s+dev\b', re.I), "web_dev"),
+    (re.compile(r'\bschool\b|\bstudent\b|\bcollege\b|\bstud(y|ying)\b', re.I), "school"),
+    (re.compile(r'\bwork\b|\bbusiness\b|\boffice\b|\bprofessional\b', re.I), "business"),
+]
+# Use-case word immediately preceded by a negation (checked within 25 chars)
+_USE_CASE_NEGATION_RE = re.compile(r'\b(?:no|not|non|without|avoid)\s+\S*\s*$', re.IGNORECASE)
+
+# Regex fallback for preferred brand when the semantic LLM extraction is unavailable
+_BRAND_PATTERNS = [
+    (re.compile(r'\b(?:apple|macbook|mac\s+air|mac\s+pro|mac\s+mini|mac\s+book|macs?)\b', re.I), "Apple"),
+    (re.compile(r'\bdell\b|\bxps\b|\binspiron\b|\blatitude\b', re.I), "Dell"),
+    (re.compile(r'\blenovo\b|\bthinkpad\b|\bideapad\b', re.I), "Lenovo"),
+    (re.compile(r'\basus\b|\brog\b', re.I), "ASUS"),
+    (re.compile(r'\bmsi\b', re.I), "MSI"),
+    (re.compile(r'\brazer\b', re.I), "Razer"),
+    (re.compile(r'\bmicrosoft\b|\bsurface\b', re.I), "Microsoft"),
+    (re.compile(r'\bsamsung\b', re.I), "Samsung"),
+    (re.compile(r'\bframework\b', re.I), "Framework"),
+    (re.compile(r'\bsystem76\b', re.I), "System76"),
+    (re.compile(r'\bhp\b|\bhewlett\b', re.I), "HP"),
+    (re.compile(r'\bacer\b|\baspire\b|\bswift\b', re.I), "Acer"),
+    (re.compile(r'\bgigabyte\b|\baorus\b', re.I), "Gigabyte"),
+    (re.compile(r'\btoshiba\b|\bdynabook\b', re.I), "Toshiba"),
+]
+
+
 # ---------------------------------------------------------------------------
 # Vague refinement heuristics — applied when LLM can't extract a numeric value
 # ---------------------------------------------------------------------------
@@ -570,6 +678,7 @@ class UniversalAgent:
         history: Optional[List[Dict[str, str]]] = None,
         max_questions: int = DEFAULT_MAX_QUESTIONS,
         probe_search_fn=None,
+        probe_facets_fn=None,
     ):
         self.session_id = session_id
         self.history: List[Any] = history or []
@@ -577,6 +686,7 @@ class UniversalAgent:
         self.filters: Dict[str, Any] = {}
         self.state = AgentState.INTENT_DETECTION
         self._probe_search_fn = probe_search_fn  # injected by chat_endpoint for entropy
+        self._probe_facets_fn = probe_facets_fn  # same, from catalog-wide facet counts
 
         # IDSS interview state
         self.question_count = 0
@@ -595,13 +705,16 @@ class UniversalAgent:
         self.client = OpenAI(timeout=10.0, max_retries=0)
 
     @classmethod
-    def restore_from_session(cls, session_id: str, session_state, probe_search_fn=None) -> "UniversalAgent":
+    def restore_from_session(
+        cls, session_id: str, session_state, probe_search_fn=None, probe_facets_fn=None
+    ) -> "UniversalAgent":
         """Reconstruct agent from persisted session state."""
         agent = cls(
             session_id=session_id,
             history=list(session_state.agent_history) if session_state.agent_history else [],
             max_questions=DEFAULT_MAX_QUESTIONS,
             probe_search_fn=probe_search_fn,
+            probe_facets_fn=probe_facets_fn,
         )
         agent.domain = session_state.active_domain
         agent.filters = dict(session_state.agent_filters) if session_state.agent_filters else {}
@@ -639,7 +752,7 @@ class UniversalAgent:
             search_filters["product_type"] = _DOMAIN_PRODUCT_TYPE[domain]
 
         for slot_name, value in self.filters.items():
-            if not value or str(value).lower() in ("no preference", "any", "either", "any price"):
+            if not value or str(value).lower() in _NO_PREFERENCE_VALUES:
                 continue
 
             if slot_name == "budget":
@@ -829,6 +942,7 @@ class UniversalAgent:
 
         return search_filters
 
+    @traced("agent.process_message")
     def process_message(self, message: str) -> Dict[str, Any]:
         import time
         timings = {}
@@ -1134,6 +1248,7 @@ class UniversalAgent:
         "under", "laptop", "notebook", "chromebook",
     })
 
+    @traced("agent.detect_domain")
     def _detect_domain_from_message(self, message: str) -> Optional[str]:
         """
         Classify the user's message into a domain.
@@ -1170,6 +1285,7 @@ class UniversalAgent:
                 ],
                 response_format=DomainClassification,
             )
+            record_llm_usage(completion)
             result = completion.choices[0].message.parsed
             if not result:
                 logger.warning("Domain detection: LLM returned None (parsing failed)")
@@ -1262,6 +1378,7 @@ class UniversalAgent:
 
 
 
+    @traced("agent.extract_criteria")
     def _extract_criteria(self, message: str, schema: DomainSchema) -> Optional[ExtractedCriteria]:
         """
         Uses LLM to extract criteria based on the active schema.
@@ -1309,6 +1426,7 @@ class UniversalAgent:
                 ],
                 response_format=ExtractedCriteria,
             )
+            record_llm_usage(completion)
             result = completion.choices[0].message.parsed
             if not result:
                 logger.warning("Criteria extraction returned None")
@@ -1520,21 +1638,11 @@ class UniversalAgent:
         # ── Budget ───────────────────────────────────────────────────────────
         # Patterns: "$900", "under $900", "budget $900", "$800-$1,500", "500 bucks"
         budget_val: Optional[str] = None
-        _b_range = re.search(r'\$(\d[\d,]*)\s*[-–to]+\s*\$?(\d[\d,]*k?)', text, re.IGNORECASE)
-        _b_under = re.search(
-            r'(?:under|below|less than|at most|up to|max|budget[:\s]+)\s*\$\s*(\d[\d,]*)',
-            text, re.IGNORECASE
-        )
-        _b_over = re.search(
-            r'(?:over|above|more than|at least|minimum|starting(?:\s+from)?|from)\s*\$\s*(\d[\d,]*)',
-            text, re.IGNORECASE
-        )
-        _b_plain = re.search(r'\$\s*(\d[\d,]+)', text)
-        # "500 bucks", "500 dollars", "500 usd" (without dollar sign)
-        _b_bucks = re.search(
-            r'(?:^|[\s,])(\d{2,5})\s*(?:bucks?|dollars?|usd)\b',
-            text, re.IGNORECASE
-        )
+        _b_range = _BUDGET_RANGE_RE.search(text)
+        _b_under = _BUDGET_UNDER_RE.search(text)
+        _b_over = _BUDGET_OVER_RE.search(text)
+        _b_plain = _BUDGET_PLAIN_RE.search(text)
+        _b_bucks = _BUDGET_BUCKS_RE.search(text)
         if _b_range:
             lo = _b_range.group(1).replace(",", "")
             hi = _b_range.group(2).replace(",", "").rstrip("k")
@@ -1553,12 +1661,7 @@ class UniversalAgent:
             criteria.append(SlotValue(slot_name="budget", value=budget_val))
 
         # ── RAM (laptops / phones) ────────────────────────────────────────────
-        _ram = re.search(
-            r'(?:at\s+least\s+)?(\d{1,3})\s*(?:gb|g)\s*(?:of\s+)?(?:ram|memory)',
-            text, re.IGNORECASE
-        )
-        if not _ram:
-            _ram = re.search(r'(\d{1,3})\s*(?:gigs?)\s*(?:of\s+)?(?:ram|memory)?', text, re.IGNORECASE)
+        _ram = _RAM_RE.search(text) or _RAM_GIGS_RE.search(text)
         if _ram:
             val_gb = int(_ram.group(1))
             if 2 <= val_gb <= 256:
@@ -1573,32 +1676,11 @@ class UniversalAgent:
             criteria.append(SlotValue(slot_name="excluded_brands", value=",".join(excl_brands)))
 
         # ── OS exclusion (Chromebook / ChromeOS) ─────────────────────────────
-        # Detect "no Chromebook", "not a Chromebook", "Windows or macOS", "real OS", etc.
-        # These mean "exclude ChromeOS" — NOT a positive ChromeOS request.
-        _CHROMEBOOK_EXCLUSION_RE = re.compile(
-            r"(?:no|not\s+a?|don'?t\s+want|avoid|without)\s+chromebook"
-            r"|chromebook[s]?\s+(?:are\s+)?(?:not|won'?t)\s+work"
-            r"|\breal\s+os\b"                          # "I need a real OS"
-            r"|\bwindows\s+or\s+ma?c"                  # "Windows or Mac/macOS"
-            r"|\bma?c\s+or\s+windows\b",               # "Mac or Windows"
-            re.IGNORECASE,
+        # Explicit "no Chromebook"-style phrasing, or proactively for professional /
+        # medical use cases where Chromebooks are unsuitable.
+        _exclude_chromeos = bool(
+            _CHROMEBOOK_EXCLUSION_RE.search(message) or _PROFESSIONAL_CHROMEBOOK_EXCL_RE.search(message)
         )
-        _exclude_chromeos = bool(_CHROMEBOOK_EXCLUSION_RE.search(message))
-        # Proactively exclude Chrome OS for professional / medical use cases where
-        # Chromebooks are inherently unsuitable (clinical software, IDE, engineering tools, etc.)
-        if not _exclude_chromeos:
-            _PROFESSIONAL_CHROMEBOOK_EXCL_RE = re.compile(
-                r'\b(?:medical\s+school|med\s+school|nursing\s+school|pharmacy\s+school'
-                r'|law\s+school|dental\s+school|engineering\s+school'
-                r'|for\s+(?:work|office|business|professional|corporate|enterprise|hospital|clinic)'
-                r'|software\s+(?:developer|engineer|development)'
-                r'|programming|coding\s+bootcamp|computer\s+science\s+(?:major|degree|program)'
-                r'|data\s+science|machine\s+learning|graphic\s+design|video\s+editing'
-                r'|autocad|solidworks|matlab|visual\s+studio)\b',
-                re.IGNORECASE,
-            )
-            if _PROFESSIONAL_CHROMEBOOK_EXCL_RE.search(message):
-                _exclude_chromeos = True
         if _exclude_chromeos:
             criteria.append(SlotValue(slot_name="excluded_os", value="Chrome OS"))
 
@@ -1607,21 +1689,13 @@ class UniversalAgent:
         # "Windows or macOS" = excluded_os only (no positive filter); handle ChromeOS
         # as an exclusion (above) rather than a positive match when negated.
         _skip_chromeos_positive = _exclude_chromeos  # don't add os=Chrome OS when user said "no Chromebook"
-        _os_map = [
-            (re.compile(r'\bwindows\s*10\b', re.I), "Windows 10"),
-            (re.compile(r'\bwindows\s*11\b', re.I), "Windows 11"),
-            (re.compile(r'\bwindows\b', re.I),      "Windows 11"),
-            (re.compile(r'\blinux\b|\bubuntu\b|\bdebian\b|\bfedora\b', re.I), "Linux"),
-            (re.compile(r'\bmacos\b|\bos\s*x\b|\bapple\s+os\b', re.I), "macOS"),
-            (re.compile(r'\bchrome\s*os\b|\bchromebook\b', re.I), "Chrome OS"),
-        ]
-        for _pat, _os_val in _os_map:
+        for _pat, _os_val in _OS_PATTERNS:
             if _pat.search(message):
                 if _os_val == "Chrome OS" and _skip_chromeos_positive:
                     break  # exclusion already added above; don't add positive filter
                 # Also skip positive Windows/macOS match when phrase is "Windows or macOS"
                 # (that phrase means "not Chromebook", not a restriction to one OS)
-                if re.search(r'\bwindows\s+or\s+ma?c|\bma?c\s+or\s+windows\b', message, re.I):
+                if _WINDOWS_OR_MAC_RE.search(message):
                     break  # handled by excluded_os above
                 criteria.append(SlotValue(slot_name="os", value=_os_val))
                 break
@@ -1637,46 +1711,28 @@ class UniversalAgent:
                 )
             )
 
-        _scr = re.search(
-            r'(\d{2}(?:\.\d)?)\s*(?:"|″|inch(?:es)?|-inch)(?:\s+(?:screen|display|laptop))?',
-            text, re.IGNORECASE
-        )
+        _scr = _SCREEN_RE.search(text)
         if _scr:
             # Ignore if negated: "I don't want a 14 inch", "no 14 inch screen"
             _pre_context = text[max(0, _scr.start() - 40):_scr.start()]
-            _scr_negated = re.search(
-                r'(?:no|not|don.t\s+want|don.t\s+like|avoid|hate)',
-                _pre_context, re.IGNORECASE
-            )
-            if not _scr_negated:
+            if not _SCREEN_NEGATION_RE.search(_pre_context):
                 criteria.append(SlotValue(slot_name="screen_size", value=_scr.group(1)))
 
         # ── Storage type ──────────────────────────────────────────────────────
-        if re.search(r'\bssd\b', text):
+        if _SSD_RE.search(text):
             criteria.append(SlotValue(slot_name="storage_type", value="SSD"))
-        elif re.search(r'\bhdd\b|\bhard\s+drive\b', text):
+        elif _HDD_RE.search(text):
             criteria.append(SlotValue(slot_name="storage_type", value="HDD"))
 
         # ── Use-case (laptops) ────────────────────────────────────────────────
         if domain == "laptops":
-            _use_map = [
-                (r'\bgaming\b', "gaming"),
-                (r'\bml\b|\bmachine\s+learning\b|\bai\b|\bdeep\s+learning\b|\bpytorch\b|\btensorflow\b', "machine_learning"),
-                (r'\bcreative\b|\bdesign\b|\bvideo\s+edit\b|\bphoto\s+edit\b|\bfigma\b', "creative"),
-                (r'\bweb\s*dev\b|\bprogramm\b|\bcod(e|ing)\b|\bsoftware\s+dev\b', "web_dev"),
-                (r'\bschool\b|\bstudent\b|\bcollege\b|\bstud(y|ying)\b', "school"),
-                (r'\bwork\b|\bbusiness\b|\boffice\b|\bprofessional\b', "business"),
-            ]
-            _NEG_UC_RE = re.compile(
-                r'\b(?:no|not|non|without|avoid|don\'?t\s+want)\s+\S*\s*$', re.IGNORECASE
-            )
-            for _uc_pat, _uc_val in _use_map:
-                _m = re.search(_uc_pat, text, re.IGNORECASE)
+            for _uc_pat, _uc_val in _USE_CASE_PATTERNS:
+                _m = _uc_pat.search(text)
                 if not _m:
                     continue
                 # Skip if word is immediately preceded by negation (within 25 chars)
                 _prefix = text[max(0, _m.start()-25):_m.start()]
-                if re.search(r'\b(?:no|not|non|without|avoid)\s+\S*\s*$', _prefix, re.IGNORECASE):
+                if _USE_CASE_NEGATION_RE.search(_prefix):
                     continue
                 criteria.append(SlotValue(slot_name="use_case", value=_uc_val))
                 break
@@ -1689,24 +1745,8 @@ class UniversalAgent:
 
         # Step 2: regex fallback only if LLM unavailable (quota, network error)
         if _brand_found is None:
-            _brand_phrases = [
-                (r'\b(?:apple|macbook|mac\s+air|mac\s+pro|mac\s+mini|mac\s+book|macs?)\b', "Apple"),
-                (r'\bdell\b|\bxps\b|\binspiron\b|\blatitude\b', "Dell"),
-                (r'\blenovo\b|\bthinkpad\b|\bideapad\b', "Lenovo"),
-                (r'\basus\b|\brog\b', "ASUS"),
-                (r'\bmsi\b', "MSI"),
-                (r'\brazer\b', "Razer"),
-                (r'\bmicrosoft\b|\bsurface\b', "Microsoft"),
-                (r'\bsamsung\b', "Samsung"),
-                (r'\bframework\b', "Framework"),
-                (r'\bsystem76\b', "System76"),
-                (r'\bhp\b|\bhewlett\b', "HP"),
-                (r'\bacer\b|\baspire\b|\bswift\b', "Acer"),
-                (r'\bgigabyte\b|\baorus\b', "Gigabyte"),
-                (r'\btoshiba\b|\bdynabook\b', "Toshiba"),
-            ]
-            for _bp, _bv in _brand_phrases:
-                if re.search(_bp, text, re.IGNORECASE):
+            for _bp, _bv in _BRAND_PATTERNS:
+                if _bp.search(text):
                     _brand_found = _bv
                     break
 
@@ -1926,6 +1966,87 @@ class UniversalAgent:
         "storage_type": "storage_type",
     }
 
+    _NUMERICAL_ATTRS = frozenset({"price", "ram_gb", "screen_size"})
+
+    @staticmethod
+    def _extract_attr(product: Dict[str, Any], attr: str):
+        """Extract a laptop attribute from product dict (handles nested attrs)."""
+        # Try top-level first (price, brand)
+        val = product.get(attr) or product.get("price_value") if attr == "price" else product.get(attr)
+        if val is None:
+            # Try nested attributes dict (ram_gb, screen_size, storage_type)
+            attrs = product.get("attributes") or {}
+            val = attrs.get(attr)
+        return val
+
+    @classmethod
+    def _slot_distributions(cls, candidates: List[Dict[str, Any]]) -> Dict[str, Counter]:
+        """
+        Value counts per mapped product attribute (quantile-bucket counts for
+        numerical attributes). Attributes with fewer than 3 values are omitted.
+        """
+        from idss.diversification.entropy import bucket_numerical_values  # noqa: PLC0415
+
+        distributions: Dict[str, Counter] = {}
+        for attr in set(cls._SLOT_TO_ATTR.values()):
+            try:
+                non_null = [v for v in (cls._extract_attr(p, attr) for p in candidates) if v is not None]
+                if len(non_null) < 3:
+                    continue
+                if attr in cls._NUMERICAL_ATTRS:
+                    buckets, _ = bucket_numerical_values([float(v) for v in non_null], n_buckets=3)
+                    distributions[attr] = Counter(buckets)
+                else:
+                    distributions[attr] = Counter(non_null)
+            except Exception:
+                pass
+        return distributions
+
+    def _probe_distributions(self) -> Optional[Dict[str, Counter]]:
+        """
+        Slot value distributions for the current filters, or None when the
+        probe finds fewer than 5 candidates.
+
+        Facet counts over every matching product (probe_facets_fn) are used
+        when available; they are cheap enough to compute per turn. Otherwise
+        a probe search samples candidates, and the result is cached per
+        probe, domain and filter set, so warm filter sets need no probe search.
+        """
+        if self._probe_facets_fn is not None:
+            try:
+                facet_distributions = self._probe_facets_fn(self.filters)
+            except Exception:
+                facet_distributions = None
+            if facet_distributions is not None:
+                return facet_distributions or None
+        if not self._probe_search_fn:
+            return None
+
+        try:
+            from idss.interview.entropy_question_selector import question_distribution_cache  # noqa: PLC0415
+        except ImportError:
+            question_distribution_cache = None
+
+        cache_domain = (self._probe_search_fn, self.domain)
+        if question_distribution_cache is not None:
+            cached = question_distribution_cache.get(cache_domain, self.filters)
+            if cached is not None:
+                return cached or None
+
+        try:
+            candidates: List[Dict[str, Any]] = self._probe_search_fn(self.filters, limit=30)
+        except Exception:
+            candidates = []
+        if not candidates:
+            # Errors and empty probes are not cached
+            return None
+
+        distributions = self._slot_distributions(candidates) if len(candidates) >= 5 else {}
+        if question_distribution_cache is not None:
+            question_distribution_cache.put(cache_domain, self.filters, distributions)
+        return distributions or None
+
+    @traced("agent.entropy_next_slot")
     def _entropy_next_slot(self, schema: DomainSchema) -> Optional[PreferenceSlot]:
         """
         Select the next interview question using information-gain (entropy).
@@ -1936,21 +2057,21 @@ class UniversalAgent:
           compute Shannon entropy per unasked slot dimension, pick the one
           with highest entropy (= most information gained by asking it).
         - Fallback to priority system if probe returns <5 candidates or
-          no probe_search_fn is injected.
+          neither probe_search_fn nor probe_facets_fn is injected.
 
         This replaces the rigid HIGH→MEDIUM→LOW order for follow-up questions.
         """
         # Q1 or no probe function — fall back to priority order
-        if self.question_count == 0 or not self._probe_search_fn:
+        if self.question_count == 0 or not (self._probe_search_fn or self._probe_facets_fn):
             return self._get_next_missing_slot(schema)
 
-        # Get candidate products with current filters
         try:
-            candidates: List[Dict[str, Any]] = self._probe_search_fn(self.filters, limit=30)
-        except Exception:
-            candidates = []
+            from idss.diversification.entropy import entropy_from_distribution  # noqa: PLC0415
+        except ImportError:
+            return self._get_next_missing_slot(schema)
 
-        if len(candidates) < 5:
+        distributions = self._probe_distributions()
+        if distributions is None:
             return self._get_next_missing_slot(schema)
 
         # Find unasked, non-extract-only slots that have a product attribute mapping
@@ -1964,50 +2085,18 @@ class UniversalAgent:
         if not askable:
             return self._get_next_missing_slot(schema)
 
-        # Compute entropy for each candidate slot dimension.
-        # Use compute_shannon_entropy with manual extraction — compute_dimension_entropy
-        # uses vehicle-specific getters and doesn't handle nested laptop attributes.
-        try:
-            from idss.diversification.entropy import (  # noqa: PLC0415
-                compute_shannon_entropy,
-                bucket_numerical_values,
-            )
-        except ImportError:
-            return self._get_next_missing_slot(schema)
-
-        _NUMERICAL_ATTRS = {"price", "ram_gb", "screen_size"}
-
-        def _extract_attr(product: Dict[str, Any], attr: str):
-            """Extract a laptop attribute from product dict (handles nested attrs)."""
-            # Try top-level first (price, brand)
-            val = product.get(attr) or product.get("price_value") if attr == "price" else product.get(attr)
-            if val is None:
-                # Try nested attributes dict (ram_gb, screen_size, storage_type)
-                attrs = product.get("attributes") or {}
-                val = attrs.get(attr)
-            return val
-
         best_slot: Optional[PreferenceSlot] = None
         best_entropy = -1.0
         for slot in askable:
             attr = self._SLOT_TO_ATTR[slot.name]
-            try:
-                raw_vals = [_extract_attr(p, attr) for p in candidates]
-                non_null = [v for v in raw_vals if v is not None]
-                if len(non_null) < 3:
-                    continue
-                if attr in _NUMERICAL_ATTRS:
-                    floats = [float(v) for v in non_null]
-                    buckets, _ = bucket_numerical_values(floats, n_buckets=3)
-                    h = compute_shannon_entropy(buckets)
-                else:
-                    h = compute_shannon_entropy(non_null)
-                logger.info(f"Entropy slot={slot.name} attr={attr} H={h:.3f}")
-                if h > best_entropy:
-                    best_entropy = h
-                    best_slot = slot
-            except Exception:
-                pass
+            counts = distributions.get(attr)
+            if counts is None:
+                continue
+            h = entropy_from_distribution(counts)
+            logger.info(f"Entropy slot={slot.name} attr={attr} H={h:.3f}")
+            if h > best_entropy:
+                best_entropy = h
+                best_slot = slot
 
         if best_slot:
             logger.info(f"Entropy-selected next slot: {best_slot.name} (H={best_entropy:.3f})")
@@ -2081,6 +2170,7 @@ class UniversalAgent:
 
 **{invite_str}**"""
 
+    @traced("agent.generate_question")
     def _generate_question(self, slot: PreferenceSlot, schema: DomainSchema) -> GeneratedQuestion:
         """
         Uses LLM to generate a natural follow-up question.
@@ -2113,6 +2203,7 @@ class UniversalAgent:
                 ],
                 response_format=GeneratedQuestion
             )
+            record_llm_usage(completion)
             result = completion.choices[0].message.parsed
             if not result:
                 raise ValueError("Question generation parsing returned None")
@@ -2153,6 +2244,7 @@ class UniversalAgent:
         logger.info(f"Handoff to search: domain={self.domain}, filters={self.filters}, questions_asked={self.question_count}")
         return response
 
+    @traced("agent.explain_recommendations")
     def generate_recommendation_explanation(
         self, recommendations: List[List[Dict[str, Any]]], domain: str, message: str = ""
     ) -> str:
@@ -2218,6 +2310,7 @@ Write the recommendation message."""}
                 # KV-cache per max_completion_tokens, so high caps inflate queue latency.
                 max_completion_tokens=400,
             )
+            record_llm_usage(completion)
             message = (completion.choices[0].message.content or "").strip()
             if not message:
                 # gpt-5-nano occasionally returns empty content; use fallback
@@ -2228,6 +2321,7 @@ Write the recommendation message."""}
             logger.error(f"Recommendation explanation failed: {e}")
             return f"Here are top {domain} recommendations based on your preferences. What would you like to do next?"
 
+    @traced("agent.process_refinement")
     def process_refinement(self, message: str) -> Dict[str, Any]:
         """
         Classify and handle a post-recommendation message using LLM.
@@ -2255,6 +2349,7 @@ Write the recommendation message."""}
                 ],
                 response_format=RefinementClassification,
             )
+            record_llm_usage(completion)
             result = completion.choices[0].message.parsed
             if not result:
                 logger.warning("Refinement classification returned None")
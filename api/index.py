@@ -11,9 +11,27 @@ Environment variables required:
 - DATABASE_URL: PostgreSQL connection string (Supabase/Neon)
 - PINECONE_API_KEY: For vector search (optional)
 - PINECONE_INDEX: Pinecone index name (optional)
+
+Sessions and embeddings survive cold starts through a pluggable store
+(SESSION_BACKEND):
+- redis: UPSTASH_REDIS_URL or REDIS_URL (default when either is set)
+- sqlite: SESSION_DB_PATH (default /tmp/idss_api.sqlite; survives warm
+  invocations only, meant for local runs and tests)
+- memory: per-process dict (previous behaviour)
+If Redis is unreachable, sessions fall back to a per-process MemoryStore
+for that call instead of failing the request.
+Sessions expire SESSION_TTL_SECONDS after their last update. Embeddings
+are keyed by a SHA-256 of model + text, so a text is embedded once.
 """
 import os
 import json
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 from typing import Dict, Any, List, Optional
@@ -21,10 +39,194 @@ from typing import Dict, Any, List, Optional
 # Use OpenAI for embeddings (lightweight, no local models)
 from openai import OpenAI
 
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+# Embeddings never change for a given text; the TTL only bounds Redis growth
+EMBEDDING_TTL_SECONDS = int(os.environ.get("EMBEDDING_TTL_SECONDS", str(30 * 24 * 3600)))
+# In-process embedding LRU in front of the persistent store
+EMBEDDING_MEMORY_SIZE = int(os.environ.get("EMBEDDING_MEMORY_SIZE", "2048"))
+
+
+def embedding_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Content hash used as the embedding cache key."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class MemoryStore:
+    """Per-process sessions and embeddings (lost on cold start)."""
+
+    def __init__(self):
+        self.sessions: Dict[str, dict] = {}
+        self.embeddings: Dict[str, bytes] = {}
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        return self.sessions.get(session_id)
+
+    def save_session(self, session: dict) -> None:
+        self.sessions[session["session_id"]] = session
+
+    def count_sessions(self) -> int:
+        return len(self.sessions)
+
+    def get_embeddings(self, keys: List[str]) -> Dict[str, bytes]:
+        return {k: self.embeddings[k] for k in keys if k in self.embeddings}
+
+    def put_embeddings(self, blobs: Dict[str, bytes]) -> None:
+        self.embeddings.update(blobs)
+
+
+class SQLiteStore:
+    """File-backed store for local runs and tests."""
+
+    def __init__(self, path: str, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL);
+        """)
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_session(self, session: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session["session_id"], json.dumps(session), time.time() + self.ttl_seconds),
+            )
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def get_embeddings(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {k: bytes(v) for k, v in rows}
+
+    def put_embeddings(self, blobs: Dict[str, bytes]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", list(blobs.items())
+            )
+
+
+class RedisStore:
+    """
+    Redis-backed store shared by every function instance.
+
+    Session reads and writes that fail (Redis outage, timeout) are logged and
+    served from a per-process MemoryStore, so a chat turn still completes.
+    """
 
-# Simple in-memory session storage (note: won't persist across function invocations)
-# For production, use Redis or database-backed sessions
-sessions: Dict[str, dict] = {}
+    PREFIX = "idss_api"
+
+    def __init__(self, url: str, ttl_seconds: int = SESSION_TTL_SECONDS, client=None):
+        if client is None:
+            import redis
+            client = redis.from_url(url, socket_connect_timeout=5, socket_timeout=5)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.fallback = MemoryStore()
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.PREFIX}:session:{session_id}"
+
+    def _embedding_key(self, key: str) -> str:
+        return f"{self.PREFIX}:emb:{key}"
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        try:
+            raw = self.client.get(self._session_key(session_id))
+        except Exception as e:
+            logger.warning("Redis session read failed, using in-memory store: %s", e)
+            return self.fallback.get_session(session_id)
+        # A session saved during an outage only exists in the fallback
+        return json.loads(raw) if raw else self.fallback.get_session(session_id)
+
+    def save_session(self, session: dict) -> None:
+        try:
+            self.client.set(self._session_key(session["session_id"]), json.dumps(session), ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning("Redis session write failed, using in-memory store: %s", e)
+            self.fallback.save_session(session)
+            return
+        self.fallback.sessions.pop(session["session_id"], None)
+
+    def count_sessions(self) -> int:
+        try:
+            return sum(1 for _ in self.client.scan_iter(match=self._session_key("*"), count=500))
+        except Exception as e:
+            logger.warning("Redis session count failed, using in-memory store: %s", e)
+            return self.fallback.count_sessions()
+
+    def get_embeddings(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        values = self.client.mget([self._embedding_key(k) for k in keys])
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def put_embeddings(self, blobs: Dict[str, bytes]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, blob in blobs.items():
+            pipe.set(self._embedding_key(key), blob, nx=True, ex=EMBEDDING_TTL_SECONDS)
+        pipe.execute()
+
+
+_store = None
+_embedding_memory: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+def get_store():
+    """Session/embedding store for this process, created on first use."""
+    global _store
+    if _store is None:
+        redis_url = os.environ.get("UPSTASH_REDIS_URL") or os.environ.get("REDIS_URL")
+        backend = os.environ.get("SESSION_BACKEND") or ("redis" if redis_url else "sqlite")
+        if backend == "redis" and redis_url:
+            _store = RedisStore(redis_url)
+        elif backend == "memory":
+            _store = MemoryStore()
+        else:
+            _store = SQLiteStore(os.environ.get("SESSION_DB_PATH", "/tmp/idss_api.sqlite"))
+    return _store
+
+
+def new_session(session_id: str) -> dict:
+    return {
+        "session_id": session_id,
+        "filters": {},
+        "preferences": {},
+        "conversation_history": [],
+        "question_count": 0,
+        "k": 3  # Default questions to ask
+    }
 
 
 def get_openai_client():
@@ -32,14 +234,48 @@ def get_openai_client():
     return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 
+def get_embeddings(texts: List[str], client: Optional[OpenAI] = None) -> List[List[float]]:
+    """
+    Embed texts, reusing cached vectors. Only texts never seen before (by
+    content hash) go to the OpenAI API, in a single request.
+    """
+    keys = [embedding_key(t) for t in texts]
+    found: Dict[str, List[float]] = {}
+    for key in keys:
+        if key in _embedding_memory:
+            _embedding_memory.move_to_end(key)
+            found[key] = _embedding_memory[key]
+
+    missing = [k for k in dict.fromkeys(keys) if k not in found]
+    if missing:
+        try:
+            for key, blob in get_store().get_embeddings(missing).items():
+                found[key] = _unpack(blob)
+        except Exception as e:
+            logger.warning("Embedding cache lookup failed: %s", e)
+
+    new_texts = list({k: t for k, t in zip(keys, texts) if k not in found}.items())
+    if new_texts:
+        client = client or get_openai_client()
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=[t for _, t in new_texts])
+        fresh = {key: item.embedding for (key, _), item in zip(new_texts, response.data)}
+        found.update(fresh)
+        try:
+            get_store().put_embeddings({k: _pack(v) for k, v in fresh.items()})
+        except Exception as e:
+            logger.warning("Embedding cache store failed: %s", e)
+
+    for key in keys:
+        _embedding_memory[key] = found[key]
+        _embedding_memory.move_to_end(key)
+    while len(_embedding_memory) > EMBEDDING_MEMORY_SIZE:
+        _embedding_memory.popitem(last=False)
+    return [found[k] for k in keys]
+
+
 def get_embedding(text: str) -> List[float]:
-    """Get embedding using OpenAI API."""
-    client = get_openai_client()
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+    """Get embedding using OpenAI API (cached by content hash)."""
+    return get_embeddings([text])[0]
 
 
 def parse_user_input_simple(message: str, client: OpenAI) -> dict:
@@ -126,12 +362,13 @@ class handler(BaseHTTPRequestHandler):
             self.send_json_response({
                 "status": "online",
                 "runtime": "vercel-serverless",
-                "sessions": len(sessions)
+                "sessions": get_store().count_sessions()
             })
         elif path.startswith("/session/"):
             session_id = path.split("/session/")[1]
-            if session_id in sessions:
-                self.send_json_response(sessions[session_id])
+            session = get_store().get_session(session_id)
+            if session is not None:
+                self.send_json_response(session)
             else:
                 self.send_error_response(404, "Session not found")
         else:
@@ -177,19 +414,13 @@ class handler(BaseHTTPRequestHandler):
             session_id = data.get("session_id")
 
             # Get or create session
-            if not session_id or session_id not in sessions:
+            store = get_store()
+            session = store.get_session(session_id) if session_id else None
+            if session is None:
                 import uuid
                 session_id = session_id or str(uuid.uuid4())
-                sessions[session_id] = {
-                    "session_id": session_id,
-                    "filters": {},
-                    "preferences": {},
-                    "conversation_history": [],
-                    "question_count": 0,
-                    "k": 3  # Default questions to ask
-                }
-
-            session = sessions[session_id]
+                session = new_session(session_id)
+
             client = get_openai_client()
 
             # Parse user input
@@ -225,6 +456,7 @@ class handler(BaseHTTPRequestHandler):
                     "role": "assistant",
                     "content": intro
                 })
+                store.save_session(session)
 
                 self.send_json_response({
                     "response_type": "recommendations",
@@ -245,6 +477,7 @@ class handler(BaseHTTPRequestHandler):
                     "role": "assistant",
                     "content": question_data["question"]
                 })
+                store.save_session(session)
 
                 self.send_json_response({
                     "response_type": "question",
@@ -264,14 +497,7 @@ class handler(BaseHTTPRequestHandler):
         import uuid
         session_id = data.get("session_id") or str(uuid.uuid4())
 
-        sessions[session_id] = {
-            "session_id": session_id,
-            "filters": {},
-            "preferences": {},
-            "conversation_history": [],
-            "question_count": 0,
-            "k": 3
-        }
+        get_store().save_session(new_session(session_id))
 
         self.send_json_response({
             "session_id": session_id,
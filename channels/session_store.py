@@ -2,37 +2,262 @@
 session_store.py — maps channel-specific user IDs to IDSS session IDs.
 
 Each channel user gets a stable IDSS session_id so conversation context
-persists across messages. The store is in-memory (resets on server restart);
-upgrade to Redis via `cache_client` when persistence is needed.
+persists across messages.
+
+Two backends, picked with CHANNEL_SESSION_BACKEND:
+
+- "memory" (default): per-process map with lock-free reads. Lookups of an
+  existing session are a plain dict read; only creating or replacing an
+  expired entry takes a lock, striped by key so users in different
+  workspaces never contend. (The old single asyncio.Lock serialized every
+  Slack event from every workspace.)
+- "redis": shared by every channel worker process. get_or_create is one
+  GETEX on the hot path and an atomic SET NX on first contact, so two
+  workers racing on a new user still agree on one session_id. Connection
+  settings follow app.cache (UPSTASH_REDIS_URL or REDIS_HOST/REDIS_PORT,
+  REDIS_DB_AGENT). If Redis is unreachable the in-memory store answers and
+  a warning is logged; Redis is then skipped for
+  CHANNEL_SESSION_REDIS_COOLDOWN seconds (default 30) so messages do not
+  each wait for a connect timeout, after which one message probes it again.
+
+Sessions expire CHANNEL_SESSION_TTL seconds (default 24h) after the user's
+last message.
 """
 from __future__ import annotations
 
-import asyncio
+import logging
+import os
+import threading
+import time
 import uuid
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("channels.session_store")
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_REDIS_COOLDOWN_SECONDS = 30.0
+REDIS_KEY_PREFIX = "channel_session"
+
+Key = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("session_id", "expires_at")
+
+    def __init__(self, session_id: str, expires_at: float):
+        self.session_id = session_id
+        self.expires_at = expires_at
+
+
+class InMemorySessionStore:
+    """Per-process store: lock-free reads, striped locks for writes, sliding TTL."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, stripes: int = 64, sweep_every: int = 1024):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("CHANNEL_SESSION_TTL", str(DEFAULT_TTL_SECONDS))
+        )
+        # Maps (channel_prefix, user_id) → entry
+        # e.g. ("slack", "U12345678") → "550e8400-e29b-41d4-a716-446655440000"
+        self._store: Dict[Key, _Entry] = {}
+        # Plain threading locks: nothing awaits while holding one, so they
+        # are safe for any number of event loops / threads.
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._sweep_every = sweep_every
+        self._writes = 0
+
+    def _lock_for(self, key: Key) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def get_or_create_sync(self, channel: str, user_id: str) -> str:
+        key = (channel, user_id)
+        now = time.monotonic()
+        entry = self._store.get(key)
+        if entry is not None and entry.expires_at > now:
+            entry.expires_at = now + self.ttl_seconds
+            return entry.session_id
+        with self._lock_for(key):
+            entry = self._store.get(key)
+            if entry is not None and entry.expires_at > now:
+                entry.expires_at = now + self.ttl_seconds
+                return entry.session_id
+            session_id = str(uuid.uuid4())
+            self._store[key] = _Entry(session_id, now + self.ttl_seconds)
+            self._writes += 1
+        if self._writes % self._sweep_every == 0:
+            self.sweep()
+        return session_id
+
+    def sweep(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+        now = time.monotonic()
+        removed = 0
+        for key, entry in list(self._store.items()):
+            if entry.expires_at <= now:
+                with self._lock_for(key):
+                    current = self._store.get(key)
+                    if current is not None and current.expires_at <= now:
+                        del self._store[key]
+                        removed += 1
+        return removed
+
+    def clear_sync(self, channel: Optional[str] = None) -> None:
+        if channel is None:
+            self._store.clear()
+            return
+        for key in [k for k in list(self._store) if k[0] == channel]:
+            self._store.pop(key, None)
+
+    async def get_or_create(self, channel: str, user_id: str) -> str:
+        return self.get_or_create_sync(channel, user_id)
+
+    async def clear(self, channel: Optional[str] = None) -> None:
+        self.clear_sync(channel)
+
+    def __len__(self) -> int:
+        return len(self._store)
 
-_lock = asyncio.Lock()
 
-# Maps (channel_prefix, user_id) → idss_session_id
-# e.g. ("slack", "U12345678") → "550e8400-e29b-41d4-a716-446655440000"
-_store: dict[tuple[str, str], str] = {}
+class RedisSessionStore:
+    """
+    Redis-backed store shared across worker processes.
+
+    A Redis failure opens a simple circuit breaker: for cooldown_seconds every
+    lookup goes straight to the in-memory fallback. After that the breaker is
+    half-open and a single lookup tries Redis again; success closes it, a
+    failure opens it for another cooldown.
+    """
+
+    def __init__(self, client=None, ttl_seconds: Optional[float] = None,
+                 fallback: Optional[InMemorySessionStore] = None,
+                 cooldown_seconds: Optional[float] = None):
+        self.ttl_seconds = int(ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("CHANNEL_SESSION_TTL", str(DEFAULT_TTL_SECONDS))
+        ))
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else float(
+            os.getenv("CHANNEL_SESSION_REDIS_COOLDOWN", str(DEFAULT_REDIS_COOLDOWN_SECONDS))
+        )
+        self._client = client
+        self.fallback = fallback or InMemorySessionStore(ttl_seconds=self.ttl_seconds)
+        self.redis_errors = 0
+        self.redis_skipped = 0
+        self._open_until: Optional[float] = None  # None = breaker closed
+        self._probing = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = _make_redis_client()
+        return self._client
+
+    @staticmethod
+    def _key(channel: str, user_id: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{channel}:{user_id}"
+
+    @property
+    def breaker_open(self) -> bool:
+        return self._open_until is not None
+
+    def _redis_allowed(self) -> bool:
+        if self._open_until is None:
+            return True
+        if self._probing or time.monotonic() < self._open_until:
+            return False
+        self._probing = True  # half-open: this caller probes Redis
+        return True
+
+    def _redis_succeeded(self) -> None:
+        if self._open_until is not None:
+            logger.info("channel session store: Redis reachable again")
+            self._open_until = None
+
+    def _redis_failed(self, e: Exception) -> None:
+        self.redis_errors += 1
+        logger.warning(
+            "channel session store: Redis unavailable (%s); using in-memory sessions for %.0fs",
+            e, self.cooldown_seconds,
+        )
+        self._open_until = time.monotonic() + self.cooldown_seconds
+
+    async def get_or_create(self, channel: str, user_id: str) -> str:
+        if not self._redis_allowed():
+            self.redis_skipped += 1
+            return await self.fallback.get_or_create(channel, user_id)
+        key = self._key(channel, user_id)
+        try:
+            # Hot path: existing session, TTL slid forward in the same round trip
+            existing = await self.client.getex(key, ex=self.ttl_seconds)
+            session_id = str(uuid.uuid4())
+            while existing is None:
+                if await self.client.set(key, session_id, nx=True, ex=self.ttl_seconds):
+                    break
+                # Another worker created it between GETEX and SET NX
+                existing = await self.client.get(key)
+            else:
+                session_id = _decode(existing)
+        except Exception as e:
+            self._redis_failed(e)
+            return await self.fallback.get_or_create(channel, user_id)
+        finally:
+            self._probing = False  # also if the probing caller was cancelled
+        self._redis_succeeded()
+        return session_id
+
+    async def clear(self, channel: Optional[str] = None) -> None:
+        pattern = f"{REDIS_KEY_PREFIX}:{channel}:*" if channel else f"{REDIS_KEY_PREFIX}:*"
+        try:
+            batch: List = []
+            async for key in self.client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    await self.client.delete(*batch)
+                    batch = []
+            if batch:
+                await self.client.delete(*batch)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning("channel session store: Redis clear failed (%s)", e)
+        await self.fallback.clear(channel)
+
+
+def _decode(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _make_redis_client():
+    import redis.asyncio as aioredis
+
+    upstash_url = os.getenv("UPSTASH_REDIS_URL")
+    if upstash_url:
+        return aioredis.from_url(
+            upstash_url, decode_responses=True, socket_connect_timeout=5, socket_timeout=5
+        )
+    return aioredis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        db=int(os.getenv("REDIS_DB_AGENT", "1")),
+        decode_responses=True,
+        socket_connect_timeout=2,
+        socket_timeout=2,
+    )
+
+
+def _make_store():
+    backend = os.getenv("CHANNEL_SESSION_BACKEND", "memory").strip().lower()
+    if backend == "redis":
+        return RedisSessionStore()
+    if backend != "memory":
+        logger.warning("Unknown CHANNEL_SESSION_BACKEND=%r; using memory", backend)
+    return InMemorySessionStore()
+
+
+store = _make_store()
 
 
 async def get_or_create(channel: str, user_id: str) -> str:
     """Return the IDSS session_id for this user, creating one if absent."""
-    key = (channel, user_id)
-    async with _lock:
-        if key not in _store:
-            _store[key] = str(uuid.uuid4())
-        return _store[key]
+    return await store.get_or_create(channel, user_id)
 
 
 async def clear(channel: Optional[str] = None) -> None:
     """Clear sessions (optionally for a single channel). Useful in tests."""
-    async with _lock:
-        if channel is None:
-            _store.clear()
-        else:
-            for k in list(_store.keys()):
-                if k[0] == channel:
-                    del _store[k]
+    await store.clear(channel)
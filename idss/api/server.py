@@ -39,7 +39,7 @@ from idss.api.models import (
 from idss.core.controller import IDSSController, SessionState
 from idss.core.config import get_config, IDSSConfig
 from idss.data.vehicle_store import get_vehicle_store
-from idss.diversification.entropy import select_diversification_dimension
+from idss.diversification.entropy import DimensionColumns, select_diversification_dimension
 from idss.diversification.bucketing import diversify_with_entropy_bucketing
 from idss.recommendation.embedding_similarity import rank_with_embedding_similarity
 from idss.recommendation.coverage_risk import rank_with_coverage_risk
@@ -393,9 +393,11 @@ async def recommend(request: RecommendRequest):
         logger.info(f"Ranked to {len(ranked)} candidates using {method}")
 
         # Step 3: Select diversification dimension
+        columns = DimensionColumns(ranked)
         div_dimension = select_diversification_dimension(
             candidates=ranked,
-            explicit_filters=request.filters
+            explicit_filters=request.filters,
+            columns=columns
         )
 
         # Step 4: Bucket vehicles
@@ -403,7 +405,8 @@ async def recommend(request: RecommendRequest):
             vehicles=ranked,
             dimension=div_dimension,
             n_rows=request.n_rows,
-            n_per_row=request.n_per_row
+            n_per_row=request.n_per_row,
+            columns=columns
         )
 
         return RecommendResponse(
@@ -474,16 +477,19 @@ async def compare_methods(request: RecommendRequest):
                 )
 
             # Diversify
+            columns = DimensionColumns(ranked)
             div_dimension = select_diversification_dimension(
                 candidates=ranked,
-                explicit_filters=request.filters
+                explicit_filters=request.filters,
+                columns=columns
             )
 
             buckets, bucket_labels, _ = diversify_with_entropy_bucketing(
                 vehicles=ranked,
                 dimension=div_dimension,
                 n_rows=request.n_rows,
-                n_per_row=request.n_per_row
+                n_per_row=request.n_per_row,
+                columns=columns
             )
 
             results[method] = {
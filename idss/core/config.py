@@ -50,6 +50,11 @@ class IDSSConfig:
     use_progressive_relaxation: bool = False   # Use progressive filter relaxation
     use_entropy_questions: bool = True        # Use entropy-based question dimension selection
 
+    # Per-session candidate pool (reuse fetched listings while filters narrow)
+    use_candidate_pool: bool = True
+    candidate_pool_max_mb: float = 32.0       # Memory budget for cached listings
+    candidate_pool_min_rows: int = 50         # Refetch when a narrowed pool falls below this
+
     # Model configuration
     semantic_parser_model: str = "gpt-4o-mini"
     question_generator_model: str = "gpt-4o"
@@ -75,6 +80,7 @@ class IDSSConfig:
         recommendation_config = data.get('recommendation', {})
         models_config = data.get('models', {})
         data_config = data.get('data', {})
+        pool_config = data.get('candidate_pool', {})
 
         embedding_similarity = recommendation_config.get('embedding_similarity', {})
         coverage_risk = recommendation_config.get('coverage_risk', {})
@@ -91,6 +97,9 @@ class IDSSConfig:
             coverage_risk_mode=coverage_risk.get('mode', 'max'),
             coverage_risk_tau=coverage_risk.get('tau', 0.5),
             coverage_risk_alpha=coverage_risk.get('alpha', 1.0),
+            use_candidate_pool=pool_config.get('enabled', True),
+            candidate_pool_max_mb=pool_config.get('max_mb', 32.0),
+            candidate_pool_min_rows=pool_config.get('min_rows', 50),
             semantic_parser_model=models_config.get('semantic_parser', 'gpt-4o-mini'),
             question_generator_model=models_config.get('question_generator', 'gpt-4o'),
             temperature=models_config.get('temperature', 0),
@@ -41,11 +41,14 @@ from idss.interview.question_generator import (
     QuestionResponse
 )
 from idss.interview.entropy_question_selector import (
+    compute_candidate_distributions,
+    question_distribution_cache,
     select_question_dimension,
     get_dimension_topic,
     get_dimension_context,
 )
 from idss.diversification.entropy import (
+    DimensionColumns,
     select_diversification_dimension,
     compute_entropy_report
 )
@@ -53,6 +56,7 @@ from idss.diversification.bucketing import diversify_with_entropy_bucketing
 from idss.recommendation.embedding_similarity import rank_with_embedding_similarity
 from idss.recommendation.coverage_risk import rank_with_coverage_risk
 from idss.recommendation.progressive_relaxation import progressive_filter_relaxation
+from idss.data.candidate_pool import CandidatePool, supports_candidate_pool
 
 logger = get_logger("core.controller")
 
@@ -103,6 +107,13 @@ class IDSSController:
         self.config = config or get_config()
         self.state = SessionState()
         self.store = get_vehicle_store(require_photos=True)
+        # Listings fetched this session; follow-up turns that only narrow the
+        # filters are answered from memory instead of re-querying the store.
+        self.candidate_pool = CandidatePool(
+            self.store,
+            max_bytes=int(self.config.candidate_pool_max_mb * 1024 * 1024),
+            min_rows=self.config.candidate_pool_min_rows,
+        )
 
         logger.info(f"IDSS Controller initialized: k={self.config.k}, method={self.config.recommendation_method}")
 
@@ -159,6 +170,7 @@ class IDSSController:
     def reset_session(self) -> None:
         """Reset the session state for a new conversation."""
         self.state = SessionState()
+        self.candidate_pool.clear()
         logger.info("Session reset")
 
     def _update_state(self, user_message: str, parsed: ParsedInput) -> None:
@@ -301,19 +313,26 @@ class IDSSController:
         Returns:
             QuestionResponse if a high-entropy dimension found, None otherwise
         """
-        # Get preliminary candidates for entropy calculation
-        candidates = self._get_preliminary_candidates(limit=200)
-
-        if not candidates or len(candidates) < 10:
+        # Per-dimension distributions of the preliminary candidates depend only
+        # on the filter set, so warm filter sets skip the candidate fetch.
+        distributions = question_distribution_cache.get("vehicles", self.state.explicit_filters)
+        if distributions is None:
+            candidates = self._get_preliminary_candidates(limit=200)
+            if candidates:
+                distributions = compute_candidate_distributions(candidates)
+                question_distribution_cache.put("vehicles", self.state.explicit_filters, distributions)
+
+        if distributions is None or distributions.total < 10:
             logger.info("Not enough candidates for entropy-based question selection")
             return None
 
         # Select dimension with highest entropy
         selected_dim = select_question_dimension(
-            candidates=candidates,
+            candidates=[],
             explicit_filters=self.state.explicit_filters,
             asked_dimensions=self.state.asked_dimensions,
             min_entropy_threshold=0.3,
+            distributions=distributions,
         )
 
         if selected_dim is None:
@@ -321,7 +340,7 @@ class IDSSController:
             return None
 
         # Get context about the dimension for LLM
-        dim_context = get_dimension_context(selected_dim, candidates)
+        dim_context = get_dimension_context(selected_dim, [], distributions=distributions)
 
         # Generate question using LLM with dimension focus
         question_response = generate_question_for_dimension(
@@ -360,7 +379,7 @@ class IDSSController:
             db_filters['year'] = '2018-2025'
 
         try:
-            candidates = self.store.search_listings(
+            candidates = self._listing_source().search_listings(
                 filters=db_filters,
                 limit=limit,
                 order_by="year DESC, price ASC",
@@ -370,6 +389,15 @@ class IDSSController:
             logger.error(f"Failed to get preliminary candidates: {e}")
             return []
 
+    def _listing_source(self):
+        """
+        Vehicle store to query: the session candidate pool, unless it is
+        disabled or the store's results cannot be refined in memory.
+        """
+        if self.config.use_candidate_pool and supports_candidate_pool(self.store):
+            return self.candidate_pool
+        return self.store
+
     def _generate_recommendations(self) -> IDSSResponse:
         """Generate recommendations with ranking method + entropy-based diversification."""
         logger.info("Generating recommendations...")
@@ -397,14 +425,19 @@ class IDSSController:
         ranked_candidates = self._rank_candidates(candidates)
         logger.info(f"Ranked to {len(ranked_candidates)} candidates using {self.config.recommendation_method}")
 
+        # Steps 3-5 read every diversifiable dimension of the ranked candidates;
+        # extract them once into columns shared by all three.
+        columns = DimensionColumns(ranked_candidates)
+
         # Step 3: Log entropy report for analysis
-        entropy_report = compute_entropy_report(ranked_candidates)
+        entropy_report = compute_entropy_report(ranked_candidates, columns=columns)
         logger.info(f"Entropy report: {entropy_report}")
 
         # Step 4: Select diversification dimension (based on ranked candidates)
         div_dimension = select_diversification_dimension(
             candidates=ranked_candidates,
-            explicit_filters=self.state.explicit_filters
+            explicit_filters=self.state.explicit_filters,
+            columns=columns
         )
 
         # Step 5: Bucket vehicles using entropy-based diversification (or skip if ablation)
@@ -413,7 +446,8 @@ class IDSSController:
                 vehicles=ranked_candidates,
                 dimension=div_dimension,
                 n_rows=self.config.num_rows,
-                n_per_row=self.config.n_vehicles_per_row
+                n_per_row=self.config.n_vehicles_per_row,
+                columns=columns
             )
         else:
             # Ablation: just take top N vehicles without diversification
@@ -484,7 +518,7 @@ class IDSSController:
             if self.config.use_progressive_relaxation:
                 # Use progressive filter relaxation to find candidates
                 candidates, relaxation_state = progressive_filter_relaxation(
-                    store=self.store,
+                    store=self._listing_source(),
                     explicit_filters=db_filters,
                     limit=limit
                 )
@@ -501,7 +535,7 @@ class IDSSController:
                 logger.info("Progressive relaxation disabled (ablation mode)")
                 if not db_filters:
                     db_filters['year'] = '2018-2025'
-                candidates = self.store.search_listings(
+                candidates = self._listing_source().search_listings(
                     filters=db_filters,
                     limit=limit,
                     order_by="price",
@@ -0,0 +1,372 @@
+"""
+Per-session candidate pool in front of the vehicle store.
+
+An interview turn fetches up to 200 listings for entropy question selection
+and the recommendation step fetches up to 500 more; every follow-up turn used
+to repeat both queries even though answers usually only narrow the filters.
+CandidatePool keeps the result sets it has fetched, keyed by (ordering,
+filter set), and answers a new search from memory when its filters are a
+refinement of a cached filter set:
+
+    pool = CandidatePool(store)
+    pool.search_listings({"body_style": "SUV"}, limit=500)              # store query
+    pool.search_listings({"body_style": "SUV", "price": "0-30000"}, limit=500)  # in memory
+
+Filtering a cached result keeps the store's ordering, so the rows kept are
+exactly the first rows the store would return for the narrower filters. The
+store is queried again when filters widen, when a filter cannot be evaluated
+against payloads (see REFINABLE_FILTERS), or when the in-memory result is
+shorter than both the requested limit and ``min_rows`` while the cached
+result was truncated by its own limit.
+
+Entries are evicted least-recently-used under ``max_bytes``, an estimate of
+the serialized size of the cached payloads.
+
+All of this assumes the store returns the ordered head of the full match set,
+so a result shorter than its limit holds every matching row. Only stores that
+declare ``supports_candidate_pool = True`` (LocalVehicleStore) are pooled;
+for any other store (e.g. SupabaseVehicleStore, which returns a capped,
+shuffled sample) every call goes straight to the store.
+"""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from idss.data.vehicle_store import _parse_numeric_range, _split_multi_value
+from idss.utils.logger import get_logger
+
+logger = get_logger("data.candidate_pool")
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MIN_ROWS = 50
+
+# Payload rows sampled to estimate an entry's size
+_SIZE_SAMPLE = 16
+
+
+def _vehicle(row: Dict[str, Any]) -> Dict[str, Any]:
+    return row.get("vehicle") or {}
+
+
+def _retail(row: Dict[str, Any]) -> Dict[str, Any]:
+    return row.get("retailListing") or {}
+
+
+# Filter key -> payload accessor, for the filters LocalVehicleStore._build_query
+# applies to fields present in every payload shape the stores return.
+_TEXT_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "make": lambda r: _vehicle(r).get("make"),
+    "model": lambda r: _vehicle(r).get("model"),
+    "trim": lambda r: _vehicle(r).get("trim"),
+    "body_style": lambda r: _vehicle(r).get("norm_body_type"),
+    "fuel_type": lambda r: _vehicle(r).get("norm_fuel_type"),
+}
+_RANGE_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "year": lambda r: _vehicle(r).get("year"),
+    "price": lambda r: _retail(r).get("price"),
+    "mileage": lambda r: _retail(r).get("miles"),
+    "highway_mpg": lambda r: _vehicle(r).get("build_highway_mpg"),
+}
+_FLAG_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "is_used": lambda r: _vehicle(r).get("norm_is_used"),
+}
+
+REFINABLE_FILTERS: FrozenSet[str] = frozenset(_TEXT_FIELDS) | frozenset(_RANGE_FIELDS) | frozenset(_FLAG_FIELDS)
+
+_SORT_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "price": _RANGE_FIELDS["price"],
+    "mileage": _RANGE_FIELDS["mileage"],
+    "year": _RANGE_FIELDS["year"],
+}
+
+
+#  Filter semantics (mirrors LocalVehicleStore._build_query)
+
+def _text_values(value: Any) -> FrozenSet[str]:
+    return frozenset(v.upper() for v in _split_multi_value(value)) if isinstance(value, str) else frozenset()
+
+
+def _range_bounds(key: str, value: Any) -> Tuple[Optional[float], Optional[float]]:
+    text = str(value)
+    if key == "highway_mpg" and "-" not in text:
+        # A single MPG value is a minimum, not an exact match
+        try:
+            return (float(int(text)), None)
+        except ValueError:
+            return (None, None)
+    try:
+        return _parse_numeric_range(text)
+    except ValueError:
+        return (None, None)
+
+
+def _is_narrower(key: str, new: Any, old: Any) -> bool:
+    """Whether every row matching ``key=new`` also matches ``key=old``."""
+    if key in _TEXT_FIELDS:
+        new_values, old_values = _text_values(new), _text_values(old)
+        if not old_values:
+            return True
+        return bool(new_values) and new_values <= old_values
+    if key in _RANGE_FIELDS:
+        new_lo, new_hi = _range_bounds(key, new) if new else (None, None)
+        old_lo, old_hi = _range_bounds(key, old) if old else (None, None)
+        if old_lo is not None and (new_lo is None or new_lo < old_lo):
+            return False
+        if old_hi is not None and (new_hi is None or new_hi > old_hi):
+            return False
+        return True
+    if key in _FLAG_FIELDS:
+        return old is None or (new is not None and bool(new) == bool(old))
+    return False
+
+
+def _predicate(key: str, value: Any) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """In-memory equivalent of one filter, or None when it does not constrain rows."""
+    if key in _TEXT_FIELDS:
+        wanted = _text_values(value)
+        if not wanted:
+            return None
+        get = _TEXT_FIELDS[key]
+        return lambda row: get(row) is not None and str(get(row)).upper() in wanted
+    if key in _RANGE_FIELDS:
+        if not value:
+            return None
+        lo, hi = _range_bounds(key, value)
+        if lo is None and hi is None:
+            return None
+        get = _RANGE_FIELDS[key]
+        # The SQL binds bounds as integers
+        lo = int(lo) if lo is not None else None
+        hi = int(hi) if hi is not None else None
+
+        def in_range(row: Dict[str, Any]) -> bool:
+            v = get(row)
+            if v is None:
+                return False
+            try:
+                v = float(v)
+            except (TypeError, ValueError):
+                return False
+            return (lo is None or v >= lo) and (hi is None or v <= hi)
+
+        return in_range
+    if key in _FLAG_FIELDS:
+        if value is None:
+            return None
+        flag = 1 if value else 0
+        get = _FLAG_FIELDS[key]
+        return lambda row: get(row) is not None and int(get(row)) == flag
+    return None
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def freeze_filters(filters: Dict[str, Any]) -> FrozenSet[Tuple[str, Any]]:
+    """Hashable form of a filter dict (None values dropped), for cache keys."""
+    return frozenset((k, _freeze(v)) for k, v in filters.items() if v is not None)
+
+
+#  Ordering (mirrors the ORDER BY built by LocalVehicleStore._build_query)
+
+def _order_spec(order_by: Optional[str], order_dir: str) -> Optional[Tuple[Tuple[str, bool], ...]]:
+    """((column, descending), ...) for reproducible orderings; None for random/unordered."""
+    if order_by is None:
+        return None
+    text = order_by.lower()
+    if text in ("random", "random()"):
+        return None
+    if "," in text:
+        parts = []
+        for part in text.split(","):
+            tokens = part.split()
+            col = tokens[0] if tokens else "price"
+            direction = tokens[1].upper() if len(tokens) > 1 else "ASC"
+            if col in _SORT_FIELDS and direction in ("ASC", "DESC"):
+                parts.append((col, direction == "DESC"))
+        return tuple(parts) or (("price", False),)
+    col = text if text in _SORT_FIELDS else "price"
+    return ((col, order_dir.upper() == "DESC"),)
+
+
+def _sort_rows(rows: List[Dict[str, Any]], spec: Tuple[Tuple[str, bool], ...]) -> List[Dict[str, Any]]:
+    """Stable multi-key sort with SQLite semantics (NULLs first ascending), vin ASC tie-break."""
+    out = sorted(rows, key=lambda r: str(r.get("vin") or _vehicle(r).get("vin") or ""))
+    for col, descending in reversed(spec):
+        get = _SORT_FIELDS[col]
+        out.sort(key=lambda r: (get(r) is not None, get(r) if get(r) is not None else 0), reverse=descending)
+    return out
+
+
+def estimate_payload_bytes(rows: List[Dict[str, Any]]) -> int:
+    """Approximate serialized size of a list of payloads from an evenly spaced sample."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // _SIZE_SAMPLE)
+    sample = rows[::step][:_SIZE_SAMPLE]
+    sampled = sum(len(json.dumps(row, default=str)) for row in sample)
+    return sampled * len(rows) // len(sample)
+
+
+def supports_candidate_pool(store: Any) -> bool:
+    """Whether ``store`` returns the ordered head of the match set (see module docstring)."""
+    return bool(getattr(store, "supports_candidate_pool", False))
+
+
+@dataclass
+class _PoolEntry:
+    filters: Dict[str, Any]
+    order: Tuple[Any, ...]
+    limit: int
+    rows: List[Dict[str, Any]]
+    nbytes: int
+
+    @property
+    def complete(self) -> bool:
+        """True when the store returned every matching row (not cut off by limit)."""
+        return len(self.rows) < self.limit
+
+
+class CandidatePool:
+    """
+    Memoizing wrapper with the search_listings() signature of the vehicle stores.
+
+    Args:
+        store: Underlying LocalVehicleStore / SupabaseVehicleStore.
+        max_bytes: Memory budget for cached payloads (estimated serialized size).
+        min_rows: Smallest in-memory result served from a truncated cached result.
+    """
+
+    def __init__(self, store: Any, max_bytes: int = DEFAULT_MAX_BYTES, min_rows: int = DEFAULT_MIN_ROWS):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.min_rows = min_rows
+        self.enabled = supports_candidate_pool(store)
+        self._entries: "OrderedDict[Tuple[Any, FrozenSet], _PoolEntry]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def search_listings(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 200,
+        offset: int = 0,
+        order_by: str = "price",
+        order_dir: str = "ASC",
+        user_latitude: Optional[float] = None,
+        user_longitude: Optional[float] = None,
+        max_per_make_model: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Same contract as the store's search_listings, served from the pool when possible."""
+        order = _order_spec(order_by, order_dir)
+        cacheable = (
+            self.enabled
+            and order is not None
+            and offset == 0
+            and max_per_make_model is None
+            and not filters.get("search_radius")
+        )
+        if cacheable:
+            rows = self._lookup(filters, limit, order)
+            if rows is not None:
+                self.hits += 1
+                return rows
+
+        self.misses += 1
+        rows = self.store.search_listings(
+            filters,
+            limit=limit,
+            offset=offset,
+            order_by=order_by,
+            order_dir=order_dir,
+            user_latitude=user_latitude,
+            user_longitude=user_longitude,
+            max_per_make_model=max_per_make_model,
+        )
+        if cacheable:
+            self._store(filters, limit, order, rows)
+        return rows
+
+    #  Pool internals
+
+    def _lookup(
+        self, filters: Dict[str, Any], limit: int, order: Tuple[Any, ...]
+    ) -> Optional[List[Dict[str, Any]]]:
+        wanted = {k: v for k, v in filters.items() if v is not None}
+        exact = self._entries.get((order, freeze_filters(wanted)))
+        if exact is not None and (exact.complete or exact.limit >= limit):
+            self._entries.move_to_end((order, freeze_filters(wanted)))
+            return exact.rows[:limit]
+
+        best: Optional[Tuple[Tuple[Any, FrozenSet], List[Dict[str, Any]]]] = None
+        for key, entry in self._entries.items():
+            # A truncated result only covers the head of its own ordering, to
+            # its own depth
+            if not entry.complete and (entry.order != order or entry.limit < limit):
+                continue
+            predicates = self._refinement(wanted, entry.filters)
+            if predicates is None:
+                continue
+            rows = [row for row in entry.rows if all(p(row) for p in predicates)]
+            if entry.order != order:
+                rows = _sort_rows(rows, order)
+            if not (entry.complete or len(rows) >= min(limit, self.min_rows)):
+                continue
+            if best is None or len(rows) > len(best[1]):
+                best = (key, rows)
+            if entry.complete or len(rows) >= limit:
+                break
+
+        if best is None:
+            return None
+        self._entries.move_to_end(best[0])
+        logger.info("Candidate pool: served %d listings in memory for %s", min(len(best[1]), limit), wanted)
+        return best[1][:limit]
+
+    @staticmethod
+    def _refinement(
+        wanted: Dict[str, Any], cached: Dict[str, Any]
+    ) -> Optional[List[Callable[[Dict[str, Any]], bool]]]:
+        """Predicates narrowing ``cached`` rows to ``wanted``, or None if not a refinement."""
+        predicates = []
+        for key in cached.keys() | wanted.keys():
+            new, old = wanted.get(key), cached.get(key)
+            if _freeze(new) == _freeze(old):
+                continue
+            if key not in REFINABLE_FILTERS or not _is_narrower(key, new, old):
+                return None
+            predicate = _predicate(key, new)
+            if predicate is not None:
+                predicates.append(predicate)
+        return predicates
+
+    def _store(self, filters: Dict[str, Any], limit: int, order: Tuple[Any, ...], rows: List[Dict[str, Any]]) -> None:
+        wanted = {k: v for k, v in filters.items() if v is not None}
+        key = (order, freeze_filters(wanted))
+        nbytes = estimate_payload_bytes(rows)
+        if nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        self._entries[key] = _PoolEntry(dict(wanted), order, limit, list(rows), nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
@@ -11,7 +11,7 @@ import json
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from idss.utils.logger import get_logger
 
@@ -116,7 +116,13 @@ def _haversine_distance_sql(user_lat: float, user_lon: float) -> str:
 class SupabaseVehicleStore:
     """
     Vehicle data access layer backed by Supabase.
+
+    Results are a capped (at most 100 rows), shuffled, price-stratified
+    sample rather than the ordered head of the match set, so they must not be
+    refined in memory by CandidatePool.
     """
+    supports_candidate_pool: ClassVar[bool] = False
+
     client: Any = None
     require_photos: bool = True
 
@@ -353,6 +359,10 @@ class LocalVehicleStore:
         require_photos: Whether to filter listings to those with photo metadata.
     """
 
+    # Results are the ordered head of the full match set (ORDER BY + LIMIT),
+    # which is what CandidatePool relies on to refine them in memory.
+    supports_candidate_pool: ClassVar[bool] = True
+
     db_path: Optional[Path] = None
     require_photos: bool = True
     last_sql_query: Optional[str] = None  # Stores the last executed SQL query (formatted with params)
@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 
 from idss.utils.logger import get_logger
-from idss.diversification.entropy import get_vehicle_value, NUMERICAL_DIMENSIONS
+from idss.diversification.entropy import DimensionColumns, NUMERICAL_DIMENSIONS, get_dimension_columns
 
 logger = get_logger("diversification.bucketing")
 
@@ -54,13 +54,13 @@ def compute_quantile_boundaries(
     Compute quantile boundaries for equal-count bucketing.
 
     Args:
-        values: List of numerical values (None values filtered out)
+        values: Numerical values or float array (None values filtered out)
         n_buckets: Number of buckets
 
     Returns:
         List of boundary values (n_buckets - 1 boundaries)
     """
-    if not values:
+    if len(values) == 0:
         return []
 
     # Use numpy percentile for accurate quantile calculation
@@ -74,7 +74,8 @@ def bucket_vehicles_numerical(
     vehicles: List[Dict[str, Any]],
     dimension: str,
     n_buckets: int = 3,
-    n_per_bucket: int = 3
+    n_per_bucket: int = 3,
+    columns: Optional[DimensionColumns] = None
 ) -> Tuple[List[List[Dict[str, Any]]], List[str]]:
     """
     Bucket vehicles by a numerical dimension using quantiles.
@@ -84,6 +85,7 @@ def bucket_vehicles_numerical(
         dimension: Numerical dimension to bucket by
         n_buckets: Number of buckets to create
         n_per_bucket: Maximum vehicles per bucket
+        columns: Pre-extracted DimensionColumns for these vehicles (optional)
 
     Returns:
         Tuple of:
@@ -93,29 +95,22 @@ def bucket_vehicles_numerical(
     if not vehicles:
         return [[] for _ in range(n_buckets)], ["No data"] * n_buckets
 
-    # Extract values and track indices
-    values_with_idx = []
-    for i, v in enumerate(vehicles):
-        val = get_vehicle_value(v, dimension)
-        if val is not None:
-            try:
-                values_with_idx.append((float(val), i))
-            except (ValueError, TypeError):
-                pass
+    # Vehicle indices with a numeric value, sorted by value (stable: ties keep rank order)
+    values = get_dimension_columns(vehicles, columns, [dimension]).numeric(dimension)
+    valid_idx = np.flatnonzero(~np.isnan(values))
 
-    if not values_with_idx:
+    if valid_idx.size == 0:
         return [vehicles[:n_per_bucket]], [f"All ({dimension} unknown)"]
 
-    # Sort by value
-    values_with_idx.sort(key=lambda x: x[0])
-    sorted_values = [v for v, _ in values_with_idx]
+    order = valid_idx[np.argsort(values[valid_idx], kind="stable")]
+    sorted_values = values[order]
 
     # Compute quantile boundaries
     boundaries = compute_quantile_boundaries(sorted_values, n_buckets)
 
     # Create bucket ranges
-    min_val = sorted_values[0]
-    max_val = sorted_values[-1]
+    min_val = float(sorted_values[0])
+    max_val = float(sorted_values[-1])
 
     bucket_ranges = []
     prev = min_val
@@ -125,25 +120,17 @@ def bucket_vehicles_numerical(
         prev = boundary
     if not bucket_ranges or prev != max_val:
         bucket_ranges.append((prev, max_val))
-        
-    actual_buckets = len(bucket_ranges)
-
-    # Assign vehicles to buckets
-    buckets: List[List[Dict[str, Any]]] = [[] for _ in range(actual_buckets)]
-
-    for val, idx in values_with_idx:
-        for bucket_idx, (low, high) in enumerate(bucket_ranges):
-            if bucket_idx == len(bucket_ranges) - 1:
-                # Last bucket includes upper bound
-                if low <= val <= high:
-                    if len(buckets[bucket_idx]) < n_per_bucket:
-                        buckets[bucket_idx].append(vehicles[idx])
-                    break
-            else:
-                if low <= val < high:
-                    if len(buckets[bucket_idx]) < n_per_bucket:
-                        buckets[bucket_idx].append(vehicles[idx])
-                    break
+
+    # Ranges are contiguous, so a value's bucket is the number of later
+    # lower bounds <= value ([low, high) ranges, last one closed).
+    lows = np.asarray([low for low, _ in bucket_ranges[1:]], dtype=float)
+    assignment = np.searchsorted(lows, sorted_values, side="right")
+
+    # Keep the first n_per_bucket vehicles (in value order) of each bucket
+    buckets: List[List[Dict[str, Any]]] = [
+        [vehicles[i] for i in order[assignment == bucket_idx][:n_per_bucket]]
+        for bucket_idx in range(len(bucket_ranges))
+    ]
 
     # Generate labels
     labels = [
@@ -158,7 +145,8 @@ def bucket_vehicles_categorical(
     vehicles: List[Dict[str, Any]],
     dimension: str,
     n_buckets: int = 3,
-    n_per_bucket: int = 3
+    n_per_bucket: int = 3,
+    columns: Optional[DimensionColumns] = None
 ) -> Tuple[List[List[Dict[str, Any]]], List[str]]:
     """
     Bucket vehicles by a categorical dimension.
@@ -170,6 +158,7 @@ def bucket_vehicles_categorical(
         dimension: Categorical dimension to bucket by
         n_buckets: Number of buckets to create
         n_per_bucket: Maximum vehicles per bucket
+        columns: Pre-extracted DimensionColumns for these vehicles (optional)
 
     Returns:
         Tuple of:
@@ -181,8 +170,7 @@ def bucket_vehicles_categorical(
 
     # Group vehicles by value
     by_value: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    for v in vehicles:
-        val = get_vehicle_value(v, dimension)
+    for v, val in zip(vehicles, get_dimension_columns(vehicles, columns, [dimension]).values(dimension)):
         if val is not None:
             by_value[str(val)].append(v)
 
@@ -215,7 +203,8 @@ def bucket_vehicles(
     vehicles: List[Dict[str, Any]],
     dimension: str,
     n_buckets: int = 3,
-    n_per_bucket: int = 3
+    n_per_bucket: int = 3,
+    columns: Optional[DimensionColumns] = None
 ) -> Tuple[List[List[Dict[str, Any]]], List[str]]:
     """
     Bucket vehicles by a dimension (auto-detects numerical vs categorical).
@@ -225,6 +214,7 @@ def bucket_vehicles(
         dimension: Dimension to bucket by
         n_buckets: Number of buckets to create
         n_per_bucket: Maximum vehicles per bucket
+        columns: Pre-extracted DimensionColumns for these vehicles (optional)
 
     Returns:
         Tuple of:
@@ -232,16 +222,17 @@ def bucket_vehicles(
         - List of bucket labels
     """
     if dimension in NUMERICAL_DIMENSIONS:
-        return bucket_vehicles_numerical(vehicles, dimension, n_buckets, n_per_bucket)
+        return bucket_vehicles_numerical(vehicles, dimension, n_buckets, n_per_bucket, columns)
     else:
-        return bucket_vehicles_categorical(vehicles, dimension, n_buckets, n_per_bucket)
+        return bucket_vehicles_categorical(vehicles, dimension, n_buckets, n_per_bucket, columns)
 
 
 def diversify_with_entropy_bucketing(
     vehicles: List[Dict[str, Any]],
     dimension: str,
     n_rows: int = 3,
-    n_per_row: int = 3
+    n_per_row: int = 3,
+    columns: Optional[DimensionColumns] = None
 ) -> Tuple[List[List[Dict[str, Any]]], List[str], str]:
     """
     Diversify vehicles using entropy-based bucketing.
@@ -253,6 +244,7 @@ def diversify_with_entropy_bucketing(
         dimension: Dimension to diversify along
         n_rows: Number of output rows (buckets)
         n_per_row: Vehicles per row
+        columns: Pre-extracted DimensionColumns for vehicles (optional)
 
     Returns:
         Tuple of:
@@ -267,7 +259,8 @@ def diversify_with_entropy_bucketing(
         vehicles,
         dimension,
         n_buckets=n_rows,
-        n_per_bucket=n_per_row
+        n_per_bucket=n_per_row,
+        columns=columns
     )
 
     # Log result
@@ -5,8 +5,9 @@ Computes Shannon entropy for each dimension and selects the one
 with highest entropy (most uncertainty) for diversification.
 """
 from collections import Counter
-from typing import Any, Dict, List, Optional, Tuple
-import math
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 
 from idss.utils.logger import get_logger
 
@@ -30,6 +31,34 @@ DIVERSIFIABLE_DIMENSIONS = [
 NUMERICAL_DIMENSIONS = {'price', 'mileage', 'year'}
 
 
+def _get_price(vehicle: Dict[str, Any], v: Dict[str, Any]) -> Optional[float]:
+    val = v.get('price')
+    if val is None: val = vehicle.get('retailListing', {}).get('price')
+    if val is None: val = vehicle.get('price')
+    return float(val) if val is not None else None
+
+
+def _get_mileage(vehicle: Dict[str, Any], v: Dict[str, Any]) -> Optional[float]:
+    val = v.get('mileage')
+    if val is None: val = vehicle.get('retailListing', {}).get('miles')
+    if val is None: val = vehicle.get('mileage')
+    return float(val) if val is not None else None
+
+
+# (vehicle, vehicle['vehicle'] or vehicle) -> value, per dimension
+_DIMENSION_GETTERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {
+    'price': _get_price,
+    'mileage': _get_mileage,
+    'year': lambda vehicle, v: v.get('year'),
+    'make': lambda vehicle, v: v.get('make'),
+    'model': lambda vehicle, v: v.get('model'),
+    'body_style': lambda vehicle, v: v.get('bodyStyle') or v.get('norm_body_type') or v.get('body_style'),
+    'fuel_type': lambda vehicle, v: v.get('fuel') or v.get('norm_fuel_type'),
+    'drivetrain': lambda vehicle, v: v.get('drivetrain'),
+    'transmission': lambda vehicle, v: v.get('transmission'),
+}
+
+
 def get_vehicle_value(vehicle: Dict[str, Any], dimension: str) -> Any:
     """
     Extract a dimension value from a vehicle payload.
@@ -43,33 +72,120 @@ def get_vehicle_value(vehicle: Dict[str, Any], dimension: str) -> Any:
     """
     # Try vehicle section first
     v = vehicle.get('vehicle', vehicle)
-
-    if dimension == 'price':
-        val = v.get('price')
-        if val is None: val = vehicle.get('retailListing', {}).get('price')
-        if val is None: val = vehicle.get('price')
-        return float(val) if val is not None else None
-    elif dimension == 'mileage':
-        val = v.get('mileage')
-        if val is None: val = vehicle.get('retailListing', {}).get('miles')
-        if val is None: val = vehicle.get('mileage')
-        return float(val) if val is not None else None
-    elif dimension == 'year':
-        return v.get('year')
-    elif dimension == 'make':
-        return v.get('make')
-    elif dimension == 'model':
-        return v.get('model')
-    elif dimension == 'body_style':
-        return v.get('bodyStyle') or v.get('norm_body_type') or v.get('body_style')
-    elif dimension == 'fuel_type':
-        return v.get('fuel') or v.get('norm_fuel_type')
-    elif dimension == 'drivetrain':
-        return v.get('drivetrain')
-    elif dimension == 'transmission':
-        return v.get('transmission')
-    else:
+    getter = _DIMENSION_GETTERS.get(dimension)
+    if getter is None:
         return v.get(dimension)
+    return getter(vehicle, v)
+
+
+def _to_float_array(values: Sequence[Any]) -> np.ndarray:
+    """float64 array with NaN wherever a value is None or not numeric."""
+    out = np.full(len(values), np.nan)
+    for i, val in enumerate(values):
+        if val is not None:
+            try:
+                out[i] = float(val)
+            except (ValueError, TypeError):
+                pass
+    return out
+
+
+class DimensionColumns:
+    """
+    Dimension values for a candidate list, extracted in one pass.
+
+    Entropy reporting, dimension selection and bucketing all read the same
+    candidates; building the columns once replaces a get_vehicle_value() call
+    per vehicle per dimension in each of those stages. Numeric columns are
+    converted to float arrays (NaN = missing) on first use.
+
+    Args:
+        vehicles: Candidate vehicles (order is preserved)
+        dimensions: Dimensions to extract (default: DIVERSIFIABLE_DIMENSIONS)
+    """
+
+    def __init__(self, vehicles: List[Dict[str, Any]], dimensions: Optional[Sequence[str]] = None):
+        self.vehicles = vehicles
+        self.dimensions = list(dimensions or DIVERSIFIABLE_DIMENSIONS)
+        getters = [
+            (dim, _DIMENSION_GETTERS.get(dim) or (lambda vehicle, v, _d=dim: v.get(_d)))
+            for dim in self.dimensions
+        ]
+        self._raw: Dict[str, List[Any]] = {dim: [] for dim in self.dimensions}
+        for vehicle in vehicles:
+            v = vehicle.get('vehicle', vehicle)
+            for dim, getter in getters:
+                self._raw[dim].append(getter(vehicle, v))
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def values(self, dimension: str) -> List[Any]:
+        """Raw values (None when missing), one per vehicle."""
+        if dimension not in self._raw:
+            self._raw[dimension] = [get_vehicle_value(v, dimension) for v in self.vehicles]
+        return self._raw[dimension]
+
+    def numeric(self, dimension: str) -> np.ndarray:
+        """Values as float64, NaN where missing or not numeric."""
+        if dimension not in self._numeric:
+            self._numeric[dimension] = _to_float_array(self.values(dimension))
+        return self._numeric[dimension]
+
+    def non_null_count(self, dimension: str) -> int:
+        return sum(1 for val in self.values(dimension) if val is not None)
+
+
+def get_dimension_columns(
+    vehicles: List[Dict[str, Any]],
+    columns: Optional[DimensionColumns] = None,
+    dimensions: Optional[Sequence[str]] = None
+) -> DimensionColumns:
+    """Reuse columns built for this exact vehicle list, else extract `dimensions` now."""
+    if columns is not None and columns.vehicles is vehicles:
+        return columns
+    return DimensionColumns(vehicles, dimensions)
+
+
+def bucket_numerical_array(
+    values: np.ndarray,
+    n_buckets: int = 3
+) -> Tuple[np.ndarray, List[Tuple[float, float]]]:
+    """
+    Vectorized bucket_numerical_values for a float array (NaN = missing).
+
+    Boundaries are the sorted values at int(n * i / n_buckets); a value goes
+    to the first bucket whose [low, high) range contains it (the last bucket
+    is closed), which is the number of boundaries <= value. Missing values
+    go to bucket 0.
+
+    Returns:
+        (bucket index per value, list of (min, max) bucket ranges)
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.zeros(len(values), dtype=np.intp), [(0, 0)]
+
+    sorted_values = np.sort(values[valid])
+    n = len(sorted_values)
+    boundaries = [float(sorted_values[min(int(n * i / n_buckets), n - 1)]) for i in range(1, n_buckets)]
+    lows = [float(sorted_values[0])] + boundaries
+    highs = boundaries + [float(sorted_values[-1])]
+
+    indices = np.zeros(len(values), dtype=np.intp)
+    indices[valid] = np.searchsorted(np.asarray(boundaries, dtype=float), values[valid], side="right")
+    return indices, list(zip(lows, highs))
+
+
+def _entropy_from_counts(counts: np.ndarray) -> float:
+    """H = -Σ p_i * log2(p_i) over non-zero counts."""
+    counts = counts[counts > 0]
+    if counts.size == 0:
+        return 0.0
+    p = counts / counts.sum()
+    return float(-(p * np.log2(p)).sum())
 
 
 def bucket_numerical_values(
@@ -91,54 +207,8 @@ def bucket_numerical_values(
     if not values:
         return [], []
 
-    # Filter out None values
-    valid_values = [v for v in values if v is not None]
-    if not valid_values:
-        return [0] * len(values), [(0, 0)]
-
-    # Sort for quantile calculation
-    sorted_values = sorted(valid_values)
-    n = len(sorted_values)
-
-    # Compute quantile boundaries
-    boundaries = []
-    for i in range(1, n_buckets):
-        idx = int(n * i / n_buckets)
-        boundaries.append(sorted_values[min(idx, n - 1)])
-
-    # Define bucket ranges
-    bucket_ranges = []
-    prev = sorted_values[0]
-    for boundary in boundaries:
-        bucket_ranges.append((prev, boundary))
-        prev = boundary
-    bucket_ranges.append((prev, sorted_values[-1]))
-
-    # Assign each value to a bucket
-    bucket_indices = []
-    for v in values:
-        if v is None:
-            bucket_indices.append(0)  # Default bucket for None
-            continue
-
-        assigned = False
-        for i, (low, high) in enumerate(bucket_ranges):
-            if i == len(bucket_ranges) - 1:
-                # Last bucket includes the upper bound
-                if low <= v <= high:
-                    bucket_indices.append(i)
-                    assigned = True
-                    break
-            else:
-                if low <= v < high:
-                    bucket_indices.append(i)
-                    assigned = True
-                    break
-
-        if not assigned:
-            bucket_indices.append(len(bucket_ranges) - 1)
-
-    return bucket_indices, bucket_ranges
+    indices, bucket_ranges = bucket_numerical_array(_to_float_array(values), n_buckets)
+    return indices.tolist(), bucket_ranges
 
 
 def compute_shannon_entropy(values: List[Any]) -> float:
@@ -161,24 +231,20 @@ def compute_shannon_entropy(values: List[Any]) -> float:
     if not valid_values:
         return 0.0
 
-    # Count frequencies
-    counts = Counter(valid_values)
-    total = len(valid_values)
+    return entropy_from_distribution(Counter(valid_values))
 
-    # Compute entropy
-    entropy = 0.0
-    for count in counts.values():
-        if count > 0:
-            p = count / total
-            entropy -= p * math.log2(p)
 
-    return entropy
+def entropy_from_distribution(distribution: Mapping[Any, int]) -> float:
+    """Shannon entropy of a value -> count distribution (e.g. a Counter)."""
+    counts = np.fromiter(distribution.values(), dtype=float, count=len(distribution))
+    return _entropy_from_counts(counts)
 
 
 def compute_dimension_entropy(
     vehicles: List[Dict[str, Any]],
     dimension: str,
-    n_buckets: int = 3
+    n_buckets: int = 3,
+    columns: Optional[DimensionColumns] = None
 ) -> float:
     """
     Compute entropy for a dimension across candidate vehicles.
@@ -189,6 +255,7 @@ def compute_dimension_entropy(
         vehicles: List of vehicle dictionaries
         dimension: Dimension name
         n_buckets: Number of buckets for numerical dimensions
+        columns: Pre-extracted DimensionColumns for these vehicles (optional)
 
     Returns:
         Shannon entropy value (higher = more diverse/uncertain)
@@ -196,54 +263,44 @@ def compute_dimension_entropy(
     if not vehicles:
         return 0.0
 
-    # Extract values
-    values = [get_vehicle_value(v, dimension) for v in vehicles]
+    columns = get_dimension_columns(vehicles, columns, [dimension])
 
-    # For numerical dimensions, bucket the values first
+    # For numerical dimensions, bucket the values first (missing values land in bucket 0)
     if dimension in NUMERICAL_DIMENSIONS:
-        numeric_values = []
-        for v in values:
-            if v is not None:
-                try:
-                    numeric_values.append(float(v))
-                except (ValueError, TypeError):
-                    numeric_values.append(None)
-            else:
-                numeric_values.append(None)
-
-        bucket_indices, _ = bucket_numerical_values(numeric_values, n_buckets)
-        values = bucket_indices
+        bucket_indices, _ = bucket_numerical_array(columns.numeric(dimension), n_buckets)
+        return _entropy_from_counts(np.bincount(bucket_indices).astype(float))
 
-    return compute_shannon_entropy(values)
+    return compute_shannon_entropy(columns.values(dimension))
 
 
-def discover_dimensions(vehicles: List[Dict[str, Any]]) -> List[str]:
+def discover_dimensions(
+    vehicles: List[Dict[str, Any]],
+    columns: Optional[DimensionColumns] = None
+) -> List[str]:
     """
     Discover which dimensions have meaningful data in the vehicles.
 
     Args:
         vehicles: List of vehicle dictionaries
+        columns: Pre-extracted DimensionColumns for these vehicles (optional)
 
     Returns:
         List of dimension names that have data
     """
-    available = []
-
-    for dim in DIVERSIFIABLE_DIMENSIONS:
-        # Check if at least 50% of vehicles have this dimension
-        values = [get_vehicle_value(v, dim) for v in vehicles]
-        non_null = [v for v in values if v is not None]
-
-        if len(non_null) >= len(vehicles) * 0.5:
-            available.append(dim)
+    columns = get_dimension_columns(vehicles, columns)
 
-    return available
+    # Keep dimensions where at least 50% of vehicles have a value
+    return [
+        dim for dim in DIVERSIFIABLE_DIMENSIONS
+        if columns.non_null_count(dim) >= len(vehicles) * 0.5
+    ]
 
 
 def select_diversification_dimension(
     candidates: List[Dict[str, Any]],
     explicit_filters: Dict[str, Any],
-    exclude_dimensions: Optional[List[str]] = None
+    exclude_dimensions: Optional[List[str]] = None,
+    columns: Optional[DimensionColumns] = None
 ) -> str:
     """
     Select the dimension to diversify based on entropy.
@@ -257,6 +314,7 @@ def select_diversification_dimension(
         candidates: Candidate vehicles after filtering
         explicit_filters: User's explicit filters (these are KNOWN)
         exclude_dimensions: Additional dimensions to exclude
+        columns: Pre-extracted DimensionColumns for candidates (optional)
 
     Returns:
         Dimension name to diversify along
@@ -264,8 +322,10 @@ def select_diversification_dimension(
     if not candidates:
         return 'price'  # Default
 
+    columns = get_dimension_columns(candidates, columns)
+
     # Discover available dimensions
-    available_dims = discover_dimensions(candidates)
+    available_dims = discover_dimensions(candidates, columns)
     logger.info(f"Available dimensions: {available_dims}")
 
     # Exclude dimensions already specified by user
@@ -288,7 +348,7 @@ def select_diversification_dimension(
     # Compute entropy for each unspecified dimension
     entropies = {}
     for dim in unspecified_dims:
-        entropies[dim] = compute_dimension_entropy(candidates, dim)
+        entropies[dim] = compute_dimension_entropy(candidates, dim, columns=columns)
 
     logger.info(f"Entropy scores: {entropies}")
 
@@ -301,7 +361,8 @@ def select_diversification_dimension(
 
 def compute_entropy_report(
     candidates: List[Dict[str, Any]],
-    dimensions: Optional[List[str]] = None
+    dimensions: Optional[List[str]] = None,
+    columns: Optional[DimensionColumns] = None
 ) -> Dict[str, float]:
     """
     Compute entropy for all specified dimensions (for logging/analysis).
@@ -309,14 +370,16 @@ def compute_entropy_report(
     Args:
         candidates: Candidate vehicles
         dimensions: List of dimensions to analyze (None = all available)
+        columns: Pre-extracted DimensionColumns for candidates (optional)
 
     Returns:
         Dict mapping dimension name to entropy value
     """
+    columns = get_dimension_columns(candidates, columns)
     if dimensions is None:
-        dimensions = discover_dimensions(candidates)
+        dimensions = discover_dimensions(candidates, columns)
 
     return {
-        dim: compute_dimension_entropy(candidates, dim)
+        dim: compute_dimension_entropy(candidates, dim, columns=columns)
         for dim in dimensions
     }
@@ -5,12 +5,16 @@ Selects which dimension to ask about based on entropy analysis of the
 current candidate set. Higher entropy = more uncertainty = more valuable
 to ask about.
 """
-from typing import Any, Dict, List, Optional, Set, Tuple
-
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from idss.data.candidate_pool import freeze_filters
 from idss.diversification.entropy import (
-    compute_shannon_entropy,
-    bucket_numerical_values,
-    DIVERSIFIABLE_DIMENSIONS,
+    entropy_from_distribution,
     NUMERICAL_DIMENSIONS,
 )
 from idss.utils.logger import get_logger
@@ -77,6 +81,92 @@ DIMENSION_EXTRACTORS = {
 }
 
 
+@dataclass
+class DimensionDistribution:
+    """
+    Value distribution of one dimension over a candidate set.
+
+    ``counts`` maps categorical values (or, for numerical dimensions, bucket
+    labels) to candidate counts; ``min``/``max`` are the numeric range.
+    """
+    counts: Counter = field(default_factory=Counter)
+    present: int = 0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    @property
+    def entropy(self) -> float:
+        return entropy_from_distribution(self.counts) if self.counts else 0.0
+
+
+@dataclass
+class CandidateDistributions:
+    """Per-dimension distributions of a candidate set; all question selection needs."""
+    total: int
+    dimensions: Dict[str, DimensionDistribution]
+
+
+def compute_dimension_distribution(
+    candidates: List[Dict[str, Any]],
+    dimension: str,
+    n_buckets: int = 5,
+) -> DimensionDistribution:
+    """
+    Distribution of one dimension across candidates.
+
+    Numerical dimensions are bucketed into ``n_buckets`` equal-width buckets
+    between the observed min and max.
+    """
+    extractor = DIMENSION_EXTRACTORS.get(dimension)
+    if extractor is None:
+        return DimensionDistribution()
+
+    values = [extractor(v) for v in candidates]
+    values = [v for v in values if v is not None]
+    dist = DimensionDistribution(present=len(values))
+    if not values:
+        return dist
+
+    if dimension in NUMERICAL_DIMENSIONS:
+        try:
+            numeric_values = [float(v) for v in values]
+        except (ValueError, TypeError):
+            return dist
+        dist.min, dist.max = min(numeric_values), max(numeric_values)
+        if len(numeric_values) < 2:
+            return dist
+
+        min_val, max_val = dist.min, dist.max
+        bucket_size = (max_val - min_val) / n_buckets if max_val > min_val else 1
+
+        def get_bucket_label(val):
+            if bucket_size == 0:
+                return "all_same"
+            bucket_idx = min(int((val - min_val) / bucket_size), n_buckets - 1)
+            return f"bucket_{bucket_idx}"
+
+        dist.counts = Counter(get_bucket_label(v) for v in numeric_values)
+        return dist
+
+    # Convert any unhashable types to strings
+    dist.counts = Counter(str(v) if not isinstance(v, (str, int, float, bool)) else v for v in values)
+    return dist
+
+
+def compute_candidate_distributions(
+    candidates: List[Dict[str, Any]],
+    n_buckets: int = 5,
+) -> CandidateDistributions:
+    """Distributions of every questionable dimension over a candidate set."""
+    return CandidateDistributions(
+        total=len(candidates),
+        dimensions={
+            dim: compute_dimension_distribution(candidates, dim, n_buckets)
+            for dim in QUESTIONABLE_DIMENSIONS
+        },
+    )
+
+
 def compute_dimension_entropy(
     candidates: List[Dict[str, Any]],
     dimension: str,
@@ -93,42 +183,62 @@ def compute_dimension_entropy(
     Returns:
         Shannon entropy value (higher = more uncertainty)
     """
-    if dimension not in DIMENSION_EXTRACTORS:
-        return 0.0
+    return compute_dimension_distribution(candidates, dimension, n_buckets).entropy
 
-    extractor = DIMENSION_EXTRACTORS[dimension]
-    values = [extractor(v) for v in candidates]
-    values = [v for v in values if v is not None]
 
-    if not values:
-        return 0.0
-
-    # For numerical dimensions, bucket into string labels
-    if dimension in NUMERICAL_DIMENSIONS:
-        try:
-            numeric_values = [float(v) for v in values if v is not None]
-            if len(numeric_values) < 2:
-                return 0.0
-
-            # Create bucket labels instead of using bucket_numerical_values
-            # which returns lists that aren't hashable
-            min_val, max_val = min(numeric_values), max(numeric_values)
-            bucket_size = (max_val - min_val) / n_buckets if max_val > min_val else 1
-
-            def get_bucket_label(val):
-                if bucket_size == 0:
-                    return "all_same"
-                bucket_idx = min(int((val - min_val) / bucket_size), n_buckets - 1)
-                return f"bucket_{bucket_idx}"
-
-            values = [get_bucket_label(v) for v in numeric_values]
-        except (ValueError, TypeError):
-            return 0.0
+class DistributionCache:
+    """
+    Thread-safe LRU of candidate distributions keyed by (domain, filter set).
 
-    # Convert any unhashable types to strings
-    values = [str(v) if not isinstance(v, (str, int, float, bool)) else v for v in values]
+    Question selection only needs per-dimension value counts, so a warm
+    entry answers "which dimension next?" without fetching candidate rows.
+    Entries expire after ``ttl_seconds`` so inventory changes are picked up.
+    """
 
-    return compute_shannon_entropy(values)
+    def __init__(self, maxsize: int = 256, ttl_seconds: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(domain: Hashable, filters: Dict[str, Any]) -> Hashable:
+        return (domain, freeze_filters(filters))
+
+    def get(self, domain: Hashable, filters: Dict[str, Any]) -> Optional[Any]:
+        key = self.key(domain, filters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, domain: Hashable, filters: Dict[str, Any], value: Any) -> None:
+        key = self.key(domain, filters)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by all sessions: distributions depend only on the domain and filters
+question_distribution_cache = DistributionCache(
+    maxsize=int(os.getenv("QUESTION_DISTRIBUTION_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("QUESTION_DISTRIBUTION_CACHE_TTL", "600")),
+)
 
 
 def get_specified_dimensions(explicit_filters: Dict[str, Any]) -> Set[str]:
@@ -153,6 +263,7 @@ def select_question_dimension(
     explicit_filters: Dict[str, Any],
     asked_dimensions: Set[str],
     min_entropy_threshold: float = 0.5,
+    distributions: Optional[CandidateDistributions] = None,
 ) -> Optional[str]:
     """
     Select the dimension with highest entropy that hasn't been asked or specified.
@@ -162,11 +273,15 @@ def select_question_dimension(
         explicit_filters: User's explicit filters
         asked_dimensions: Dimensions already asked about
         min_entropy_threshold: Minimum entropy to consider a dimension worth asking
+        distributions: Precomputed distributions of the candidates (e.g. from
+            question_distribution_cache); candidates may then be empty
 
     Returns:
         Dimension name to ask about, or None if all covered
     """
-    if not candidates:
+    if distributions is None and candidates:
+        distributions = compute_candidate_distributions(candidates)
+    if distributions is None or not distributions.total:
         logger.warning("No candidates for entropy calculation")
         return None
 
@@ -186,7 +301,7 @@ def select_question_dimension(
         if dimension in covered:
             continue
 
-        entropy = compute_dimension_entropy(candidates, dimension)
+        entropy = distributions.dimensions[dimension].entropy
         entropy_scores.append((dimension, entropy))
         logger.debug(f"  {dimension}: entropy={entropy:.3f}")
 
@@ -222,6 +337,7 @@ def get_dimension_topic(dimension: str) -> str:
 def get_dimension_context(
     dimension: str,
     candidates: List[Dict[str, Any]],
+    distributions: Optional[CandidateDistributions] = None,
 ) -> Dict[str, Any]:
     """
     Get context about a dimension's distribution for LLM question generation.
@@ -229,6 +345,7 @@ def get_dimension_context(
     Args:
         dimension: Dimension to analyze
         candidates: Current candidates
+        distributions: Precomputed distributions of the candidates, if available
 
     Returns:
         Dict with distribution info for the LLM prompt
@@ -236,25 +353,27 @@ def get_dimension_context(
     if dimension not in DIMENSION_EXTRACTORS:
         return {"dimension": dimension, "topic": get_dimension_topic(dimension)}
 
-    extractor = DIMENSION_EXTRACTORS[dimension]
-    values = [extractor(v) for v in candidates]
-    values = [v for v in values if v is not None]
+    if distributions is not None:
+        total = distributions.total
+        dist = distributions.dimensions.get(dimension) or compute_dimension_distribution(candidates, dimension)
+    else:
+        total = len(candidates)
+        dist = compute_dimension_distribution(candidates, dimension)
 
     context = {
         "dimension": dimension,
         "topic": get_dimension_topic(dimension),
-        "total_candidates": len(candidates),
-        "values_present": len(values),
+        "total_candidates": total,
+        "values_present": dist.present,
     }
 
-    if not values:
+    if not dist.present:
         return context
 
     if dimension in NUMERICAL_DIMENSIONS:
-        try:
-            numeric_values = [float(v) for v in values]
-            context["min"] = min(numeric_values)
-            context["max"] = max(numeric_values)
+        if dist.min is not None:
+            context["min"] = dist.min
+            context["max"] = dist.max
             context["is_numerical"] = True
 
             # Format for display
@@ -264,13 +383,9 @@ def get_dimension_context(
                 context["range_display"] = f"{int(context['min']):,} - {int(context['max']):,} miles"
             elif dimension == "year":
                 context["range_display"] = f"{int(context['min'])} - {int(context['max'])}"
-        except (ValueError, TypeError):
-            pass
     else:
         # Categorical - get top values
-        from collections import Counter
-        counts = Counter(values)
-        top_values = counts.most_common(5)
+        top_values = dist.counts.most_common(5)
         context["top_values"] = [v for v, c in top_values]
         context["is_categorical"] = True
 
@@ -282,5 +397,10 @@ __all__ = [
     "get_dimension_topic",
     "get_dimension_context",
     "get_specified_dimensions",
+    "compute_candidate_distributions",
+    "CandidateDistributions",
+    "DimensionDistribution",
+    "DistributionCache",
+    "question_distribution_cache",
     "QUESTIONABLE_DIMENSIONS",
 ]
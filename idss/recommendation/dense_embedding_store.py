@@ -4,7 +4,11 @@ Dense Embedding Store: Manages FAISS index for fast similarity search.
 This class loads precomputed embeddings and FAISS index, and provides
 efficient similarity search over all vehicles.
 """
+import json
+import os
 import pickle
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 import numpy as np
@@ -13,6 +17,10 @@ from idss.utils.logger import get_logger
 
 logger = get_logger("recommendation.dense_embedding_store")
 
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("DENSE_QUERY_CACHE_SIZE", "1024"))
+# VINs per Supabase `in.(...)` request when fetching candidate embeddings
+SUPABASE_EMBEDDING_BATCH = 100
+
 
 def _project_root() -> Path:
     """Return project root."""
@@ -68,6 +76,10 @@ class DenseEmbeddingStore:
         
         # Cache for embeddings
         self._embedding_cache = {}
+        # Query embeddings keyed by normalized text / feature tuple, LRU-bounded
+        self._query_cache: "OrderedDict[Any, np.ndarray]" = OrderedDict()
+        self._query_cache_size = QUERY_EMBEDDING_CACHE_SIZE
+        self._query_lock = threading.Lock()
 
         if preload_model:
             self._get_encoder()
@@ -97,11 +109,13 @@ class DenseEmbeddingStore:
         """Lazy load the sentence transformer model."""
         if self._encoder is None:
             try:
-                from sentence_transformers import SentenceTransformer
+                import sentence_transformers  # noqa: F401
             except ImportError:
                 logger.error("sentence-transformers not installed")
                 raise
-            self._encoder = SentenceTransformer(self.model_name)
+            from idss.recommendation.encoder_backend import load_sentence_encoder
+
+            self._encoder = load_sentence_encoder(self.model_name)
         return self._encoder
 
     def encode_text(self, text: str) -> np.ndarray:
@@ -121,6 +135,35 @@ class DenseEmbeddingStore:
         normalized = summed / (np.linalg.norm(summed) + 1e-8)
         return normalized.reshape(1, -1).astype(np.float32)
 
+    def _cached_query(self, key, compute) -> np.ndarray:
+        with self._query_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+        embedding = compute()
+        if self._query_cache_size > 0:
+            with self._query_lock:
+                self._query_cache[key] = embedding
+                self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+
+    def encode_query(self, query_input) -> np.ndarray:
+        """
+        Query embedding for search_by_vins, cached across calls.
+
+        A list is a sum-of-features query (encode_features), a string is
+        encoded whole. Keys are whitespace-normalized, so a repeated
+        re-rank of the same preferences needs no model forward pass.
+        """
+        if isinstance(query_input, list):
+            features = [" ".join(str(f).split()) for f in query_input]
+            return self._cached_query(("features", tuple(features)), lambda: self.encode_features(features))
+        text = " ".join(query_input.split())
+        return self._cached_query(("text", text), lambda: self.encode_text(text))
+
     def search(self, query_text: str, k: int = 20) -> Tuple[List[str], List[float]]:
         """Search for similar vehicles."""
         if self.use_supabase:
@@ -134,7 +177,7 @@ class DenseEmbeddingStore:
         if self.index is None:
             raise RuntimeError("FAISS index not loaded")
 
-        query_embedding = self.encode_text(query_text)
+        query_embedding = self.encode_query(query_text)
         distances, indices = self.index.search(query_embedding, k)
         similarities = 1.0 / (1.0 + distances[0])
         result_vins = [self.vins[idx] for idx in indices[0]]
@@ -153,13 +196,15 @@ class DenseEmbeddingStore:
             return [], []
 
         if method == "sum" and isinstance(query_input, list):
-            query_embedding = self.encode_features(query_input)
+            query_embedding = self.encode_query(query_input)
         else:
             if isinstance(query_input, list):
                 query_input = " ".join(query_input)
-            query_embedding = self.encode_text(query_input)
+            query_embedding = self.encode_query(query_input)
 
         # Fetch embeddings for candidates
+        if self.use_supabase:
+            self._prefetch_supabase_embeddings(candidate_vins)
         similarities = []
         for vin in candidate_vins:
             candidate_embedding = self.get_embedding_for_vin(vin)
@@ -176,6 +221,33 @@ class DenseEmbeddingStore:
 
         return [vin for vin, _ in sorted_pairs], [score for _, score in sorted_pairs]
 
+    def _prefetch_supabase_embeddings(self, vins: List[str]) -> None:
+        """Load uncached embeddings for vins with one request per SUPABASE_EMBEDDING_BATCH VINs."""
+        missing = [vin for vin in dict.fromkeys(vins) if vin not in self._embedding_cache]
+        for start in range(0, len(missing), SUPABASE_EMBEDDING_BATCH):
+            chunk = missing[start:start + SUPABASE_EMBEDDING_BATCH]
+            try:
+                rows = self.supabase.select(
+                    "vehicle_embeddings",
+                    filters={"vin": f"in.({','.join(chunk)})"},
+                    select="vin,embedding",
+                    limit=len(chunk),
+                )
+            except Exception as e:
+                logger.error(f"Failed to batch-fetch {len(chunk)} embeddings from Supabase: {e}")
+                continue
+            for row in rows or []:
+                raw_emb = row.get("embedding")
+                if row.get("vin") and raw_emb is not None:
+                    # Supabase returns embeddings as stringified JSON arrays
+                    if isinstance(raw_emb, str):
+                        raw_emb = json.loads(raw_emb)
+                    self._embedding_cache[row["vin"]] = np.array(raw_emb, dtype=np.float32)
+            if rows:
+                # select() returns [] on errors too, so only trust absences from a non-empty answer
+                for vin in chunk:
+                    self._embedding_cache.setdefault(vin, None)
+
     def get_embedding_for_vin(self, vin: str) -> Optional[np.ndarray]:
         """Get precomputed embedding for a VIN."""
         # 1. Check cache
@@ -192,7 +264,6 @@ class DenseEmbeddingStore:
                     raw_emb = res[0]["embedding"]
                     # Supabase returns embeddings as stringified JSON arrays
                     if isinstance(raw_emb, str):
-                        import json
                         raw_emb = json.loads(raw_emb)
                     emb = np.array(raw_emb, dtype=np.float32)
                     self._embedding_cache[vin] = emb
@@ -0,0 +1,141 @@
+"""
+Sentence-transformer loading with optional CPU-optimized int8 backends.
+
+DenseEmbeddingStore, PhraseStore and the MCP UniversalEmbeddingStore all
+load all-mpnet-base-v2 through load_sentence_encoder(). The backend is
+chosen with SENTENCE_ENCODER_BACKEND:
+
+- "torch" (default): float32 PyTorch, as before.
+- "torch-int8": the same model with torch dynamic int8 quantization of
+  the Linear layers. No extra dependencies.
+- "onnx-int8": ONNX Runtime with a dynamically quantized int8 graph
+  (needs sentence-transformers>=3.2 with onnxruntime/optimum). The
+  published quantized file for SENTENCE_ENCODER_QUANTIZATION (avx512_vnni,
+  avx512, avx2, arm64) is used when the model repo ships one; otherwise
+  it is exported and quantized once into SENTENCE_ENCODER_ONNX_DIR.
+
+Every backend returns an object with the SentenceTransformer encode() /
+get_sentence_embedding_dimension() interface, so callers are unchanged.
+If the requested backend cannot be loaded the float model is used and a
+warning is logged.
+
+Stored indexes were built with the float model, so quantized query
+embeddings are compared against float product embeddings; check
+cosine_parity() (scripts/benchmark_encoder_backends.py) before switching.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from idss.utils.logger import get_logger
+
+logger = get_logger("recommendation.encoder_backend")
+
+BACKENDS = ("torch", "torch-int8", "onnx-int8")
+ONNX_QUANTIZATIONS = ("avx512_vnni", "avx512", "avx2", "arm64")
+
+
+def _project_root() -> Path:
+    return Path(__file__).resolve().parent.parent.parent
+
+
+def configured_backend() -> str:
+    backend = os.getenv("SENTENCE_ENCODER_BACKEND", "torch").strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown SENTENCE_ENCODER_BACKEND={backend!r}; using torch")
+        return "torch"
+    return backend
+
+
+def onnx_quantized_file(quantization: str) -> str:
+    """File name sentence-transformers gives a dynamically quantized export."""
+    if quantization == "avx2":
+        return "onnx/model_quint8_avx2.onnx"
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def _load_torch(model_name: str, **kwargs):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, **kwargs)
+
+
+def _load_torch_int8(model_name: str):
+    import torch
+
+    # Dynamic quantization kernels are CPU-only
+    model = _load_torch(model_name, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx_int8(model_name: str, quantization: str, onnx_dir: Path):
+    from sentence_transformers import SentenceTransformer
+
+    file_name = onnx_quantized_file(quantization)
+    try:
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": file_name})
+    except Exception as e:
+        logger.info(f"No published {file_name} for {model_name} ({e}); exporting locally")
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    local_dir = onnx_dir / model_name.replace("/", "_")
+    if not (local_dir / file_name).exists():
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(str(local_dir))
+        export_dynamic_quantized_onnx_model(model, quantization, str(local_dir))
+    return SentenceTransformer(str(local_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_sentence_encoder(model_name: str, backend: Optional[str] = None):
+    """
+    Load model_name with the configured (or given) backend.
+
+    Raises ImportError only when sentence-transformers itself is missing;
+    a failing optimized backend falls back to float torch.
+    """
+    backend = backend or configured_backend()
+    if backend == "torch-int8":
+        try:
+            encoder = _load_torch_int8(model_name)
+            logger.info(f"Loaded {model_name} with torch dynamic int8 quantization")
+            return encoder
+        except ImportError:
+            raise
+        except Exception as e:
+            logger.warning(f"torch-int8 encoder failed for {model_name}: {e}; using float model")
+    elif backend == "onnx-int8":
+        quantization = os.getenv("SENTENCE_ENCODER_QUANTIZATION", "avx512_vnni")
+        if quantization not in ONNX_QUANTIZATIONS:
+            logger.warning(f"Unknown SENTENCE_ENCODER_QUANTIZATION={quantization!r}; using avx512_vnni")
+            quantization = "avx512_vnni"
+        onnx_dir = Path(os.getenv("SENTENCE_ENCODER_ONNX_DIR") or _project_root() / "data" / "onnx_encoders")
+        try:
+            encoder = _load_onnx_int8(model_name, quantization, onnx_dir)
+            logger.info(f"Loaded {model_name} as ONNX int8 ({quantization})")
+            return encoder
+        except Exception as e:
+            # Older sentence-transformers (no backend=) or onnxruntime/optimum missing
+            logger.warning(f"onnx-int8 encoder failed for {model_name}: {e}; using float model")
+    return _load_torch(model_name)
+
+
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, Any]:
+    """
+    Row-wise cosine similarity between two (N, D) embedding matrices of the
+    same texts, e.g. float vs. quantized encoder output.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"shape mismatch: {reference.shape} vs {candidate.shape}")
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    cosines = np.einsum("ij,ij->i", reference, candidate) / np.maximum(norms, 1e-12)
+    return {
+        "n": int(len(cosines)),
+        "mean": float(cosines.mean()) if len(cosines) else 0.0,
+        "min": float(cosines.min()) if len(cosines) else 0.0,
+        "p5": float(np.percentile(cosines, 5)) if len(cosines) else 0.0,
+    }
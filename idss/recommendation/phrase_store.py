@@ -365,14 +365,15 @@ class PhraseStore:
         """Lazy load the sentence transformer model."""
         if self._encoder is None:
             try:
-                from sentence_transformers import SentenceTransformer
+                import sentence_transformers  # noqa: F401
             except ImportError:
                 logger.error("sentence-transformers not installed")
                 logger.error("Please run: pip install sentence-transformers")
                 raise
+            from idss.recommendation.encoder_backend import load_sentence_encoder
 
             logger.info(f"Loading sentence transformer: {self.model_name}")
-            self._encoder = SentenceTransformer(self.model_name)
+            self._encoder = load_sentence_encoder(self.model_name)
             logger.info(f"Model loaded (dim={self._encoder.get_sentence_embedding_dimension()})")
 
         return self._encoder
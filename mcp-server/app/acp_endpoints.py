@@ -9,7 +9,8 @@ Session lifecycle: incomplete → ready_for_payment → completed | canceled
 
 import uuid
 import math
-from typing import Dict, List, Optional
+import logging
+from typing import Dict, Iterator, List, Optional
 from sqlalchemy.orm import Session
 
 from app.acp_schemas import (
@@ -21,6 +22,9 @@ from app.acp_schemas import (
 from app.schemas import GetProductRequest
 from app.endpoints import get_product
 from app.models import Product
+from app.merchant_feed import FEED_CHUNK_SIZE, FeedFrame, iter_framed
+
+logger = logging.getLogger(__name__)
 
 # In-memory session store (same pattern as ucp_checkout.py _checkout_sessions)
 _acp_sessions: Dict[str, ACPCheckoutSession] = {}
@@ -247,48 +251,113 @@ async def acp_cancel_checkout_session(session_id: str) -> Optional[ACPCheckoutSe
 # Product Feed
 # ============================================================================
 
+_FEED_BASE_URL = "https://idss-web.vercel.app"
+
+ACP_FEED_CSV_HEADER = (
+    "id,title,price_dollars,currency,availability,inventory,brand,category,rating,product_url"
+)
+
+
+def _feed_item(p: Product) -> ACPProductFeedItem:
+    """Map one products row to an ACP feed item."""
+    price_dollars = float(p.price_value) if p.price_value is not None else 0.0
+    inventory = int(p.inventory) if p.inventory is not None else 0
+    availability = "in_stock" if inventory > 0 else "out_of_stock"
+    product_url = p.link or f"{_FEED_BASE_URL}/products/{p.product_id}"
+
+    return ACPProductFeedItem(
+        id=str(p.product_id),
+        title=p.name or "",
+        description=p.description,
+        price_dollars=round(price_dollars, 2),
+        currency="USD",
+        availability=availability,
+        inventory=inventory,
+        image_url=p.image_url,
+        product_url=product_url,
+        category=p.category,
+        brand=p.brand,
+        rating=float(p.rating) if p.rating is not None else None,
+        rating_count=int(p.rating_count) if p.rating_count is not None else None,
+    )
+
+
+def iter_product_feed(
+    db: Session,
+    limit: Optional[int] = None,
+    chunk_size: int = FEED_CHUNK_SIZE,
+) -> Iterator[ACPProductFeedItem]:
+    """
+    Yield ACP feed items one at a time from a server-side cursor.
+
+    yield_per() keeps at most `chunk_size` ORM rows in memory, so the full
+    catalog can be streamed. Database errors propagate: a streamed response
+    is aborted instead of ending as a truncated but well-formed feed.
+    """
+    query = db.query(Product).filter(Product.name.isnot(None))
+    if limit:
+        query = query.limit(limit)
+    for p in query.yield_per(chunk_size):
+        yield _feed_item(p)
+
+
 def generate_product_feed(db: Session, limit: int = 500) -> List[ACPProductFeedItem]:
     """
     Build ACP product feed from Supabase product catalog.
 
     Queries the products table directly via SQLAlchemy (same pattern as
     search_products in endpoints.py). Returns up to `limit` items.
+    For the full catalog use iter_product_feed() / stream_product_feed_*().
 
     GET /acp/feed.json  or  GET /acp/feed.csv
     """
-    base_url = "https://idss-web.vercel.app"
-
     try:
-        rows = (
-            db.query(Product)
-            .filter(Product.name.isnot(None))
-            .limit(limit)
-            .all()
-        )
-    except Exception:
+        return list(iter_product_feed(db, limit=limit))
+    except Exception as e:
+        logger.warning("ACP feed query failed: %s", e)
         return []
 
-    items: List[ACPProductFeedItem] = []
-    for p in rows:
-        price_dollars = float(p.price_value) if p.price_value is not None else 0.0
-        inventory = int(p.inventory) if p.inventory is not None else 0
-        availability = "in_stock" if inventory > 0 else "out_of_stock"
-        product_url = p.link or f"{base_url}/products/{p.product_id}"
-
-        items.append(ACPProductFeedItem(
-            id=str(p.product_id),
-            title=p.name or "",
-            description=p.description,
-            price_dollars=round(price_dollars, 2),
-            currency="USD",
-            availability=availability,
-            inventory=inventory,
-            image_url=p.image_url,
-            product_url=product_url,
-            category=p.category,
-            brand=p.brand,
-            rating=float(p.rating) if p.rating is not None else None,
-            rating_count=int(p.rating_count) if p.rating_count is not None else None,
-        ))
 
-    return items
+ACP_FEED_JSON_FRAME = FeedFrame(
+    head='{"protocol": "acp", "items": [',
+    sep=",",
+    tail=lambda count: f'], "count": {count}}}',
+)
+
+ACP_FEED_CSV_FRAME = FeedFrame(head=ACP_FEED_CSV_HEADER, sep="", tail=lambda count: "")
+
+
+def _csv_quote(v: object) -> str:
+    s = str(v) if v is not None else ""
+    return f'"{s.replace(chr(34), chr(34)+chr(34))}"'
+
+
+def feed_item_csv_row(it: ACPProductFeedItem) -> str:
+    """Format one ACP feed item as a CSV line (no trailing newline)."""
+    return ",".join([
+        _csv_quote(it.id), _csv_quote(it.title), str(it.price_dollars), it.currency,
+        it.availability, str(it.inventory),
+        _csv_quote(it.brand or ""), _csv_quote(it.category or ""),
+        str(it.rating or ""), _csv_quote(it.product_url),
+    ])
+
+
+def stream_product_feed_json(db: Session, limit: Optional[int] = None) -> Iterator[str]:
+    """
+    Stream the /acp/feed.json document as text chunks.
+
+    Same shape as the in-memory response ({"protocol", "items", "count"});
+    count is written last because it is only known once the cursor is drained.
+    """
+    return iter_framed(
+        ACP_FEED_JSON_FRAME,
+        (item.model_dump_json() for item in iter_product_feed(db, limit=limit)),
+    )
+
+
+def stream_product_feed_csv(db: Session, limit: Optional[int] = None) -> Iterator[str]:
+    """Stream the /acp/feed.csv document line by line."""
+    return iter_framed(
+        ACP_FEED_CSV_FRAME,
+        ("\n" + feed_item_csv_row(item) for item in iter_product_feed(db, limit=limit)),
+    )
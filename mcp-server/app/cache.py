@@ -12,13 +12,47 @@ Cache keys follow a clear naming pattern:
 - session:{session_id}        — agent session blobs (TTL 1 hour)
 
 Supports both local Redis and Upstash (cloud-hosted) via UPSTASH_REDIS_URL.
+
+Product lookups that need summary + price + inventory go through
+get_product_bundles() / set_product_bundle(), which read or write all three
+keys (for any number of products) in one pipelined round trip. Values larger
+than CACHE_COMPRESS_THRESHOLD bytes are stored zlib-compressed; reads
+detect the marker, so compressed and plain values can coexist. stats()
+reports hit ratios per key namespace (prod_summary, price, search, ...).
+
+Search pages are stored with their own freshness deadline and kept in Redis
+for a further CACHE_SEARCH_STALE_S seconds. get_search_entry() says when a
+page is due for a refresh: once it is past its deadline (stale but still
+served), or a little before, with a probability that rises towards the
+deadline and with the time the page took to compute (probabilistic early
+expiry, so a hot key is usually refreshed before it ever goes stale).
+acquire_refresh_lock() is a short SET NX lock so only one worker refreshes
+a given key.
+
+Search keys also fold in a per-category generation number. Every catalog
+write (through app.cache_invalidation) bumps catgen:_all plus catgen:{category}
+for each touched category, or catgen:_unknown when the category is not known.
+A search scoped to a category reads catgen:{category} + catgen:_unknown; a
+search with no category reads catgen:_all, so it moves on every write. One
+bump orphans every affected cached page at once; the old pages age out.
 """
 
+import base64
 import hashlib
+import math
+import random
 import redis
 import json
 import os
-from typing import Optional, Dict, Any, List, Set
+import threading
+import time
+import uuid
+import zlib
+from typing import Optional, Dict, Any, List, Set, Iterable
+
+# Marker for zlib+base64 values; plain JSON never starts with it
+_COMPRESSED_PREFIX = "z:"
+PRODUCT_KINDS = ("prod_summary", "price", "inventory")
 
 
 class CacheClient:
@@ -37,6 +71,8 @@ class CacheClient:
     """
 
     POPULARITY_KEY = "mcp:popularity:access_count"
+    ALL_CATEGORIES = "_all"
+    UNKNOWN_CATEGORY = "_unknown"
 
     def __init__(self, namespace: str = "mcp"):
         """
@@ -91,10 +127,75 @@ class CacheClient:
         self.ttl_agent_session = int(os.getenv("CACHE_TTL_AGENT_SESSION", "3600"))  # 1 hour
         self.ttl_agent_context = int(os.getenv("CACHE_TTL_AGENT_CONTEXT", "1800"))  # 30 minutes
 
+        self.compress_threshold = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "1024"))
+
+        # Stale-while-revalidate for search pages
+        self.search_stale_window = int(os.getenv("CACHE_SEARCH_STALE_S", "300"))
+        self.search_early_refresh_beta = float(os.getenv("CACHE_SEARCH_EARLY_REFRESH_BETA", "1.0"))
+        self.refresh_lock_ttl = int(os.getenv("CACHE_REFRESH_LOCK_S", "30"))
+
+        # Per key-namespace counters: {"price": {"hits": .., "misses": .., "errors": ..}}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self.read_round_trips = 0
+
     def _key(self, key: str) -> str:
         """Prefix key with namespace."""
         return f"{self.namespace}:{key}"
 
+    # 
+    # Serialization, compression and statistics
+    # 
+
+    def _encode(self, value: Any) -> str:
+        """JSON-encode; zlib-compress when large and it actually saves space."""
+        raw = json.dumps(value)
+        if len(raw) > self.compress_threshold:
+            packed = _COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw.encode("utf-8"))).decode("ascii")
+            if len(packed) < len(raw):
+                return packed
+        return raw
+
+    @staticmethod
+    def _decode(cached: str) -> Any:
+        if cached.startswith(_COMPRESSED_PREFIX):
+            cached = zlib.decompress(base64.b64decode(cached[len(_COMPRESSED_PREFIX):])).decode("utf-8")
+        return json.loads(cached)
+
+    def _count(self, kind: str, outcome: str, n: int = 1) -> None:
+        with self._stats_lock:
+            counters = self._stats.setdefault(kind, {"hits": 0, "misses": 0, "errors": 0})
+            counters[outcome] = counters.get(outcome, 0) + n
+
+    def _get_json(self, kind: str, key: str, label: str = "Cache") -> Optional[Any]:
+        """GET + decode one key, counting a hit/miss for `kind`."""
+        try:
+            self.read_round_trips += 1
+            cached = self.client.get(key)
+            if cached:
+                self._count(kind, "hits")
+                return self._decode(cached)
+            self._count(kind, "misses")
+            return None
+        except Exception as e:
+            self._count(kind, "errors")
+            print(f"{label} read error for {key}: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio per key namespace plus read round trips (for /metrics)."""
+        with self._stats_lock:
+            namespaces = {}
+            for kind, c in sorted(self._stats.items()):
+                lookups = c["hits"] + c["misses"]
+                namespaces[kind] = {**c, "hit_ratio": round(c["hits"] / lookups, 4) if lookups else 0.0}
+        return {"namespace": self.namespace, "read_round_trips": self.read_round_trips, "by_key_type": namespaces}
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+            self.read_round_trips = 0
+
 
     def ping(self) -> bool:
         """Check if Redis is reachable."""
@@ -131,7 +232,10 @@ class CacheClient:
         Warm products (3-9 accesses): 1x base TTL — standard
         Cold products (<3 accesses):  0.5x base TTL — evict sooner
         """
-        score = self.get_popularity_score(product_id)
+        return self._ttl_for_score(self.get_popularity_score(product_id), base_ttl)
+
+    @staticmethod
+    def _ttl_for_score(score: float, base_ttl: int) -> int:
         if score >= 10:
             return int(base_ttl * 3)
         elif score >= 3:
@@ -152,15 +256,7 @@ class CacheClient:
 
     def get_product_summary(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get cached product summary by ID. Returns None on miss."""
-        key = self._key(f"prod_summary:{product_id}")
-        try:
-            cached = self.client.get(key)
-            if cached:
-                return json.loads(cached)
-            return None
-        except Exception as e:
-            print(f"Cache read error for {key}: {e}")
-            return None
+        return self._get_json("prod_summary", self._key(f"prod_summary:{product_id}"))
 
 
     def set_product_summary(self, product_id: str, summary: Dict[str, Any], adaptive: bool = False) -> bool:
@@ -168,7 +264,7 @@ class CacheClient:
         key = self._key(f"prod_summary:{product_id}")
         ttl = self.get_adaptive_ttl(product_id, self.ttl_product_summary) if adaptive else self.ttl_product_summary
         try:
-            self.client.setex(key, ttl, json.dumps(summary))
+            self.client.setex(key, ttl, self._encode(summary))
             return True
         except Exception as e:
             print(f"Cache write error for {key}: {e}")
@@ -181,15 +277,7 @@ class CacheClient:
 
     def get_price(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get cached price. Returns None on miss."""
-        key = self._key(f"price:{product_id}")
-        try:
-            cached = self.client.get(key)
-            if cached:
-                return json.loads(cached)
-            return None
-        except Exception as e:
-            print(f"Cache read error for {key}: {e}")
-            return None
+        return self._get_json("price", self._key(f"price:{product_id}"))
 
 
     def set_price(self, product_id: str, price_data: Dict[str, Any], adaptive: bool = False) -> bool:
@@ -197,7 +285,7 @@ class CacheClient:
         key = self._key(f"price:{product_id}")
         ttl = self.get_adaptive_ttl(product_id, self.ttl_price) if adaptive else self.ttl_price
         try:
-            self.client.setex(key, ttl, json.dumps(price_data))
+            self.client.setex(key, ttl, self._encode(price_data))
             return True
         except Exception as e:
             print(f"Cache write error for {key}: {e}")
@@ -210,15 +298,7 @@ class CacheClient:
 
     def get_inventory(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get cached inventory. Returns None on miss."""
-        key = self._key(f"inventory:{product_id}")
-        try:
-            cached = self.client.get(key)
-            if cached:
-                return json.loads(cached)
-            return None
-        except Exception as e:
-            print(f"Cache read error for {key}: {e}")
-            return None
+        return self._get_json("inventory", self._key(f"inventory:{product_id}"))
 
 
     def set_inventory(self, product_id: str, inventory_data: Dict[str, Any], adaptive: bool = False) -> bool:
@@ -226,47 +306,197 @@ class CacheClient:
         key = self._key(f"inventory:{product_id}")
         ttl = self.get_adaptive_ttl(product_id, self.ttl_inventory) if adaptive else self.ttl_inventory
         try:
-            self.client.setex(key, ttl, json.dumps(inventory_data))
+            self.client.setex(key, ttl, self._encode(inventory_data))
             return True
         except Exception as e:
             print(f"Cache write error for {key}: {e}")
             return False
 
 
+    # 
+    # Batched product lookups (summary + price + inventory)
+    # 
+
+    def get_product_bundles(
+        self, product_ids: Iterable[str], record_access: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Summary, price and inventory for every product in one round trip
+        (a single MGET, pipelined with ZINCRBY per product when
+        record_access=True). Returns {product_id: {"summary", "price",
+        "inventory"[, "popularity"]}}, with None for each missing part.
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        bundles: Dict[str, Dict[str, Any]] = {
+            pid: {"summary": None, "price": None, "inventory": None} for pid in product_ids
+        }
+        if not product_ids:
+            return bundles
+        keys = [self._key(f"{kind}:{pid}") for pid in product_ids for kind in PRODUCT_KINDS]
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.mget(keys)
+            if record_access:
+                for pid in product_ids:
+                    pipe.zincrby(self.POPULARITY_KEY, 1, pid)
+            self.read_round_trips += 1
+            results = pipe.execute()
+        except Exception as e:
+            for kind in PRODUCT_KINDS:
+                self._count(kind, "errors", len(product_ids))
+            print(f"Cache batch read error for {len(product_ids)} products: {e}")
+            return bundles
+
+        values = results[0]
+        for i, pid in enumerate(product_ids):
+            for j, (kind, field) in enumerate(zip(PRODUCT_KINDS, ("summary", "price", "inventory"))):
+                cached = values[i * len(PRODUCT_KINDS) + j]
+                if cached:
+                    try:
+                        bundles[pid][field] = self._decode(cached)
+                        self._count(kind, "hits")
+                        continue
+                    except Exception:
+                        self._count(kind, "errors")
+                        continue
+                self._count(kind, "misses")
+            if record_access:
+                bundles[pid]["popularity"] = float(results[1 + i] or 0.0)
+        return bundles
+
+    def set_product_bundle(
+        self,
+        product_id: str,
+        summary: Dict[str, Any],
+        price_data: Dict[str, Any],
+        inventory_data: Dict[str, Any],
+        adaptive: bool = False,
+        popularity: Optional[float] = None,
+    ) -> bool:
+        """
+        Write summary, price and inventory in one pipelined round trip.
+        With adaptive=True the TTLs follow the product's popularity; pass the
+        score returned by get_product_bundles(record_access=True) to avoid
+        an extra ZSCORE.
+        """
+        if adaptive and popularity is None:
+            popularity = self.get_popularity_score(product_id)
+        entries = (
+            ("prod_summary", summary, self.ttl_product_summary),
+            ("price", price_data, self.ttl_price),
+            ("inventory", inventory_data, self.ttl_inventory),
+        )
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for kind, value, base_ttl in entries:
+                ttl = self._ttl_for_score(popularity, base_ttl) if adaptive else base_ttl
+                pipe.setex(self._key(f"{kind}:{product_id}"), ttl, self._encode(value))
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache batch write error for {product_id}: {e}")
+            return False
+
     # 
     # Search Result Cache
     # 
 
     @staticmethod
-    def make_search_key(filters: Dict[str, Any], category: str, page: int = 1, limit: int = 20) -> str:
+    def make_search_key(
+        filters: Dict[str, Any], category: str, page: int = 1, limit: int = 20, generation: int = 0
+    ) -> str:
         """
         Generate a deterministic cache key for a search query.
 
         Filters are sorted by key to ensure identical queries produce identical keys
-        regardless of dict ordering.
+        regardless of dict ordering. `generation` is the category's
+        invalidation generation (see search_key()).
         """
         # Remove internal/transient keys that shouldn't affect caching
         stable_filters = {
             k: v for k, v in sorted(filters.items())
             if not k.startswith("_") and v is not None
         }
-        raw = json.dumps({"f": stable_filters, "c": category, "p": page, "l": limit}, sort_keys=True)
+        raw = json.dumps({"f": stable_filters, "c": category, "p": page, "l": limit, "g": generation}, sort_keys=True)
         return f"search:{hashlib.sha256(raw.encode()).hexdigest()[:16]}"
 
-    def get_search_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
-        """Get cached search results. Returns None on miss."""
-        key = self._key(cache_key)
+    def search_key(self, filters: Dict[str, Any], category: str, page: int = 1, limit: int = 20) -> str:
+        """make_search_key() with the category's current invalidation generation folded in."""
+        return self.make_search_key(filters, category, page, limit, generation=self.get_search_generation(category))
+
+    def get_search_generation(self, category: Optional[str]) -> int:
+        """
+        Current generation for a search (one MGET): the category's counter
+        plus the unknown-category counter, or the every-write counter for a
+        search with no category.
+        """
+        if category:
+            keys = [self._key(f"catgen:{category}"), self._key(f"catgen:{self.UNKNOWN_CATEGORY}")]
+        else:
+            keys = [self._key(f"catgen:{self.ALL_CATEGORIES}")]
         try:
-            cached = self.client.get(key)
-            if cached:
-                return json.loads(cached)
-            return None
+            return sum(int(v) for v in self.client.mget(keys) if v)
+        except Exception:
+            return 0
+
+    def bump_search_generation(self, categories: Iterable[Optional[str]]) -> bool:
+        """
+        Invalidate every cached search page for these categories by bumping
+        their generation (None / empty = unknown category, which retires
+        every category's pages). The _all counter, read by searches without
+        a category, is bumped on every call.
+        """
+        names = {c or self.UNKNOWN_CATEGORY for c in categories} or {self.UNKNOWN_CATEGORY}
+        names.add(self.ALL_CATEGORIES)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for name in sorted(names):
+                pipe.incr(self._key(f"catgen:{name}"))
+            pipe.execute()
+            return True
         except Exception as e:
-            print(f"Search cache read error for {key}: {e}")
+            print(f"Search generation bump error for {sorted(names)}: {e}")
+            return False
+
+    def get_search_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Get cached search results (fresh or stale). Returns None on miss."""
+        entry = self.get_search_entry(cache_key)
+        return entry[0] if entry is not None else None
+
+    def get_search_entry(self, cache_key: str) -> Optional[tuple]:
+        """
+        Get cached search results plus whether they are due for a refresh.
+
+        Returns (results, refresh_due) or None on miss. refresh_due is True
+        once the page is past its freshness deadline, and occasionally just
+        before it: with delta = compute time and beta the early-refresh
+        factor, a reader refreshes when now - delta * beta * ln(rand) >= deadline.
+        """
+        cached = self._get_json("search", self._key(cache_key), label="Search cache")
+        if cached is None:
             return None
+        if not (isinstance(cached, dict) and "fresh_until" in cached):
+            return cached, False  # written before stale-while-revalidate
+        now = time.time()
+        if now >= cached["fresh_until"]:
+            self._count("search", "stale")
+            return cached["results"], True
+        delta = cached.get("compute_s", 0.0) * self.search_early_refresh_beta
+        if delta > 0 and now - delta * math.log(1.0 - random.random()) >= cached["fresh_until"]:
+            self._count("search", "early_refresh")
+            return cached["results"], True
+        return cached["results"], False
+
+    def set_search_results(
+        self, cache_key: str, results: List[Dict[str, Any]], adaptive: bool = False, compute_s: float = 0.0
+    ) -> bool:
+        """
+        Cache search results. TTL adapts based on popularity of returned products when adaptive=True.
 
-    def set_search_results(self, cache_key: str, results: List[Dict[str, Any]], adaptive: bool = False) -> bool:
-        """Cache search results. TTL adapts based on popularity of returned products when adaptive=True."""
+        The page counts as fresh for the TTL and stays servable (stale) for
+        search_stale_window seconds more. compute_s (how long the page took
+        to build) scales the probabilistic early refresh.
+        """
         key = self._key(cache_key)
         ttl = self.ttl_search
         if adaptive and results:
@@ -282,13 +512,37 @@ class CacheClient:
                     ttl = max(int(self.ttl_search * 0.5), 30)  # Cold: 2.5 min (min 30s)
             except Exception:
                 pass  # Fall back to default TTL
+        entry = {"results": results, "fresh_until": time.time() + ttl, "compute_s": round(compute_s, 4)}
         try:
-            self.client.setex(key, ttl, json.dumps(results))
+            self.client.setex(key, ttl + self.search_stale_window, self._encode(entry))
             return True
         except Exception as e:
             print(f"Search cache write error for {key}: {e}")
             return False
 
+    def acquire_refresh_lock(self, cache_key: str) -> Optional[str]:
+        """
+        Take the cross-worker refresh lock for a key (SET NX with a short
+        expiry). Returns a token for release_refresh_lock(), or None if
+        another worker holds it or Redis is unavailable.
+        """
+        token = uuid.uuid4().hex
+        try:
+            if self.client.set(self._key(f"lock:{cache_key}"), token, nx=True, ex=self.refresh_lock_ttl):
+                return token
+        except Exception as e:
+            print(f"Refresh lock error for {cache_key}: {e}")
+        return None
+
+    def release_refresh_lock(self, cache_key: str, token: str) -> None:
+        """Release the refresh lock if it is still ours (it may have expired and been retaken)."""
+        key = self._key(f"lock:{cache_key}")
+        try:
+            if self.client.get(key) == token:
+                self.client.delete(key)
+        except Exception:
+            pass  # Lock expires on its own
+
 
     # 
     # Brand / Category Index Queries (uses existing Redis sets)
@@ -298,18 +552,19 @@ class CacheClient:
         self, category: Optional[str] = None, brand: Optional[str] = None
     ) -> Optional[Set[str]]:
         """
-        Fast set intersection on brand:{name} and category:{name} Redis sets.
+        Fast set intersection on the candidate index's idx:cat:{category}
+        and idx:brand:{brand} sets (maintained by app.candidate_index).
 
-        These sets are populated by populate_all_databases.py and contain
-        product_id members. Returns None if Redis is unavailable or sets
-        don't exist.
+        Returns None if Redis is unavailable or the sets don't exist. For
+        full filter combinations with counts and paging, use
+        candidate_index.search().
         """
         try:
             keys = []
             if category:
-                keys.append(f"category:{category}")
+                keys.append(self._key(f"idx:cat:{category}"))
             if brand:
-                keys.append(f"brand:{brand}")
+                keys.append(self._key(f"idx:brand:{brand.lower()}"))
             if not keys:
                 return None
             if len(keys) == 1:
@@ -340,6 +595,20 @@ class CacheClient:
             print(f"Cache invalidation error for {product_id}: {e}")
             return False
 
+    def invalidate_products(self, product_ids: Iterable[str]) -> int:
+        """Delete summary, price and inventory keys for many products in one round trip."""
+        keys = [self._key(f"{kind}:{pid}") for pid in dict.fromkeys(product_ids) for kind in PRODUCT_KINDS]
+        if not keys:
+            return 0
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for i in range(0, len(keys), 500):
+                pipe.delete(*keys[i:i + 500])
+            return sum(pipe.execute())
+        except Exception as e:
+            print(f"Cache invalidation error for {len(keys) // len(PRODUCT_KINDS)} products: {e}")
+            return 0
+
     def invalidate_search_cache(self) -> int:
         """Invalidate all cached search results. Returns count of keys deleted."""
         try:
@@ -367,21 +636,13 @@ class CacheClient:
 
     def get_session_data(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Load session blob from Redis. Returns None if missing or on error."""
-        key = self._key(f"session:{session_id}")
-        try:
-            cached = self.client.get(key)
-            if cached:
-                return json.loads(cached)
-            return None
-        except Exception as e:
-            print(f"Session read error for {key}: {e}")
-            return None
+        return self._get_json("session", self._key(f"session:{session_id}"), label="Session")
 
     def set_session_data(self, session_id: str, data: Dict[str, Any], ttl_seconds: int = 3600) -> bool:
         """Persist session blob to Redis (default TTL 1 hour)."""
         key = self._key(f"session:{session_id}")
         try:
-            self.client.setex(key, ttl_seconds, json.dumps(data))
+            self.client.setex(key, ttl_seconds, self._encode(data))
             return True
         except Exception as e:
             print(f"Session write error for {key}: {e}")
@@ -0,0 +1,208 @@
+"""
+Event-driven cache invalidation for catalog writes.
+
+Writers that change product rows (supplier price / inventory updates, CSV
+imports, description normalization) call publish_catalog_change() with the
+touched product IDs and their categories. The event goes onto a Redis
+stream (mcp:catalog_events), so writers in other processes (the
+csv_importer CLI, batch jobs) reach the server too.
+
+CacheInvalidationSubscriber reads the stream through a consumer group, so
+each event is applied once however many server workers run it:
+
+- the per-product keys (prod_summary / price / inventory) are deleted, and
+- the per-category search generation is bumped, which moves every search
+  key for that category (CacheClient.search_key) to a fresh namespace, and
+- the products are re-read into the Redis candidate index (candidate_index),
+  and this process's in-memory facet index is marked for a rebuild.
+
+Events published while no server is running stay in the stream and are
+applied when the subscriber next starts. With CACHE_INVALIDATION_MODE=direct
+(or when the stream write fails) the publisher applies the invalidation
+itself instead, a local stand-in for setups without a subscriber.
+
+Because writes now invalidate, the TTLs in cache_policy only bound
+staleness from writers that bypass these paths.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.cache import cache_client
+from app.candidate_index import CandidateIndex, candidate_index
+from app.facets import facet_index
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "mcp:catalog_events"
+CONSUMER_GROUP = "cache-invalidator"
+
+
+def _mode() -> str:
+    return os.getenv("CACHE_INVALIDATION_MODE", "stream").strip().lower()
+
+
+def apply_catalog_change(product_ids: Iterable[str], categories: Iterable[Optional[str]], cache=None) -> None:
+    """
+    Delete the products' cached keys, re-index them and bump their
+    categories' search generation.
+    """
+    cache = cache or cache_client
+    product_ids = [str(pid) for pid in product_ids if pid]
+    if product_ids:
+        cache.invalidate_products(product_ids)
+        index = candidate_index if cache is cache_client else CandidateIndex(cache=cache)
+        index.reindex_products(product_ids)
+        facet_index.mark_stale()
+    if not cache.bump_search_generation(categories):
+        raise ConnectionError("could not bump search generation")
+
+
+def publish_catalog_change(
+    product_ids: Iterable[str],
+    categories: Iterable[Optional[str]] = (),
+    reason: str = "",
+    cache=None,
+) -> bool:
+    """
+    Announce that these products changed. Returns True if the event was
+    queued on the stream (or applied directly); False if caching is off or
+    Redis is unreachable.
+    """
+    cache = cache or cache_client
+    product_ids = sorted({str(pid) for pid in product_ids if pid})
+    categories = sorted({c or cache.ALL_CATEGORIES for c in categories})
+    mode = _mode()
+    if mode == "off" or not (product_ids or categories):
+        return False
+    if mode == "stream":
+        try:
+            cache.client.xadd(
+                STREAM_KEY,
+                {
+                    "product_ids": json.dumps(product_ids),
+                    "categories": json.dumps(categories),
+                    "reason": reason,
+                    "ts": f"{time.time():.3f}",
+                },
+                maxlen=int(os.getenv("CACHE_INVALIDATION_STREAM_MAXLEN", "100000")),
+                approximate=True,
+            )
+            return True
+        except Exception as e:
+            logger.warning("catalog_event_publish_failed: %s; invalidating directly", e)
+    try:
+        apply_catalog_change(product_ids, categories or [None], cache=cache)
+        return True
+    except Exception as e:
+        logger.warning("catalog_invalidation_failed: %s", e)
+        return False
+
+
+class CacheInvalidationSubscriber:
+    """Background consumer of catalog change events (one per server worker)."""
+
+    def __init__(self, cache=None, enabled: Optional[bool] = None, block_ms: int = 1000, batch: int = 100):
+        self.cache = cache or cache_client
+        self.enabled = enabled if enabled is not None else _mode() == "stream"
+        self.block_ms = block_ms
+        self.batch = batch
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Any] = {
+            "events_applied": 0,
+            "products_invalidated": 0,
+            "generations_bumped": 0,
+            "errors": 0,
+            "last_lag_ms": 0.0,
+        }
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            # "$": a new group starts at the tail; an existing one keeps its position
+            self.cache.client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="$", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def poll_once(self, pending: bool = False) -> int:
+        """
+        Read and apply one batch of events. With pending=True, re-read this
+        consumer's delivered-but-unacknowledged events instead of new ones.
+        Returns the number of events applied.
+        """
+        self._ensure_group()
+        response = self.cache.client.xreadgroup(
+            CONSUMER_GROUP, self.consumer, {STREAM_KEY: "0" if pending else ">"},
+            count=self.batch, block=None if pending else self.block_ms,
+        )
+        applied = 0
+        for _stream, messages in response or []:
+            done: List[str] = []
+            for message_id, fields in messages:
+                if fields:
+                    self._apply(fields)
+                done.append(message_id)
+                applied += 1
+            if done:
+                self.cache.client.xack(STREAM_KEY, CONSUMER_GROUP, *done)
+        return applied
+
+    def _apply(self, fields: Dict[str, str]) -> None:
+        product_ids = json.loads(fields.get("product_ids") or "[]")
+        categories = json.loads(fields.get("categories") or "[]")
+        apply_catalog_change(product_ids, categories or [None], cache=self.cache)
+        self.stats["events_applied"] += 1
+        self.stats["products_invalidated"] += len(product_ids)
+        self.stats["generations_bumped"] += max(len(categories), 1)
+        if fields.get("ts"):
+            self.stats["last_lag_ms"] = round((time.time() - float(fields["ts"])) * 1000, 1)
+
+    def start(self) -> None:
+        """Start the background consumer (no-op unless enabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        drained_pending = False
+        while True:
+            try:
+                if not drained_pending:
+                    while await asyncio.to_thread(self.poll_once, True):
+                        pass
+                    drained_pending = True
+                await asyncio.to_thread(self.poll_once)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                drained_pending = False  # retry what was delivered but not acked
+                if backoff == 1.0:
+                    logger.warning("cache_invalidation_subscriber_error: %s", e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+cache_invalidator = CacheInvalidationSubscriber()
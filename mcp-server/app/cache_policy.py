@@ -9,9 +9,12 @@ Architecture:
   Redis      → read-through cache (hot data only, TTL-based expiry)
   Neo4j      → knowledge graph (relationships, not cached)
 
-All cache entries expire automatically via TTL. No manual invalidation
-is needed for normal operation. Invalidation methods exist for:
-  - Product updates (price change, stock change) → invalidate_product()
+All cache entries expire automatically via TTL. Catalog writes (supplier
+price/stock updates, CSV imports, normalization) additionally publish
+change events (app.cache_invalidation) that delete the touched products'
+keys and bump their category's search generation. Invalidation methods:
+  - Product updates (price change, stock change) → invalidate_product(s)()
+  - Category-wide search pages → bump_search_generation()
   - Bulk data refreshes → invalidate_search_cache() or flush_all()
 """
 
@@ -25,9 +28,9 @@ is needed for normal operation. Invalidation methods exist for:
 # Price            | mcp:price:{id}            | 60 sec  | Prices may change; short TTL
 # Inventory        | mcp:inventory:{id}        | 30 sec  | Most volatile; shortest TTL
 # Search results   | mcp:search:{sha256[:16]}  | 5 min   | Same query = same results (within TTL)
+# Search generation| mcp:catgen:{category|_all}| None    | Folded into search keys; bumped on writes
 # Agent session    | mcp:session:{session_id}  | 1 hour  | Conversation context; long-lived
-# Brand index      | brand:{name}              | None    | Persistent set; refreshed by populate script
-# Category index   | category:{name}           | None    | Persistent set; refreshed by populate script
+# Candidate index  | mcp:idx:{cat,brand,...}:* | None    | Sets / sorted sets; see app.candidate_index
 #
 # 
 # Consistency Expectations
@@ -37,23 +40,30 @@ is needed for normal operation. Invalidation methods exist for:
 #   This is acceptable for browsing; checkout always reads from Postgres.
 # - Search results may be up to 5 min stale. A product added to Postgres
 #   won't appear in cached search results until the cache entry expires.
-# - Brand/category indexes are only refreshed when populate_all_databases.py
-#   is re-run. New products won't appear in these indexes until then.
+# - The candidate index (mcp:idx:*) is built by `python -m app.candidate_index`
+#   and updated per product by the catalog change subscriber. If an update
+#   fails the index marks itself not ready and searches use SQL until the
+#   next rebuild.
 #
 # 
 # Cache Invalidation Strategy
 # 
 #
-# Primary: TTL-based (automatic expiry, no coordination needed)
-# Secondary: Explicit invalidation for known mutations:
+# Primary: event-driven on catalog writes. Writers call
+#   publish_catalog_change(product_ids, categories) → Redis stream
+#   mcp:catalog_events → one subscriber per event (consumer group) deletes
+#   the per-product keys, re-indexes them in mcp:idx:* and INCRs
+#   mcp:catgen:{category} (or mcp:catgen:_unknown) plus mcp:catgen:_all.
+# Backstop: TTL-based expiry for writers that bypass those paths.
+# Other explicit invalidation:
 #   - checkout/cart operations → invalidate_product(product_id)
-#   - admin price updates → invalidate_product(product_id)
 #   - bulk data refresh → invalidate_search_cache() + flush_all()
 #
-# We do NOT invalidate search cache on individual product changes because:
-#   1. Search results contain multiple products — invalidating one doesn't help
-#   2. TTL-based expiry (5 min) is acceptable for search freshness
-#   3. Avoids complexity of tracking which search keys contain which products
+# Search pages are not tracked per product (a page holds many products).
+# Instead the generation is part of every search key (CacheClient.search_key,
+# used by /search and the agent's /chat search cache), so one INCR retires
+# all of that category's pages; searches without a category read
+# mcp:catgen:_all, which every write moves. Orphaned keys age out by TTL.
 
 # 
 # Bélády-Inspired Adaptive TTL Policy
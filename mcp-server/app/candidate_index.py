@@ -0,0 +1,450 @@
+"""
+Candidate index — a maintained inverted index of the catalog in Redis.
+
+search_products used to answer every filter combination with a COUNT and
+an OFFSET/LIMIT query over the filtered products table. For the common
+structured combinations (category, product type, GPU vendor, a single
+brand, price range, laptop hint, minimum RAM / storage / screen / battery /
+year) this index answers both from Redis set algebra instead, and Postgres
+only hydrates the final page by primary key.
+
+Keys (all under the cache namespace, e.g. mcp:idx:...):
+
+- Sets: idx:all, idx:cat:{category}, idx:ptype:{product_type},
+  idx:gpu:{vendor}, idx:brand:{brand lowercased}, idx:tok:{name token}
+  (only tokens that are a known brand, see idx:brands), idx:hint:laptop
+  (the laptop name/description keywords, Chromebooks excluded) and
+  idx:noattrs (products whose attributes are NULL).
+- Sorted sets: idx:price (price in cents, +inf when unpriced), idx:rating
+  and idx:num:{ram_gb, storage_gb, screen_size_inches, battery_life_hours,
+  year}.
+- idx:doc:{product_id} records each product's memberships, so an update
+  can remove the old ones; idx:meta marks the index as ready.
+
+A query intersects the clause sets into a temporary sorted set scored by
+price (ZINTERSTORE), then ZCOUNT gives total_count and ZRANGEBYSCORE the
+page, cheapest first. Spec thresholds keep the SQL semantics
+(value >= X OR attributes IS NULL). Anything else (keyword / KG / vector
+candidates, colors, use cases, brand OR lists, desktop hints) returns None
+and the caller keeps the SQL path, as does an empty result so the
+relaxation logic still runs.
+
+The index is built with rebuild() (python -m app.candidate_index, or on
+start with CANDIDATE_INDEX_BUILD_ON_START=1) and kept current by
+cache_invalidation.apply_catalog_change(), which re-indexes the products
+in each catalog change event. Until a build completes, or after a failed
+update, the index reports not ready and searches use SQL.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.cache import cache_client
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+# filters key -> attributes key of the numeric spec sorted set
+SPEC_FILTERS = {
+    "min_ram_gb": "ram_gb",
+    "min_storage_gb": "storage_gb",
+    "min_screen_inches": "screen_size_inches",
+    "min_battery_hours": "battery_life_hours",
+    "min_year": "year",
+}
+
+# Mirrors the _product_type_hint == "laptop" filter in endpoints.search_products
+_LAPTOP_NAME_TERMS = ("laptop", "notebook", "macbook", "chromebook", "thinkpad")
+_LAPTOP_DESC_TERMS = ("laptop", "notebook", "thinkpad")
+_CHROMEBOOK_TERMS = ("chromebook", "chrome book")
+_COMPONENT_BRANDS = ("nvidia", "amd", "intel", "geforce", "radeon", "rtx", "gtx")
+_LAPTOP_PRICE_FLOOR_CENTS = 15000
+
+_PLANNED_KEYS = {
+    "category", "product_type", "gpu_vendor", "brand",
+    "price_min_cents", "price_max_cents", "price_min", "price_max",
+    *SPEC_FILTERS,
+}
+
+INDEX_COLUMNS = (
+    Product.product_id, Product.name, Product.category, Product.product_type,
+    Product.brand, Product.price_value, Product.rating, Product.attributes,
+)
+
+
+def _default_session_factory():
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+def as_float(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def index_entry(row: Any, brand_vocab: Iterable[str] = ()) -> Tuple[List[str], Dict[str, float]]:
+    """
+    Return (set keys, {sorted set key: score}) for one product row.
+    Keys are relative to the namespace (idx:...).
+    """
+    attrs = row.attributes if isinstance(row.attributes, dict) else None
+    name = (row.name or "").lower()
+    description = str(attrs.get("description") or "").lower() if attrs else ""
+
+    sets = ["idx:all"]
+    if row.category:
+        sets.append(f"idx:cat:{row.category}")
+    if row.product_type:
+        sets.append(f"idx:ptype:{row.product_type}")
+    if row.brand:
+        sets.append(f"idx:brand:{row.brand.lower()}")
+    vocab = set(brand_vocab)
+    sets.extend(f"idx:tok:{token}" for token in sorted(set(name.split(" ")) & vocab))
+    if attrs is None:
+        sets.append("idx:noattrs")
+    elif attrs.get("gpu_vendor") is not None:
+        sets.append(f"idx:gpu:{attrs['gpu_vendor']}")
+    if (
+        (any(t in name for t in _LAPTOP_NAME_TERMS) or any(t in description for t in _LAPTOP_DESC_TERMS))
+        and not any(t in name for t in _CHROMEBOOK_TERMS)
+    ):
+        sets.append("idx:hint:laptop")
+
+    price = as_float(row.price_value)
+    zsets = {"idx:price": round(price * 100, 2) if price is not None else float("inf")}
+    rating = as_float(row.rating)
+    if rating is not None:
+        zsets["idx:rating"] = rating
+    for field in SPEC_FILTERS.values():
+        value = as_float(attrs.get(field)) if attrs else None
+        if value is not None:
+            zsets[f"idx:num:{field}"] = value
+    return sets, zsets
+
+
+class CandidateIndex:
+    """Redis inverted index over the catalog plus the search query planner."""
+
+    def __init__(
+        self,
+        cache=None,
+        session_factory: Optional[Callable] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.cache = cache or cache_client
+        self.session_factory = session_factory or _default_session_factory
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("CANDIDATE_INDEX_ENABLED", "1") == "1"
+        )
+        self.build_on_start = os.getenv("CANDIDATE_INDEX_BUILD_ON_START", "0") == "1"
+        self.chunk_size = int(os.getenv("CANDIDATE_INDEX_CHUNK", "500"))
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Any] = {
+            "queries": 0,
+            "served": 0,
+            "ineligible": 0,
+            "not_ready": 0,
+            "empty": 0,
+            "errors": 0,
+            "products_reindexed": 0,
+            "rebuilds": 0,
+            "last_build_ms": 0.0,
+        }
+
+    def _k(self, key: str) -> str:
+        return self.cache._key(key)
+
+    # ------------------------------------------------------------------
+    # Query planner
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def plan(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Translate search filters into index clauses, or None when the
+        combination has filters the index does not cover.
+
+        Returns {"sets": [[key, ...], ...] (each inner list is a union),
+        "specs": [(attributes key, minimum), ...], "price": (lo, hi)}.
+        """
+        sets: List[List[str]] = []
+        specs: List[Tuple[str, float]] = []
+        lo: Optional[float] = None
+        hi: Optional[float] = None
+        for key, value in filters.items():
+            if key.startswith("_"):
+                if key == "_product_type_hint" and value != "laptop":
+                    return None
+                continue
+            if key not in _PLANNED_KEYS:
+                return None
+
+        if filters.get("category"):
+            sets.append([f"idx:cat:{filters['category']}"])
+        elif "category" in filters:
+            return None
+
+        for key, prefix in (("product_type", "idx:ptype:"), ("gpu_vendor", "idx:gpu:")):
+            if key in filters:
+                raw = filters[key]
+                values = [raw] if isinstance(raw, str) else (raw or [])
+                if key == "gpu_vendor":
+                    values = [v.strip() for v in values if v]
+                if values:
+                    sets.append([prefix + v for v in values])
+
+        if "brand" in filters:
+            brand = filters["brand"]
+            if not isinstance(brand, str) or not brand or any(c in brand for c in "%_\\ \t"):
+                return None
+            brand = brand.lower()
+            if any(comp in brand for comp in _COMPONENT_BRANDS):
+                return None
+            # brand ILIKE :brand OR the brand is a space-delimited word of the name
+            sets.append([f"idx:brand:{brand}", f"idx:tok:{brand}"])
+
+        if filters.get("_product_type_hint") == "laptop":
+            sets.append(["idx:hint:laptop"])
+
+        if "price_min_cents" in filters:
+            lo = as_float(filters["price_min_cents"])
+        elif "price_min" in filters:
+            lo = as_float(filters["price_min"])
+            lo = int(lo * 100) if lo is not None else None
+        elif filters.get("_product_type_hint") == "laptop":
+            lo = _LAPTOP_PRICE_FLOOR_CENTS
+        if "price_max_cents" in filters:
+            # base filter: price_value <= int(price_max_cents) / 100
+            hi = as_float(filters["price_max_cents"])
+            hi = int(hi) if hi is not None else None
+        elif "price_max" in filters:
+            hi = as_float(filters["price_max"])
+            hi = int(hi * 100) if hi is not None else None
+        for key in ("price_min_cents", "price_min", "price_max_cents", "price_max"):
+            if key in filters and as_float(filters[key]) is None:
+                return None
+
+        for key, field in SPEC_FILTERS.items():
+            if filters.get(key):
+                minimum = as_float(filters[key])
+                if minimum is None:
+                    return None
+                specs.append((field, minimum if key == "min_screen_inches" else int(minimum)))
+
+        return {"sets": sets, "specs": specs, "price": (lo, hi)}
+
+    def search(self, filters: Dict[str, Any], offset: int, limit: int) -> Optional[Tuple[int, List[str]]]:
+        """
+        Answer a search from the index: (total_count, product IDs of the
+        page, cheapest first). None means "use SQL" — the filters are not
+        covered, the index is not ready, nothing matched, or Redis failed.
+        """
+        if not self.enabled:
+            return None
+        self.stats["queries"] += 1
+        plan = self.plan(filters)
+        if plan is None:
+            self.stats["ineligible"] += 1
+            return None
+
+        temp_keys: List[str] = []
+
+        def temp() -> str:
+            key = self._k(f"idx:tmp:{uuid.uuid4().hex}")
+            temp_keys.append(key)
+            return key
+
+        lo, hi = plan["price"]
+        if lo is None and hi is None:
+            score_range = ("-inf", "+inf")
+        else:
+            # Unpriced products (+inf) never satisfy a price filter
+            score_range = (
+                "-inf" if lo is None else repr(float(lo)),
+                "(+inf" if hi is None else repr(float(hi)),
+            )
+
+        try:
+            pipe = self.cache.client.pipeline(transaction=False)
+            pipe.get(self._k("idx:meta"))
+            weights = {self._k("idx:price"): 1}
+            for union in plan["sets"]:
+                if len(union) == 1:
+                    weights[self._k(union[0])] = 0
+                else:
+                    key = temp()
+                    pipe.sunionstore(key, [self._k(k) for k in union])
+                    weights[key] = 0
+            for field, minimum in plan["specs"]:
+                key = temp()
+                pipe.zunionstore(key, [self._k(f"idx:num:{field}")])
+                pipe.zremrangebyscore(key, "-inf", f"({minimum}")
+                pipe.zunionstore(key, {key: 0, self._k("idx:noattrs"): 0})
+                weights[key] = 0
+            result = temp()
+            pipe.zinterstore(result, weights)
+            pipe.zcount(result, *score_range)
+            pipe.zrangebyscore(result, *score_range, start=offset, num=limit)
+            pipe.delete(*temp_keys)
+            replies = pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("candidate_index_query_failed: %s", e)
+            return None
+
+        if not replies[0]:
+            self.stats["not_ready"] += 1
+            return None
+        total, page_ids = int(replies[-3]), list(replies[-2])
+        if total == 0:
+            self.stats["empty"] += 1
+            return None
+        self.stats["served"] += 1
+        return total, page_ids
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def is_ready(self) -> bool:
+        try:
+            return bool(self.cache.client.get(self._k("idx:meta")))
+        except Exception:
+            return False
+
+    def _write(self, pipe, product_id: str, sets: List[str], zsets: Dict[str, float]) -> None:
+        for key in sets:
+            pipe.sadd(self._k(key), product_id)
+        for key, score in zsets.items():
+            pipe.zadd(self._k(key), {product_id: score})
+        pipe.set(self._k(f"idx:doc:{product_id}"), json.dumps({"s": sets, "z": sorted(zsets)}))
+
+    def _brand_vocab(self) -> List[str]:
+        return sorted(self.cache.client.smembers(self._k("idx:brands")) or [])
+
+    def rebuild(self) -> int:
+        """Rebuild the whole index from Postgres. Returns the number of products indexed."""
+        start = time.time()
+        client = self.cache.client
+        db = self.session_factory()
+        try:
+            client.delete(self._k("idx:meta"))  # searches use SQL until the build completes
+            stale = list(client.scan_iter(match=self._k("idx:*"), count=1000))
+            for i in range(0, len(stale), 1000):
+                client.delete(*stale[i:i + 1000])
+
+            vocab = sorted({
+                b.lower() for (b,) in db.query(Product.brand).distinct()
+                if b and not any(c.isspace() for c in b)
+            })
+            pipe = client.pipeline(transaction=False)
+            if vocab:
+                pipe.sadd(self._k("idx:brands"), *vocab)
+            count = 0
+            for row in db.query(*INDEX_COLUMNS).yield_per(self.chunk_size):
+                sets, zsets = index_entry(row, vocab)
+                self._write(pipe, str(row.product_id), sets, zsets)
+                count += 1
+                if count % self.chunk_size == 0:
+                    pipe.execute()
+            build_ms = round((time.time() - start) * 1000, 1)
+            pipe.set(self._k("idx:meta"), json.dumps({"built_at": time.time(), "products": count, "build_ms": build_ms}))
+            pipe.execute()
+        finally:
+            db.close()
+        self.stats["rebuilds"] += 1
+        self.stats["last_build_ms"] = build_ms
+        logger.info("candidate_index_rebuilt: %d products in %.0f ms", count, build_ms)
+        return count
+
+    def reindex_products(self, product_ids: Iterable[str]) -> int:
+        """
+        Re-read these products from Postgres and replace their index
+        entries (deleted products are removed). No-op until the index has
+        been built; on failure the index is marked not ready so searches
+        fall back to SQL until the next rebuild.
+        """
+        ids = [str(pid) for pid in dict.fromkeys(product_ids) if pid]
+        if not ids or not self.enabled or not self.is_ready():
+            return 0
+        client = self.cache.client
+        try:
+            uuids = []
+            for pid in ids:
+                try:
+                    uuids.append(uuid.UUID(pid))
+                except ValueError:
+                    pass
+            db = self.session_factory()
+            try:
+                rows = {str(r.product_id): r for r in db.query(*INDEX_COLUMNS).filter(Product.product_id.in_(uuids))}
+            finally:
+                db.close()
+            vocab = self._brand_vocab()
+            docs = client.mget([self._k(f"idx:doc:{pid}") for pid in ids])
+            pipe = client.pipeline(transaction=False)
+            for pid, doc in zip(ids, docs):
+                if doc:
+                    old = json.loads(doc)
+                    for key in old.get("s", []):
+                        pipe.srem(self._k(key), pid)
+                    for key in old.get("z", []):
+                        pipe.zrem(self._k(key), pid)
+                if pid in rows:
+                    sets, zsets = index_entry(rows[pid], vocab)
+                    self._write(pipe, pid, sets, zsets)
+                else:
+                    pipe.delete(self._k(f"idx:doc:{pid}"))
+            pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("candidate_index_update_failed: %s; disabling index until rebuild", e)
+            try:
+                client.delete(self._k("idx:meta"))
+            except Exception:
+                pass
+            return 0
+        self.stats["products_reindexed"] += len(ids)
+        return len(ids)
+
+    def start(self) -> None:
+        """Build the index in the background if CANDIDATE_INDEX_BUILD_ON_START=1 and it is not ready."""
+        if not (self.enabled and self.build_on_start) or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._build_if_missing())
+
+    async def _build_if_missing(self) -> None:
+        try:
+            if not await asyncio.to_thread(self.is_ready):
+                await asyncio.to_thread(self.rebuild)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("candidate_index_build_failed: %s", e)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+candidate_index = CandidateIndex()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    print(f"Indexed {candidate_index.rebuild()} products")
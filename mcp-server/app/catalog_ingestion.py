@@ -162,6 +162,7 @@ class CatalogNormalizer:
         skipped_count = 0
         failed_count = 0
         processed = 0
+        written = []
 
         for product in products:
             if processed >= limit:
@@ -196,11 +197,16 @@ class CatalogNormalizer:
                 new_attrs["normalized_at"] = datetime.now(timezone.utc).isoformat()
                 product.attributes = new_attrs
                 db.add(product)
+                written.append((str(product.product_id), product.category))
 
             normalized_count += 1
 
         if not dry_run and normalized_count > 0:
             db.commit()
+            from app.cache_invalidation import publish_catalog_change
+            publish_catalog_change(
+                [pid for pid, _ in written], {cat for _, cat in written}, reason="normalize"
+            )
             logger.info(
                 "batch_normalize_done",
                 extra={"normalized": normalized_count, "skipped": skipped_count, "failed": failed_count},
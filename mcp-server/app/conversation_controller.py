@@ -15,6 +15,14 @@ from enum import Enum
 
 from app.structured_logger import StructuredLogger
 from app.input_validator import fuzzy_match_domain, normalize_domain_keywords
+from app.query_parse import (
+    BOOK_KEYWORDS,
+    DESKTOP_PC_PHRASES,
+    LAPTOP_KEYWORDS,
+    PHONE_KEYWORDS,
+    VEHICLE_KEYWORDS,
+    parse_query,
+)
 
 logger = StructuredLogger("conversation_controller")
 
@@ -28,34 +36,9 @@ class Domain(str, Enum):
 
 
 # --- Hard domain keywords (deterministic, checked first) ---
-# Order: vehicle > desktop/PC > laptop > book (so "gaming PC" is not routed as laptop)
-VEHICLE_KEYWORDS = [
-    "car", "cars", "vehicle", "vehicles", "auto", "automobile", "automobiles",
-    "suv", "suvs", "truck", "trucks", "sedan", "sedans", "van", "vans",
-    "coupe", "hatchback", "wagon", "fuel efficient", "family suv",
-    "honda", "toyota", "ford", "bmw", "tesla", "vin"  # brand/vin hint
-]
-# Desktop/PC first — check before laptop so "gaming PC" / "desktop" don't match "pc" -> laptop
-DESKTOP_PC_PHRASES = [
-    "gaming pc", "gaming computer", "desktop pc", "desktop computer",
-    "desktop", "desktops", "tower", "workstation"
-]
-LAPTOP_KEYWORDS = [
-    "laptop", "laptops", "lapto", "lpatop",
-    "computer", "computers", "computr",
-    "notebook", "notebooks", "notbook", "notbooks",
-    "macbook", "chromebook", "thinkpad", "xps", 
-    "pc", "pcs"
-]
-BOOK_KEYWORDS = [
-    "book", "books", "novel", "novels", "textbook", "textbooks", "reading",
-    "genre", "author", "fiction", "mystery", "romance", "looking for books",
-    "show me books", "find books"
-]
-PHONE_KEYWORDS = [
-    "phone", "phones", "smartphone", "smartphones", "cell phone", "mobile",
-    "fairphone", "repairable phone", "sustainable phone"
-]
+# VEHICLE_KEYWORDS, DESKTOP_PC_PHRASES, LAPTOP_KEYWORDS, BOOK_KEYWORDS and
+# PHONE_KEYWORDS live in app.query_parse so the single-pass parse can
+# evaluate them; order: vehicle > desktop/PC > laptop > book > phone.
 
 # Short domain intents: treat as mode switch → start interview Q1
 # Include common misspellings
@@ -125,28 +108,13 @@ def detect_domain(
         })
         return Domain(fuzzy_domain), "fuzzy_match"
 
-    # 3) Explicit keywords — vehicle first, then desktop/PC (so "gaming PC" is not laptop)
-    # Use word boundaries to avoid false matches (e.g., "book" in "notebook")
-    for kw in VEHICLE_KEYWORDS:
-        if re.search(rf'\b{re.escape(kw)}\b', msg):
-            return Domain.VEHICLES, "keyword_vehicle"
-
-    for phrase in DESKTOP_PC_PHRASES:
-        if phrase in msg:
-            return Domain.LAPTOPS, "keyword_desktop"
-
-    for kw in LAPTOP_KEYWORDS:
-        if re.search(rf'\b{re.escape(kw)}\b', msg):
-            return Domain.LAPTOPS, "keyword_laptop"
-
-    for kw in BOOK_KEYWORDS:
-        # Use word boundaries to prevent "book" matching in "notebook"
-        if re.search(rf'\b{re.escape(kw)}\b', msg):
-            return Domain.BOOKS, "keyword_book"
-
-    for kw in PHONE_KEYWORDS:
-        if re.search(rf'\b{re.escape(kw)}\b', msg):
-            return Domain.PHONES, "keyword_phone"
+    # 3) Explicit keywords — vehicle first, then desktop/PC (so "gaming PC" is not laptop).
+    # Word-boundary matches (e.g. "book" must not hit "notebook"), evaluated
+    # once per message by the shared parse.
+    signals = parse_query(message).domain_signals
+    if signals:
+        domain, reason = signals[0]
+        return Domain(domain), reason
 
     # 4) Filters category
     if filters_category:
@@ -30,7 +30,7 @@ import json
 import logging
 import os
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from dotenv import load_dotenv
 
@@ -291,6 +291,8 @@ def import_csv(
         db = SessionLocal()
 
     inserted = failed = enriched = 0
+    written_ids: List[str] = []
+    written_categories: Set[str] = set()
 
     try:
         for raw in raw_rows:
@@ -353,6 +355,8 @@ def import_csv(
                     {**row, "attributes": json.dumps(row["attributes"])},
                 )
                 inserted += 1
+                written_ids.append(str(row["id"]))
+                written_categories.add(row["category"])
             except Exception as exc:
                 logger.error("db_insert_failed for %s: %s", row.get("title"), exc)
                 failed += 1
@@ -361,6 +365,13 @@ def import_csv(
             db.commit()
             logger.info("csv_import_done: inserted=%d failed=%d enriched=%d", inserted, failed, enriched)
 
+            # Let the server's feed materializer re-render just these rows,
+            # and drop their cached copies / search pages
+            from app.feed_materializer import append_dirty_journal
+            from app.cache_invalidation import publish_catalog_change
+            append_dirty_journal(written_ids)
+            publish_catalog_change(written_ids, written_categories, reason="csv_import")
+
     finally:
         if db:
             db.close()
@@ -5,6 +5,7 @@ All endpoints follow the standard response envelope pattern.
 All execution endpoints (AddToCart, Checkout) accept IDs only, never names.
 """
 
+import asyncio
 import json
 import os
 import re
@@ -25,7 +26,10 @@ from app.schemas import (
 )
 from app.formatters import _extract_policy_from_description
 from app.cache import cache_client
-from app.metrics import record_request_metrics
+from app.candidate_index import candidate_index
+from app.facets import facet_counts_for_query, facet_index
+from app.single_flight import search_flight
+from app.metrics import metrics_collector, record_request_metrics
 from app.structured_logger import log_request, log_response, StructuredLogger
 from app.vector_search import get_vector_store
 from app.event_logger import log_event
@@ -161,6 +165,50 @@ def create_version_info() -> VersionInfo:
     )
 
 
+# Background stale-page refreshes; referenced so they aren't garbage-collected
+_search_refresh_tasks: set = set()
+
+
+def _build_page_on_own_session(build_page, page_query):
+    """
+    Run build_page (in a worker thread) with page_query re-bound to a private
+    session on the same engine. search_flight shares the result with other
+    requests and shields it from cancellation, so it must not use the
+    request's session, which get_db closes as soon as that request ends.
+    """
+    from app.database import SessionLocal
+    session = SessionLocal(bind=page_query.session.get_bind())
+    try:
+        return build_page(page_query.with_session(session))
+    finally:
+        session.close()
+
+
+def _refresh_search_page(cache_key: str, page_query, build_page) -> None:
+    """
+    Rebuild a stale search page in the background while the stale copy is
+    served. The Redis refresh lock keeps it to one refresh per key across
+    workers; search_flight merges it with any concurrent miss in this one.
+    """
+    token = cache_client.acquire_refresh_lock(cache_key)
+    if token is None:
+        return
+
+    async def _refresh():
+        try:
+            await search_flight.run(
+                cache_key, lambda: asyncio.to_thread(_build_page_on_own_session, build_page, page_query)
+            )
+        except Exception as e:
+            logger.warning("search_refresh_failed", f"Background search refresh failed: {e}", {"cache_key": cache_key})
+        finally:
+            cache_client.release_refresh_lock(cache_key, token)
+
+    task = asyncio.get_running_loop().create_task(_refresh())
+    _search_refresh_tasks.add(task)
+    task.add_done_callback(_search_refresh_tasks.discard)
+
+
 # 
 # SearchProducts - Discovery Tool
 # 
@@ -803,12 +851,15 @@ async def search_products(
                     # Otherwise use LLM for brand/other questions (fall back to rule-based if openai not installed)
                     try:
                         from agent.interview.question_generator import generate_question
+                        llm_start = time.time()
                         question_response = generate_question(
                             product_type=product_type or "electronics",
                             conversation_history=session.conversation_history,
                             explicit_filters=session.explicit_filters,
                             questions_asked=session.questions_asked
                         )
+                        timings["llm"] = (time.time() - llm_start) * 1000
+                        metrics_collector.record_stage("llm", timings["llm"])
                         q_msg = question_response.question
                         q_replies = question_response.quick_replies
                         q_topic = question_response.topic
@@ -1262,6 +1313,8 @@ async def search_products(
     # Priority: KG candidates > Vector search > Keyword search
     # KG provides high-quality candidates, vector search provides semantic matches, keyword is fallback
     candidate_ids = None
+    keyword_filter_applied = False
+    chromebook_requested = False
     
     if kg_candidate_ids:
         # Use KG candidates (highest priority - per week4notes.txt)
@@ -1314,6 +1367,7 @@ async def search_products(
             # With category filter but query not just category word: try to match query
             # No category filter: require query match (with synonyms)
             db_query = db_query.filter(or_(*search_conditions))
+            keyword_filter_applied = True
         
         # Log synonym expansion for debugging (unique_terms is defined only in this branch)
         if expanded_terms and len(expanded_terms) > 0:
@@ -1351,6 +1405,7 @@ async def search_products(
                 kw in (search_query or "").lower()
                 for kw in ["chromebook", "chrome book", "chromeos", "chrome os"]
             )
+            chromebook_requested = _chromebook_requested
             if not _chromebook_requested:
                 db_query = db_query.filter(
                     ~Product.name.ilike("%chromebook%"),
@@ -1745,8 +1800,37 @@ async def search_products(
                 ))
         db_query = db_query.filter(or_(*uc_conditions))
 
-    # Get total count for pagination
-    total_count = db_query.count()
+    # Pagination offset (needed before counting: the candidate index pages in Redis)
+    offset = 0
+    if request.cursor:
+        try:
+            offset = int(request.cursor)
+        except ValueError:
+            # Invalid cursor - start from beginning
+            offset = 0
+
+    # Get total count for pagination. Structured-only filter combinations are
+    # answered from the Redis candidate index (count + page IDs from set
+    # algebra); Postgres then only loads the page rows by primary key.
+    # Facets come from the in-memory bitmap index when it covers the filters,
+    # otherwise from one GROUP BY query that also yields the count.
+    index_page = None
+    facets = None
+    structured_only = not candidate_ids and not keyword_filter_applied and not chromebook_requested
+    if structured_only:
+        index_page = candidate_index.search(filters, offset, request.limit)
+    if request.include_facets:
+        facets = facet_index.counts(filters) if structured_only else None
+        if facets is None:
+            facets = facet_counts_for_query(db_query)
+    counted_query = db_query
+    if index_page:
+        total_count, index_page_ids = index_page
+        sources.append("candidate_index")
+    elif facets is not None:
+        total_count = facets["total"]
+    else:
+        total_count = db_query.count()
 
     # Debug: log final query state (helps diagnose "no results" — pipeline-killers)
     logger.info("final_search_debug", "final query debug", {
@@ -1756,6 +1840,7 @@ async def search_products(
         "filters": dict(filters),
         "has_category_filter": has_category_filter,
         "used_candidate_ids": bool(candidate_ids),
+        "used_candidate_index": bool(index_page),
         "candidate_count": len(candidate_ids) if candidate_ids else 0,
         "total_count_before_pagination": total_count,
     })
@@ -1894,273 +1979,299 @@ async def search_products(
                 logger.info("relaxation_step", "Step 2 (spec-only) found results", {"count": count2, "dropped": dropped_filters})
             # If count2 == 0 we leave total_count 0 and return NO_MATCHING_PRODUCTS (no more steps)
     timings["relaxation_ms"] = round((time.time() - relaxation_start) * 1000, 1)
-    
-    # Apply pagination
-    offset = 0
-    if request.cursor:
-        try:
-            offset = int(request.cursor)
-        except ValueError:
-            # Invalid cursor - start from beginning
-            offset = 0
-    
-    db_query = db_query.offset(offset).limit(request.limit)
+    if facets is not None and db_query is not counted_query:
+        facets = facet_counts_for_query(db_query)  # describe the relaxed result set
 
-    # ── Search result cache check ────────────────────────────────────────
-    search_cache_key = cache_client.make_search_key(filters, filters.get("category", ""), offset, request.limit)
-    cached_search = cache_client.get_search_results(search_cache_key)
-    if cached_search is not None:
-        # Cache HIT — reconstruct ProductSummary list from cached dicts
-        cache_hit = True
-        timings["db"] = 0
-        product_summaries = [ProductSummary(**item) for item in cached_search]
-        total_count = len(product_summaries)  # approximate (page-level)
-        timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("search_products", timings["total"], cache_hit, is_error=False)
-        log_response("search_products", request_id, "OK", timings["total"], cache_hit=True)
-        next_cursor = None
-        if offset + request.limit < total_count:
-            next_cursor = str(offset + request.limit)
-        return SearchProductsResponse(
-            status=ResponseStatus.OK,
-            data=SearchResultsData(
-                products=product_summaries,
-                total_count=total_count,
-                next_cursor=next_cursor,
-            ),
-            constraints=[],
-            trace=create_trace(request_id, True, timings, ["redis_search_cache"]),
-            version=create_version_info(),
-        )
+    page_order = None
+    if index_page:
+        page_order = {pid: i for i, pid in enumerate(index_page_ids)}
+        db_query = db.query(Product).filter(Product.product_id.in_([uuid.UUID(pid) for pid in index_page_ids]))
+    else:
+        db_query = db_query.offset(offset).limit(request.limit)
 
-    # Execute query (cache miss — hit Postgres)
-    db_start = time.time()
-    products = db_query.all()
-    timings["db"] = (time.time() - db_start) * 1000
+    search_cache_key = cache_client.search_key(filters, filters.get("category", ""), offset, request.limit)
 
-    # Build response data
-    product_summaries = []
-    products_with_scores = []
+    def _build_page(page_query):
+        """
+        Run the page query, rank and annotate the results, and cache the page
+        (the expensive part of a search miss). Runs in a worker thread, either
+        for a miss (coalesced per key) or as a background stale refresh.
+        Returns (summaries, raw_count, post_validation_count, total_count).
+        """
+        page_total = total_count
+        db_start = time.time()
+        products = page_query.all()
+        if page_order:
+            # Primary-key lookups come back unordered; keep the index's price order
+            products.sort(key=lambda p: page_order.get(str(p.product_id), len(page_order)))
+        timings["db"] = (time.time() - db_start) * 1000
+
+        # Build response data
+        product_summaries = []
+        products_with_scores = []
     
-    for product in products:
-        # Extract enriched fields: use direct columns first, fall back to description parsing
-        desc = getattr(product, 'description', '') or ''
-        policies = _extract_policy_from_description(desc)
+        for product in products:
+            # Extract enriched fields: use direct columns first, fall back to description parsing
+            desc = getattr(product, 'description', '') or ''
+            policies = _extract_policy_from_description(desc)
 
-        # Build shipping info from delivery_promise column or parsed policies
-        delivery_promise = getattr(product, 'delivery_promise', None)
-        shipping_val = policies.get("shipping")
-        if delivery_promise and not shipping_val:
-            from app.schemas import ShippingInfo as _SI
-            shipping_val = _SI(shipping_method="standard", estimated_delivery_days=5,
-                               shipping_cost_cents=None, shipping_region=None)
-
-        return_policy_val = (getattr(product, 'return_policy', None)
-                             or policies.get("return_policy"))
-        warranty_val = (getattr(product, 'warranty', None)
-                        or policies.get("warranty"))
-        promotion_val = (getattr(product, 'promotions_discounts', None)
-                         or policies.get("promotion_info"))
-
-        # Ensure at least a default return_policy string so enriched fields are present
-        if not return_policy_val:
-            return_policy_val = "Standard return policy applies. Contact seller for details."
-
-        # Include product_type and attributes (specs) so eval and clients can score/display hard constraints
-        attrs = getattr(product, 'attributes', None) or {}
-        summary = ProductSummary(
-            product_id=str(product.product_id),
-            name=product.name,
-            price_cents=int((product.price_value or 0) * 100),
-            currency="USD",
-            category=product.category,
-            brand=product.brand,
-            available_qty=int(product.inventory or 0),
-            source=getattr(product, 'source', None),
-            color=getattr(product, 'color', None),
-            scraped_from_url=None,
-            shipping=shipping_val,
-            return_policy=return_policy_val,
-            warranty=warranty_val,
-            promotion_info=promotion_val,
-            product_type=getattr(product, 'product_type', None),
-            metadata=attrs if isinstance(attrs, dict) else {},
-        )
-        products_with_scores.append((summary, product))
+            # Build shipping info from delivery_promise column or parsed policies
+            delivery_promise = getattr(product, 'delivery_promise', None)
+            shipping_val = policies.get("shipping")
+            if delivery_promise and not shipping_val:
+                from app.schemas import ShippingInfo as _SI
+                shipping_val = _SI(shipping_method="standard", estimated_delivery_days=5,
+                                   shipping_cost_cents=None, shipping_region=None)
+
+            return_policy_val = (getattr(product, 'return_policy', None)
+                                 or policies.get("return_policy"))
+            warranty_val = (getattr(product, 'warranty', None)
+                            or policies.get("warranty"))
+            promotion_val = (getattr(product, 'promotions_discounts', None)
+                             or policies.get("promotion_info"))
+
+            # Ensure at least a default return_policy string so enriched fields are present
+            if not return_policy_val:
+                return_policy_val = "Standard return policy applies. Contact seller for details."
+
+            # Include product_type and attributes (specs) so eval and clients can score/display hard constraints
+            attrs = getattr(product, 'attributes', None) or {}
+            summary = ProductSummary(
+                product_id=str(product.product_id),
+                name=product.name,
+                price_cents=int((product.price_value or 0) * 100),
+                currency="USD",
+                category=product.category,
+                brand=product.brand,
+                available_qty=int(product.inventory or 0),
+                source=getattr(product, 'source', None),
+                color=getattr(product, 'color', None),
+                scraped_from_url=None,
+                shipping=shipping_val,
+                return_policy=return_policy_val,
+                warranty=warranty_val,
+                promotion_info=promotion_val,
+                product_type=getattr(product, 'product_type', None),
+                metadata=attrs if isinstance(attrs, dict) else {},
+            )
+            products_with_scores.append((summary, product))
     
-    # Apply IDSS ranking if requested (for books/laptops using IDSS interview system)
-    if filters.get("_use_idss_ranking") and (is_books or is_laptops):
-        try:
-            idss_preferences = filters.get("_idss_preferences", {})
-            idss_filters = filters.get("_idss_filters", {})
+        # Apply IDSS ranking if requested (for books/laptops using IDSS interview system)
+        if filters.get("_use_idss_ranking") and (is_books or is_laptops):
+            try:
+                idss_preferences = filters.get("_idss_preferences", {})
+                idss_filters = filters.get("_idss_filters", {})
             
-            logger.info("applying_idss_ranking", "Applying IDSS ranking algorithms to PostgreSQL results", {
-                "product_count": len(products_with_scores),
-                "is_books": is_books,
-                "is_laptops": is_laptops
-            })
+                logger.info("applying_idss_ranking", "Applying IDSS ranking algorithms to PostgreSQL results", {
+                    "product_count": len(products_with_scores),
+                    "is_books": is_books,
+                    "is_laptops": is_laptops
+                })
             
-            # Convert PostgreSQL products to dict format for IDSS ranking
-            # IDSS ranking expects vehicle-like dicts with name, description, price, etc.
-            products_for_ranking = []
-            for summary, product in products_with_scores:
-                product_dict = {
-                    "product_id": summary.product_id,
-                    "name": summary.name or product.name,
-                    "description": getattr(product, 'description', '') or summary.name,
-                    "price": summary.price_cents / 100.0,  # Convert cents to dollars
-                    "category": summary.category or product.category,
-                    "brand": summary.brand or product.brand,
-                    "product_type": getattr(product, 'product_type', None),
-                    "subcategory": getattr(product, 'subcategory', None),
-                    # Add any other fields that IDSS ranking might use
-                    "metadata": {
-                        "color": getattr(product, 'color', None),
-                        "source": getattr(product, 'source', None),
+                # Convert PostgreSQL products to dict format for IDSS ranking
+                # IDSS ranking expects vehicle-like dicts with name, description, price, etc.
+                products_for_ranking = []
+                for summary, product in products_with_scores:
+                    product_dict = {
+                        "product_id": summary.product_id,
+                        "name": summary.name or product.name,
+                        "description": getattr(product, 'description', '') or summary.name,
+                        "price": summary.price_cents / 100.0,  # Convert cents to dollars
+                        "category": summary.category or product.category,
+                        "brand": summary.brand or product.brand,
+                        "product_type": getattr(product, 'product_type', None),
+                        "subcategory": getattr(product, 'subcategory', None),
+                        # Add any other fields that IDSS ranking might use
+                        "metadata": {
+                            "color": getattr(product, 'color', None),
+                            "source": getattr(product, 'source', None),
+                        }
                     }
-                }
-                products_for_ranking.append(product_dict)
+                    products_for_ranking.append(product_dict)
             
-            # Apply IDSS ranking algorithm (embedding_similarity or coverage_risk)
-            # Use embedding_similarity as default (works better for general products)
-            from idss.recommendation.embedding_similarity import rank_with_embedding_similarity
-            from idss.core.config import get_config
+                # Apply IDSS ranking algorithm (embedding_similarity or coverage_risk)
+                # Use embedding_similarity as default (works better for general products)
+                from idss.recommendation.embedding_similarity import rank_with_embedding_similarity
+                from idss.core.config import get_config
             
-            config = get_config()
-            ranking_method = config.recommendation_method  # "embedding_similarity" or "coverage_risk"
+                config = get_config()
+                ranking_method = config.recommendation_method  # "embedding_similarity" or "coverage_risk"
             
-            if ranking_method == "embedding_similarity":
-                ranked_products = rank_with_embedding_similarity(
-                    vehicles=products_for_ranking,  # IDSS uses "vehicles" but works with any products
-                    explicit_filters=idss_filters,
-                    implicit_preferences=idss_preferences,
-                    top_k=min(100, len(products_for_ranking)),
-                    lambda_param=config.embedding_similarity_lambda_param,
-                    use_mmr=config.use_mmr_diversification
-                )
-            else:
-                # Try coverage_risk, fallback to embedding_similarity if it fails
-                try:
-                    from idss.recommendation.coverage_risk import rank_with_coverage_risk
-                    ranked_products = rank_with_coverage_risk(
-                        vehicles=products_for_ranking,
-                        explicit_filters=idss_filters,
-                        implicit_preferences=idss_preferences,
-                        top_k=min(100, len(products_for_ranking)),
-                        lambda_risk=config.coverage_risk_lambda_risk,
-                        mode=config.coverage_risk_mode,
-                        tau=config.coverage_risk_tau,
-                        alpha=config.coverage_risk_alpha
-                    )
-                except Exception as e:
-                    logger.warning("coverage_risk_failed", f"Coverage-risk ranking failed, using embedding_similarity: {e}")
+                if ranking_method == "embedding_similarity":
                     ranked_products = rank_with_embedding_similarity(
-                        vehicles=products_for_ranking,
+                        vehicles=products_for_ranking,  # IDSS uses "vehicles" but works with any products
                         explicit_filters=idss_filters,
                         implicit_preferences=idss_preferences,
                         top_k=min(100, len(products_for_ranking)),
                         lambda_param=config.embedding_similarity_lambda_param,
                         use_mmr=config.use_mmr_diversification
                     )
+                else:
+                    # Try coverage_risk, fallback to embedding_similarity if it fails
+                    try:
+                        from idss.recommendation.coverage_risk import rank_with_coverage_risk
+                        ranked_products = rank_with_coverage_risk(
+                            vehicles=products_for_ranking,
+                            explicit_filters=idss_filters,
+                            implicit_preferences=idss_preferences,
+                            top_k=min(100, len(products_for_ranking)),
+                            lambda_risk=config.coverage_risk_lambda_risk,
+                            mode=config.coverage_risk_mode,
+                            tau=config.coverage_risk_tau,
+                            alpha=config.coverage_risk_alpha
+                        )
+                    except Exception as e:
+                        logger.warning("coverage_risk_failed", f"Coverage-risk ranking failed, using embedding_similarity: {e}")
+                        ranked_products = rank_with_embedding_similarity(
+                            vehicles=products_for_ranking,
+                            explicit_filters=idss_filters,
+                            implicit_preferences=idss_preferences,
+                            top_k=min(100, len(products_for_ranking)),
+                            lambda_param=config.embedding_similarity_lambda_param,
+                            use_mmr=config.use_mmr_diversification
+                        )
             
-            # Map ranked products back to ProductSummary objects
-            ranked_product_ids = {p.get("product_id"): p for p in ranked_products}
-            products_with_scores_ranked = []
-            for summary, product in products_with_scores:
-                if summary.product_id in ranked_product_ids:
-                    ranked_product = ranked_product_ids[summary.product_id]
-                    # Store ranking score in metadata if available
-                    if "_dense_score" in ranked_product:
-                        summary.metadata = summary.metadata or {}
-                        summary.metadata["_idss_score"] = ranked_product["_dense_score"]
-                    products_with_scores_ranked.append((summary, product))
+                # Map ranked products back to ProductSummary objects
+                ranked_product_ids = {p.get("product_id"): p for p in ranked_products}
+                products_with_scores_ranked = []
+                for summary, product in products_with_scores:
+                    if summary.product_id in ranked_product_ids:
+                        ranked_product = ranked_product_ids[summary.product_id]
+                        # Store ranking score in metadata if available
+                        if "_dense_score" in ranked_product:
+                            summary.metadata = summary.metadata or {}
+                            summary.metadata["_idss_score"] = ranked_product["_dense_score"]
+                        products_with_scores_ranked.append((summary, product))
             
-            # Reorder by IDSS ranking (products not in ranked list go to end)
-            products_with_scores = products_with_scores_ranked + [
-                (s, p) for s, p in products_with_scores 
-                if s.product_id not in ranked_product_ids
-            ]
+                # Reorder by IDSS ranking (products not in ranked list go to end)
+                products_with_scores = products_with_scores_ranked + [
+                    (s, p) for s, p in products_with_scores 
+                    if s.product_id not in ranked_product_ids
+                ]
             
-            logger.info("idss_ranking_complete", f"IDSS ranking applied, {len(ranked_products)} products ranked", {
-                "method": ranking_method,
-                "ranked_count": len(ranked_products)
-            })
-            timings["idss_ranking_ms"] = (time.time() - start_time) * 1000 - timings.get("total", 0)
-            sources.append("idss_ranking")
-        except Exception as e:
-            logger.error("idss_ranking_failed", f"IDSS ranking failed, using default ranking: {e}", {
-                "error": str(e)
-            })
-            # Fall through to default ranking
-    
-    # Apply ranking: KG candidates first, then vector scores, then popularity (if IDSS ranking not applied)
-    if not filters.get("_use_idss_ranking"):
-        if kg_candidate_ids:
-            # KG candidates are already ordered by relevance
-            # Keep KG order (most relevant first)
-            kg_order = {pid: idx for idx, pid in enumerate(kg_candidate_ids)}
-            products_with_scores.sort(
-                key=lambda x: kg_order.get(x[0].product_id, 9999)
-            )
-        elif use_vector_search and vector_product_ids and vector_scores and len(vector_scores) > 0:
-            # Fallback: Sort by vector score (highest similarity first)
-            score_map = dict(zip(vector_product_ids, vector_scores))
-            products_with_scores.sort(
-                key=lambda x: score_map.get(x[0].product_id, 0.0),
-                reverse=True
-            )
-        else:
-            # No KG or vector ranking — use popularity score as tiebreaker
-            # Popular products (more views) rank higher within same price tier
-            try:
-                pop_scores = {
-                    s.product_id: cache_client.get_popularity_score(s.product_id)
-                    for s, _ in products_with_scores[:request.limit]
-                }
+                logger.info("idss_ranking_complete", f"IDSS ranking applied, {len(ranked_products)} products ranked", {
+                    "method": ranking_method,
+                    "ranked_count": len(ranked_products)
+                })
+                timings["idss_ranking_ms"] = (time.time() - start_time) * 1000 - timings.get("total", 0)
+                sources.append("idss_ranking")
+            except Exception as e:
+                logger.error("idss_ranking_failed", f"IDSS ranking failed, using default ranking: {e}", {
+                    "error": str(e)
+                })
+                # Fall through to default ranking
+    
+        # Apply ranking: KG candidates first, then vector scores, then popularity (if IDSS ranking not applied)
+        if not filters.get("_use_idss_ranking"):
+            if kg_candidate_ids:
+                # KG candidates are already ordered by relevance
+                # Keep KG order (most relevant first)
+                kg_order = {pid: idx for idx, pid in enumerate(kg_candidate_ids)}
                 products_with_scores.sort(
-                    key=lambda x: pop_scores.get(x[0].product_id, 0.0),
-                    reverse=True,
+                    key=lambda x: kg_order.get(x[0].product_id, 9999)
+                )
+            elif use_vector_search and vector_product_ids and vector_scores and len(vector_scores) > 0:
+                # Fallback: Sort by vector score (highest similarity first)
+                score_map = dict(zip(vector_product_ids, vector_scores))
+                products_with_scores.sort(
+                    key=lambda x: score_map.get(x[0].product_id, 0.0),
+                    reverse=True
+                )
+            else:
+                # No KG or vector ranking — use popularity score as tiebreaker
+                # Popular products (more views) rank higher within same price tier
+                try:
+                    pop_scores = {
+                        s.product_id: cache_client.get_popularity_score(s.product_id)
+                        for s, _ in products_with_scores[:request.limit]
+                    }
+                    products_with_scores.sort(
+                        key=lambda x: pop_scores.get(x[0].product_id, 0.0),
+                        reverse=True,
+                    )
+                except Exception:
+                    pass  # Popularity ranking failure is non-fatal
+
+        # Extract summaries (limit to requested limit)
+        product_summaries = [summary for summary, _ in products_with_scores[:request.limit]]
+
+        # GUARDRAIL: Category cannot change in results — drop any item that doesn't match requested category
+        # Prevents "book flow" from ever returning vehicles, and routing bugs from leaking categories
+        requested_category = filters.get("category")
+        raw_count = len(product_summaries)
+        if requested_category:
+            before_guardrail = len(product_summaries)
+            product_summaries = [s for s in product_summaries if (s.category or "").strip() == (requested_category or "").strip()]
+            dropped = before_guardrail - len(product_summaries)
+            if dropped > 0:
+                logger.error(
+                    "category_guardrail_dropped",
+                    f"Dropped {dropped} results with wrong category (requested={requested_category})",
+                    {"requested_category": requested_category, "dropped": dropped, "before": before_guardrail, "after": len(product_summaries)}
+                )
+                page_total = max(0, page_total - dropped)  # Approximate: we only have this page
+        post_validation_count = len(product_summaries)
+
+        # ── "Why recommended" annotation (week7 §564) ────────────────────────
+        from app.research_compare import generate_recommendation_reasons
+        product_dicts_for_reasons = [
+            {"product_id": s.product_id, "brand": s.brand, "price_cents": s.price_cents}
+            for s in product_summaries
+        ]
+        generate_recommendation_reasons(product_dicts_for_reasons, filters, kg_candidate_ids)
+        for s, d in zip(product_summaries, product_dicts_for_reasons):
+            s.reason = d.get("_reason")
+
+        # ── Cache search results for next time ───────────────────────────────
+        if product_summaries:
+            try:
+                serialized = [s.model_dump(mode="json", exclude_none=True) for s in product_summaries]
+                cache_client.set_search_results(
+                    search_cache_key, serialized, adaptive=True, compute_s=time.time() - db_start
                 )
             except Exception:
-                pass  # Popularity ranking failure is non-fatal
+                pass  # Cache write failure is non-fatal
+        return product_summaries, raw_count, post_validation_count, page_total
 
-    # Extract summaries (limit to requested limit)
-    product_summaries = [summary for summary, _ in products_with_scores[:request.limit]]
+    # ── Search result cache check ────────────────────────────────────────
+    cached_entry = cache_client.get_search_entry(search_cache_key)
+    if cached_entry is not None:
+        # Cache HIT — reconstruct ProductSummary list from cached dicts.
+        # A stale (or nearly stale) page is still served; one worker
+        # refreshes it in the background.
+        cached_search, refresh_due = cached_entry
+        if refresh_due:
+            _refresh_search_page(search_cache_key, db_query, _build_page)
+        cache_hit = True
+        timings["db"] = 0
+        product_summaries = [ProductSummary(**item) for item in cached_search]
+        # Exact with facets; otherwise approximate (page-level)
+        total_count = facets["total"] if facets is not None else len(product_summaries)
+        timings["total"] = (time.time() - start_time) * 1000
+        record_request_metrics("search_products", timings["total"], cache_hit, is_error=False, stages=timings)
+        log_response("search_products", request_id, "OK", timings["total"], cache_hit=True)
+        next_cursor = None
+        if offset + request.limit < total_count:
+            next_cursor = str(offset + request.limit)
+        return SearchProductsResponse(
+            status=ResponseStatus.OK,
+            data=SearchResultsData(
+                products=product_summaries,
+                total_count=total_count,
+                next_cursor=next_cursor,
+                facets=facets,
+            ),
+            constraints=[],
+            trace=create_trace(request_id, True, timings, ["redis_search_cache"]),
+            version=create_version_info(),
+        )
 
-    # GUARDRAIL: Category cannot change in results — drop any item that doesn't match requested category
-    # Prevents "book flow" from ever returning vehicles, and routing bugs from leaking categories
+    # Cache miss — hit Postgres. Concurrent misses on the same key in this
+    # worker share one computation instead of each running the pipeline.
+    product_summaries, raw_count, post_validation_count, total_count = await search_flight.run(
+        search_cache_key, lambda: asyncio.to_thread(_build_page_on_own_session, _build_page, db_query)
+    )
     requested_category = filters.get("category")
-    raw_count = len(product_summaries)
-    if requested_category:
-        before_guardrail = len(product_summaries)
-        product_summaries = [s for s in product_summaries if (s.category or "").strip() == (requested_category or "").strip()]
-        dropped = before_guardrail - len(product_summaries)
-        if dropped > 0:
-            logger.error(
-                "category_guardrail_dropped",
-                f"Dropped {dropped} results with wrong category (requested={requested_category})",
-                {"requested_category": requested_category, "dropped": dropped, "before": before_guardrail, "after": len(product_summaries)}
-            )
-            total_count = max(0, total_count - dropped)  # Approximate: we only have this page
-    post_validation_count = len(product_summaries)
-
-    # ── "Why recommended" annotation (week7 §564) ────────────────────────
-    from app.research_compare import generate_recommendation_reasons
-    product_dicts_for_reasons = [
-        {"product_id": s.product_id, "brand": s.brand, "price_cents": s.price_cents}
-        for s in product_summaries
-    ]
-    generate_recommendation_reasons(product_dicts_for_reasons, filters, kg_candidate_ids)
-    for s, d in zip(product_summaries, product_dicts_for_reasons):
-        s.reason = d.get("_reason")
-
-    # ── Cache search results for next time ───────────────────────────────
-    if product_summaries:
-        try:
-            serialized = [s.model_dump(mode="json", exclude_none=True) for s in product_summaries]
-            cache_client.set_search_results(search_cache_key, serialized, adaptive=True)
-        except Exception:
-            pass  # Cache write failure is non-fatal
 
     # Record search impressions for top results (view signal for popularity ranking)
     try:
@@ -2178,7 +2289,7 @@ async def search_products(
     timings["total"] = (time.time() - start_time) * 1000
     
     # Record metrics
-    record_request_metrics("search_products", timings["total"], cache_hit, is_error=False)
+    record_request_metrics("search_products", timings["total"], cache_hit, is_error=False, stages=timings)
     
     # Structured logging: log response
     log_response("search_products", request_id, "OK", timings["total"], cache_hit=cache_hit)
@@ -2304,7 +2415,8 @@ async def search_products(
         data=SearchResultsData(
             products=product_summaries,
             total_count=total_count,
-            next_cursor=next_cursor
+            next_cursor=next_cursor,
+            facets=facets,
         ),
         constraints=constraints_out,
         trace=create_trace(request_id, cache_hit, timings, sources, trace_metadata),
@@ -2409,9 +2521,11 @@ def get_product(
             "inventory": "30s (30 sec)"
         }
     })
-    cached_summary = cache_client.get_product_summary(request.product_id)
-    cached_price = cache_client.get_price(request.product_id)
-    cached_inventory = cache_client.get_inventory(request.product_id)
+    # One pipelined round trip: MGET of the three keys + ZINCRBY for the
+    # Bélády-inspired popularity count (its score sizes the TTLs on a miss)
+    cached = cache_client.get_product_bundles([request.product_id], record_access=True)[request.product_id]
+    cached_summary, cached_price, cached_inventory = cached["summary"], cached["price"], cached["inventory"]
+    popularity = cached.get("popularity")
     timings["cache"] = (time.time() - cache_start) * 1000
     
     if cached_summary and cached_price and cached_inventory:
@@ -2468,7 +2582,7 @@ def get_product(
         timings["total"] = (time.time() - start_time) * 1000
         
         # Record metrics
-        record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
         
         # Structured logging: log response
         log_response("get_product", request_id, "OK", timings["total"], cache_hit=cache_hit)
@@ -2481,9 +2595,6 @@ def get_product(
             version=create_version_info()
         )
         
-        # Track access for Bélády-inspired adaptive TTL
-        cache_client.record_access(request.product_id)
-
         # Event logging for research replay
         log_mcp_event(db, request_id, "get_product", "/api/get-product", request, response)
 
@@ -2506,7 +2617,7 @@ def get_product(
                         product_detail.provenance.source = "supabase"
                     # Populate cache for next time
                     now = datetime.now(timezone.utc)
-                    cache_client.set_product_summary(
+                    cache_client.set_product_bundle(
                         request.product_id,
                         {
                             "product_id": product_detail.product_id,
@@ -2521,23 +2632,15 @@ def get_product(
                             "created_at": now.isoformat(),
                             "updated_at": now.isoformat(),
                         },
-                        adaptive=True,
-                    )
-                    cache_client.set_price(
-                        request.product_id,
                         {"price_cents": product_detail.price_cents, "currency": product_detail.currency or "USD"},
-                        adaptive=True,
-                    )
-                    cache_client.set_inventory(
-                        request.product_id,
                         {"available_qty": product_detail.available_qty},
                         adaptive=True,
+                        popularity=popularity,
                     )
-                    cache_client.record_access(request.product_id)
                     if request.fields:
                         product_detail = apply_field_projection(product_detail, request.fields)
                     timings["total"] = (time.time() - start_time) * 1000
-                    record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+                    record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
                     log_response("get_product", request_id, "OK", timings["total"], cache_hit=cache_hit)
                     response = GetProductResponse(
                         status=ResponseStatus.OK,
@@ -2550,7 +2653,7 @@ def get_product(
                     return response
                 # Vehicle not found in Supabase
                 timings["total"] = (time.time() - start_time) * 1000
-                record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+                record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
                 log_response("get_product", request_id, "NOT_FOUND", timings["total"], cache_hit=cache_hit)
                 response = GetProductResponse(
                     status=ResponseStatus.NOT_FOUND,
@@ -2611,7 +2714,7 @@ def get_product(
                 if request.fields:
                     product_detail = apply_field_projection(product_detail, request.fields)
                 now = datetime.now(timezone.utc)
-                cache_client.set_product_summary(
+                cache_client.set_product_bundle(
                     request.product_id,
                     {
                         "product_id": product_detail.product_id,
@@ -2623,21 +2726,13 @@ def get_product(
                         "created_at": now.isoformat(),
                         "updated_at": now.isoformat(),
                     },
-                    adaptive=True,
-                )
-                cache_client.set_price(
-                    request.product_id,
                     {"price_cents": product_detail.price_cents, "currency": product_detail.currency or "USD"},
-                    adaptive=True,
-                )
-                cache_client.set_inventory(
-                    request.product_id,
                     {"available_qty": product_detail.available_qty},
                     adaptive=True,
+                    popularity=popularity,
                 )
-                cache_client.record_access(request.product_id)
                 timings["total"] = (time.time() - start_time) * 1000
-                record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+                record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
                 log_response("get_product", request_id, "OK", timings["total"], cache_hit=cache_hit)
                 response = GetProductResponse(
                     status=ResponseStatus.OK,
@@ -2691,7 +2786,7 @@ def get_product(
         timings["total"] = (time.time() - start_time) * 1000
         
         # Record metrics (not an error, just not found)
-        record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
         
         # Structured logging: log response
         log_response("get_product", request_id, "NOT_FOUND", timings["total"], cache_hit=cache_hit)
@@ -2785,7 +2880,7 @@ def get_product(
         ]
     })
     
-    cache_client.set_product_summary(
+    cache_client.set_product_bundle(
         str(product.product_id),
         {
             "product_id": str(product.product_id),
@@ -2800,29 +2895,17 @@ def get_product(
             "created_at": product.created_at.isoformat(),
             "updated_at": product.updated_at.isoformat()
         },
-        adaptive=True
-    )
-
-    cache_client.set_price(
-        str(product.product_id),
         {
             "price_cents": int((product.price_value or 0) * 100),
             "currency": "USD"
         },
-        adaptive=True
-    )
-
-    cache_client.set_inventory(
-        str(product.product_id),
         {
             "available_qty": int(product.inventory or 0)
         },
-        adaptive=True
+        adaptive=True,
+        popularity=popularity,
     )
 
-    # Track access for Bélády-inspired adaptive TTL
-    cache_client.record_access(str(product.product_id))
-
     # STEP 5: Apply field projection if requested
     if request.fields:
         logger.info("processing_step", "Step 5: Applying field projection", {
@@ -2852,7 +2935,7 @@ def get_product(
     })
     
     # Record metrics
-    record_request_metrics("get_product", timings["total"], cache_hit, is_error=False)
+    record_request_metrics("get_product", timings["total"], cache_hit, is_error=False, stages=timings)
     
     # Structured logging: log response
     log_response("get_product", request_id, "OK", timings["total"], cache_hit=cache_hit)
@@ -2921,7 +3004,7 @@ def add_to_cart(
     if not product:
         timings["db"] = (time.time() - db_start) * 1000
         timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False, stages=timings)
         log_response("add_to_cart", request_id, "NOT_FOUND", timings["total"], cache_hit=cache_hit)
         response = AddToCartResponse(
             status=ResponseStatus.NOT_FOUND,
@@ -2947,7 +3030,7 @@ def add_to_cart(
     if available_qty < request.qty:
         timings["db"] = (time.time() - db_start) * 1000
         timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False, stages=timings)
         log_response("add_to_cart", request_id, "OUT_OF_STOCK", timings["total"], cache_hit=cache_hit)
         response = AddToCartResponse(
             status=ResponseStatus.OUT_OF_STOCK,
@@ -3012,7 +3095,7 @@ def add_to_cart(
         currency="USD"
     )
 
-    record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False)
+    record_request_metrics("add_to_cart", timings["total"], cache_hit, is_error=False, stages=timings)
     log_response("add_to_cart", request_id, "OK", timings["total"], cache_hit=cache_hit)
 
     response = AddToCartResponse(
@@ -3062,7 +3145,7 @@ def checkout(
     if not cart:
         timings["db"] = (time.time() - db_start) * 1000
         timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False, stages=timings)
         log_response("checkout", request_id, "NOT_FOUND", timings["total"], cache_hit=cache_hit)
         response = CheckoutResponse(
             status=ResponseStatus.NOT_FOUND,
@@ -3085,7 +3168,7 @@ def checkout(
     if not cart.get("items"):
         timings["db"] = (time.time() - db_start) * 1000
         timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False, stages=timings)
         log_response("checkout", request_id, "INVALID", timings["total"], cache_hit=cache_hit)
         response = CheckoutResponse(
             status=ResponseStatus.INVALID,
@@ -3105,27 +3188,35 @@ def checkout(
         log_mcp_event(db, request_id, "checkout", "/api/checkout", request, response)
         return response
 
-    # Re-check inventory for each item (detect race conditions)
+    # Re-check inventory for every item in one query (detect race conditions).
+    # Deliberately read from Postgres, not the inventory cache: stock at
+    # checkout must be authoritative.
     out_of_stock_items = []
+    try:
+        inventory_by_id = {
+            str(pid): inventory
+            for pid, inventory in db.query(Product.product_id, Product.inventory)
+            .filter(Product.product_id.in_(list(cart["items"].keys())))
+            .all()
+        }
+    except Exception:
+        inventory_by_id = {}
     for pid_key, item_data in cart["items"].items():
-        try:
-            prod = db.query(Product).filter(Product.product_id == pid_key).first()
-            if prod and prod.inventory is not None:
-                available = int(prod.inventory)
-                if available < item_data["qty"]:
-                    out_of_stock_items.append({
-                        "product_id": pid_key,
-                        "product_name": item_data["name"],
-                        "requested_qty": item_data["qty"],
-                        "available_qty": available,
-                    })
-        except Exception:
-            pass
+        inventory = inventory_by_id.get(pid_key)
+        if inventory is not None:
+            available = int(inventory)
+            if available < item_data["qty"]:
+                out_of_stock_items.append({
+                    "product_id": pid_key,
+                    "product_name": item_data["name"],
+                    "requested_qty": item_data["qty"],
+                    "available_qty": available,
+                })
 
     if out_of_stock_items:
         timings["db"] = (time.time() - db_start) * 1000
         timings["total"] = (time.time() - start_time) * 1000
-        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False)
+        record_request_metrics("checkout", timings["total"], cache_hit, is_error=False, stages=timings)
         log_response("checkout", request_id, "OUT_OF_STOCK", timings["total"], cache_hit=cache_hit)
         response = CheckoutResponse(
             status=ResponseStatus.OUT_OF_STOCK,
@@ -3189,7 +3280,7 @@ def checkout(
         shipping=shipping_info,
     )
 
-    record_request_metrics("checkout", timings["total"], cache_hit, is_error=False)
+    record_request_metrics("checkout", timings["total"], cache_hit, is_error=False, stages=timings)
     log_response("checkout", request_id, "OK", timings["total"], cache_hit=cache_hit)
 
     response = CheckoutResponse(
@@ -3207,19 +3298,35 @@ def get_cart_items(cart_id: str) -> list:
     """
     Return cart items for a cart_id from in-memory store (for UCP get_cart when not using Supabase).
     Each item: {"id": str, "product_id": str, "product_snapshot": dict, "quantity": int}.
+    Snapshots are hydrated from the product cache in one round trip for the
+    whole cart, falling back to the name/price captured at add-to-cart time.
     """
     cart = _CARTS.get(str(cart_id))
     if not cart or not cart.get("items"):
         return []
-    return [
-        {
+    bundles = cache_client.get_product_bundles(cart["items"].keys())
+    items = []
+    for pid, data in cart["items"].items():
+        bundle = bundles.get(pid) or {}
+        summary = bundle.get("summary") or {}
+        price = bundle.get("price") or {}
+        price_cents = price.get("price_cents", data.get("price_cents"))
+        snapshot = {
+            "name": summary.get("name") or data.get("name"),
+            "price_cents": price_cents,
+            "price": price_cents / 100 if price_cents is not None else None,
+            "brand": summary.get("brand"),
+            "category": summary.get("category"),
+        }
+        if bundle.get("inventory"):
+            snapshot["inventory"] = bundle["inventory"].get("available_qty")
+        items.append({
             "id": pid,
             "product_id": pid,
-            "product_snapshot": {},
+            "product_snapshot": {k: v for k, v in snapshot.items() if v is not None},
             "quantity": data["qty"],
-        }
-        for pid, data in cart["items"].items()
-    ]
+        })
+    return items
 
 
 def remove_from_cart_item(cart_id: str, product_id: str) -> bool:
@@ -9,6 +9,10 @@ Improvements over basic cache.py:
 5. Compression for large objects
 6. Query result caching
 
+Note: the request path (get_product, cart, search) uses app.cache.CacheClient,
+which now provides the pipelined batch reads, compression and per-namespace
+hit ratios; new hot-path code should use that layer.
+
 Usage:
     from app.enhanced_cache import EnhancedCache
     
@@ -1,16 +1,58 @@
 """
 Event logging for MCP requests/responses.
 Append-only log for research replay and debugging.
+
+log_event() used to INSERT and commit on the request's own session, so every
+tool call paid a full transaction commit for audit logging. Now:
+
+- Request path: build_event_row() redacts, summarizes and hashes the event
+  into a row dict, which is appended to EventLogWriter's bounded queue.
+- Background writer: drains the queue every flush interval (or as soon as a
+  full batch is waiting) and group-commits the batch as one multi-row
+  INSERT in its own transaction. Only INSERTs are ever issued, so the table
+  stays append-only.
+- If the queue is full, or the writer is not running (scripts, tests), the
+  row is written synchronously on the caller's session as before - events
+  are never dropped to save latency.
+- If a batch INSERT fails, its rows are retried one per transaction, so a
+  single bad row only costs itself. If the database is unreachable, the rows
+  go back to the front of the queue for the next flush.
+
+Call event_log_writer.start() / stop() from the app lifespan; stop() flushes
+what is left. stats() (backlog, commit and enqueue-to-commit latency) is on
+/metrics.
 """
 
+import asyncio
 import hashlib
 import json
+import logging
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Deque, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import column, insert, table
+from sqlalchemy.exc import DBAPIError, OperationalError
 from app.schemas import ResponseStatus
 
+logger = logging.getLogger(__name__)
+
+EVENT_COLUMNS = (
+    "timestamp", "trace_id", "request_id", "session_id", "tool_name", "endpoint_path",
+    "input_hash", "input_summary", "outcome_status", "constraints_count",
+    "latency_ms", "cache_hit", "timings_breakdown", "sources",
+    "product_ids", "cart_id", "order_id", "response_summary",
+    "catalog_version", "db_version",
+)
+
+# Lightweight table construct (no ORM model, so rows can't be updated through
+# a session); an executemany of insert(mcp_events) lets SQLAlchemy batch the
+# rows into multi-row INSERT ... VALUES statements.
+mcp_events = table("mcp_events", *(column(name) for name in EVENT_COLUMNS))
+
 
 def hash_input(input_data: Dict[str, Any]) -> str:
     """
@@ -138,6 +180,296 @@ def extract_product_ids(request_data: Dict[str, Any], response_data: Dict[str, A
     return list(set(product_ids))
 
 
+def build_event_row(
+    request_id: str,
+    tool_name: str,
+    endpoint_path: str,
+    request_data: Dict[str, Any],
+    response_status: ResponseStatus,
+    response_data: Dict[str, Any],
+    trace: Dict[str, Any],
+    version: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Serialize one event into an mcp_events row (redacted summaries, input
+    hash, timings). The timestamp is taken here, on the request path.
+    """
+    # Create input/output summaries
+    input_summary = create_input_summary(request_data)
+    response_summary = create_response_summary(response_data)
+
+    # Extract product IDs
+    product_ids = extract_product_ids(request_data, response_data)
+
+    # Extract cart_id and order_id
+    cart_id = request_data.get('cart_id') or response_data.get('data', {}).get('cart_id')
+    order_id = response_data.get('data', {}).get('order_id')
+
+    # Create input hash for deduplication
+    input_hash = hash_input(request_data)
+
+    # Extract timing information
+    timings = trace.get('timings_ms', {})
+    latency_ms = timings.get('total', 0)
+    cache_hit = trace.get('cache_hit', False)
+    sources = trace.get('sources', [])
+
+    # Extract version info
+    catalog_version = None
+    db_version = None
+    if version:
+        catalog_version = version.get('catalog_version')
+        db_version = version.get('db_version')
+
+    # Count constraints
+    constraints_count = len(response_data.get('constraints', []))
+
+    # trace_id is a Supabase-added NOT NULL column; use request_id as the trace identifier
+    return {
+        'timestamp': datetime.now(timezone.utc),
+        'trace_id': request_id,
+        'request_id': request_id,
+        'session_id': session_id,
+        'tool_name': tool_name,
+        'endpoint_path': endpoint_path,
+        'input_hash': input_hash,
+        'input_summary': json.dumps(input_summary),
+        'outcome_status': response_status.value,
+        'constraints_count': constraints_count,
+        'latency_ms': float(latency_ms) if latency_ms else None,
+        'cache_hit': cache_hit,
+        'timings_breakdown': json.dumps(timings),
+        'sources': sources,
+        'product_ids': product_ids,
+        'cart_id': cart_id,
+        'order_id': order_id,
+        'response_summary': json.dumps(response_summary),
+        'catalog_version': catalog_version,
+        'db_version': db_version
+    }
+
+
+def insert_events(conn, rows: List[Dict[str, Any]]) -> None:
+    """Append rows to mcp_events (one multi-row INSERT per executemany batch)."""
+    conn.execute(insert(mcp_events), rows)
+
+
+def _write_sync(db: Session, row: Dict[str, Any]) -> None:
+    """Insert one row and commit on the caller's session (pre-queue behaviour)."""
+    try:
+        insert_events(db, [row])
+        db.commit()
+    except Exception as e:
+        # Don't fail the request if logging fails
+        # Rollback to clean up the DB session state (critical for Supabase where mcp_events may not exist)
+        try:
+            db.rollback()
+        except Exception:
+            pass
+        logger.error(f"Failed to log event: {e}", exc_info=True)
+
+
+class EventLogWriter:
+    """
+    Bounded queue + background group-commit writer for mcp_events.
+
+    deque.append / popleft are atomic in CPython, so enqueue() is safe from
+    the sync endpoints' worker threads without a lock.
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        capacity: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_s: Optional[float] = None,
+    ):
+        self._engine = engine
+        self.capacity = capacity or int(os.getenv("EVENT_LOG_BUFFER", "10000"))
+        self.batch_size = batch_size or int(os.getenv("EVENT_LOG_BATCH", "200"))
+        self.flush_interval_s = flush_interval_s or float(os.getenv("EVENT_LOG_FLUSH_S", "0.5"))
+
+        self._buffer: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        # A cancelled drain task may still be committing in its worker thread
+        # when stop() flushes; keep batches in order.
+        self._write_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.overflow_sync = 0
+        self.failed_events = 0
+        self.requeued_events = 0
+        self.write_errors = 0
+        self.commit_ms_total = 0.0
+        self.last_commit_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine
+            self._engine = engine
+        return self._engine
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """Queue one row. Returns False if the writer is stopped or full."""
+        if self._task is None:
+            return False
+        if len(self._buffer) >= self.capacity:
+            self.overflow_sync += 1
+            return False
+        self._buffer.append((time.monotonic(), row))
+        self.enqueued += 1
+        if len(self._buffer) == self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def _take_batch(self) -> List[Tuple[float, Dict[str, Any]]]:
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def _write_batch(self, batch: List[Tuple[float, Dict[str, Any]]]) -> bool:
+        """
+        Commit one batch in a single transaction (runs in a worker thread).
+
+        Returns False when the database was unreachable and the batch was put
+        back on the queue, so callers stop draining until the next flush.
+        """
+        if not batch:
+            return True
+        with self._write_lock:
+            started = time.monotonic()
+            try:
+                with self.engine.begin() as conn:
+                    insert_events(conn, [row for _, row in batch])
+            except Exception as e:
+                self.write_errors += 1
+                logger.warning("event_log_write_failed: %d events, retrying row by row: %s", len(batch), e)
+                return self._write_rows(batch)
+            done = time.monotonic()
+            self.written += len(batch)
+            self.batches += 1
+            self.last_commit_ms = (done - started) * 1000.0
+            self.commit_ms_total += self.last_commit_ms
+            self.last_lag_ms = (done - batch[0][0]) * 1000.0
+            self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+            return True
+
+    def _write_rows(self, batch: List[Tuple[float, Dict[str, Any]]]) -> bool:
+        """Retry a failed batch one row per transaction; only rows that fail on their own are dropped."""
+        for i, (_, row) in enumerate(batch):
+            try:
+                with self.engine.begin() as conn:
+                    insert_events(conn, [row])
+            except Exception as e:
+                if _is_unavailable(e):
+                    rest = batch[i:]
+                    self._buffer.extendleft(reversed(rest))
+                    self.requeued_events += len(rest)
+                    logger.warning("event_log_db_unavailable: requeued %d events: %s", len(rest), e)
+                    return False
+                self.failed_events += 1
+                logger.warning("event_log_row_dropped: request_id=%s: %s", row.get("request_id"), e)
+                continue
+            self.written += 1
+        return True
+
+    def flush(self) -> None:
+        """Synchronously commit everything currently queued."""
+        while self._buffer:
+            if not self._write_batch(self._take_batch()):
+                return
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._buffer:
+                if not await asyncio.to_thread(self._write_batch, self._take_batch()):
+                    break  # database unavailable; retry on the next flush
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background writer on the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer and commit the remaining queue."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+            self._loop = None
+        await asyncio.to_thread(self.flush)
+        if self._buffer:
+            lost = len(self._buffer)
+            self._buffer.clear()
+            self.failed_events += lost
+            logger.error("event_log_write_failed: database unavailable at shutdown, %d events lost", lost)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /metrics."""
+        return {
+            "running": self.running,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "backlog": len(self._buffer),
+            "batches": self.batches,
+            "avg_batch_size": self.written / self.batches if self.batches else 0.0,
+            "avg_commit_ms": self.commit_ms_total / self.batches if self.batches else 0.0,
+            "last_commit_ms": self.last_commit_ms,
+            "last_lag_ms": self.last_lag_ms,
+            "max_lag_ms": self.max_lag_ms,
+            "overflow_sync": self.overflow_sync,
+            "failed_events": self.failed_events,
+            "requeued_events": self.requeued_events,
+            "write_errors": self.write_errors,
+        }
+
+
+def _is_unavailable(e: Exception) -> bool:
+    """True for connection-level failures, where retrying the row later can succeed."""
+    return isinstance(e, OperationalError) or (isinstance(e, DBAPIError) and e.connection_invalidated)
+
+
+# Global writer started by the app lifespan
+event_log_writer = EventLogWriter()
+
+
 def log_event(
     db: Session,
     request_id: str,
@@ -152,9 +484,12 @@ def log_event(
 ) -> None:
     """
     Log an MCP event to the append-only event log.
+
+    The row is queued for event_log_writer; it is written on db directly
+    only when the writer is not running or its queue is full.
     
     Args:
-        db: Database session
+        db: Database session (used only for the synchronous fallback)
         request_id: Unique request identifier
         tool_name: Name of the tool/endpoint (e.g., 'search_products')
         endpoint_path: API endpoint path
@@ -166,87 +501,14 @@ def log_event(
         session_id: Optional session identifier
     """
     try:
-        # Create input/output summaries
-        input_summary = create_input_summary(request_data)
-        response_summary = create_response_summary(response_data)
-        
-        # Extract product IDs
-        product_ids = extract_product_ids(request_data, response_data)
-        
-        # Extract cart_id and order_id
-        cart_id = request_data.get('cart_id') or response_data.get('data', {}).get('cart_id')
-        order_id = response_data.get('data', {}).get('order_id')
-        
-        # Create input hash for deduplication
-        input_hash = hash_input(request_data)
-        
-        # Extract timing information
-        timings = trace.get('timings_ms', {})
-        latency_ms = timings.get('total', 0)
-        cache_hit = trace.get('cache_hit', False)
-        sources = trace.get('sources', [])
-        
-        # Extract version info
-        catalog_version = None
-        db_version = None
-        if version:
-            catalog_version = version.get('catalog_version')
-            db_version = version.get('db_version')
-        
-        # Count constraints
-        constraints_count = len(response_data.get('constraints', []))
-        
-        # Insert event using raw SQL for append-only guarantee
-        # (SQLAlchemy models can be updated, raw SQL ensures append-only)
-        # trace_id is a Supabase-added NOT NULL column; use request_id as the trace identifier
-        insert_sql = text("""
-            INSERT INTO mcp_events (
-                timestamp, trace_id, request_id, session_id, tool_name, endpoint_path,
-                input_hash, input_summary, outcome_status, constraints_count,
-                latency_ms, cache_hit, timings_breakdown, sources,
-                product_ids, cart_id, order_id, response_summary,
-                catalog_version, db_version
-            ) VALUES (
-                :timestamp, :trace_id, :request_id, :session_id, :tool_name, :endpoint_path,
-                :input_hash, :input_summary, :outcome_status, :constraints_count,
-                :latency_ms, :cache_hit, :timings_breakdown, :sources,
-                :product_ids, :cart_id, :order_id, :response_summary,
-                :catalog_version, :db_version
-            )
-        """)
-
-        db.execute(insert_sql, {
-            'timestamp': datetime.now(timezone.utc),
-            'trace_id': request_id,
-            'request_id': request_id,
-            'session_id': session_id,
-            'tool_name': tool_name,
-            'endpoint_path': endpoint_path,
-            'input_hash': input_hash,
-            'input_summary': json.dumps(input_summary),
-            'outcome_status': response_status.value,
-            'constraints_count': constraints_count,
-            'latency_ms': float(latency_ms) if latency_ms else None,
-            'cache_hit': cache_hit,
-            'timings_breakdown': json.dumps(timings),
-            'sources': sources,
-            'product_ids': product_ids,
-            'cart_id': cart_id,
-            'order_id': order_id,
-            'response_summary': json.dumps(response_summary),
-            'catalog_version': catalog_version,
-            'db_version': db_version
-        })
-        
-        db.commit()
-        
+        row = build_event_row(
+            request_id, tool_name, endpoint_path, request_data, response_status,
+            response_data, trace, version=version, session_id=session_id
+        )
     except Exception as e:
         # Don't fail the request if logging fails
-        # Rollback to clean up the DB session state (critical for Supabase where mcp_events may not exist)
-        try:
-            db.rollback()
-        except Exception:
-            pass
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Failed to log event: {e}", exc_info=True)
+        return
+
+    if not event_log_writer.enqueue(row):
+        _write_sync(db, row)
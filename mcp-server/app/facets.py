@@ -0,0 +1,358 @@
+"""
+Facet counts — result counts per brand, price band, RAM / storage / screen
+bucket, storage type and use case for a filter combination.
+
+Search (total_count, optional facets in the response) and the interview's
+entropy-based question selection both need value distributions over a
+filtered result set. They used to get them from separate COUNT queries or
+by sampling ~30 rows. There are two ways to get them now:
+
+- FacetIndex keeps an in-memory bitmap index of the catalog (Python ints as
+  bitsets, one bit per product). Product bits are assigned in price order,
+  so a price range is one contiguous mask. Numeric spec thresholds use
+  precomputed ">= value" bitmaps, and every facet value has its own bitmap.
+  A query is a handful of ANDs plus one popcount per facet value, so it is
+  cheap enough to run on every turn. Filter coverage and semantics are the
+  same as the Redis candidate index (CandidateIndex.plan); other filters
+  return None.
+- facet_counts_for_query() computes the same counts for any SQLAlchemy
+  product query in one GROUP BY query. search_products uses it when the
+  bitmap index cannot answer.
+
+The bitmap index is per process. It rebuilds in a background thread when
+it is older than FACET_INDEX_MAX_AGE_S, or (at most every
+FACET_INDEX_MIN_REBUILD_S) after cache_invalidation reports a catalog write
+in this process. The previous snapshot keeps serving meanwhile.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, case, cast, func
+
+from app.candidate_index import INDEX_COLUMNS, SPEC_FILTERS, CandidateIndex, as_float, index_entry
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Bucket edges are upper-exclusive: value < edges[i] → labels[i], else the last label
+PRICE_BAND_EDGES = (50000, 100000, 150000, 200000)  # cents
+PRICE_BAND_LABELS = ("under_500", "500_1000", "1000_1500", "1500_2000", "2000_plus")
+RAM_EDGES = (8, 16, 32)
+RAM_LABELS = ("under_8gb", "8_15gb", "16_31gb", "32gb_plus")
+STORAGE_EDGES = (256, 512, 1024)
+STORAGE_LABELS = ("under_256gb", "256_511gb", "512_1023gb", "1tb_plus")
+SCREEN_EDGES = (13, 15, 17)
+SCREEN_LABELS = ("under_13in", "13_14in", "15_16in", "17in_plus")
+
+# facet name -> (attributes key, edges, labels)
+BUCKETED_FACETS = {
+    "ram_gb": ("ram_gb", RAM_EDGES, RAM_LABELS),
+    "storage_gb": ("storage_gb", STORAGE_EDGES, STORAGE_LABELS),
+    "screen_size": ("screen_size_inches", SCREEN_EDGES, SCREEN_LABELS),
+}
+
+# use_case facet value -> attributes tag (same mapping as the use_cases search filter)
+USE_CASE_TAGS = {
+    "ml": "good_for_ml",
+    "web_dev": "good_for_web_dev",
+    "gaming": "good_for_gaming",
+    "creative": "good_for_creative",
+    "linux": "good_for_linux",
+    "programming": "good_for_programming",
+}
+
+FACETS = ("brand", "price_band", "ram_gb", "storage_gb", "screen_size", "storage_type", "use_case")
+
+
+def bucket(value: Optional[float], edges: Sequence[float], labels: Sequence[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return labels[bisect_right(edges, value)]
+
+
+def _tag_true(value: Any) -> bool:
+    return value is True or value in ("true", "1") or (type(value) is int and value == 1)
+
+
+def row_facets(row: Any) -> Dict[str, Any]:
+    """Facet values of one product row (use_case is a list; missing values are None)."""
+    attrs = row.attributes if isinstance(row.attributes, dict) else {}
+    price = as_float(row.price_value)
+    values: Dict[str, Any] = {
+        "brand": (row.brand or "").strip() or None,
+        "price_band": bucket(price * 100 if price is not None else None, PRICE_BAND_EDGES, PRICE_BAND_LABELS),
+        "storage_type": str(attrs["storage_type"]) if attrs.get("storage_type") else None,
+        "use_case": [uc for uc, tag in USE_CASE_TAGS.items() if _tag_true(attrs.get(tag))],
+    }
+    for name, (key, edges, labels) in BUCKETED_FACETS.items():
+        values[name] = bucket(as_float(attrs.get(key)), edges, labels)
+    return values
+
+
+def _finish(total: int, counts: Dict[str, Dict[str, int]], top_brands: int) -> Dict[str, Any]:
+    """Drop zero counts, keep the top brands (rest folded into "other")."""
+    result: Dict[str, Any] = {"total": total}
+    for name in FACETS:
+        values = {k: v for k, v in counts.get(name, {}).items() if v}
+        if name == "brand" and len(values) > top_brands:
+            ranked = sorted(values.items(), key=lambda kv: (-kv[1], kv[0]))
+            values = dict(ranked[:top_brands])
+            values["other"] = sum(v for _, v in ranked[top_brands:])
+        result[name] = values
+    return result
+
+
+def _default_top_brands() -> int:
+    return int(os.getenv("FACET_TOP_BRANDS", "10"))
+
+
+def _default_session_factory():
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+def _bitmap(positions: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for pos in positions:
+        bits[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(bits, "little")
+
+
+class _Snapshot:
+    """Immutable bitmap index over one catalog read."""
+
+    def __init__(self, rows: List[Any], brand_vocab: Iterable[str]):
+        vocab = list(brand_vocab)
+        entries = [(row, *index_entry(row, vocab)) for row in rows]
+        entries.sort(key=lambda e: e[2]["idx:price"])  # bit i = i-th cheapest product
+        self.size = len(entries)
+        self.prices = [e[2]["idx:price"] for e in entries]
+        self.built_at = time.time()
+
+        set_positions: Dict[str, List[int]] = {}
+        numeric: Dict[str, List[Tuple[float, int]]] = {}
+        facet_positions: Dict[str, Dict[str, List[int]]] = {name: {} for name in FACETS}
+        for pos, (row, sets, zsets) in enumerate(entries):
+            for key in sets:
+                set_positions.setdefault(key, []).append(pos)
+            for field in SPEC_FILTERS.values():
+                value = zsets.get(f"idx:num:{field}")
+                if value is not None:
+                    numeric.setdefault(field, []).append((value, pos))
+            for name, value in row_facets(row).items():
+                for v in (value if isinstance(value, list) else [value]):
+                    if v is not None:
+                        facet_positions[name].setdefault(v, []).append(pos)
+
+        self.sets = {key: _bitmap(p, self.size) for key, p in set_positions.items()}
+        self.facets = {
+            name: {value: _bitmap(p, self.size) for value, p in values.items()}
+            for name, values in facet_positions.items()
+        }
+        # field -> (distinct values ascending, bitmap of "value >= distinct[i]")
+        self.thresholds: Dict[str, Tuple[List[float], List[int]]] = {}
+        for field, pairs in numeric.items():
+            pairs.sort(reverse=True)
+            bits = bytearray((self.size + 7) // 8)
+            distinct: List[float] = []
+            at_least: List[int] = []
+            for i, (value, pos) in enumerate(pairs):
+                bits[pos >> 3] |= 1 << (pos & 7)
+                if i + 1 == len(pairs) or pairs[i + 1][0] != value:
+                    distinct.append(value)
+                    at_least.append(int.from_bytes(bits, "little"))
+            self.thresholds[field] = (distinct[::-1], at_least[::-1])
+
+    def _price_mask(self, lo: Optional[float], hi: Optional[float]) -> int:
+        if lo is None and hi is None:
+            return (1 << self.size) - 1
+        start = 0 if lo is None else bisect_left(self.prices, lo)
+        # Unpriced products (+inf) never satisfy a price filter
+        end = bisect_left(self.prices, float("inf")) if hi is None else bisect_right(self.prices, hi)
+        return ((1 << end) - 1) & ~((1 << start) - 1) if end > start else 0
+
+    def match(self, plan: Dict[str, Any]) -> int:
+        mask = self._price_mask(*plan["price"])
+        for union in plan["sets"]:
+            members = 0
+            for key in union:
+                members |= self.sets.get(key, 0)
+            mask &= members
+        noattrs = self.sets.get("idx:noattrs", 0)
+        for field, minimum in plan["specs"]:
+            distinct, at_least = self.thresholds.get(field, ([], []))
+            i = bisect_left(distinct, minimum)
+            mask &= (at_least[i] if i < len(at_least) else 0) | noattrs
+        return mask
+
+    def counts(self, mask: int) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {value: (mask & bits).bit_count() for value, bits in values.items()}
+            for name, values in self.facets.items()
+        }
+
+
+class FacetIndex:
+    """Per-process bitmap facet index with background refresh."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.session_factory = session_factory or _default_session_factory
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("FACET_INDEX_ENABLED", "1") == "1"
+        )
+        self.max_age_s = float(os.getenv("FACET_INDEX_MAX_AGE_S", "300"))
+        self.min_rebuild_s = float(os.getenv("FACET_INDEX_MIN_REBUILD_S", "30"))
+        self.top_brands = _default_top_brands()
+        self._snapshot: Optional[_Snapshot] = None
+        self._stale = False
+        self._last_attempt = 0.0
+        self._build_lock = threading.Lock()
+        self._building = False
+        self.stats: Dict[str, Any] = {
+            "queries": 0,
+            "served": 0,
+            "ineligible": 0,
+            "not_ready": 0,
+            "rebuilds": 0,
+            "errors": 0,
+            "products": 0,
+            "last_build_ms": 0.0,
+        }
+
+    def counts(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Facet counts ({"total": n, "brand": {...}, "price_band": {...}, ...})
+        for these search filters, or None when the filters are not covered
+        or no snapshot is built yet.
+        """
+        if not self.enabled:
+            return None
+        self.stats["queries"] += 1
+        plan = CandidateIndex.plan(filters)
+        if plan is None:
+            self.stats["ineligible"] += 1
+            return None
+        self._maybe_refresh()
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.stats["not_ready"] += 1
+            return None
+        mask = snapshot.match(plan)
+        self.stats["served"] += 1
+        return _finish(mask.bit_count(), snapshot.counts(mask), self.top_brands)
+
+    def mark_stale(self) -> None:
+        """The catalog changed; rebuild on the next query (rate-limited)."""
+        self._stale = True
+
+    def _maybe_refresh(self) -> None:
+        now = time.time()
+        snapshot = self._snapshot
+        if snapshot is None:
+            due = now - self._last_attempt >= self.min_rebuild_s or not self._last_attempt
+        else:
+            due = (
+                (self._stale or now - snapshot.built_at >= self.max_age_s)
+                and now - self._last_attempt >= self.min_rebuild_s
+            )
+        if not due or self._building:
+            return
+        self._last_attempt = now
+        threading.Thread(target=self._rebuild_quietly, name="facet-index-build", daemon=True).start()
+
+    def _rebuild_quietly(self) -> None:
+        try:
+            self.rebuild()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("facet_index_build_failed: %s", e)
+
+    def rebuild(self) -> int:
+        """Read the catalog and swap in a new snapshot. Returns the product count."""
+        with self._build_lock:
+            self._building = True
+            try:
+                start = time.time()
+                self._stale = False
+                db = self.session_factory()
+                try:
+                    rows = list(db.query(*INDEX_COLUMNS).yield_per(1000))
+                finally:
+                    db.close()
+                vocab = {b.lower() for b in (r.brand for r in rows) if b and not any(c.isspace() for c in b)}
+                self._snapshot = _Snapshot(rows, vocab)
+            finally:
+                self._building = False
+        self.stats["rebuilds"] += 1
+        self.stats["products"] = len(rows)
+        self.stats["last_build_ms"] = round((time.time() - start) * 1000, 1)
+        return len(rows)
+
+
+def _sql_bucket(expr, edges: Sequence[float], labels: Sequence[str]):
+    return case(
+        (expr.is_(None), None),
+        *[(expr < edge, label) for edge, label in zip(edges, labels)],
+        else_=labels[-1],
+    )
+
+
+def facet_counts_for_query(query, top_brands: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Facet counts for an arbitrary (unpaginated) Product query in one
+    GROUP BY query. Each group carries a FILTER count per use-case tag.
+    """
+    def attr_float(key: str):
+        return cast(Product.attributes[key].astext, Float)
+
+    dims = [
+        Product.brand,
+        _sql_bucket(Product.price_value * 100, PRICE_BAND_EDGES, PRICE_BAND_LABELS),
+        *[_sql_bucket(attr_float(key), edges, labels) for key, edges, labels in BUCKETED_FACETS.values()],
+        Product.attributes["storage_type"].astext,
+    ]
+    tag_counts = [
+        func.count().filter(Product.attributes[tag].astext.in_(["true", "1"]))
+        for tag in USE_CASE_TAGS.values()
+    ]
+    rows = (
+        query.order_by(None)
+        .with_entities(*dims, func.count(), *tag_counts)
+        .group_by(*dims)
+        .all()
+    )
+    return fold_facet_rows(rows, top_brands)
+
+
+def fold_facet_rows(rows: Iterable[Sequence[Any]], top_brands: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Sum GROUP BY rows of (brand, price_band, ram_gb, storage_gb,
+    screen_size, storage_type, count, *use-case tag counts) into facets.
+    """
+    names = ("brand", "price_band", *BUCKETED_FACETS, "storage_type")
+    counts: Dict[str, Dict[str, int]] = {name: {} for name in FACETS}
+    total = 0
+    for row in rows:
+        n = int(row[len(names)])
+        total += n
+        for name, value in zip(names, row):
+            if name == "brand":
+                value = (value or "").strip() or None
+            if value not in (None, ""):
+                counts[name][value] = counts[name].get(value, 0) + n
+        for use_case, tagged in zip(USE_CASE_TAGS, row[len(names) + 1:]):
+            counts["use_case"][use_case] = counts["use_case"].get(use_case, 0) + int(tagged or 0)
+    return _finish(total, counts, top_brands if top_brands is not None else _default_top_brands())
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,474 @@
+"""
+Feed materializer — precomputed, incrementally maintained feed snapshots.
+
+Downstream agents poll /acp/feed.* and /export/merchant-feed far more often
+than the catalog changes. Instead of regenerating every feed from Postgres
+per poll, a background task keeps versioned gzip artifacts on local disk:
+
+- A full build streams the catalog once (server-side cursor) and renders
+  every feed format from the same rows.
+- Rendered per-product fragments stay in memory, so a supplier price or
+  inventory update or a CSV import only re-queries and re-renders the
+  touched products before the affected artifacts are re-assembled.
+- Artifacts are written to a temp file and os.replace()d into place before
+  the manifest is updated, so readers never see a partial file.
+
+Writers report touched products with mark_dirty() (same process) or
+append_dirty_journal() (other processes, e.g. the csv_importer CLI).
+The feed endpoints serve feed_materializer.latest(name) straight from disk.
+A build that fails to render any product (or renders an empty feed from a
+non-empty catalog) publishes nothing, so the previous artifacts stay live.
+
+Enable with FEED_MATERIALIZER_ENABLED=1 (run it in a single worker).
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.acp_endpoints import (
+    ACP_FEED_CSV_FRAME,
+    ACP_FEED_JSON_FRAME,
+    _feed_item,
+    feed_item_csv_row,
+)
+from app.merchant_feed import FEED_CHUNK_SIZE, FeedFrame, iter_framed, merchant_exporter
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_ARTIFACT_DIR = Path(__file__).parent.parent / "feed_artifacts"
+_MANIFEST = "manifest.json"
+_JOURNAL = "dirty.journal"
+
+
+class FeedBuildError(RuntimeError):
+    """A build or refresh was rejected; the previously published artifacts stay live."""
+
+
+class _FeedSpec(NamedTuple):
+    media_type: str
+    frame: Callable[[], FeedFrame]
+    render: Callable[[Product], Optional[str]]  # None = product not in this feed
+
+
+def _acp_json_row(p: Product) -> Optional[str]:
+    return _feed_item(p).model_dump_json() if p.name is not None else None
+
+
+def _acp_csv_row(p: Product) -> Optional[str]:
+    return "\n" + feed_item_csv_row(_feed_item(p)) if p.name is not None else None
+
+
+# Artifact name -> how to render it. Names match the endpoint variants
+# (/acp/feed.json, /acp/feed.csv, /export/merchant-feed?format=...).
+FEED_SPECS: Dict[str, _FeedSpec] = {
+    "acp.json": _FeedSpec("application/json", lambda: ACP_FEED_JSON_FRAME, _acp_json_row),
+    "acp.csv": _FeedSpec("text/csv", lambda: ACP_FEED_CSV_FRAME, _acp_csv_row),
+    "merchant.json": _FeedSpec(
+        "application/json",
+        lambda: merchant_exporter.frame("json"),
+        lambda p: merchant_exporter.render_row(p, "json", include_metadata=True),
+    ),
+    "merchant.xml": _FeedSpec(
+        "application/xml",
+        lambda: merchant_exporter.frame("xml"),
+        lambda p: merchant_exporter.render_row(p, "xml"),
+    ),
+    "merchant.csv": _FeedSpec(
+        "text/csv",
+        lambda: merchant_exporter.frame("csv"),
+        lambda p: merchant_exporter.render_row(p, "csv"),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class FeedArtifact:
+    """One published, immutable feed snapshot on disk (gzip-compressed)."""
+    name: str
+    version: int
+    path: Path
+    media_type: str
+    etag: str            # validator for the decompressed representation
+    last_modified: datetime
+    size: int            # decompressed bytes
+    compressed_size: int
+
+    @property
+    def gzip_etag(self) -> str:
+        """Validator for the gzip-encoded representation (served as-is)."""
+        return self.etag[:-1] + '-gz"'
+
+    def iter_decompressed(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Stream the artifact body for clients that do not accept gzip."""
+        with gzip.open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def _default_session_factory() -> Session:
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+def append_dirty_journal(product_ids: Iterable[str], artifact_dir: Optional[Path] = None) -> None:
+    """
+    Record touched products for a materializer running in another process.
+
+    Appends one product ID per line to the journal in the artifact directory;
+    the materializer's background loop drains it on its next refresh.
+    """
+    ids = [str(pid) for pid in product_ids if pid]
+    if not ids:
+        return
+    directory = Path(artifact_dir or os.getenv("FEED_ARTIFACT_DIR") or _DEFAULT_ARTIFACT_DIR)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / _JOURNAL, "a", encoding="utf-8") as f:
+            f.write("\n".join(ids) + "\n")
+    except OSError as e:
+        logger.warning("feed_journal_append_failed: %s", e)
+
+
+class FeedMaterializer:
+    """
+    Maintains versioned feed artifacts and refreshes them incrementally.
+
+    Thread-safety: mark_dirty() may be called from any thread; builds run in
+    a worker thread (asyncio.to_thread) and are serialized by a lock.
+    """
+
+    def __init__(
+        self,
+        artifact_dir: Optional[Path] = None,
+        session_factory: Callable[[], Session] = _default_session_factory,
+        enabled: Optional[bool] = None,
+    ):
+        self.artifact_dir = Path(artifact_dir or os.getenv("FEED_ARTIFACT_DIR") or _DEFAULT_ARTIFACT_DIR)
+        self.session_factory = session_factory
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("FEED_MATERIALIZER_ENABLED", "0") == "1"
+        )
+        self.refresh_interval_s = float(os.getenv("FEED_REFRESH_INTERVAL_S", "5"))
+        self.full_rebuild_s = float(os.getenv("FEED_FULL_REBUILD_S", "3600"))
+        self.keep_versions = int(os.getenv("FEED_ARTIFACT_KEEP", "3"))
+
+        # feed name -> product_id -> rendered fragment (insertion-ordered)
+        self._fragments: Dict[str, Dict[str, str]] = {}
+        self._artifacts: Dict[str, FeedArtifact] = {}
+        self._version = 0
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.stats = {
+            "full_builds": 0,
+            "incremental_refreshes": 0,
+            "products_rerendered": 0,
+            "render_errors": 0,
+            "failed_builds": 0,
+            "last_build_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Read side
+    # ------------------------------------------------------------------
+
+    def latest(self, name: str) -> Optional[FeedArtifact]:
+        """Return the newest published artifact for a feed, or None."""
+        if not self.enabled:
+            return None
+        if not self._artifacts:
+            self._load_manifest()
+        return self._artifacts.get(name)
+
+    def _load_manifest(self) -> None:
+        try:
+            manifest = json.loads((self.artifact_dir / _MANIFEST).read_text())
+        except (OSError, ValueError):
+            return
+        artifacts = {}
+        for name, meta in manifest.get("feeds", {}).items():
+            path = self.artifact_dir / meta["file"]
+            if path.exists():
+                artifacts[name] = FeedArtifact(
+                    name=name,
+                    version=meta["version"],
+                    path=path,
+                    media_type=meta["media_type"],
+                    etag=meta["etag"],
+                    last_modified=datetime.fromisoformat(meta["last_modified"]),
+                    size=meta["size"],
+                    compressed_size=meta["compressed_size"],
+                )
+        self._artifacts = artifacts
+        self._version = max(self._version, manifest.get("version", 0))
+
+    # ------------------------------------------------------------------
+    # Write side
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, product_ids: Iterable[str]) -> None:
+        """Queue products for re-rendering on the next refresh."""
+        if not self.enabled:
+            return
+        with self._dirty_lock:
+            self._dirty.update(str(pid) for pid in product_ids if pid)
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def rebuild(self) -> None:
+        """Full build: stream every product once and publish all feeds."""
+        with self._build_lock:
+            t0 = time.perf_counter()
+            fragments: Dict[str, Dict[str, str]] = {name: {} for name in FEED_SPECS}
+            # The scan below covers everything marked dirty so far; writes
+            # landing mid-scan stay queued for the next refresh.
+            dirty = self._drain_dirty()
+            rows = errors = 0
+            db = self.session_factory()
+            try:
+                for product in db.query(Product).yield_per(FEED_CHUNK_SIZE):
+                    rows += 1
+                    errors += self._render_into(fragments, product)
+            except Exception:
+                self._requeue(dirty)
+                raise
+            finally:
+                db.close()
+            empty = sorted(name for name, rendered in fragments.items() if rows and not rendered)
+            if errors or empty:
+                self._reject(dirty, f"full build: {errors} render errors, empty feeds {empty} from {rows} products")
+            self._fragments = fragments
+            self._publish(set(FEED_SPECS))
+            self.stats["full_builds"] += 1
+            self.stats["last_build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def refresh(self) -> None:
+        """Incremental refresh: re-render only products marked dirty."""
+        if not self._fragments:
+            self.rebuild()
+            return
+        with self._build_lock:
+            dirty = self._drain_dirty()
+            if not dirty:
+                return
+            t0 = time.perf_counter()
+            # Render into a staging map first so a failed refresh leaves the
+            # in-memory fragments (and the published artifacts) untouched.
+            staged: Dict[str, Dict[str, str]] = {name: {} for name in FEED_SPECS}
+            errors = 0
+            db = self.session_factory()
+            try:
+                ids = sorted(dirty)
+                for i in range(0, len(ids), FEED_CHUNK_SIZE):
+                    keys = [uuid.UUID(pid) for pid in ids[i:i + FEED_CHUNK_SIZE] if _is_uuid(pid)]
+                    if keys:
+                        for product in db.query(Product).filter(Product.product_id.in_(keys)).all():
+                            errors += self._render_into(staged, product)
+            except Exception:
+                self._requeue(dirty)
+                raise
+            finally:
+                db.close()
+            if errors:
+                self._reject(dirty, f"incremental refresh: {errors} render errors in {len(dirty)} products")
+            changed = set()
+            for name, rows in self._fragments.items():
+                for pid in dirty:  # absent from staged = deleted, unknown or not in this feed
+                    fragment = staged[name].get(pid)
+                    if fragment == rows.get(pid):
+                        continue
+                    changed.add(name)
+                    if fragment is None:
+                        rows.pop(pid, None)
+                    else:
+                        rows[pid] = fragment
+            if changed:
+                self._publish(changed)
+            self.stats["incremental_refreshes"] += 1
+            self.stats["products_rerendered"] += len(dirty)
+            self.stats["last_build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def _render_into(self, fragments: Dict[str, Dict[str, str]], product: Product) -> int:
+        """Render one product into every feed; returns the number of feeds that failed."""
+        pid = str(product.product_id)
+        errors = 0
+        for name, spec in FEED_SPECS.items():
+            try:
+                fragment = spec.render(product)
+            except Exception as e:
+                if not errors:
+                    logger.warning("feed_render_failed: feed=%s product=%s: %r", name, pid, e)
+                self.stats["render_errors"] += 1
+                errors += 1
+                continue
+            if fragment is None:
+                fragments[name].pop(pid, None)
+            else:
+                fragments[name][pid] = fragment
+        return errors
+
+    def _requeue(self, product_ids: Set[str]) -> None:
+        """Put drained products back so the next refresh retries them."""
+        with self._dirty_lock:
+            self._dirty.update(product_ids)
+
+    def _reject(self, dirty: Set[str], reason: str) -> None:
+        self._requeue(dirty)
+        self.stats["failed_builds"] += 1
+        logger.error("feed_build_rejected: %s; keeping version %d", reason, self._version)
+        raise FeedBuildError(reason)
+
+    def _drain_dirty(self) -> Set[str]:
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        journal = self.artifact_dir / _JOURNAL
+        draining = journal.with_name(f"{_JOURNAL}.{os.getpid()}")
+        try:
+            os.replace(journal, draining)
+        except FileNotFoundError:
+            return dirty
+        try:
+            dirty.update(line.strip() for line in draining.read_text().splitlines() if line.strip())
+        finally:
+            draining.unlink(missing_ok=True)
+        return dirty
+
+    def _publish(self, names: Set[str]) -> None:
+        """Write new versions of the named feeds, then swap the manifest."""
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        self._version += 1
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        artifacts = dict(self._artifacts)
+        for name in sorted(names):
+            spec = FEED_SPECS[name]
+            path = self.artifact_dir / f"{name}.{self._version:06d}.gz"
+            tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+                for chunk in iter_framed(spec.frame(), self._fragments[name].values()):
+                    data = chunk.encode("utf-8")
+                    digest.update(data)
+                    size += len(data)
+                    gz.write(data)
+            os.replace(tmp, path)
+            artifacts[name] = FeedArtifact(
+                name=name,
+                version=self._version,
+                path=path,
+                media_type=spec.media_type,
+                etag=f'"{digest.hexdigest()[:32]}"',
+                last_modified=now,
+                size=size,
+                compressed_size=path.stat().st_size,
+            )
+
+        manifest = {
+            "version": self._version,
+            "feeds": {
+                name: {
+                    "file": a.path.name,
+                    "version": a.version,
+                    "media_type": a.media_type,
+                    "etag": a.etag,
+                    "last_modified": a.last_modified.isoformat(),
+                    "size": a.size,
+                    "compressed_size": a.compressed_size,
+                }
+                for name, a in artifacts.items()
+            },
+        }
+        tmp_manifest = self.artifact_dir / f"{_MANIFEST}.tmp{os.getpid()}"
+        tmp_manifest.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_manifest, self.artifact_dir / _MANIFEST)
+        self._artifacts = artifacts
+        self._prune(names)
+        logger.info("feed_artifacts_published: version=%d feeds=%s", self._version, sorted(names))
+
+    def _prune(self, names: Set[str]) -> None:
+        """Keep the newest `keep_versions` files per feed (older readers may still be streaming)."""
+        for name in names:
+            versions: List[Path] = sorted(self.artifact_dir.glob(f"{name}.*.gz"))
+            for old in versions[:-self.keep_versions]:
+                old.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background refresh loop (no-op unless enabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background loop and wait for it to exit."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        self._wake = None
+
+    async def _run(self) -> None:
+        last_full = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_full >= self.full_rebuild_s or not self._fragments:
+                    # Stamped up front: a rejected periodic rebuild is retried on
+                    # the next full-rebuild interval, not every refresh tick.
+                    last_full = time.monotonic()
+                    await asyncio.to_thread(self.rebuild)
+                else:
+                    await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("feed_materializer_refresh_failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+# Global materializer instance
+feed_materializer = FeedMaterializer()
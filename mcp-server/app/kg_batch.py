@@ -0,0 +1,367 @@
+"""
+Batched knowledge-graph ingestion.
+
+KnowledgeGraphBuilder.create_laptop_node and its siblings write one product
+per statement: each call MERGEs the product, every component / entity node it
+references and the edges between them. Loading a catalog that way costs one
+round trip (and one transaction) per product.
+
+GraphBatch decomposes the same product dicts into the nodes and edges those
+methods would write, grouped by label and relationship type:
+
+    batch = GraphBatch()
+    for data in laptop_rows:
+        batch.add_laptop(data)
+    stats = KGBatchLoader(conn, batch_size=500).load(batch)
+
+KGBatchLoader then writes each group with one parameterized statement per
+chunk of rows:
+
+    UNWIND $rows AS row
+    MERGE (n:CPU {model: row.key.model})
+    SET n += row.props
+
+Entity nodes are deduplicated in Python (later rows overwrite earlier
+properties, as the sequential SETs did), all node groups are written before
+any edge group, and edges MATCH their endpoints through the unique/indexed
+key properties created by create_indexes_and_constraints(). A chunk that
+fails is retried row by row so one bad record does not drop its neighbours.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# (labels, key property names), e.g. ("Laptop:Product", ("product_id",))
+NodeGroup = Tuple[str, Tuple[str, ...]]
+# (rel_type, src group, dst group, merge property names)
+EdgeGroup = Tuple[str, NodeGroup, NodeGroup, Tuple[str, ...]]
+
+PRODUCT_KEY = ("product_id",)
+
+
+def _check_identifier(name: str) -> str:
+    for part in name.split(":"):
+        if not _IDENTIFIER_RE.match(part):
+            raise ValueError(f"Invalid Cypher identifier: {name!r}")
+    return name
+
+
+def _present(value: Any) -> bool:
+    """FOREACH guard used by the per-product queries: not null and not ''."""
+    return value is not None and value != ""
+
+
+@dataclass
+class GraphBatch:
+    """Nodes and edges to write, grouped by label and relationship type."""
+
+    nodes: Dict[NodeGroup, Dict[Tuple[Any, ...], Dict[str, Any]]] = field(default_factory=dict)
+    edges: Dict[EdgeGroup, List[Dict[str, Any]]] = field(default_factory=dict)
+    # Groups whose nodes / edges get a datetime() stamp property on write
+    stamped: Dict[Any, str] = field(default_factory=dict)
+
+    #  Generic primitives
+
+    def add_node(
+        self,
+        labels: str,
+        key: Dict[str, Any],
+        props: Optional[Dict[str, Any]] = None,
+        stamp: Optional[str] = None,
+    ) -> Optional[NodeGroup]:
+        """MERGE a node on ``key`` and SET ``props``. Nodes with a null key are skipped."""
+        if any(v is None for v in key.values()):
+            return None
+        group = (_check_identifier(labels), tuple(_check_identifier(k) for k in key))
+        rows = self.nodes.setdefault(group, {})
+        entry = rows.setdefault(tuple(key.values()), {"key": dict(key), "props": {}})
+        if props:
+            for name in props:
+                _check_identifier(name)
+            entry["props"].update(props)
+        if stamp:
+            self.stamped[group] = _check_identifier(stamp)
+        return group
+
+    def add_edge(
+        self,
+        rel_type: str,
+        src: NodeGroup,
+        src_key: Dict[str, Any],
+        dst: NodeGroup,
+        dst_key: Dict[str, Any],
+        props: Optional[Dict[str, Any]] = None,
+        merge_props: Optional[Dict[str, Any]] = None,
+        stamp: Optional[str] = None,
+    ) -> None:
+        """MERGE (src)-[:rel_type {merge_props}]->(dst) and SET ``props``."""
+        merge_props = merge_props or {}
+        group = (
+            _check_identifier(rel_type),
+            src,
+            dst,
+            tuple(_check_identifier(k) for k in merge_props),
+        )
+        for name in props or {}:
+            _check_identifier(name)
+        self.edges.setdefault(group, []).append(
+            {"src": dict(src_key), "dst": dict(dst_key), "merge": dict(merge_props), "props": dict(props or {})}
+        )
+        if stamp:
+            self.stamped[group] = _check_identifier(stamp)
+
+    def _entity(
+        self,
+        product: NodeGroup,
+        product_id: str,
+        rel_type: str,
+        labels: str,
+        key: Dict[str, Any],
+        props: Optional[Dict[str, Any]] = None,
+        merge_props: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        group = self.add_node(labels, key, props)
+        if product is not None and group is not None:
+            self.add_edge(rel_type, product, {"product_id": product_id}, group, key, merge_props=merge_props)
+
+    def _product(self, labels: str, data: Dict[str, Any], props: Dict[str, Any]) -> Tuple[Optional[NodeGroup], str]:
+        product_id = data["product_id"]
+        return self.add_node(labels, {"product_id": product_id}, props, stamp="created_at"), product_id
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.nodes.values()) + sum(len(rows) for rows in self.edges.values())
+
+    #  Product decompositions (same graph as KnowledgeGraphBuilder.create_*_node)
+
+    def add_laptop(self, d: Dict[str, Any]) -> str:
+        group, pid = self._product("Laptop:Product", d, {
+            "name": d["name"], "brand": d["brand"], "model": d["model"], "price": d["price"],
+            "description": d["description"], "image_url": d["image_url"], "category": "Electronics",
+            "subcategory": d["subcategory"], "available": d["available"], "weight_kg": d["weight_kg"],
+            "portability_score": d["portability_score"], "battery_life_hours": d["battery_life_hours"],
+            "screen_size_inches": d["screen_size_inches"], "refresh_rate_hz": d["refresh_rate_hz"],
+        })
+        self._entity(group, pid, "MANUFACTURED_BY", "Manufacturer", {"name": d["brand"]}, {
+            "country": d["manufacturer_country"], "founded_year": d["manufacturer_founded"],
+            "website": d["manufacturer_website"],
+        })
+        self._entity(group, pid, "HAS_CPU", "CPU", {"model": d["cpu_model"]}, {
+            "manufacturer": d["cpu_manufacturer"], "cores": d["cpu_cores"], "threads": d["cpu_threads"],
+            "base_clock_ghz": d["cpu_base_clock"], "boost_clock_ghz": d["cpu_boost_clock"],
+            "tdp_watts": d["cpu_tdp"], "generation": d["cpu_generation"], "tier": d["cpu_tier"],
+        })
+        if d.get("gpu_model") is not None:
+            self._entity(group, pid, "HAS_GPU", "GPU", {"model": d["gpu_model"]}, {
+                "manufacturer": d["gpu_manufacturer"], "vram_gb": d["gpu_vram"],
+                "memory_type": d["gpu_memory_type"], "tdp_watts": d["gpu_tdp"], "tier": d["gpu_tier"],
+                "ray_tracing": d["gpu_ray_tracing"],
+            })
+        self._entity(group, pid, "HAS_RAM", "RAM", {"capacity_gb": d["ram_capacity"], "type": d["ram_type"]}, {
+            "speed_mhz": d["ram_speed"], "channels": d["ram_channels"], "expandable": d["ram_expandable"],
+        })
+        self._entity(group, pid, "HAS_STORAGE", "Storage",
+                     {"capacity_gb": d["storage_capacity"], "type": d["storage_type"]}, {
+            "interface": d["storage_interface"], "read_speed_mbps": d["storage_read_speed"],
+            "write_speed_mbps": d["storage_write_speed"], "expandable": d["storage_expandable"],
+        })
+        self._entity(group, pid, "HAS_DISPLAY", "Display",
+                     {"size_inches": d["screen_size_inches"], "resolution": d["display_resolution"]}, {
+            "panel_type": d["display_panel_type"], "refresh_rate_hz": d["refresh_rate_hz"],
+            "brightness_nits": d["display_brightness"], "color_gamut": d["display_color_gamut"],
+            "touch_screen": d["display_touch"],
+        })
+        return pid
+
+    def add_book(self, d: Dict[str, Any]) -> str:
+        group, pid = self._product("Book:Product", d, {
+            "title": d["title"], "name": d["name"], "price": d["price"], "description": d["description"],
+            "image_url": d["image_url"], "category": "Books", "isbn": d["isbn"], "pages": d["pages"],
+            "language": d["language"], "publication_year": d["publication_year"], "edition": d["edition"],
+            "format": d["format"], "available": d["available"],
+        })
+        self._entity(group, pid, "WRITTEN_BY", "Author", {"name": d["author"]}, {
+            "nationality": d["author_nationality"], "birth_year": d["author_birth_year"],
+            "biography": d["author_biography"], "awards": d["author_awards"],
+        })
+        self._entity(group, pid, "PUBLISHED_BY", "Publisher", {"name": d["publisher"]}, {
+            "country": d["publisher_country"], "founded_year": d["publisher_founded"],
+            "website": d["publisher_website"],
+        }, merge_props={"year": d["publication_year"]})
+        self._entity(group, pid, "BELONGS_TO_GENRE", "Genre", {"name": d["genre"]},
+                     {"description": d["genre_description"]})
+        for theme in d.get("themes") or []:
+            self._entity(group, pid, "EXPLORES_THEME", "Theme", {"name": theme})
+        if d.get("series_name") is not None and d.get("series_position") is not None:
+            self._entity(group, pid, "PART_OF_SERIES", "Series", {"name": d["series_name"]},
+                         {"total_books": d.get("series_total_books")},
+                         merge_props={"position": d["series_position"]})
+        return pid
+
+    def _branded(self, group: Optional[NodeGroup], pid: str, d: Dict[str, Any], *entities: Tuple[str, str, str]) -> None:
+        if _present(d.get("brand")):
+            self._entity(group, pid, "BRANDED_BY", "Brand", {"name": d["brand"]})
+        for field_name, rel_type, labels in entities:
+            if _present(d.get(field_name)):
+                self._entity(group, pid, rel_type, labels, {"name": d[field_name]})
+
+    def add_jewelry(self, d: Dict[str, Any]) -> str:
+        group, pid = self._product("Jewelry:Product", d, {
+            "name": d["name"], "brand": d["brand"], "price": d["price"], "description": d["description"],
+            "image_url": d["image_url"], "category": "Jewelry", "subcategory": d["subcategory"],
+            "color": d["color"], "available": d["available"],
+        })
+        self._branded(group, pid, d, ("material", "MADE_OF", "Material"), ("item_type", "IS_TYPE", "ItemType"))
+        return pid
+
+    def add_accessory(self, d: Dict[str, Any]) -> str:
+        group, pid = self._product("Accessory:Product", d, {
+            "name": d["name"], "brand": d["brand"], "price": d["price"], "description": d["description"],
+            "image_url": d["image_url"], "category": "Accessories", "subcategory": d["subcategory"],
+            "color": d["color"], "available": d["available"],
+        })
+        self._branded(group, pid, d, ("item_type", "IS_TYPE", "ItemType"))
+        return pid
+
+    def add_generic_product(self, d: Dict[str, Any]) -> str:
+        group, pid = self._product("Product", d, {
+            "name": d["name"], "brand": d["brand"], "price": d["price"], "description": d["description"],
+            "image_url": d["image_url"], "category": d["category"], "subcategory": d["subcategory"],
+            "product_type": d["product_type"], "color": d["color"], "available": d["available"],
+            "source": d["source"],
+        })
+        self._branded(group, pid, d)
+        self._entity(group, pid, "IN_CATEGORY", "Category", {"name": d["category"]})
+        return pid
+
+    def add_comparison(self, product_id1: str, product_id2: str, comparison_type: str, score: float) -> None:
+        """Batched create_comparison_relationships."""
+        product = ("Product", PRODUCT_KEY)
+        self.add_edge(comparison_type, product, {"product_id": product_id1}, product,
+                      {"product_id": product_id2}, props={"score": score}, stamp="calculated_at")
+
+
+#  Writer
+
+
+def node_query(group: NodeGroup, stamp: Optional[str] = None) -> str:
+    labels, key_fields = group
+    key = ", ".join(f"{k}: row.key.{k}" for k in key_fields)
+    stamp_clause = f", n.{stamp} = datetime()" if stamp else ""
+    return f"UNWIND $rows AS row\nMERGE (n:{labels} {{{key}}})\nSET n += row.props{stamp_clause}"
+
+
+def _match_label(group: NodeGroup) -> str:
+    # Products are matched through the Product.product_id uniqueness constraint
+    labels, key_fields = group
+    return "Product" if key_fields == PRODUCT_KEY else labels
+
+
+def edge_query(group: EdgeGroup, stamp: Optional[str] = None) -> str:
+    rel_type, src, dst, merge_fields = group
+    src_key = ", ".join(f"{k}: row.src.{k}" for k in src[1])
+    dst_key = ", ".join(f"{k}: row.dst.{k}" for k in dst[1])
+    merge = " {" + ", ".join(f"{k}: row.merge.{k}" for k in merge_fields) + "}" if merge_fields else ""
+    stamp_clause = f", r.{stamp} = datetime()" if stamp else ""
+    return (
+        "UNWIND $rows AS row\n"
+        f"MATCH (a:{_match_label(src)} {{{src_key}}})\n"
+        f"MATCH (b:{_match_label(dst)} {{{dst_key}}})\n"
+        f"MERGE (a)-[r:{rel_type}{merge}]->(b)\n"
+        f"SET r += row.props{stamp_clause}"
+    )
+
+
+def _run_rows(tx, query: str, rows: List[Dict[str, Any]]):
+    return tx.run(query, rows=rows).consume()
+
+
+@dataclass
+class LoadStats:
+    """Per-group and total throughput of a KGBatchLoader.load() call."""
+
+    rows: int = 0
+    batches: int = 0
+    failed_rows: int = 0
+    seconds: float = 0.0
+    groups: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class KGBatchLoader:
+    """
+    Writes a GraphBatch in UNWIND transactions of ``batch_size`` rows.
+
+    Args:
+        connection: Neo4jConnection (uses its driver and database).
+        batch_size: Rows per UNWIND transaction.
+        progress: Callable receiving one progress line per chunk (default: print).
+    """
+
+    def __init__(self, connection, batch_size: int = 500, progress: Optional[Callable[[str], None]] = print):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.driver = connection.driver
+        self.database = connection.database
+        self.batch_size = batch_size
+        self.progress = progress
+
+    def load(self, batch: GraphBatch) -> LoadStats:
+        stats = LoadStats()
+        started = time.perf_counter()
+        # Nodes first so every edge finds both endpoints
+        for group, rows in batch.nodes.items():
+            self._write(node_query(group, batch.stamped.get(group)), list(rows.values()),
+                        f"(:{group[0]})", stats)
+        for group, rows in batch.edges.items():
+            self._write(edge_query(group, batch.stamped.get(group)), rows, f"[:{group[0]}]", stats)
+        stats.seconds = time.perf_counter() - started
+        self._report(
+            f"Loaded {stats.rows} rows in {stats.batches} batches, {stats.seconds:.1f}s "
+            f"({stats.rows_per_second:.0f} rows/s), {stats.failed_rows} failed"
+        )
+        return stats
+
+    def _write(self, query: str, rows: List[Dict[str, Any]], name: str, stats: LoadStats) -> None:
+        started = time.perf_counter()
+        written = failed = 0
+        with self.driver.session(database=self.database) as session:
+            for chunk in _chunks(rows, self.batch_size):
+                try:
+                    session.execute_write(_run_rows, query, chunk)
+                    written += len(chunk)
+                except Exception as e:
+                    self._report(f"   [WARN] {name} batch of {len(chunk)} failed ({e}); retrying row by row")
+                    for row in chunk:
+                        try:
+                            session.execute_write(_run_rows, query, [row])
+                            written += 1
+                        except Exception:
+                            failed += 1
+                stats.batches += 1
+                elapsed = time.perf_counter() - started
+                self._report(
+                    f"   {name}: {written + failed}/{len(rows)} "
+                    f"({(written + failed) / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+        elapsed = time.perf_counter() - started
+        stats.rows += written
+        stats.failed_rows += failed
+        stats.groups.append({"group": name, "rows": written, "failed": failed, "seconds": elapsed})
+
+    def _report(self, line: str) -> None:
+        if self.progress is not None:
+            self.progress(line)
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
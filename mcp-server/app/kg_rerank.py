@@ -0,0 +1,202 @@
+"""
+Latency-budgeted KG re-ranking for the chat search path.
+
+_search_ecommerce_products used to call KnowledgeGraphService.search_candidates
+synchronously after the store search, so a slow or reconnecting Neo4j held up
+every recommendation. The KG lookup only depends on the filters, so it can
+run alongside the store search:
+
+    lookup = kg_reranker.start(query, filters, limit)   # before the store search
+    ...store search...
+    kg_ids = await kg_reranker.collect(lookup)          # waits at most the budget
+
+- start() submits the lookup to a small thread pool (the Neo4j driver is
+  synchronous) and returns immediately. Boosts for a query seen within the
+  TTL are served from an in-process LRU without touching Neo4j.
+- collect() waits only for what is left of the budget, measured from
+  start(). A lookup that misses the deadline is counted and the request
+  goes ahead with store ordering; the lookup keeps running and caches its
+  result, so the next identical query gets the boost.
+- When every worker is busy (Neo4j hanging) new lookups are skipped rather
+  than queued behind them.
+
+Budget / cache knobs come from env (KG_RERANK_BUDGET_MS, KG_RERANK_CACHE_TTL,
+KG_RERANK_CACHE_SIZE, KG_RERANK_WORKERS); stats() is exported on /metrics.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, int]
+
+
+def _cache_key(query: str, filters: Dict[str, Any], limit: int) -> CacheKey:
+    return (query, json.dumps(filters, sort_keys=True, default=str), limit)
+
+
+@dataclass
+class KGLookup:
+    """Handle for one in-flight (or already answered) KG candidate lookup."""
+
+    key: Optional[CacheKey]
+    started: float
+    future: Optional[Future] = None
+    result: Optional[List[str]] = None
+
+
+class KGReranker:
+    """Runs KG candidate searches off the request path under a latency budget."""
+
+    def __init__(
+        self,
+        budget_ms: Optional[float] = None,
+        cache_ttl_s: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.budget_ms = budget_ms if budget_ms is not None else float(os.getenv("KG_RERANK_BUDGET_MS", "150"))
+        self.cache_ttl_s = cache_ttl_s if cache_ttl_s is not None else float(os.getenv("KG_RERANK_CACHE_TTL", "300"))
+        self.cache_size = cache_size or int(os.getenv("KG_RERANK_CACHE_SIZE", "512"))
+        self.max_workers = max_workers or int(os.getenv("KG_RERANK_WORKERS", "4"))
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache: "OrderedDict[CacheKey, Tuple[float, List[str]]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.cache_hits = 0
+        self.on_time = 0
+        self.budget_expired = 0
+        self.skipped_busy = 0
+        self.errors = 0
+        self.late_completions = 0
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def start(self, query: str, filters: Dict[str, Any], limit: int) -> KGLookup:
+        """Begin a lookup; never blocks on Neo4j."""
+        key = _cache_key(query, filters, limit)
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return KGLookup(key=key, started=now, result=list(cached[1]))
+            future = self._inflight.get(key)
+            if future is None:
+                if len(self._inflight) >= self.max_workers:
+                    self.skipped_busy += 1
+                    return KGLookup(key=None, started=now, result=[])
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="kg-rerank")
+                future = self._executor.submit(self._fetch, key, dict(filters))
+                self._inflight[key] = future
+        return KGLookup(key=key, started=now, future=future)
+
+    async def collect(self, lookup: KGLookup) -> List[str]:
+        """KG candidate IDs if they arrive within the budget, else []."""
+        if lookup.future is None:
+            return list(lookup.result or [])
+        remaining = self.budget_ms / 1000.0 - (time.monotonic() - lookup.started)
+        try:
+            if lookup.future.done():
+                ids = lookup.future.result()
+            else:
+                ids = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(lookup.future)), max(remaining, 0.0)
+                )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.budget_expired += 1
+            return []
+        except Exception:
+            # Already logged and counted in _fetch
+            return []
+        with self._lock:
+            self.on_time += 1
+        return list(ids)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _fetch(self, key: CacheKey, filters: Dict[str, Any]) -> List[str]:
+        query, _, limit = key
+        started = time.monotonic()
+        try:
+            from app.kg_service import get_kg_service
+
+            kg = get_kg_service()
+            if not kg.is_available():
+                return []
+            ids, explanation = kg.search_candidates(query=query, filters=filters, limit=limit)
+            if explanation.get("error"):
+                raise RuntimeError(explanation["error"])
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._cache[key] = (time.monotonic() + self.cache_ttl_s, list(ids))
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                if elapsed * 1000.0 > self.budget_ms:
+                    self.late_completions += 1
+            try:
+                from app.metrics import metrics_collector
+
+                metrics_collector.record_stage("kg", elapsed * 1000.0)
+            except Exception:
+                pass
+            return ids
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning("kg_rerank_failed: %s", e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /metrics."""
+        with self._lock:
+            return {
+                "budget_ms": self.budget_ms,
+                "lookups": self.lookups,
+                "cache_hits": self.cache_hits,
+                "on_time": self.on_time,
+                "budget_expired": self.budget_expired,
+                "budget_expired_rate": self.budget_expired / self.lookups if self.lookups else 0.0,
+                "late_completions": self.late_completions,
+                "skipped_busy": self.skipped_busy,
+                "errors": self.errors,
+                "inflight": len(self._inflight),
+                "cached_queries": len(self._cache),
+            }
+
+    def clear(self) -> None:
+        """Drop cached boosts (counters are kept)."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Global instance used by agent/chat_endpoint.py
+kg_reranker = KGReranker()
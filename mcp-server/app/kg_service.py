@@ -14,6 +14,8 @@ Per week4notes.txt:
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,19 @@ except ImportError:
     NEO4J_AVAILABLE = False
     logger.warning("neo4j driver not installed. Install with: pip install neo4j")
 
+# Index / property names created by KnowledgeGraphBuilder.create_indexes_and_constraints
+FULLTEXT_INDEX = "product_text"
+CONNECTIVITY_INDEX = "product_connectivity"
+# Seconds between re-checks of which search indexes are online (graph may be rebuilt)
+CAPABILITY_TTL_SECONDS = 300.0
+
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def fulltext_phrase(text: str) -> str:
+    """Lucene phrase query for text: special characters escaped, terms kept in order."""
+    return '"' + _LUCENE_SPECIAL.sub(r"\\\1", text) + '"'
+
 
 class KnowledgeGraphService:
     """
@@ -48,6 +63,8 @@ class KnowledgeGraphService:
             user: Neo4j user (or set NEO4J_USER env).
             password: Neo4j password — set via NEO4J_PASSWORD env only; do not hardcode.
         """
+        self._capabilities: Optional[Dict[str, bool]] = None
+        self._capabilities_checked = 0.0
         if not NEO4J_AVAILABLE:
             self.driver = None
             logger.warning("Neo4j not available - KG features disabled")
@@ -77,6 +94,35 @@ class KnowledgeGraphService:
     def is_available(self) -> bool:
         """Check if KG is available."""
         return self.driver is not None
+
+    def _search_capabilities(self) -> Dict[str, bool]:
+        """
+        Which search indexes this graph has, re-checked every CAPABILITY_TTL_SECONDS.
+
+        Graphs built before the full-text index / materialized connectivity
+        existed fall back to the CONTAINS + OPTIONAL MATCH query.
+        """
+        now = time.monotonic()
+        if self._capabilities is not None and now - self._capabilities_checked < CAPABILITY_TTL_SECONDS:
+            return self._capabilities
+        caps = {"fulltext": False, "connectivity": False}
+        try:
+            with self.driver.session() as session:
+                online = {
+                    record["name"]
+                    for record in session.run(
+                        "SHOW INDEXES YIELD name, state WHERE state = 'ONLINE' RETURN name"
+                    )
+                }
+                caps["fulltext"] = FULLTEXT_INDEX in online
+                if CONNECTIVITY_INDEX in online:
+                    caps["connectivity"] = session.run(
+                        "MATCH (p:Product) WHERE p.connectivity IS NOT NULL RETURN p.product_id LIMIT 1"
+                    ).single() is not None
+        except Exception as e:
+            logger.warning(f"KG index check failed, using unindexed search: {e}")
+        self._capabilities, self._capabilities_checked = caps, now
+        return caps
     
     def search_candidates(
         self,
@@ -103,11 +149,16 @@ class KnowledgeGraphService:
             return [], {}
         
         try:
+            caps = self._search_capabilities()
             with self.driver.session() as session:
-                cypher_query = self._build_cypher_query(query, filters, limit)
+                cypher_query = self._build_cypher_query(
+                    query, filters, limit,
+                    fulltext=caps["fulltext"], materialized_connectivity=caps["connectivity"],
+                )
                 params = {"limit": limit, **self._extract_filters(filters or {})}
                 if query and len(query) >= 2:
                     params["q"] = query.lower()[:50]
+                    params["q_fulltext"] = fulltext_phrase(params["q"])
                 result = session.run(cypher_query, params)
                 
                 product_ids = []
@@ -138,22 +189,29 @@ class KnowledgeGraphService:
         self,
         query: str,
         filters: Optional[Dict[str, Any]],
-        limit: int
+        limit: int,
+        fulltext: bool = True,
+        materialized_connectivity: bool = True,
     ) -> str:
         """
         Build Cypher query for product search with hard and soft constraints.
 
         Hard constraints (WHERE clause): category, price bounds, brand, subcategory,
             repairable, refurbished, battery_life_min.  Products that fail these are
-            excluded entirely — they are non-negotiable requirements.
+            excluded entirely — they are non-negotiable requirements.  Category and
+            price are served by the (category, price) range index.
 
         Soft constraints (scoring): use-case flags (good_for_gaming, good_for_ml, …)
             and text match.  Products that don't have these flags are still shown but
             ranked lower.  This preserves recall when the KG hasn't been fully
-            back-filled with use-case attributes.
+            back-filled with use-case attributes.  With ``fulltext`` the text match
+            is one phrase lookup in the product_text full-text index; without it,
+            every filtered product is scanned with CONTAINS.
 
         Connectivity bonus: products with more SIMILAR_TO outgoing edges are ranked
             higher, acting as a graph-centrality signal for popular/well-connected items.
+            With ``materialized_connectivity`` this reads p.connectivity (maintained by
+            KnowledgeGraphBuilder); without it, edges are counted per query.
         """
         # ── Hard constraints (WHERE) ─────────────────────────────────────────
         category = (filters or {}).get("category", "Electronics")
@@ -196,21 +254,35 @@ class KnowledgeGraphService:
                     )
 
         # Text match is also soft: preferred but not required
+        text_hits = ""
         if query and len(query) >= 2:
-            soft_score_cases.append(
-                "CASE WHEN (toLower(coalesce(p.subcategory, '')) CONTAINS $q OR "
-                "toLower(coalesce(p.name, '')) CONTAINS $q OR "
-                "toLower(coalesce(p.description, '')) CONTAINS $q) THEN 3 ELSE 0 END"
-            )
+            if fulltext and re.search(r"\w", query):
+                text_hits = (
+                    f"CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $q_fulltext) YIELD node\n"
+                    "            WITH collect(node) AS text_hits"
+                )
+                soft_score_cases.append("CASE WHEN p IN text_hits THEN 3 ELSE 0 END")
+            elif not fulltext:
+                soft_score_cases.append(
+                    "CASE WHEN (toLower(coalesce(p.subcategory, '')) CONTAINS $q OR "
+                    "toLower(coalesce(p.name, '')) CONTAINS $q OR "
+                    "toLower(coalesce(p.description, '')) CONTAINS $q) THEN 3 ELSE 0 END"
+                )
+
+        if materialized_connectivity:
+            expand, connectivity = "", "coalesce(p.connectivity, 0)"
+        else:
+            # Counts outgoing SIMILAR_TO edges per product on every query
+            expand, connectivity = "OPTIONAL MATCH (p)-[:SIMILAR_TO]->(nb:Product)", "count(nb)"
 
         if soft_score_cases:
             score_expr = " + ".join(soft_score_cases)
-            # OPTIONAL MATCH counts outgoing SIMILAR_TO edges as a connectivity bonus.
             cypher = f"""
+            {text_hits}
             MATCH (p:Product)
             WHERE {where_clause}
-            OPTIONAL MATCH (p)-[:SIMILAR_TO]->(nb:Product)
-            WITH p, count(nb) AS connectivity,
+            {expand}
+            WITH p, {connectivity} AS connectivity,
                  ({score_expr}) AS relevance_score
             ORDER BY relevance_score DESC, connectivity DESC, p.price ASC
             LIMIT $limit
@@ -223,8 +295,8 @@ class KnowledgeGraphService:
             cypher = f"""
             MATCH (p:Product)
             WHERE {where_clause}
-            OPTIONAL MATCH (p)-[:SIMILAR_TO]->(nb:Product)
-            WITH p, count(nb) AS connectivity
+            {expand}
+            WITH p, {connectivity} AS connectivity
             ORDER BY connectivity DESC, p.price ASC
             LIMIT $limit
             RETURN p.product_id AS product_id, connectivity * 0.1 AS score, [p.name] AS path
@@ -20,6 +20,7 @@ Builds a rich, multi-dimensional knowledge graph with:
 from typing import Dict, Any, List, Optional
 from neo4j import GraphDatabase
 from app.neo4j_config import Neo4jConnection
+from app.kg_batch import GraphBatch, KGBatchLoader, LoadStats
 import json
 import difflib
 
@@ -62,6 +63,23 @@ class KnowledgeGraphBuilder:
             "CREATE INDEX user_session_id IF NOT EXISTS FOR (s:UserSession) ON (s.session_id)",
             "CREATE INDEX session_intent_name IF NOT EXISTS FOR (si:SessionIntent) ON (si.name)",
             "CREATE INDEX step_intent_name IF NOT EXISTS FOR (st:StepIntent) ON (st.name)",
+
+            # Entity keys matched by batched edge writes (kg_batch)
+            "CREATE INDEX brand_name IF NOT EXISTS FOR (b:Brand) ON (b.name)",
+            "CREATE INDEX material_name IF NOT EXISTS FOR (m:Material) ON (m.name)",
+            "CREATE INDEX item_type_name IF NOT EXISTS FOR (it:ItemType) ON (it.name)",
+            "CREATE INDEX category_name IF NOT EXISTS FOR (c:Category) ON (c.name)",
+            "CREATE INDEX theme_name IF NOT EXISTS FOR (t:Theme) ON (t.name)",
+            "CREATE INDEX series_name IF NOT EXISTS FOR (s:Series) ON (s.name)",
+            "CREATE INDEX ram_key IF NOT EXISTS FOR (r:RAM) ON (r.capacity_gb, r.type)",
+            "CREATE INDEX storage_key IF NOT EXISTS FOR (s:Storage) ON (s.capacity_gb, s.type)",
+            "CREATE INDEX display_key IF NOT EXISTS FOR (d:Display) ON (d.size_inches, d.resolution)",
+
+            # Candidate search (KnowledgeGraphService.search_candidates)
+            "CREATE INDEX product_category_price IF NOT EXISTS FOR (p:Product) ON (p.category, p.price)",
+            "CREATE INDEX product_subcategory IF NOT EXISTS FOR (p:Product) ON (p.subcategory)",
+            "CREATE INDEX product_connectivity IF NOT EXISTS FOR (p:Product) ON (p.connectivity)",
+            "CREATE FULLTEXT INDEX product_text IF NOT EXISTS FOR (p:Product) ON EACH [p.name, p.subcategory, p.description]",
         ]
         
         for query in queries:
@@ -72,6 +90,62 @@ class KnowledgeGraphBuilder:
             except Exception as e:
                 print(f"[WARN] {query}: {e}")
     
+    def bulk_load(self, batch: GraphBatch, batch_size: int = 500) -> LoadStats:
+        """
+        Write a GraphBatch in UNWIND transactions of batch_size rows.
+
+        Creates constraints and indexes first and waits for them to come
+        online, so MERGE and the edge MATCHes are index lookups from the
+        first batch on.
+        """
+        self.create_indexes_and_constraints()
+        try:
+            with self.driver.session(database=self.database) as session:
+                session.run("CALL db.awaitIndexes(300)").consume()
+        except Exception as e:
+            print(f"[WARN] awaitIndexes: {e}")
+        stats = KGBatchLoader(self.conn, batch_size=batch_size).load(batch)
+        similar_sources = [
+            row["src"]["product_id"]
+            for group, rows in batch.edges.items() if group[0] == "SIMILAR_TO"
+            for row in rows
+        ]
+        if similar_sources:
+            self.refresh_connectivity(list(dict.fromkeys(similar_sources)))
+        return stats
+
+    def refresh_connectivity(self, product_ids: Optional[List[str]] = None) -> int:
+        """
+        Materialize p.connectivity (outgoing SIMILAR_TO count) on products.
+
+        Candidate search ranks by this property instead of expanding every
+        product's SIMILAR_TO edges per query. create_comparison_relationships
+        and bulk_load keep it current; call with no arguments after editing
+        SIMILAR_TO edges any other way.
+
+        Args:
+            product_ids: Products to refresh (default: all products)
+
+        Returns:
+            Number of products updated
+        """
+        if product_ids is None:
+            query = """
+            MATCH (p:Product)
+            SET p.connectivity = size([(p)-[:SIMILAR_TO]->(:Product) | 1])
+            RETURN count(p) AS updated
+            """
+        else:
+            query = """
+            UNWIND $product_ids AS pid
+            MATCH (p:Product {product_id: pid})
+            SET p.connectivity = size([(p)-[:SIMILAR_TO]->(:Product) | 1])
+            RETURN count(p) AS updated
+            """
+        with self.driver.session(database=self.database) as session:
+            record = session.run(query, {"product_ids": product_ids}).single()
+            return record["updated"] if record else 0
+
     def create_laptop_node(self, laptop_data: Dict[str, Any]) -> str:
         """
         Create a complex laptop node with all components and relationships.
@@ -541,6 +615,9 @@ class KnowledgeGraphBuilder:
         SET r.score = $score,
             r.calculated_at = datetime()
         """
+        if comparison_type == "SIMILAR_TO":
+            # Keep the materialized connectivity score in step with the edges
+            query += "SET p1.connectivity = size([(p1)-[:SIMILAR_TO]->(:Product) | 1])\n"
         
         with self.driver.session(database=self.database) as session:
             session.run(query, {
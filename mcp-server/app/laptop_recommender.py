@@ -17,12 +17,19 @@ Usage:
     
     recommender = LaptopRecommender()
     ranked = recommender.rank_laptops(laptops, user_preferences)
+
+rank_laptops scores the whole pool at once: extract_features() reads each
+laptop a single time into aligned arrays, and score_features() computes
+every sub-score and the weighted total with numpy array operations. The
+per-laptop score_* methods are kept as the reference implementation.
 """
 
 from typing import List, Dict, Any, Optional
 import json
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass
 class UserPreferences:
@@ -44,6 +51,55 @@ class UserPreferences:
             self.disliked_features = []
 
 
+def _contains(texts: np.ndarray, keyword: str) -> np.ndarray:
+    """Elementwise ``keyword in text`` over an array of strings."""
+    return np.char.find(texts, keyword) >= 0
+
+
+def _contains_any(texts: np.ndarray, keywords: List[str]) -> np.ndarray:
+    """Elementwise ``any(kw in text for kw in keywords)``."""
+    return np.logical_or.reduce([_contains(texts, kw) for kw in keywords])
+
+
+def _count_contained(texts: np.ndarray, keywords: List[str]) -> np.ndarray:
+    """Elementwise count of keywords that occur in each text."""
+    return np.sum([_contains(texts, kw) for kw in keywords], axis=0)
+
+
+@dataclass
+class LaptopFeatures:
+    """
+    Columnar view of a candidate pool.
+
+    Every array is aligned with ``laptops``. Nothing here depends on the
+    user's preferences, so one extraction can be scored against several
+    preference sets.
+    """
+    laptops: List[Dict[str, Any]]
+    brands: np.ndarray           # object
+    price: np.ndarray            # dollars
+    gpu_tier: np.ndarray
+    cpu_tier: np.ndarray
+    ram_points: np.ndarray
+    storage_points: np.ndarray
+    gaming_named: np.ndarray     # "gaming" in subcategory or name
+    dedicated_gpu: np.ndarray    # gpu_vendor is NVIDIA or AMD
+    has_gpu_vendor: np.ndarray
+    gaming_keyword: np.ndarray
+    work_keyword: np.ndarray
+    pro_brand: np.ndarray
+    battery_mentioned: np.ndarray
+    school_keyword: np.ndarray
+    creative_keyword: np.ndarray
+    is_apple: np.ndarray
+    portable_hits: np.ndarray
+    heavy_hits: np.ndarray
+    screen_adjust: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.laptops)
+
+
 class LaptopRecommender:
     """
     Advanced recommendation engine for laptops.
@@ -98,6 +154,13 @@ class LaptopRecommender:
         "M2": 70,
     }
     
+    GAMING_KEYWORDS = ["gaming", "rog", "omen", "predator", "legion", "alienware"]
+    WORK_KEYWORDS = ["business", "thinkpad", "latitude", "elitebook", "probook"]
+    SCHOOL_KEYWORDS = ["student", "education", "chromebook"]
+    CREATIVE_KEYWORDS = ["pro", "studio", "creator", "zbook", "precision"]
+    PORTABLE_KEYWORDS = ["air", "ultrabook", "thin", "light", "portable", "slim"]
+    HEAVY_KEYWORDS = ["gaming", "workstation", "17-inch", "17\""]
+    
     def __init__(self):
         """Initialize recommender."""
         pass
@@ -134,14 +197,12 @@ class LaptopRecommender:
                 score += 20  # Has dedicated GPU
             
             # Check for gaming keywords
-            gaming_keywords = ["gaming", "rog", "omen", "predator", "legion", "alienware"]
-            if any(kw in name for kw in gaming_keywords):
+            if any(kw in name for kw in self.GAMING_KEYWORDS):
                 score += 10
         
         # Work use case
         elif use_case == "work":
-            work_keywords = ["business", "thinkpad", "latitude", "elitebook", "probook"]
-            if any(kw in name for kw in work_keywords):
+            if any(kw in name for kw in self.WORK_KEYWORDS):
                 score += 30
             
             # Prefer professional brands
@@ -159,14 +220,12 @@ class LaptopRecommender:
             if 500 <= price <= 1500:
                 score += 30
             
-            school_keywords = ["student", "education", "chromebook"]
-            if any(kw in name or kw in description for kw in school_keywords):
+            if any(kw in name or kw in description for kw in self.SCHOOL_KEYWORDS):
                 score += 20
         
         # Creative use case
         elif use_case == "creative":
-            creative_keywords = ["pro", "studio", "creator", "zbook", "precision"]
-            if any(kw in name for kw in creative_keywords):
+            if any(kw in name for kw in self.CREATIVE_KEYWORDS):
                 score += 30
             
             # Need good GPU for creative work
@@ -179,6 +238,23 @@ class LaptopRecommender:
         
         return min(100, score)
     
+    @staticmethod
+    def _spec_text(laptop: Dict[str, Any]) -> str:
+        """Lower-cased name, description and metadata CPU, searched for spec keywords."""
+        metadata = laptop.get("metadata")
+        cpu = ""
+        if metadata:
+            if isinstance(metadata, str):
+                try:
+                    metadata = json.loads(metadata)
+                except:
+                    metadata = {}
+            cpu = metadata.get("cpu", "")
+        
+        name = laptop.get("name", "")
+        description = laptop.get("description", "")
+        return f"{name} {description} {cpu}".lower()
+    
     def score_specs(self, laptop: Dict[str, Any]) -> float:
         """
         Score laptop specs (0-100).
@@ -198,19 +274,7 @@ class LaptopRecommender:
             score += 30 * 0.4
         
         # CPU scoring
-        metadata = laptop.get("metadata")
-        cpu = ""
-        if metadata:
-            if isinstance(metadata, str):
-                try:
-                    metadata = json.loads(metadata)
-                except:
-                    metadata = {}
-            cpu = metadata.get("cpu", "")
-        
-        name = laptop.get("name", "")
-        description = laptop.get("description", "")
-        combined_text = f"{name} {description} {cpu}".lower()
+        combined_text = self._spec_text(laptop)
         
         for cpu_model, tier_score in self.CPU_TIERS.items():
             if cpu_model.lower() in combined_text:
@@ -273,14 +337,12 @@ class LaptopRecommender:
         score = 50  # Base score
         
         # Positive indicators
-        portable_keywords = ["air", "ultrabook", "thin", "light", "portable", "slim"]
-        for kw in portable_keywords:
+        for kw in self.PORTABLE_KEYWORDS:
             if kw in name or kw in description:
                 score += 10
         
         # Negative indicators (gaming laptops are heavier)
-        heavy_keywords = ["gaming", "workstation", "17-inch", "17\""]
-        for kw in heavy_keywords:
+        for kw in self.HEAVY_KEYWORDS:
             if kw in name:
                 score -= 15
         
@@ -296,6 +358,152 @@ class LaptopRecommender:
         
         return max(0, min(100, score))
     
+    def extract_features(self, laptops: List[Dict[str, Any]]) -> LaptopFeatures:
+        """
+        Read every laptop once into aligned feature arrays.
+        
+        Only the fields that need Python (metadata JSON, brand/vendor
+        lookups) are handled per laptop; keyword and tier matching run as
+        array operations over the lower-cased text columns.
+        """
+        names, subcategories, descriptions, gpu_models, spec_texts = [], [], [], [], []
+        brands, prices, gpu_vendors = [], [], []
+        for laptop in laptops:
+            names.append((laptop.get("name") or "").lower())
+            subcategories.append((laptop.get("subcategory") or "").lower())
+            descriptions.append((laptop.get("description") or "").lower())
+            gpu_models.append(laptop.get("gpu_model") or "")
+            spec_texts.append(self._spec_text(laptop))
+            brands.append(laptop.get("brand"))
+            prices.append(laptop.get("price_cents", 0) / 100)
+            gpu_vendors.append(laptop.get("gpu_vendor"))
+        
+        n = len(laptops)
+        names = np.array(names, dtype=str)
+        descriptions = np.array(descriptions, dtype=str)
+        gpu_models = np.array(gpu_models, dtype=str)
+        spec_texts = np.array(spec_texts, dtype=str)
+        brand_column = np.empty(n, dtype=object)
+        brand_column[:] = brands
+        
+        # First matching tier wins, in table order; no GPU match counts as integrated
+        gpu_tier = np.full(n, np.nan)
+        for gpu, tier_score in self.GPU_TIERS.items():
+            gpu_tier[np.isnan(gpu_tier) & _contains(gpu_models, gpu)] = tier_score
+        gpu_tier[np.isnan(gpu_tier)] = 30
+        
+        cpu_tier = np.full(n, np.nan)
+        for cpu_model, tier_score in self.CPU_TIERS.items():
+            cpu_tier[np.isnan(cpu_tier) & _contains(spec_texts, cpu_model.lower())] = tier_score
+        cpu_tier[np.isnan(cpu_tier)] = 0
+        
+        ram_points = np.select(
+            [_contains_any(spec_texts, ["32gb", "64gb"]), _contains(spec_texts, "16gb"), _contains(spec_texts, "8gb")],
+            [25, 20, 10],
+            0,
+        )
+        storage_points = np.select(
+            [_contains_any(spec_texts, ["2tb", "1tb"]), _contains(spec_texts, "512gb")],
+            [10, 7],
+            0,
+        )
+        screen_adjust = np.select(
+            [_contains(names, "13"), _contains(names, "14"), _contains(names, "15"),
+             _contains_any(names, ["16", "17"])],
+            [15, 10, 0, -10],
+            0,
+        )
+        
+        return LaptopFeatures(
+            laptops=laptops,
+            brands=brand_column,
+            price=np.array(prices, dtype=float),
+            gpu_tier=gpu_tier,
+            cpu_tier=cpu_tier,
+            ram_points=ram_points,
+            storage_points=storage_points,
+            gaming_named=_contains(np.array(subcategories, dtype=str), "gaming") | _contains(names, "gaming"),
+            dedicated_gpu=np.array([v in ["NVIDIA", "AMD"] for v in gpu_vendors], dtype=bool),
+            has_gpu_vendor=np.array([bool(v) for v in gpu_vendors], dtype=bool),
+            gaming_keyword=_contains_any(names, self.GAMING_KEYWORDS),
+            work_keyword=_contains_any(names, self.WORK_KEYWORDS),
+            pro_brand=np.array([b in ["Lenovo", "Dell", "HP"] for b in brands], dtype=bool),
+            battery_mentioned=_contains(descriptions, "battery"),
+            school_keyword=_contains_any(names, self.SCHOOL_KEYWORDS) | _contains_any(descriptions, self.SCHOOL_KEYWORDS),
+            creative_keyword=_contains_any(names, self.CREATIVE_KEYWORDS),
+            is_apple=np.array([b == "Apple" for b in brands], dtype=bool),
+            portable_hits=np.sum(
+                [_contains(names, kw) | _contains(descriptions, kw) for kw in self.PORTABLE_KEYWORDS], axis=0
+            ),
+            heavy_hits=_count_contained(names, self.HEAVY_KEYWORDS),
+            screen_adjust=screen_adjust,
+        )
+    
+    def score_features(
+        self,
+        features: LaptopFeatures,
+        preferences: UserPreferences
+    ) -> Dict[str, np.ndarray]:
+        """
+        Compute every sub-score and the weighted total for a whole pool.
+        
+        Mirrors score_use_case_match, score_specs, score_value_for_money and
+        score_portability term for term, so each array element equals the
+        per-laptop result.
+        
+        Returns:
+            Dict of arrays: use_case, specs, value, portability, total
+        """
+        f = features
+        use_case = preferences.use_case.lower()
+        
+        use_case_score = np.full(len(f), 50.0)
+        if use_case == "gaming":
+            use_case_score += 30 * f.gaming_named + 20 * f.dedicated_gpu + 10 * f.gaming_keyword
+        elif use_case == "work":
+            use_case_score += 30 * f.work_keyword + 10 * f.pro_brand + 10 * f.battery_mentioned
+        elif use_case == "school":
+            use_case_score += 30 * ((f.price >= 500) & (f.price <= 1500)) + 20 * f.school_keyword
+        elif use_case == "creative":
+            use_case_score += 30 * f.creative_keyword + 15 * f.has_gpu_vendor + 10 * f.is_apple
+        use_case_score = np.minimum(100, use_case_score)
+        
+        spec_score = np.minimum(
+            100,
+            f.gpu_tier * 0.4 + f.cpu_tier * 0.35 + f.ram_points * 0.15 + f.storage_points * 0.10,
+        )
+        
+        expected_price = (spec_score / 100) * 3000
+        better_value = np.minimum(100, 50 + (expected_price / np.maximum(f.price, 100) - 1) * 50)
+        worse_value = np.maximum(0, 50 - (f.price / np.maximum(expected_price, 100) - 1) * 30)
+        value_score = np.where(
+            f.price == 0,
+            50.0,
+            np.where(f.price < expected_price, better_value, worse_value),
+        )
+        
+        portability_score = np.clip(
+            50 + 10 * f.portable_hits - 15 * f.heavy_hits + f.screen_adjust, 0, 100
+        ).astype(float)
+        
+        total_score = (
+            use_case_score * 0.30 +
+            spec_score * 0.25 +
+            value_score * 0.20 +
+            portability_score * preferences.portability_importance * 0.15 +
+            50 * 0.10
+        )
+        if preferences.brand_preference:
+            total_score = total_score + 5 * (f.brands == preferences.brand_preference)
+        
+        return {
+            "use_case": use_case_score,
+            "specs": spec_score,
+            "value": value_score,
+            "portability": portability_score,
+            "total": total_score,
+        }
+    
     def rank_laptops(
         self,
         laptops: List[Dict[str, Any]],
@@ -311,38 +519,27 @@ class LaptopRecommender:
         Returns:
             Ranked list of laptops with scores
         """
-        scored_laptops = []
+        if not laptops:
+            return []
         
-        for laptop in laptops:
-            # Calculate component scores
-            use_case_score = self.score_use_case_match(laptop, preferences)
-            spec_score = self.score_specs(laptop)
-            value_score = self.score_value_for_money(laptop)
-            portability_score = self.score_portability(laptop)
-            
-            # Weighted total score
-            total_score = (
-                use_case_score * 0.30 +        # 30%
-                spec_score * 0.25 +             # 25%
-                value_score * 0.20 +            # 20%
-                portability_score * preferences.portability_importance * 0.15 +  # 15%
-                50 * 0.10                       # 10% base
-            )
-            
-            # Apply brand preference bonus
-            if preferences.brand_preference:
-                if laptop.get("brand") == preferences.brand_preference:
-                    total_score += 5
+        scores = {
+            key: column.tolist()
+            for key, column in self.score_features(self.extract_features(laptops), preferences).items()
+        }
+        
+        scored_laptops = []
+        for i, laptop in enumerate(laptops):
+            total_score = scores["total"][i]
             
             # Store scores
             laptop_with_score = dict(laptop)
             laptop_with_score["_recommendation_score"] = total_score
             laptop_with_score["total_score"] = round(total_score, 1)  # Add for compatibility
             laptop_with_score["_score_breakdown"] = {
-                "use_case": round(use_case_score, 1),
-                "specs": round(spec_score, 1),
-                "value": round(value_score, 1),
-                "portability": round(portability_score, 1),
+                "use_case": round(scores["use_case"][i], 1),
+                "specs": round(scores["specs"][i], 1),
+                "value": round(scores["value"][i], 1),
+                "portability": round(scores["portability"][i], 1),
                 "total": round(total_score, 1)
             }
             
@@ -0,0 +1,190 @@
+"""
+Non-blocking JSONL sink for per-request latency logs.
+
+LatencyLoggingMiddleware used to open backend_latency_logs.jsonl and append
+one line per request inside the event loop, so disk IO showed up in tail
+latency and serialized requests. This sink splits the work:
+
+- Hot path: enqueue() appends the entry dict to a bounded in-memory ring
+  buffer — O(1), no serialization, no IO. When the buffer is full the
+  entry is dropped and counted instead of blocking the request.
+- Background task: drains the buffer every flush interval (or as soon as a
+  full batch is waiting), serializes the batch and writes it with a single
+  write() call in a worker thread.
+- Size-based rotation: once the file would exceed max_bytes it is renamed
+  to .1 (.1 -> .2, ...) keeping backup_count old files, like
+  logging.handlers.RotatingFileHandler.
+
+Call start() / stop() from the app lifespan; stop() flushes what is left.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(__file__).parent.parent.parent / "backend_latency_logs.jsonl"
+
+
+class BufferedJsonlSink:
+    """
+    Ring-buffered, batch-writing JSONL log sink with rotation.
+
+    deque.append / popleft are atomic in CPython, so enqueue() is safe from
+    any thread without a lock.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        capacity: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_s: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        backup_count: Optional[int] = None,
+    ):
+        self.path = Path(path or os.getenv("LATENCY_LOG_PATH") or _DEFAULT_PATH)
+        self.capacity = capacity or int(os.getenv("LATENCY_LOG_BUFFER", "10000"))
+        self.batch_size = batch_size or int(os.getenv("LATENCY_LOG_BATCH", "500"))
+        self.flush_interval_s = flush_interval_s or float(os.getenv("LATENCY_LOG_FLUSH_S", "1.0"))
+        self.max_bytes = max_bytes or int(os.getenv("LATENCY_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.backup_count = backup_count if backup_count is not None else int(
+            os.getenv("LATENCY_LOG_BACKUPS", "5")
+        )
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._file_size: Optional[int] = None
+        # A cancelled drain task may still be writing in its worker thread
+        # when stop() flushes; serialize file access between the two.
+        self._write_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+
+    def enqueue(self, entry: Dict[str, Any]) -> bool:
+        """Buffer one log entry. Returns False (and counts a drop) if full."""
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._buffer.append(entry)
+        self.enqueued += 1
+        if len(self._buffer) == self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Serialize and append one batch (runs in a worker thread)."""
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in batch).encode("utf-8")
+        with self._write_lock:
+            self._append(data, len(batch))
+
+    def _append(self, data: bytes, count: int) -> None:
+        try:
+            if self._file_size is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file_size = self.path.stat().st_size if self.path.exists() else 0
+            if self._file_size and self._file_size + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._file_size += len(data)
+            self.written += count
+            self.batches += 1
+        except OSError as e:
+            self.write_errors += 1
+            logger.warning("latency_log_write_failed: %s", e)
+
+    def _rotate(self) -> None:
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._file_size = 0
+        self.rotations += 1
+
+    def flush(self) -> None:
+        """Synchronously write everything currently buffered."""
+        while self._buffer:
+            self._write_batch(self._take_batch())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._buffer:
+                await asyncio.to_thread(self._write_batch, self._take_batch())
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background drain task on the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the drain task and flush the remaining buffer."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+            self._loop = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for /metrics."""
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "backlog": len(self._buffer),
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+        }
+
+
+# Global sink used by LatencyLoggingMiddleware
+latency_log_sink = BufferedJsonlSink()
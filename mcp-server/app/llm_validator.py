@@ -5,11 +5,33 @@ Uses Claude/GPT to intelligently detect and correct:
 1. Misspellings and typos
 2. Invalid/gibberish input
 3. Intent understanding
+
+Most inputs are already clean ("gaming laptop under $1500", "Dell", "yes"),
+so validation is tiered: classify_locally() scores every input from
+vocabulary hits, typo distance to the nearest vocabulary word and the slots
+parse_query() extracts, and the LLM is only asked when that confidence is
+below LLM_VALIDATOR_FAST_PATH_THRESHOLD. Replay the labelled set in
+scripts/data/validator_replay.json with
+scripts/benchmark_validator_fast_path.py to see calls avoided and accuracy.
 """
 
 import os
 import re
-from typing import Tuple, Optional, Dict
+from functools import lru_cache
+from typing import Tuple, Optional, Dict, List
+
+from app.query_normalizer import FuzzyIndex, DEFAULT_DICTIONARY, normalize_typos
+from app.query_parse import (
+    BOOK_KEYWORDS,
+    BRAND_MAP,
+    DESKTOP_PC_PHRASES,
+    LAPTOP_KEYWORDS,
+    PHONE_KEYWORDS,
+    VEHICLE_KEYWORDS,
+    extract_price_range,
+    parse_query,
+)
+from app.query_parser import USE_CASE_MAP
 
 try:
     from anthropic import Anthropic
@@ -19,12 +41,114 @@ except ImportError:
     Anthropic = None
 
 
+# Inputs at or above this local confidence skip the LLM round trip.
+FAST_PATH_THRESHOLD = float(os.getenv("LLM_VALIDATOR_FAST_PATH_THRESHOLD", "0.85"))
+
+# Words that are normal in a shopping message but carry no slot on their own.
+_FILLER_WORDS = frozenset("""
+    a an the i im me my we our you your it its this that these those some any
+    is are am be was for to of in on at by with and or but not from as so
+    need needs want wants looking look find show get buy give recommend suggest
+    something anything one ones good great best nice cheap cheaper cheapest new
+    used under over below above around about between less more than max min
+    maximum minimum least most budget price prices priced cost dollars usd
+    gb tb inch inches hour hours year years please can could would like
+    what which also just only very really much too fast light thin there here
+    other all
+""".split())
+
+# Spec and model words: known, but only a slot when parse_query extracts one.
+_SPEC_WORDS = frozenset([
+    "ram", "ssd", "hdd", "storage", "screen", "display", "battery", "life",
+    "memory", "processor", "oled", "touchscreen", "keyboard", "pro", "air",
+    "max", "mini", "plus", "ultra", "size", "weight", "color", "model",
+])
+
+_GREETINGS = frozenset(["hi", "hello", "hey", "yo"])
+
+# Answers to an interview question; only confident inside a conversation.
+_SHORT_RESPONSES = frozenset([
+    "yes", "no", "ok", "okay", "sure", "maybe", "yeah", "yep", "nope",
+    "thanks", "thank", "none", "either", "whatever", "preference", "matter",
+])
+
+# Deliberate misspellings in the routing keyword lists; left out of the
+# vocabulary so they are corrected instead of counting as hits.
+_KNOWN_MISSPELLINGS = frozenset(["lapto", "lpatop", "computr", "notbook", "notbooks"])
+
+# Words that name a slot, by the intent the LLM prompt would report.
+# Checked in order after parse_query's domain signals.
+_INTENT_WORDS = (
+    ("domain_selection", frozenset([
+        "jewelry", "necklace", "necklaces", "earrings", "bracelet", "bracelets",
+        "ring", "rings", "pendant", "pendants", "accessories", "scarf", "scarves",
+        "hat", "hats", "belt", "belts", "bag", "bags", "watch", "watches",
+        "sunglasses", "tablet", "tablets",
+    ])),
+    ("brand", frozenset([
+        "google", "pixel", "iphone", "chevrolet", "nissan", "hyundai", "kia",
+        "pandora", "tiffany", "swarovski", "kay", "zales", "jared",
+    ])),
+    ("use_case", frozenset([
+        "gaming", "work", "school", "business", "creative", "home", "office",
+        "student", "students", "college", "travel", "programming", "coding",
+        "design", "editing", "streaming",
+    ])),
+    ("genre", frozenset([
+        "fiction", "nonfiction", "mystery", "romance", "fantasy", "thriller",
+        "scifi", "sci", "fi", "horror", "biography", "history", "hardcover",
+        "paperback", "ebook", "audiobook",
+    ])),
+    ("other", frozenset([
+        "restart", "reset", "clear", "start", "begin", "similar", "compare",
+        "checkout", "cart", "recommendations", "items",
+    ])),
+)
+
+# Confidence lost per corrected word, by edit distance.
+_TYPO_PENALTY = {1: 0.05, 2: 0.15}
+
+
+@lru_cache(maxsize=1)
+def _vocabulary() -> Tuple[frozenset, FuzzyIndex]:
+    """Known words (dictionary hits) and a typo index over them."""
+    words = (set(DEFAULT_DICTIONARY) | set(BRAND_MAP) | _GREETINGS | _SHORT_RESPONSES
+             | _FILLER_WORDS | _SPEC_WORDS)
+    for _, group in _INTENT_WORDS:
+        words |= group
+    for phrase in (*VEHICLE_KEYWORDS, *DESKTOP_PC_PHRASES, *LAPTOP_KEYWORDS,
+                   *BOOK_KEYWORDS, *PHONE_KEYWORDS, *USE_CASE_MAP):
+        words.update(re.findall(r"[a-z]+", phrase))
+    words -= _KNOWN_MISSPELLINGS
+    words = frozenset(w for w in words if len(w) > 1)
+    return words, FuzzyIndex(sorted(words))
+
+
+def _typo_fix(token: str, index: FuzzyIndex) -> Optional[Tuple[str, int]]:
+    """(word, distance) when token is a typo of exactly one vocabulary word."""
+    if len(token) < 4 or not token.isalpha():
+        return None
+    suggestions = index.lookup(token, max_distance=2)
+    if not suggestions:
+        return None
+    word, distance = suggestions[0]
+    if len(suggestions) > 1 and suggestions[1][1] == distance:
+        return None  # two equally close words: let the LLM pick
+    if 1.0 - distance / max(len(token), len(word)) < 0.7:
+        return None
+    if word[0] != token[0]:
+        return None  # typos rarely hit the first letter; "wife" is not "life"
+    return word, distance
+
+
 class LLMValidator:
     """LLM-based input validator using Claude."""
     
     def __init__(self):
         self.client = None
         self.enabled = False
+        self.fast_path_threshold = FAST_PATH_THRESHOLD
+        self.stats = {"local": 0, "llm": 0, "llm_errors": 0}
         
         # Check if Anthropic is available
         if not ANTHROPIC_AVAILABLE:
@@ -61,6 +185,13 @@ class LLMValidator:
             # Fallback to basic validation
             return self._basic_validation(user_input)
         
+        # Fast path: clean input is decided locally, without an LLM round trip
+        local = self.classify_locally(user_input, context)
+        if local["confidence"] >= self.fast_path_threshold:
+            self.stats["local"] += 1
+            return local
+        
+        self.stats["llm"] += 1
         try:
             prompt = self._build_validation_prompt(user_input, context)
             
@@ -76,8 +207,94 @@ class LLMValidator:
             
         except Exception as e:
             print(f"LLM validation error: {e}")
+            self.stats["llm_errors"] += 1
             return self._basic_validation(user_input)
     
+    def classify_locally(self, user_input: str, context: Optional[str] = None) -> Dict[str, any]:
+        """
+        Deterministic validation; "confidence" is how sure the local decision is.
+        
+        Confident when every word is a vocabulary hit or a typo of exactly one
+        vocabulary word, and the corrected text names a slot (parse_query
+        domain/brand/price/spec, or a use case, genre or control word). Also
+        confident for unmistakable gibberish (the strict _basic_validation
+        rules). Anything else - unknown words, ambiguous or two-edit typos,
+        filler with no slot - scores below the fast-path threshold.
+        """
+        known, index = _vocabulary()
+        text = normalize_typos((user_input or "").strip())
+        corrected = text
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        
+        hits, fixes, penalty = 0, 0, 0.0
+        unknown: List[str] = []
+        for token in tokens:
+            if len(token) == 1 or token in known or any(c.isdigit() for c in token):
+                hits += 1
+                continue
+            fix = _typo_fix(token, index)
+            # A "typo" of a filler word is as likely an unlisted English word
+            if fix is None or fix[0] in _FILLER_WORDS:
+                unknown.append(token)
+                continue
+            word, distance = fix
+            fixes += 1
+            penalty += _TYPO_PENALTY[distance]
+            corrected = re.sub(rf"\b{re.escape(token)}\b", word, corrected, flags=re.IGNORECASE)
+        
+        result = {
+            "is_valid": True,
+            "corrected_input": corrected,
+            "confidence": 0.5,
+            "detected_intent": "other",
+            "suggestions": [],
+            "error_message": None
+        }
+        
+        if not hits and not fixes:
+            basic = self._basic_validation(user_input)
+            if not basic["is_valid"] and basic["confidence"] >= 0.9:
+                return basic
+            result["confidence"] = 0.3
+            return result
+        
+        if unknown:
+            # Partly recognised: the LLM decides what the rest means
+            result["confidence"] = 0.6 * (hits + fixes) / len(tokens)
+            return result
+        
+        parsed = parse_query(corrected)
+        words = parsed.words
+        intent = None
+        if parsed.domain_signals:
+            intent = "domain_selection"
+        elif parsed.brands:
+            intent = "brand"
+        else:
+            for name, group in _INTENT_WORDS:
+                if words & group:
+                    intent = name
+                    break
+        if intent is None:
+            if parsed.spec_filters:
+                intent = "filter_response"
+            elif parsed.price_range:
+                intent = "price"
+            elif words <= _GREETINGS | _FILLER_WORDS:
+                intent = "greeting" if words & _GREETINGS else None
+        
+        if intent is not None:
+            result["confidence"] = round(0.95 - penalty, 2)
+            result["detected_intent"] = intent
+            if intent == "greeting":
+                result["suggestions"] = ["Cars", "Laptops", "Books", "Phones"]
+        elif words & _SHORT_RESPONSES and words <= _SHORT_RESPONSES | _FILLER_WORDS:
+            result["confidence"] = round((0.9 if context else 0.7) - penalty, 2)
+            result["detected_intent"] = "filter_response"
+        else:
+            result["confidence"] = 0.6
+        return result
+    
     def _build_validation_prompt(self, user_input: str, context: Optional[str]) -> str:
         """Build prompt for LLM validation."""
         prompt = f"""You are an intelligent input validator for an e-commerce chatbot that sells:
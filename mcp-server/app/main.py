@@ -7,7 +7,7 @@ All endpoints follow the standard response envelope pattern.
 
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text as _sa_text
 from pydantic import BaseModel
@@ -22,6 +22,7 @@ import time as _time
 import json as _json
 import uuid as _uuid
 from datetime import datetime as _datetime
+from email.utils import format_datetime as _format_datetime, parsedate_to_datetime as _parsedate_to_datetime
 from dotenv import load_dotenv
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -54,9 +55,18 @@ from app.schemas import (
 )
 from app.endpoints import search_products, get_product, add_to_cart, checkout
 from app.cache import cache_client
+from app.single_flight import search_flight
+from app.cache_invalidation import cache_invalidator
+from app.candidate_index import candidate_index
+from app.facets import facet_index
 from app.metrics import metrics_collector
+from app.latency_log import latency_log_sink
+from app.event_logger import event_log_writer
+from app.tracing import tracer
+from app.kg_rerank import kg_reranker
 from app.tool_schemas import get_all_tools_for_provider, ALL_TOOLS
-from app.merchant_feed import export_feed
+from app.merchant_feed import stream_feed, feed_validators
+from app.feed_materializer import feed_materializer, FeedArtifact
 from app.idss_adapter import (
     search_products_idss, get_product_universal,
     search_products_universal
@@ -95,7 +105,8 @@ from app.acp_endpoints import (
     acp_update_checkout_session as _acp_update,
     acp_complete_checkout_session as _acp_complete,
     acp_cancel_checkout_session as _acp_cancel,
-    generate_product_feed,
+    stream_product_feed_json,
+    stream_product_feed_csv,
 )
 from app.protocol_config import is_acp
 from app.supabase_cart import get_supabase_cart_client
@@ -148,10 +159,27 @@ async def lifespan(app: FastAPI):
     except Exception as _e:
         logger.warning("Could not create shared_chats table: %s", _e)
 
+    # Background writers: latency log drain, MCP event log group commits,
+    # chat trace export and feed snapshots (tracing and the materializer
+    # are off unless configured), plus the catalog-change cache invalidator
+    # and the optional candidate index build
+    latency_log_sink.start()
+    event_log_writer.start()
+    tracer.start()
+    feed_materializer.start()
+    cache_invalidator.start()
+    candidate_index.start()
+
     skip_preload = os.getenv("MCP_SKIP_PRELOAD", "0") == "1"
     if skip_preload:
         logger.info("Skipping IDSS preload (MCP_SKIP_PRELOAD=1)")
         yield
+        await candidate_index.stop()
+        await cache_invalidator.stop()
+        await feed_materializer.stop()
+        await tracer.stop()
+        await latency_log_sink.stop()
+        await event_log_writer.stop()
         return
 
     logger.info("Starting IDSS component preload...")
@@ -165,6 +193,12 @@ async def lifespan(app: FastAPI):
         logger.warning("Vehicle search will lazy-load on first request")
 
     yield
+    await candidate_index.stop()
+    await cache_invalidator.stop()
+    await feed_materializer.stop()
+    await tracer.stop()
+    await latency_log_sink.stop()
+    await event_log_writer.stop()
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -188,10 +222,11 @@ app.add_middleware(
 # ---------------------------------------------------------------------------
 # Latency logging middleware
 # Logs every non-OPTIONS request with method, path, status, and duration_ms.
-# Lines are also written to latency_log.jsonl in the project root for offline
-# analysis and the poster latency table.
+# Lines are also written to backend_latency_logs.jsonl in the project root for
+# offline analysis and the poster latency table. The request path only
+# enqueues the entry; latency_log_sink batches, writes and rotates the file
+# from a background task.
 # ---------------------------------------------------------------------------
-_LATENCY_LOG_PATH = Path(__file__).parent.parent.parent / "backend_latency_logs.jsonl"
 
 class LatencyLoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: StarletteRequest, call_next) -> StarletteResponse:
@@ -225,11 +260,7 @@ class LatencyLoggingMiddleware(BaseHTTPMiddleware):
             "[LATENCY] %s %s -> %d  %.1fms  [%s]",
             entry["method"], path, entry["status"], duration_ms, entry["category"]
         )
-        try:
-            with open(_LATENCY_LOG_PATH, "a") as f:
-                f.write(_json.dumps(entry) + "\n")
-        except Exception:
-            pass
+        latency_log_sink.enqueue(entry)
         return response
 
 app.add_middleware(LatencyLoggingMiddleware)
@@ -341,10 +372,42 @@ def get_metrics():
     - Cache hit rate
     - Request counts and error rates
     - Uptime
+    - Latency log sink backlog / drop counters
+    - Chat trace sampling / export counters
+    - KG re-rank budget hits / expiries
+    - Redis cache hits / misses per key type and read round trips
+    - Search stale serves, early refreshes and coalesced misses
+    - Catalog-change invalidation events applied / lag
+    - Candidate index queries served / fallbacks and rebuilds
+    - Facet index queries served and snapshot rebuilds
 
     For research and performance analysis.
     """
-    return metrics_collector.get_summary()
+    summary = metrics_collector.get_summary()
+    summary["latency_log"] = latency_log_sink.stats()
+    summary["event_log"] = event_log_writer.stats()
+    summary["tracing"] = tracer.stats()
+    summary["kg_rerank"] = kg_reranker.stats()
+    summary["cache"] = {**cache_client.stats(), "search_single_flight": search_flight.stats()}
+    summary["cache_invalidation"] = dict(cache_invalidator.stats)
+    summary["candidate_index"] = dict(candidate_index.stats)
+    summary["facet_index"] = dict(facet_index.stats)
+    return summary
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """
+    Prometheus text exposition of the latency histograms and counters.
+
+    Each worker exports its own cumulative buckets; aggregate fleet-wide
+    percentiles with e.g.
+    histogram_quantile(0.95, sum by (le, endpoint) (rate(mcp_request_latency_seconds_bucket[5m]))).
+    """
+    return PlainTextResponse(
+        metrics_collector.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 #
@@ -1073,8 +1136,81 @@ async def list_sessions_endpoint():
 # Merchant Center Feed Export
 # 
 
+def _not_modified(request: Request, etag: Optional[str], last_modified: Optional[_datetime]) -> bool:
+    """
+    Evaluate conditional-GET headers against a feed's validators.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 §13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        bare = etag.removeprefix("W/")
+        return "*" in tags or any(t.removeprefix("W/") == bare for t in tags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = _parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _feed_response(
+    request: Request,
+    chunks,
+    media_type: str,
+    etag: Optional[str],
+    last_modified: Optional[_datetime],
+) -> StarletteResponse:
+    """
+    Stream a feed body, or answer 304 when the client's copy is current.
+
+    The chunk iterator is lazy (no query runs on a 304) and sync, so Starlette
+    drains it in the threadpool and the server-side cursor never blocks the
+    event loop.
+    """
+    headers: Dict[str, str] = {}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = _format_datetime(last_modified, usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return StarletteResponse(status_code=304, headers=headers)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+def _artifact_response(request: Request, artifact: FeedArtifact) -> StarletteResponse:
+    """
+    Serve a materialized feed snapshot straight from disk.
+
+    gzip-capable clients get the stored file as-is (Content-Encoding: gzip)
+    through FileResponse, which handles Range / If-Range on those bytes.
+    Other clients get a decompressed stream without range support.
+    """
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = artifact.gzip_etag if accepts_gzip else artifact.etag
+    headers = {
+        "ETag": etag,
+        "Last-Modified": _format_datetime(artifact.last_modified, usegmt=True),
+        "Vary": "Accept-Encoding",
+        "X-Feed-Version": str(artifact.version),
+    }
+    if _not_modified(request, etag, artifact.last_modified):
+        return StarletteResponse(status_code=304, headers=headers)
+    if accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(artifact.path, media_type=artifact.media_type, headers=headers)
+    return StreamingResponse(artifact.iter_decompressed(), media_type=artifact.media_type, headers=headers)
+
+
+_FEED_MEDIA_TYPES = {"json": "application/json", "xml": "application/xml", "csv": "text/csv"}
+
+
 @app.get("/export/merchant-feed")
 async def export_merchant_feed(
+    request: Request,
     format: str = "json",
     limit: int = None,
     category: str = None,
@@ -1094,20 +1230,21 @@ async def export_merchant_feed(
     - category: Filter by product category
     
     Returns:
-    Product feed in specified format
+    Product feed in specified format. Unfiltered feeds are served from the
+    latest materialized snapshot when FEED_MATERIALIZER_ENABLED=1; otherwise
+    the feed is streamed from a server-side cursor. Honors If-None-Match /
+    If-Modified-Since (304 when the catalog is unchanged).
     
     Reference: https://github.com/Universal-Commerce-Protocol/ucp
     """
-    result = export_feed(db, format=format, limit=limit, category=category)
-    
-    if format == "xml":
-        from fastapi.responses import Response
-        return Response(content=result, media_type="application/xml")
-    elif format == "csv":
-        from fastapi.responses import Response
-        return Response(content=result, media_type="text/csv")
-    else:
-        return result
+    if format not in _FEED_MEDIA_TYPES:
+        format = "json"
+    artifact = feed_materializer.latest(f"merchant.{format}") if not (limit or category) else None
+    if artifact is not None:
+        return _artifact_response(request, artifact)
+    etag, last_modified = feed_validators(db, category=category, variant=f"merchant.{format}.{limit}")
+    chunks = stream_feed(db, format=format, limit=limit, category=category)
+    return _feed_response(request, chunks, _FEED_MEDIA_TYPES[format], etag, last_modified)
 
 
 # 
@@ -1604,41 +1741,34 @@ async def ucp_cancel_checkout_session(session_id: str, db: Session = Depends(get
 # ─────────────────────────────────────────────────────────────────────────────
 
 @app.get("/acp/feed.json", tags=["ACP"])
-async def acp_feed_json(db: Session = Depends(get_db)):
+async def acp_feed_json(request: Request, limit: Optional[int] = None, db: Session = Depends(get_db)):
     """
     ACP Product Feed — JSON format.
 
     Returns the full product catalog in ACP feed format so OpenAI agents
-    can discover and purchase products without a search step.
+    can discover and purchase products without a search step. Served from
+    the materialized snapshot when available, otherwise streamed from a
+    server-side cursor; unchanged catalogs answer 304.
     """
-    items = generate_product_feed(db)
-    return {"protocol": "acp", "items": [i.model_dump() for i in items], "count": len(items)}
+    artifact = feed_materializer.latest("acp.json") if not limit else None
+    if artifact is not None:
+        return _artifact_response(request, artifact)
+    etag, last_modified = feed_validators(db, variant=f"acp.json.{limit}")
+    return _feed_response(request, stream_product_feed_json(db, limit=limit), "application/json", etag, last_modified)
 
 
 @app.get("/acp/feed.csv", tags=["ACP"])
-async def acp_feed_csv(db: Session = Depends(get_db)):
+async def acp_feed_csv(request: Request, limit: Optional[int] = None, db: Session = Depends(get_db)):
     """
     ACP Product Feed — CSV format.
 
     Same data as /acp/feed.json but as text/csv for tools that prefer tabular feeds.
     """
-    from fastapi.responses import PlainTextResponse
-    items = generate_product_feed(db)
-    if not items:
-        return PlainTextResponse("id,title,price_dollars,availability,brand,category\n", media_type="text/csv")
-    header = "id,title,price_dollars,currency,availability,inventory,brand,category,rating,product_url"
-    rows = [header]
-    for it in items:
-        def _q(v: object) -> str:
-            s = str(v) if v is not None else ""
-            return f'"{s.replace(chr(34), chr(34)+chr(34))}"'
-        rows.append(",".join([
-            _q(it.id), _q(it.title), str(it.price_dollars), it.currency,
-            it.availability, str(it.inventory),
-            _q(it.brand or ""), _q(it.category or ""),
-            str(it.rating or ""), _q(it.product_url),
-        ]))
-    return PlainTextResponse("\n".join(rows), media_type="text/csv")
+    artifact = feed_materializer.latest("acp.csv") if not limit else None
+    if artifact is not None:
+        return _artifact_response(request, artifact)
+    etag, last_modified = feed_validators(db, variant=f"acp.csv.{limit}")
+    return _feed_response(request, stream_product_feed_csv(db, limit=limit), "text/csv", etag, last_modified)
 
 
 @app.post("/acp/checkout-sessions", response_model=ACPCheckoutSession, tags=["ACP"])
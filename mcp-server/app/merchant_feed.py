@@ -16,14 +16,48 @@ Required fields per Google Merchant Center:
 Reference: https://github.com/Universal-Commerce-Protocol (UCP spec)
 """
 
+import hashlib
+import json
+import os
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable, NamedTuple
 from datetime import datetime
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models import Product
 from app.schemas import ProductSummary
 
+# Rows fetched per server-side cursor round trip when streaming a feed.
+FEED_CHUNK_SIZE = int(os.getenv("FEED_CHUNK_SIZE", "500"))
+
+# Catalog prices are stored in dollars without a currency column.
+FEED_CURRENCY = "USD"
+
+CSV_HEADER = "id,title,description,link,price,currency,availability,category,brand"
+
+_XML_NAMESPACES = (
+    'xmlns="http://www.w3.org/2005/Atom" '
+    'xmlns:g="http://base.google.com/ns/1.0"'
+)
+
+
+class FeedFrame(NamedTuple):
+    """Fixed text around the per-product fragments of a streamed feed."""
+    head: str
+    sep: str
+    tail: Callable[[int], str]  # receives the number of fragments written
+
+
+def iter_framed(frame: FeedFrame, fragments: Iterable[str]) -> Iterator[str]:
+    """Yield head, separator-joined fragments, then tail(count)."""
+    yield frame.head
+    count = 0
+    for fragment in fragments:
+        yield fragment if count == 0 else frame.sep + fragment
+        count += 1
+    yield frame.tail(count)
+
 
 class MerchantFeedExporter:
     """
@@ -68,45 +102,68 @@ class MerchantFeedExporter:
         }
         
         for product in products:
-            product_data = {
-                "id": product.product_id,
-                "title": product.name,
-                "description": product.description or "",
-                "link": f"{self.base_url}/products/{product.product_id}",
-                "price": {
-                    "value": product.price_info.price_cents / 100,
-                    "currency": product.price_info.currency
-                },
-                "availability": self._map_availability(product.inventory_info.available_qty),
-            }
-            
-            # Add optional fields if available
-            if product.category:
-                product_data["product_type"] = product.category
-            
-            if product.brand:
-                product_data["brand"] = product.brand
-            
-            # Add image if available in metadata
-            if hasattr(product, 'metadata') and product.metadata:
-                if isinstance(product.metadata, dict):
-                    if "primary_image" in product.metadata:
-                        product_data["image_link"] = product.metadata["primary_image"]
-                    elif "images" in product.metadata and product.metadata["images"]:
-                        product_data["image_link"] = product.metadata["images"][0]
-            
-            # Include MCP metadata if requested
-            if include_metadata:
-                product_data["mcp_metadata"] = {
-                    "product_type": getattr(product, 'product_type', None),
-                    "created_at": product.created_at.isoformat(),
-                    "updated_at": product.updated_at.isoformat()
-                }
-            
-            feed["products"].append(product_data)
+            feed["products"].append(self._product_record(product, include_metadata))
         
         return feed
     
+    def _product_record(self, product: Product, include_metadata: bool = False) -> Dict[str, Any]:
+        """Build the JSON feed record for a single product."""
+        product_data = {
+            "id": str(product.product_id),
+            "title": product.name,
+            "description": product.description or "",
+            "link": f"{self.base_url}/products/{product.product_id}",
+            "price": {
+                "value": self._price_value(product),
+                "currency": FEED_CURRENCY
+            },
+            "availability": self._map_availability(self._available_qty(product)),
+        }
+        
+        # Add optional fields if available
+        if product.category:
+            product_data["product_type"] = product.category
+        
+        if product.brand:
+            product_data["brand"] = product.brand
+        
+        image_url = self._image_link(product)
+        if image_url:
+            product_data["image_link"] = image_url
+        
+        # Include MCP metadata if requested
+        if include_metadata:
+            product_data["mcp_metadata"] = {
+                "product_type": getattr(product, 'product_type', None),
+                "created_at": product.created_at.isoformat() if product.created_at else None,
+                "updated_at": product.updated_at.isoformat() if product.updated_at else None
+            }
+        
+        return product_data
+    
+    def iter_json(
+        self,
+        products: Iterable[Product],
+        include_metadata: bool = False
+    ) -> Iterator[str]:
+        """
+        Stream the JSON feed as text chunks, one product record at a time.
+        
+        Produces the same document as export_json(), except that total_count
+        is written after the products array since it is only known at the end.
+        
+        Args:
+            products: Iterable of Product models (e.g. a yield_per query)
+            include_metadata: Whether to include MCP-specific metadata
+        
+        Yields:
+            JSON text fragments
+        """
+        return iter_framed(
+            self.frame("json"),
+            (self.render_row(product, "json", include_metadata) for product in products),
+        )
+    
     def export_xml(
         self,
         products: List[Product]
@@ -136,45 +193,61 @@ class MerchantFeedExporter:
         
         # Add each product as entry
         for product in products:
-            entry = ET.SubElement(root, "entry")
-            
-            # Required fields
-            ET.SubElement(entry, "g:id").text = product.product_id
-            ET.SubElement(entry, "g:title").text = product.name
-            ET.SubElement(entry, "g:description").text = product.description or ""
-            ET.SubElement(entry, "g:link").text = f"{self.base_url}/products/{product.product_id}"
-            
-            # Price
-            price_value = product.price_info.price_cents / 100
-            ET.SubElement(entry, "g:price").text = f"{price_value} {product.price_info.currency}"
-            
-            # Availability
-            availability = self._map_availability(product.inventory_info.available_qty)
-            ET.SubElement(entry, "g:availability").text = availability
-            
-            # Optional fields
-            if product.category:
-                ET.SubElement(entry, "g:product_type").text = product.category
-            
-            if product.brand:
-                ET.SubElement(entry, "g:brand").text = product.brand
-            
-            # Image
-            if hasattr(product, 'metadata') and product.metadata:
-                if isinstance(product.metadata, dict):
-                    image_url = None
-                    if "primary_image" in product.metadata:
-                        image_url = product.metadata["primary_image"]
-                    elif "images" in product.metadata and product.metadata["images"]:
-                        image_url = product.metadata["images"][0]
-                    
-                    if image_url:
-                        ET.SubElement(entry, "g:image_link").text = image_url
+            root.append(self._product_entry(product))
         
         # Convert to string with pretty printing
         ET.indent(root, space="  ")
         return ET.tostring(root, encoding="unicode", method="xml")
     
+    def _product_entry(self, product: Product) -> ET.Element:
+        """Build the Atom <entry> element for a single product."""
+        entry = ET.Element("entry")
+        
+        # Required fields
+        ET.SubElement(entry, "g:id").text = str(product.product_id)
+        ET.SubElement(entry, "g:title").text = product.name
+        ET.SubElement(entry, "g:description").text = product.description or ""
+        ET.SubElement(entry, "g:link").text = f"{self.base_url}/products/{product.product_id}"
+        
+        # Price
+        ET.SubElement(entry, "g:price").text = f"{self._price_value(product)} {FEED_CURRENCY}"
+        
+        # Availability
+        availability = self._map_availability(self._available_qty(product))
+        ET.SubElement(entry, "g:availability").text = availability
+        
+        # Optional fields
+        if product.category:
+            ET.SubElement(entry, "g:product_type").text = product.category
+        
+        if product.brand:
+            ET.SubElement(entry, "g:brand").text = product.brand
+        
+        # Image
+        image_url = self._image_link(product)
+        if image_url:
+            ET.SubElement(entry, "g:image_link").text = image_url
+        
+        return entry
+    
+    def iter_xml(
+        self,
+        products: Iterable[Product]
+    ) -> Iterator[str]:
+        """
+        Stream the XML feed as text chunks, one <entry> at a time.
+        
+        Args:
+            products: Iterable of Product models (e.g. a yield_per query)
+        
+        Yields:
+            XML text fragments
+        """
+        return iter_framed(
+            self.frame("xml"),
+            (self.render_row(product, "xml") for product in products),
+        )
+    
     def export_csv(
         self,
         products: List[Product]
@@ -188,39 +261,123 @@ class MerchantFeedExporter:
         Returns:
             CSV string
         """
-        lines = [
-            "id,title,description,link,price,currency,availability,category,brand"
-        ]
-        
-        for product in products:
-            price_value = product.price_info.price_cents / 100
-            availability = self._map_availability(product.inventory_info.available_qty)
-            
-            # Escape commas and quotes in text fields
-            def escape(text):
-                if text is None:
-                    return ""
-                text = str(text).replace('"', '""')
-                if "," in text or '"' in text:
-                    return f'"{text}"'
-                return text
-            
-            line = ",".join([
-                escape(product.product_id),
-                escape(product.name),
-                escape(product.description),
-                escape(f"{self.base_url}/products/{product.product_id}"),
-                str(price_value),
-                escape(product.price_info.currency),
-                escape(availability),
-                escape(product.category),
-                escape(product.brand)
-            ])
-            
-            lines.append(line)
+        lines = [CSV_HEADER]
+        lines.extend(self._csv_row(product) for product in products)
         
         return "\n".join(lines)
     
+    def _csv_row(self, product: Product) -> str:
+        """Format a single product as a CSV line (no trailing newline)."""
+        price_value = self._price_value(product)
+        availability = self._map_availability(self._available_qty(product))
+        
+        # Escape commas and quotes in text fields
+        def escape(text):
+            if text is None:
+                return ""
+            text = str(text).replace('"', '""')
+            if "," in text or '"' in text:
+                return f'"{text}"'
+            return text
+        
+        return ",".join([
+            escape(product.product_id),
+            escape(product.name),
+            escape(product.description),
+            escape(f"{self.base_url}/products/{product.product_id}"),
+            str(price_value),
+            escape(FEED_CURRENCY),
+            escape(availability),
+            escape(product.category),
+            escape(product.brand)
+        ])
+    
+    def iter_csv(
+        self,
+        products: Iterable[Product]
+    ) -> Iterator[str]:
+        """
+        Stream the CSV feed line by line.
+        
+        Args:
+            products: Iterable of Product models (e.g. a yield_per query)
+        
+        Yields:
+            CSV lines; the output joins to the same text as export_csv()
+        """
+        return iter_framed(
+            self.frame("csv"),
+            (self.render_row(product, "csv") for product in products),
+        )
+    
+    def frame(self, format: str) -> FeedFrame:
+        """
+        Return the document frame for a streamed feed format.
+        
+        Args:
+            format: Export format (json, xml, csv)
+        
+        Returns:
+            FeedFrame whose head carries a fresh generated_at/updated stamp
+        """
+        generated_at = datetime.utcnow().isoformat() + "Z"
+        if format == "xml":
+            return FeedFrame(
+                head=(
+                    f"<feed {_XML_NAMESPACES}>\n"
+                    f"  <title>MCP Product Feed</title>\n"
+                    f'  <link rel="self" href="{self.base_url}/export/merchant-feed.xml" />\n'
+                    f"  <updated>{generated_at}</updated>\n"
+                ),
+                sep="",
+                tail=lambda count: "</feed>",
+            )
+        if format == "csv":
+            return FeedFrame(head=CSV_HEADER, sep="", tail=lambda count: "")
+        return FeedFrame(
+            head=f'{{"version": "1.0", "generated_at": {json.dumps(generated_at)}, "products": [',
+            sep=",",
+            tail=lambda count: f'], "total_count": {count}}}',
+        )
+    
+    def render_row(self, product: Product, format: str, include_metadata: bool = False) -> str:
+        """
+        Render one product as a feed fragment for iter_framed().
+        
+        Args:
+            product: Product model
+            format: Export format (json, xml, csv)
+            include_metadata: Whether to include MCP-specific metadata (json only)
+        
+        Returns:
+            Text fragment for this product
+        """
+        if format == "xml":
+            entry = self._product_entry(product)
+            ET.indent(entry, space="  ", level=1)
+            return "  " + ET.tostring(entry, encoding="unicode", method="xml").rstrip() + "\n"
+        if format == "csv":
+            return "\n" + self._csv_row(product)
+        return json.dumps(self._product_record(product, include_metadata), default=str)
+    
+    def _price_value(self, product: Product) -> float:
+        """Price in dollars from the products.price column (0.0 when unpriced)."""
+        return round(float(product.price_value), 2) if product.price_value is not None else 0.0
+    
+    def _available_qty(self, product: Product) -> int:
+        """Stock from the products.inventory column (0 when unknown)."""
+        return int(product.inventory) if product.inventory is not None else 0
+    
+    def _image_link(self, product: Product) -> Optional[str]:
+        """Return the primary image URL from product metadata, if any."""
+        if hasattr(product, 'metadata') and product.metadata:
+            if isinstance(product.metadata, dict):
+                if "primary_image" in product.metadata:
+                    return product.metadata["primary_image"]
+                elif "images" in product.metadata and product.metadata["images"]:
+                    return product.metadata["images"][0]
+        return None
+    
     def _map_availability(self, available_qty: int) -> str:
         """
         Map inventory quantity to Google Merchant Center availability values.
@@ -292,6 +449,19 @@ class MerchantFeedExporter:
 merchant_exporter = MerchantFeedExporter()
 
 
+def _feed_query(db: Session, limit: Optional[int] = None, category: Optional[str] = None):
+    """Build the product query shared by export_feed() and stream_feed()."""
+    query = db.query(Product)
+    
+    if category:
+        query = query.filter(Product.category == category)
+    
+    if limit:
+        query = query.limit(limit)
+    
+    return query
+
+
 def export_feed(
     db: Session,
     format: str = "json",
@@ -310,15 +480,7 @@ def export_feed(
     Returns:
         Feed in requested format
     """
-    query = db.query(Product)
-    
-    if category:
-        query = query.filter(Product.category == category)
-    
-    if limit:
-        query = query.limit(limit)
-    
-    products = query.all()
+    products = _feed_query(db, limit=limit, category=category).all()
     
     if format == "xml":
         return merchant_exporter.export_xml(products)
@@ -326,3 +488,72 @@ def export_feed(
         return merchant_exporter.export_csv(products)
     else:  # json
         return merchant_exporter.export_json(products, include_metadata=True)
+
+
+def stream_feed(
+    db: Session,
+    format: str = "json",
+    limit: Optional[int] = None,
+    category: Optional[str] = None,
+    chunk_size: int = FEED_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Stream product feed in specified format without materializing the catalog.
+    
+    Rows are read with yield_per(), which makes psycopg2 use a server-side
+    (named) cursor, so at most `chunk_size` ORM objects are alive at a time.
+    
+    Args:
+        db: Database session (must stay open until the iterator is exhausted)
+        format: Export format (json, xml, csv)
+        limit: Maximum number of products to export
+        category: Filter by category
+        chunk_size: Rows fetched per cursor round trip
+    
+    Returns:
+        Iterator of text chunks in the requested format
+    """
+    products = _feed_query(db, limit=limit, category=category).yield_per(chunk_size)
+    
+    if format == "xml":
+        return merchant_exporter.iter_xml(products)
+    elif format == "csv":
+        return merchant_exporter.iter_csv(products)
+    else:  # json
+        return merchant_exporter.iter_json(products, include_metadata=True)
+
+
+def feed_validators(
+    db: Session,
+    category: Optional[str] = None,
+    variant: str = ""
+) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Compute HTTP cache validators (ETag, Last-Modified) for a product feed.
+    
+    A single aggregate query (row count + newest updated_at) fingerprints the
+    catalog, so clients polling an unchanged catalog get 304 Not Modified
+    instead of a regenerated feed.
+    
+    Args:
+        db: Database session
+        category: Category filter applied to the feed, if any
+        variant: Extra discriminator (format, limit, ...) folded into the ETag
+    
+    Returns:
+        (weak ETag, last-modified datetime); (None, None) if the catalog
+        cannot be fingerprinted.
+    """
+    try:
+        query = db.query(func.count(Product.product_id), func.max(Product.updated_at))
+        if category:
+            query = query.filter(Product.category == category)
+        count, last_modified = query.one()
+    except Exception:
+        return None, None
+    if not isinstance(count, int):
+        return None, None
+    
+    stamp = last_modified.isoformat() if last_modified else ""
+    digest = hashlib.sha1(f"{count}|{stamp}|{category or ''}|{variant}".encode()).hexdigest()
+    return f'W/"{digest[:32]}"', last_modified
@@ -2,96 +2,251 @@
 Observability Metrics for Research-Grade MCP.
 
 Tracks:
-- Latency percentiles (p50, p95, p99)
+- Latency percentiles (p50, p95, p99) per endpoint and per pipeline stage
 - Cache hit rates
 - Request counts per endpoint
 - Error rates
+
+Latencies are kept in fixed, log-spaced bucket histograms rather than
+sample windows: recording is a bisect plus an increment, percentiles are
+read from cumulative bucket counts, and histograms with the same bounds
+can be merged by adding counts. That last property is what lets
+Prometheus compute fleet-wide p95/p99 from the per-worker series exposed
+by render_prometheus() (histogram_quantile over sum by (le)).
 """
 
-from typing import Dict, Optional
-from collections import defaultdict, deque
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import datetime, timezone
-import statistics
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+
+
+def _log_spaced_bounds(low_ms: float, high_ms: float, per_decade: int) -> Tuple[float, ...]:
+    """Bucket upper bounds from low_ms to high_ms, per_decade per factor of 10."""
+    bounds = []
+    i = 0
+    while True:
+        value = low_ms * 10 ** (i / per_decade)
+        if value > high_ms * 1.0001:
+            break
+        bounds.append(float(f"{value:.3g}"))
+        i += 1
+    if bounds[-1] < high_ms:
+        bounds.append(float(high_ms))
+    return tuple(bounds)
+
+
+# 0.1 ms .. 60 s, 8 buckets per decade (~33% wide, so interpolated
+# percentiles are within a few percent of the exact value).
+LATENCY_BUCKETS_MS: Tuple[float, ...] = _log_spaced_bounds(0.1, 60_000.0, per_decade=8)
+
+# Request pipeline stages recorded alongside endpoint latency
+PIPELINE_STAGES: Tuple[str, ...] = ("cache", "db", "vector", "kg", "llm")
+
+# Need at least this many samples for meaningful percentiles
+_MIN_SAMPLES_FOR_PERCENTILE = 10
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (milliseconds).
+
+    counts[i] holds samples in (bounds[i-1], bounds[i]]; the final slot is
+    the +Inf overflow bucket. Not thread-safe on its own — MetricsCollector
+    serializes access.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value_ms: float) -> None:
+        """Record one sample (O(log buckets))."""
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        if self.min is None or value_ms < self.min:
+            self.min = value_ms
+        if self.max is None or value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add another histogram's counts into this one (bounds must match)."""
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different bucket bounds")
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(self.bounds).merge(self)
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0..1) by linear interpolation inside the
+        bucket that contains the target rank, clamped to the observed
+        min/max so small samples don't report a bucket edge.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if c == 0:
+                continue
+            if cumulative + c >= rank:
+                if i == len(self.bounds):
+                    return self.max
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i]
+                value = lower + (upper - lower) * ((rank - cumulative) / c)
+                return min(max(value, self.min), self.max)
+            cumulative += c
+        return self.max
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        """(upper bound, cumulative count) pairs, ending with (inf, count)."""
+        out = []
+        running = 0
+        for bound, c in zip(self.bounds + (float("inf"),), self.counts):
+            running += c
+            out.append((bound, running))
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable snapshot (for shipping between workers)."""
+        return {
+            "bounds": list(self.bounds),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        hist = cls(tuple(data["bounds"]))
+        hist.counts = list(data["counts"])
+        hist.count = data["count"]
+        hist.sum = data["sum"]
+        hist.min = data["min"]
+        hist.max = data["max"]
+        return hist
 
 
 class MetricsCollector:
     """
     In-memory metrics collector for observability.
-    
-    For production, this would integrate with Prometheus/StatsD.
-    For research, provides basic percentile and rate tracking.
+
+    Latency histograms are cumulative since start (or reset()), matching
+    Prometheus counter semantics; use rate() over the exported buckets for
+    windowed percentiles.
     """
-    
-    def __init__(self, window_size: int = 1000):
+
+    def __init__(self, window_size: int = 1000, buckets_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
         """
         Initialize metrics collector.
-        
+
         Args:
-            window_size: Number of recent samples to keep for percentiles
+            window_size: Kept for API compatibility; histograms are not windowed
+            buckets_ms: Histogram bucket upper bounds in milliseconds
         """
         self.window_size = window_size
-        
-        # Latency tracking (sliding window)
-        self.latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window_size))
-        
+        self.buckets_ms = buckets_ms
+        self._lock = threading.Lock()
+
+        # Latency histograms
+        self.latencies: Dict[str, LatencyHistogram] = {}
+        self.stage_latencies: Dict[str, LatencyHistogram] = {}
+
         # Cache metrics
         self.cache_hits = 0
         self.cache_misses = 0
-        
+
         # Request counters
         self.request_counts: Dict[str, int] = defaultdict(int)
         self.error_counts: Dict[str, int] = defaultdict(int)
-        
+
         # Timestamp tracking
         self.start_time = datetime.now(timezone.utc)
         self.last_reset = datetime.now(timezone.utc)
-    
+
+    def _histogram(self, table: Dict[str, LatencyHistogram], key: str) -> LatencyHistogram:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = LatencyHistogram(self.buckets_ms)
+        return hist
+
     def record_latency(self, endpoint: str, latency_ms: float):
         """Record a latency sample for an endpoint."""
-        self.latencies[endpoint].append(latency_ms)
-        self.request_counts[endpoint] += 1
-    
+        with self._lock:
+            self._histogram(self.latencies, endpoint).record(latency_ms)
+            self.request_counts[endpoint] += 1
+
+    def record_stage(self, stage: str, latency_ms: float):
+        """Record a latency sample for a pipeline stage (cache, db, vector, kg, llm)."""
+        with self._lock:
+            self._histogram(self.stage_latencies, stage).record(latency_ms)
+
     def record_cache_hit(self):
         """Record a cache hit."""
         self.cache_hits += 1
-    
+
     def record_cache_miss(self):
         """Record a cache miss."""
         self.cache_misses += 1
-    
+
     def record_error(self, endpoint: str):
         """Record an error for an endpoint."""
         self.error_counts[endpoint] += 1
-    
+
     def get_percentile(self, endpoint: str, percentile: float) -> Optional[float]:
         """
         Get a latency percentile for an endpoint.
-        
+
         Args:
             endpoint: Endpoint name
             percentile: Percentile (0-100)
-        
+
         Returns:
             Latency in ms, or None if insufficient data
         """
-        if endpoint not in self.latencies or len(self.latencies[endpoint]) == 0:
-            return None
-        
-        values = sorted(self.latencies[endpoint])
-        if len(values) < 10:  # Need at least 10 samples for meaningful percentiles
+        return self._percentile(self.latencies.get(endpoint), percentile)
+
+    def get_stage_percentile(self, stage: str, percentile: float) -> Optional[float]:
+        """Get a latency percentile for a pipeline stage (None if insufficient data)."""
+        return self._percentile(self.stage_latencies.get(stage), percentile)
+
+    def _percentile(self, hist: Optional[LatencyHistogram], percentile: float) -> Optional[float]:
+        if hist is None or hist.count < _MIN_SAMPLES_FOR_PERCENTILE:
             return None
-        
-        index = int(len(values) * (percentile / 100.0))
-        index = min(index, len(values) - 1)
-        return values[index]
-    
+        with self._lock:
+            return hist.quantile(percentile / 100.0)
+
     def get_cache_hit_rate(self) -> float:
         """Get the cache hit rate as a percentage."""
         total = self.cache_hits + self.cache_misses
         if total == 0:
             return 0.0
         return (self.cache_hits / total) * 100.0
-    
+
     def get_error_rate(self, endpoint: str) -> float:
         """Get the error rate for an endpoint as a percentage."""
         total_requests = self.request_counts[endpoint]
@@ -99,17 +254,29 @@ class MetricsCollector:
             return 0.0
         errors = self.error_counts[endpoint]
         return (errors / total_requests) * 100.0
-    
+
+    def _latency_summary(self, hist: Optional[LatencyHistogram], prefix: str = "latency_") -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        if hist is None or hist.count == 0:
+            return out
+        for pct in (50, 95, 99):
+            value = self._percentile(hist, pct)
+            if value is not None:
+                out[f"{prefix}p{pct}_ms"] = round(value, 2)
+        out[f"{prefix}avg_ms"] = round(hist.mean(), 2)
+        return out
+
     def get_summary(self) -> Dict:
         """
         Get a summary of all metrics.
-        
+
         Returns:
-            Dict with metrics summary for all endpoints
+            Dict with metrics summary for all endpoints and pipeline stages
         """
         uptime_seconds = (datetime.now(timezone.utc) - self.start_time).total_seconds()
-        
+
         endpoints: Dict[str, object] = {}
+        stages: Dict[str, object] = {}
         summary: Dict[str, object] = {
             "uptime_seconds": uptime_seconds,
             "cache": {
@@ -117,46 +284,158 @@ class MetricsCollector:
                 "total_hits": self.cache_hits,
                 "total_misses": self.cache_misses
             },
-            "endpoints": endpoints
+            "endpoints": endpoints,
+            "stages": stages,
         }
-        
+
         # Add per-endpoint metrics
-        for endpoint in self.request_counts.keys():
-            p50 = self.get_percentile(endpoint, 50)
-            p95 = self.get_percentile(endpoint, 95)
-            p99 = self.get_percentile(endpoint, 99)
-            
+        for endpoint in list(self.request_counts.keys()):
             endpoint_metrics = {
                 "total_requests": self.request_counts[endpoint],
                 "total_errors": self.error_counts[endpoint],
                 "error_rate_pct": round(self.get_error_rate(endpoint), 2),
             }
-            
-            if p50 is not None:
-                endpoint_metrics["latency_p50_ms"] = round(p50, 2)
-            if p95 is not None:
-                endpoint_metrics["latency_p95_ms"] = round(p95, 2)
-            if p99 is not None:
-                endpoint_metrics["latency_p99_ms"] = round(p99, 2)
-            
-            # Add average latency
-            if len(self.latencies[endpoint]) > 0:
-                endpoint_metrics["latency_avg_ms"] = round(
-                    statistics.mean(self.latencies[endpoint]), 2
-                )
-            
+            endpoint_metrics.update(self._latency_summary(self.latencies.get(endpoint)))
             endpoints[endpoint] = endpoint_metrics
-        
+
+        for stage, hist in list(self.stage_latencies.items()):
+            stages[stage] = {"count": hist.count, **self._latency_summary(hist)}
+
         return summary
-    
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Mergeable point-in-time copy of all histograms and counters.
+
+        Snapshots from several workers can be combined with merge_snapshots().
+        """
+        with self._lock:
+            return {
+                "endpoints": {k: h.to_dict() for k, h in self.latencies.items()},
+                "stages": {k: h.to_dict() for k, h in self.stage_latencies.items()},
+                "requests": dict(self.request_counts),
+                "errors": dict(self.error_counts),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+            }
+
+    def render_prometheus(self, namespace: str = "mcp") -> str:
+        """Render all metrics in the Prometheus text exposition format (v0.0.4)."""
+        return render_prometheus(
+            self.snapshot(),
+            namespace=namespace,
+            uptime_seconds=(datetime.now(timezone.utc) - self.start_time).total_seconds(),
+        )
+
     def reset(self):
         """Reset all metrics (useful for testing)."""
-        self.latencies.clear()
-        self.cache_hits = 0
-        self.cache_misses = 0
-        self.request_counts.clear()
-        self.error_counts.clear()
-        self.last_reset = datetime.now(timezone.utc)
+        with self._lock:
+            self.latencies.clear()
+            self.stage_latencies.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.request_counts.clear()
+            self.error_counts.clear()
+            self.last_reset = datetime.now(timezone.utc)
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine MetricsCollector.snapshot() results (e.g. one per worker)."""
+    endpoints: Dict[str, LatencyHistogram] = {}
+    stages: Dict[str, LatencyHistogram] = {}
+    requests: Dict[str, int] = defaultdict(int)
+    errors: Dict[str, int] = defaultdict(int)
+    hits = misses = 0
+    for snap in snapshots:
+        for table, key in ((endpoints, "endpoints"), (stages, "stages")):
+            for name, data in snap.get(key, {}).items():
+                hist = LatencyHistogram.from_dict(data)
+                if name in table:
+                    table[name].merge(hist)
+                else:
+                    table[name] = hist
+        for name, n in snap.get("requests", {}).items():
+            requests[name] += n
+        for name, n in snap.get("errors", {}).items():
+            errors[name] += n
+        hits += snap.get("cache_hits", 0)
+        misses += snap.get("cache_misses", 0)
+    return {
+        "endpoints": {k: h.to_dict() for k, h in endpoints.items()},
+        "stages": {k: h.to_dict() for k, h in stages.items()},
+        "requests": dict(requests),
+        "errors": dict(errors),
+        "cache_hits": hits,
+        "cache_misses": misses,
+    }
+
+
+def _prom_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return f"{value:.6g}"
+
+
+def _prom_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _render_histogram_family(
+    lines: List[str], name: str, help_text: str, label: str, histograms: Dict[str, Dict[str, Any]]
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key in sorted(histograms):
+        hist = LatencyHistogram.from_dict(histograms[key])
+        lv = _prom_label(key)
+        for bound_ms, cumulative in hist.cumulative_buckets():
+            le = _prom_float(bound_ms / 1000.0)
+            lines.append(f'{name}_bucket{{{label}="{lv}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{lv}"}} {_prom_float(hist.sum / 1000.0)}')
+        lines.append(f'{name}_count{{{label}="{lv}"}} {hist.count}')
+
+
+def render_prometheus(
+    snapshot: Dict[str, Any], namespace: str = "mcp", uptime_seconds: Optional[float] = None
+) -> str:
+    """
+    Render a snapshot (or merge_snapshots() result) as Prometheus text.
+
+    Latencies are exported in seconds, per Prometheus naming conventions.
+    """
+    lines: List[str] = []
+    _render_histogram_family(
+        lines, f"{namespace}_request_latency_seconds",
+        "End-to-end request latency by endpoint.", "endpoint", snapshot["endpoints"],
+    )
+    _render_histogram_family(
+        lines, f"{namespace}_stage_latency_seconds",
+        "Request pipeline stage latency (cache, db, vector, kg, llm).", "stage", snapshot["stages"],
+    )
+
+    for metric, help_text, key in (
+        (f"{namespace}_requests_total", "Requests handled by endpoint.", "requests"),
+        (f"{namespace}_request_errors_total", "Failed requests by endpoint.", "errors"),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for endpoint in sorted(snapshot[key]):
+            lines.append(f'{metric}{{endpoint="{_prom_label(endpoint)}"}} {snapshot[key][endpoint]}')
+
+    for metric, help_text, key in (
+        (f"{namespace}_cache_hits_total", "Product cache hits.", "cache_hits"),
+        (f"{namespace}_cache_misses_total", "Product cache misses.", "cache_misses"),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {snapshot[key]}")
+
+    if uptime_seconds is not None:
+        lines.append(f"# HELP {namespace}_uptime_seconds Seconds since the metrics collector started.")
+        lines.append(f"# TYPE {namespace}_uptime_seconds gauge")
+        lines.append(f"{namespace}_uptime_seconds {_prom_float(uptime_seconds)}")
+
+    return "\n".join(lines) + "\n"
 
 
 # Global metrics collector instance
@@ -167,23 +446,32 @@ def record_request_metrics(
     endpoint: str,
     latency_ms: float,
     cache_hit: bool,
-    is_error: bool = False
+    is_error: bool = False,
+    stages: Optional[Dict[str, float]] = None,
 ):
     """
     Convenience function to record all request metrics at once.
-    
+
     Args:
         endpoint: Endpoint name (e.g. "search_products", "get_product")
         latency_ms: Total request latency in milliseconds
         cache_hit: Whether this was a cache hit
         is_error: Whether this request resulted in an error
+        stages: Per-request timings dict; keys in PIPELINE_STAGES are
+            recorded as stage latencies, anything else is ignored
     """
     metrics_collector.record_latency(endpoint, latency_ms)
-    
+
+    if stages:
+        for stage in PIPELINE_STAGES:
+            value = stages.get(stage)
+            if value is not None:
+                metrics_collector.record_stage(stage, value)
+
     if cache_hit:
         metrics_collector.record_cache_hit()
     else:
         metrics_collector.record_cache_miss()
-    
+
     if is_error:
         metrics_collector.record_error(endpoint)
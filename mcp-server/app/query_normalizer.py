@@ -7,7 +7,8 @@ This module keeps logic lightweight and deterministic for tests and local usage.
 from __future__ import annotations
 
 import re
-from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 
 DEFAULT_DICTIONARY = [
@@ -100,35 +101,148 @@ def normalize_typos(text: str) -> str:
     return re.sub(r"([^\d])\1{2,}", r"\1\1", text)
 
 
-def correct_typo(word: str, dictionary: Iterable[str]) -> Optional[str]:
-    """Return corrected word if close to dictionary entry, else None."""
-    if not word:
-        return None
-    word_lower = word.lower()
-    dictionary = [w.lower() for w in dictionary]
-
-    if word_lower in dictionary:
-        return word_lower
+def _bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance, or max_distance + 1 as soon as it must exceed it."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            value = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ca != cb),  # substitution
+            )
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable from word by removing up to max_distance characters."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for term in frontier:
+            for i in range(len(term)):
+                next_frontier.add(term[:i] + term[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+class FuzzyIndex:
+    """
+    Symmetric-delete (SymSpell-style) index for bounded edit-distance lookup.
 
-    best_match = None
-    best_distance = None
+    Every dictionary word is stored under each string obtained by deleting
+    up to max_distance of its characters. Two words within edit distance k
+    always share such a delete, so a lookup only generates the query's own
+    deletes and verifies the few words they hit, instead of running
+    Levenshtein against the whole dictionary.
 
-    for candidate in dictionary:
-        dist = levenshtein_distance(word_lower, candidate)
-        if best_distance is None or dist < best_distance:
-            best_distance = dist
-            best_match = candidate
+    Suggestions are ordered by (distance, -frequency, dictionary position);
+    with uniform frequencies that is the first closest word in dictionary
+    order, matching the previous linear scan.
+    """
 
-    if best_distance is None or best_match is None:
+    def __init__(
+        self,
+        words: Iterable[str],
+        max_distance: int = 2,
+        frequencies: Optional[Dict[str, int]] = None,
+    ):
+        self.max_distance = max_distance
+        self.words: List[str] = []
+        self._rank: Dict[str, int] = {}
+        self._deletes: Dict[str, List[int]] = {}
+        frequencies = {k.lower(): v for k, v in (frequencies or {}).items()}
+        self.frequencies: Dict[str, int] = {}
+        for word in words:
+            word = word.lower()
+            if word in self._rank:
+                continue
+            idx = len(self.words)
+            self.words.append(word)
+            self._rank[word] = idx
+            self.frequencies[word] = frequencies.get(word, 1)
+            for variant in _deletes(word, max_distance):
+                self._deletes.setdefault(variant, []).append(idx)
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self._rank
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Return (word, distance) suggestions within max_distance, best first."""
+        k = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        word = word.lower()
+        if word in self._rank:
+            return [(word, 0)]
+        seen: Set[int] = set()
+        matches: List[Tuple[int, int, int]] = []
+        for variant in _deletes(word, k):
+            for idx in self._deletes.get(variant, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                candidate = self.words[idx]
+                dist = _bounded_levenshtein(word, candidate, k)
+                if dist <= k:
+                    matches.append((dist, -self.frequencies[candidate], idx))
+        matches.sort()
+        return [(self.words[idx], dist) for dist, _, idx in matches]
+
+
+@lru_cache(maxsize=16)
+def _index_for(dictionary: Tuple[str, ...]) -> FuzzyIndex:
+    return FuzzyIndex(dictionary)
+
+
+def get_fuzzy_index(dictionary: Iterable[str]) -> FuzzyIndex:
+    """Return a cached FuzzyIndex for a word list (built on first use)."""
+    if isinstance(dictionary, FuzzyIndex):
+        return dictionary
+    return _index_for(tuple(dictionary))
+
+
+def correct_typo(word: str, dictionary: Union[Iterable[str], FuzzyIndex]) -> Optional[str]:
+    """Return corrected word if close to dictionary entry, else None.
+
+    Accepts a word list (indexed and cached on first use) or a prebuilt
+    FuzzyIndex. A correction needs edit distance <= 2 and similarity >= 0.7.
+    """
+    if not word:
+        return None
+    index = get_fuzzy_index(dictionary)
+    suggestions = index.lookup(word, max_distance=2)
+    if not suggestions:
         return None
 
-    ratio = similarity_ratio(word_lower, best_match)
-    if best_distance <= 2 and ratio >= 0.7:
+    best_match, best_distance = suggestions[0]
+    if best_distance == 0:
+        return best_match
+    ratio = 1.0 - best_distance / max(len(word), len(best_match))
+    if ratio >= 0.7:
         return best_match
 
     return None
 
 
+# Built once at import; rebuild (get_fuzzy_index) if DEFAULT_DICTIONARY changes.
+DEFAULT_INDEX = FuzzyIndex(DEFAULT_DICTIONARY)
+
+
 def expand_synonyms(word: str, synonyms_map: Dict[str, List[str]]) -> List[str]:
     """Expand a word into synonyms with reverse lookup support."""
     if not word:
@@ -175,7 +289,7 @@ def normalize_query(query: str) -> Tuple[str, Dict[str, object]]:
     expansions: Dict[str, List[str]] = {}
 
     for word in words:
-        corrected = correct_typo(word, DEFAULT_DICTIONARY)
+        corrected = correct_typo(word, DEFAULT_INDEX)
         if corrected and corrected != word.lower():
             corrections[word] = corrected
             normalized = re.sub(rf"\b{re.escape(word)}\b", corrected, normalized, flags=re.IGNORECASE)
@@ -0,0 +1,267 @@
+"""
+Single-pass query parse shared by the search and chat pipelines.
+
+One user turn used to be scanned independently by enhance_search_request,
+detect_domain, is_specific_query (twice, via should_ask_followup) and the
+/chat fast paths, each looping over its own keyword list with a fresh
+re.search(rf"\\b{kw}\\b") per keyword. parse_query() tokenizes the message
+once and caches the result per message text:
+
+    parsed = parse_query(message)
+    parsed.has_word("laptop")        # == bool(re.search(r"\\blaptop\\b", lower))
+    parsed.domain_signals            # (("laptops", "keyword_laptop"), ...)
+    parsed.brands, parsed.price_range, parsed.spec_filters, parsed.model_numbers
+
+Single-word keywords are answered from the token set: for a keyword made only
+of word characters, \\bkw\\b matches exactly when kw is one of the \\w+ runs of
+the text. Multi-word or punctuated keywords fall back to a compiled
+word-boundary regex, so results are identical to the old per-stage scans.
+
+Structured fields are computed lazily on first access. ParsedQuery objects
+are shared between callers, so dict-valued fields hand out fresh copies.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import cached_property, lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+#  Shared vocabulary
+
+BRAND_MAP = {
+    "apple": "Apple",
+    "mac": "Apple",
+    "macbook": "Apple",
+    "dell": "Dell",
+    "hp": "HP",
+    "lenovo": "Lenovo",
+    "asus": "ASUS",
+    "acer": "Acer",
+    "msi": "MSI",
+    "razer": "Razer",
+    "samsung": "Samsung",
+    "microsoft": "Microsoft",
+}
+
+# Hard domain keywords used by conversation_controller.detect_domain.
+# Order: vehicle > desktop/PC > laptop > book (so "gaming PC" is not routed as laptop)
+VEHICLE_KEYWORDS = [
+    "car", "cars", "vehicle", "vehicles", "auto", "automobile", "automobiles",
+    "suv", "suvs", "truck", "trucks", "sedan", "sedans", "van", "vans",
+    "coupe", "hatchback", "wagon", "fuel efficient", "family suv",
+    "honda", "toyota", "ford", "bmw", "tesla", "vin"  # brand/vin hint
+]
+# Desktop/PC first — check before laptop so "gaming PC" / "desktop" don't match "pc" -> laptop
+DESKTOP_PC_PHRASES = [
+    "gaming pc", "gaming computer", "desktop pc", "desktop computer",
+    "desktop", "desktops", "tower", "workstation"
+]
+LAPTOP_KEYWORDS = [
+    "laptop", "laptops", "lapto", "lpatop",
+    "computer", "computers", "computr",
+    "notebook", "notebooks", "notbook", "notbooks",
+    "macbook", "chromebook", "thinkpad", "xps",
+    "pc", "pcs"
+]
+BOOK_KEYWORDS = [
+    "book", "books", "novel", "novels", "textbook", "textbooks", "reading",
+    "genre", "author", "fiction", "mystery", "romance", "looking for books",
+    "show me books", "find books"
+]
+PHONE_KEYWORDS = [
+    "phone", "phones", "smartphone", "smartphones", "cell phone", "mobile",
+    "fairphone", "repairable phone", "sustainable phone"
+]
+
+# Specific-product lookup fast-path: matches model-number-like tokens.
+#   \b[A-Za-z]\d{1,4}\b  →  X1, M3, G16, i7, i9, T14, E15, H16
+#   \b\d{4,}\b            →  4070, 4090, 9530, 1000 (budget), 13700
+MODEL_NUMBER_RE = re.compile(r"\b[A-Za-z]\d{1,4}\b|\b\d{4,}\b", re.IGNORECASE)
+
+# Any form of "compare / comparison / comparing / compared"
+COMPARE_RE = re.compile(r"\bcompar\w*\b", re.IGNORECASE)
+
+
+#  Price extraction
+
+# Price digit pattern: matches "2000" or "2,000" (with optional comma separators)
+_PRICE_DIGITS = r"(\d{1,3}(?:,\d{3})|\d{2,5})"
+
+_PRICE_NO_MORE_RE = re.compile(r"no\s+more\s+than\s*\$?" + _PRICE_DIGITS)
+_PRICE_RANGE_RE = re.compile(r"\$?" + _PRICE_DIGITS + r"\s*[-–]\s*\$?" + _PRICE_DIGITS)
+_PRICE_UNDER_RE = re.compile(r"(under|below|<=)\s*\$?" + _PRICE_DIGITS)
+_PRICE_OVER_RE = re.compile(r"(over|above|>=)\s*\$?" + _PRICE_DIGITS)
+_PRICE_DOLLAR_RE = re.compile(r"\$" + _PRICE_DIGITS)
+_PRICE_BUDGET_RE = re.compile(r"budget\s+(?:of\s+)?\$?" + _PRICE_DIGITS)
+
+
+def _parse_price_digits(raw: str) -> int:
+    """Strip commas from price string and return int. '2,000' → 2000."""
+    return int(raw.replace(",", ""))
+
+
+def extract_price_range(query: str) -> Optional[Dict[str, int]]:
+    """Price constraint from a query: {"min": .., "max": ..} (either optional) or None."""
+    text = (query or "").lower().strip()
+
+    # "no more than $2,000", "cost no more than $2000"
+    m = _PRICE_NO_MORE_RE.search(text)
+    if m:
+        return {"max": _parse_price_digits(m.group(1))}
+
+    m = _PRICE_RANGE_RE.search(text)
+    if m:
+        return {"min": _parse_price_digits(m.group(1)), "max": _parse_price_digits(m.group(2))}
+
+    m = _PRICE_UNDER_RE.search(text)
+    if m:
+        return {"max": _parse_price_digits(m.group(2))}
+
+    m = _PRICE_OVER_RE.search(text)
+    if m:
+        return {"min": _parse_price_digits(m.group(2))}
+
+    # Standalone dollar amount: "$2000", "$2,000" — treat as budget (max price)
+    # Only match when $ sign is present to avoid matching model numbers like "2000"
+    m = _PRICE_DOLLAR_RE.search(text)
+    if m:
+        return {"max": _parse_price_digits(m.group(1))}
+
+    # "budget 2000" or "budget of 2,000" patterns
+    m = _PRICE_BUDGET_RE.search(text)
+    if m:
+        return {"max": _parse_price_digits(m.group(1))}
+
+    return None
+
+
+#  Keyword matching
+
+
+@lru_cache(maxsize=1024)
+def _phrase_re(keyword: str) -> Optional["re.Pattern[str]"]:
+    """Word-boundary regex for keywords that are not a single \\w+ token, else None."""
+    if _TOKEN_RE.fullmatch(keyword):
+        return None
+    return re.compile(rf"\b{re.escape(keyword)}\b")
+
+
+class ParsedQuery:
+    """Tokenized view of one message plus lazily extracted filters."""
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.lower = self.text.lower().strip()
+        self.tokens: Tuple[str, ...] = tuple(_TOKEN_RE.findall(self.lower))
+        self.words = frozenset(self.tokens)
+
+    def has_word(self, keyword: str) -> bool:
+        """Whole-word match, equivalent to re.search(rf"\\b{re.escape(kw)}\\b", lower)."""
+        if keyword in self.words:
+            return True
+        pattern = _phrase_re(keyword)
+        return pattern is not None and pattern.search(self.lower) is not None
+
+    def first_word(self, keywords: Iterable[str]) -> Optional[str]:
+        """First keyword (in iteration order) present as a whole word."""
+        for kw in keywords:
+            if self.has_word(kw):
+                return kw
+        return None
+
+    def has_any_word(self, keywords: Iterable[str]) -> bool:
+        return self.first_word(keywords) is not None
+
+    def first_mapped(self, mapping: Dict[str, str]) -> Optional[str]:
+        """Value for the first key of mapping present as a whole word."""
+        kw = self.first_word(mapping)
+        return mapping[kw] if kw is not None else None
+
+    #  Structured fields
+
+    @cached_property
+    def domain_signals(self) -> Tuple[Tuple[str, str], ...]:
+        """(domain, route_reason) for every keyword group hit, highest priority first."""
+        signals = []
+        if self.has_any_word(VEHICLE_KEYWORDS):
+            signals.append(("vehicles", "keyword_vehicle"))
+        if any(phrase in self.lower for phrase in DESKTOP_PC_PHRASES):
+            signals.append(("laptops", "keyword_desktop"))
+        if self.has_any_word(LAPTOP_KEYWORDS):
+            signals.append(("laptops", "keyword_laptop"))
+        if self.has_any_word(BOOK_KEYWORDS):
+            signals.append(("books", "keyword_book"))
+        if self.has_any_word(PHONE_KEYWORDS):
+            signals.append(("phones", "keyword_phone"))
+        return tuple(signals)
+
+    @cached_property
+    def brands(self) -> Tuple[str, ...]:
+        """Canonical BRAND_MAP brands mentioned, in BRAND_MAP order."""
+        found = []
+        for key, brand in BRAND_MAP.items():
+            if brand not in found and self.has_word(key):
+                found.append(brand)
+        return tuple(found)
+
+    @cached_property
+    def _price(self) -> Optional[Dict[str, int]]:
+        return extract_price_range(self.lower)
+
+    @property
+    def price_range(self) -> Optional[Dict[str, int]]:
+        return dict(self._price) if self._price else None
+
+    @cached_property
+    def model_numbers(self) -> Tuple[str, ...]:
+        return tuple(MODEL_NUMBER_RE.findall(self.lower))
+
+    @cached_property
+    def mentions_compare(self) -> bool:
+        # \bcompar\w*\b: some whole token starts with "compar"
+        return any(tok.startswith("compar") for tok in self.tokens)
+
+    @property
+    def spec_filters(self) -> Dict[str, object]:
+        """Hardware spec / use-case filters (see query_parser.enhance_search_request)."""
+        extra: Dict[str, object] = dict(self._specs)
+        if "use_cases" in extra:
+            extra["use_cases"] = list(extra["use_cases"])
+        return extra
+
+    @cached_property
+    def _specs(self) -> Dict[str, object]:
+        from app.query_parser import (
+            _extract_min_battery,
+            _extract_min_ram,
+            _extract_min_screen,
+            _extract_min_storage,
+            _extract_use_cases,
+            _extract_year,
+        )
+
+        text = self.text.strip()
+        extra: Dict[str, object] = {}
+        for key, extract in (
+            ("min_ram_gb", _extract_min_ram),
+            ("min_storage_gb", _extract_min_storage),
+            ("min_screen_inches", _extract_min_screen),
+            ("min_battery_hours", _extract_min_battery),
+            ("min_year", _extract_year),
+        ):
+            value = extract(text)
+            if value is not None:
+                extra[key] = value
+        use_cases = _extract_use_cases(text)
+        if use_cases:
+            extra["use_cases"] = tuple(use_cases)
+        return extra
+
+
+@lru_cache(maxsize=512)
+def parse_query(text: str) -> ParsedQuery:
+    """Parse a message once; repeated calls with the same text share the result."""
+    return ParsedQuery(text)
@@ -250,30 +250,7 @@ def enhance_search_request(
     if not cleaned_query:
         return cleaned_query, {}
 
-    extra: Dict[str, object] = {}
+    # Cached on the shared per-message parse (see app.query_parse)
+    from app.query_parse import parse_query
 
-    ram = _extract_min_ram(cleaned_query)
-    if ram is not None:
-        extra["min_ram_gb"] = ram
-
-    storage = _extract_min_storage(cleaned_query)
-    if storage is not None:
-        extra["min_storage_gb"] = storage
-
-    screen = _extract_min_screen(cleaned_query)
-    if screen is not None:
-        extra["min_screen_inches"] = screen
-
-    battery = _extract_min_battery(cleaned_query)
-    if battery is not None:
-        extra["min_battery_hours"] = battery
-
-    year = _extract_year(cleaned_query)
-    if year is not None:
-        extra["min_year"] = year
-
-    use_cases = _extract_use_cases(cleaned_query)
-    if use_cases:
-        extra["use_cases"] = use_cases
-
-    return cleaned_query, extra
+    return cleaned_query, parse_query(cleaned_query).spec_filters
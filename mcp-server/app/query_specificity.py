@@ -11,23 +11,9 @@ import re
 from typing import Dict, List, Tuple, Optional
 
 from agent import get_domain_schema
+from app.query_parse import BRAND_MAP, parse_query
 
 
-BRAND_MAP = {
-    "apple": "Apple",
-    "mac": "Apple",
-    "macbook": "Apple",
-    "dell": "Dell",
-    "hp": "HP",
-    "lenovo": "Lenovo",
-    "asus": "ASUS",
-    "acer": "Acer",
-    "msi": "MSI",
-    "razer": "Razer",
-    "samsung": "Samsung",
-    "microsoft": "Microsoft",
-}
-
 GPU_VENDOR_MAP = {
     "nvidia": "NVIDIA",
     "geforce": "NVIDIA",
@@ -113,65 +99,30 @@ def _normalize(text: str) -> str:
     return (text or "").lower().strip()
 
 
-def _parse_price_digits(raw: str) -> int:
-    """Strip commas from price string and return int. '2,000' → 2000."""
-    return int(raw.replace(",", ""))
-
-
-# Price digit pattern: matches "2000" or "2,000" (with optional comma separators)
-_PRICE_DIGITS = r"(\d{1,3}(?:,\d{3})|\d{2,5})"
-
-
-def _extract_price_range(query: str) -> Optional[Dict[str, int]]:
-    text = _normalize(query)
-
-    # "no more than $2,000", "cost no more than $2000"
-    no_more_match = re.search(r"no\s+more\s+than\s*\$?" + _PRICE_DIGITS, text)
-    if no_more_match:
-        return {"max": _parse_price_digits(no_more_match.group(1))}
-
-    range_match = re.search(r"\$?" + _PRICE_DIGITS + r"\s*[-–]\s*\$?" + _PRICE_DIGITS, text)
-    if range_match:
-        return {"min": _parse_price_digits(range_match.group(1)), "max": _parse_price_digits(range_match.group(2))}
-
-    under_match = re.search(r"(under|below|<=)\s*\$?" + _PRICE_DIGITS, text)
-    if under_match:
-        return {"max": _parse_price_digits(under_match.group(2))}
-
-    over_match = re.search(r"(over|above|>=)\s*\$?" + _PRICE_DIGITS, text)
-    if over_match:
-        return {"min": _parse_price_digits(over_match.group(2))}
-
-    # Standalone dollar amount: "$2000", "$2,000" — treat as budget (max price)
-    # Only match when $ sign is present to avoid matching model numbers like "2000"
-    dollar_match = re.search(r"\$" + _PRICE_DIGITS, text)
-    if dollar_match:
-        return {"max": _parse_price_digits(dollar_match.group(1))}
-
-    # "budget 2000" or "budget of 2,000" patterns
-    budget_match = re.search(r"budget\s+(?:of\s+)?\$?" + _PRICE_DIGITS, text)
-    if budget_match:
-        return {"max": _parse_price_digits(budget_match.group(1))}
-
-    return None
-
-
 def _detect_domain(query: str, filters: Dict[str, object]) -> Optional[str]:
-    text = _normalize(query)
+    parsed = parse_query(query)
     category = str(filters.get("category", "")).lower()
-    
-    # Use word boundaries to avoid false matches (e.g., "book" in "notebook")
-    if "book" in category or re.search(r'\bbook\b', text) or re.search(r'\bnovel\b', text):
+
+    # Whole-word matches to avoid false hits (e.g., "book" in "notebook")
+    if "book" in category or parsed.has_any_word(("book", "novel")):
         return "books"
-    if "electronic" in category or re.search(r'\blaptop\b', text) or re.search(r'\bcomputer\b', text) or re.search(r'\bpc\b', text) or re.search(r'\bnotebook\b', text):
+    if "electronic" in category or parsed.has_any_word(("laptop", "computer", "pc", "notebook")):
         return "laptops"
-    if "jewelry" in category or "jewellery" in category or re.search(r'\bjewelry\b', text) or re.search(r'\bnecklace\b', text) or re.search(r'\bearrings?\b', text) or re.search(r'\bbracelet\b', text) or re.search(r'\brings?\b', text) or re.search(r'\bpendant\b', text):
+    if "jewelry" in category or "jewellery" in category or parsed.has_any_word(
+        ("jewelry", "necklace", "earring", "earrings", "bracelet", "ring", "rings", "pendant")
+    ):
         return "jewelry"
-    if "accessor" in category or re.search(r'\baccessories?\b', text) or re.search(r'\bscarf\b', text) or re.search(r'\bhats?\b', text) or re.search(r'\bbelts?\b', text) or re.search(r'\bwatches?\b', text) or re.search(r'\bsunglasses\b', text):
+    if "accessor" in category or parsed.has_any_word(
+        ("accessory", "accessories", "scarf", "hat", "hats", "belt", "belts", "watch", "watches", "sunglasses")
+    ):
         return "accessories"
-    if "cloth" in category or re.search(r'\bclothing\b', text) or re.search(r'\bclothes\b', text) or re.search(r'\bapparel\b', text) or re.search(r'\bdress(es)?\b', text) or re.search(r'\bshirt(s)?\b', text) or re.search(r'\bpants?\b', text):
+    if "cloth" in category or parsed.has_any_word(
+        ("clothing", "clothes", "apparel", "dress", "dresses", "shirt", "shirts", "pant", "pants")
+    ):
         return "clothing"
-    if "beauty" in category or re.search(r'\bbeauty\b', text) or re.search(r'\bcosmetics?\b', text) or re.search(r'\bmakeup\b', text) or re.search(r'\blipstick\b', text) or re.search(r'\beyeshadow\b', text) or re.search(r'\bskincare\b', text):
+    if "beauty" in category or parsed.has_any_word(
+        ("beauty", "cosmetic", "cosmetics", "makeup", "lipstick", "eyeshadow", "skincare")
+    ):
         return "beauty"
     return None
 
@@ -195,6 +146,7 @@ def _collect_soft_preferences(text: str) -> Dict[str, List[str]]:
 def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dict[str, object]]:
     """Return whether query is specific and extracted info for constraints."""
     text = _normalize(query)
+    parsed = parse_query(query)
     extracted_info: Dict[str, object] = {}
 
     # Check if query contains a specific book title (proper nouns, multiple capitalized words)
@@ -274,16 +226,14 @@ def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dic
     # Product type - use word boundaries to avoid false matches
     if "desktop" in text or "tower" in text or "gaming pc" in text:
         extracted_info["product_type"] = "desktop"
-    elif re.search(r'\blaptop\b', text) or re.search(r'\bnotebook\b', text) or re.search(r'\bcomputer\b', text):
+    elif parsed.has_any_word(("laptop", "notebook", "computer")):
         extracted_info["product_type"] = "laptop"
-    elif re.search(r'\bbook\b', text) or re.search(r'\bnovel\b', text):
+    elif parsed.has_any_word(("book", "novel")):
         extracted_info["product_type"] = "book"
 
-    # Brand detection
-    for key, brand in BRAND_MAP.items():
-        if re.search(rf"\b{re.escape(key)}\b", text):
-            extracted_info["brand"] = brand
-            break
+    # Brand detection (first BRAND_MAP key present)
+    if parsed.brands:
+        extracted_info["brand"] = parsed.brands[0]
 
     # Jewelry brand detection (when category is jewelry/accessories)
     jewelry_brands = {
@@ -291,10 +241,9 @@ def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dic
         "swarovski": "Swarovski", "kay jewelers": "Kay Jewelers", "kay": "Kay Jewelers",
         "zales": "Zales", "jared": "Jared"
     }
-    for key, brand in jewelry_brands.items():
-        if re.search(rf"\b{re.escape(key)}\b", text):
-            extracted_info["brand"] = brand
-            break
+    jewelry_brand = parsed.first_mapped(jewelry_brands)
+    if jewelry_brand:
+        extracted_info["brand"] = jewelry_brand
 
     # "No preference" / "Specific brand" for brand question - satisfies brand slot without filtering
     if re.search(r'\bno\s+preference\b', text) or re.search(r'\bspecific\s+brand\b', text):
@@ -331,7 +280,7 @@ def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dic
         ("serum", "Skincare"), ("palette", "Eyeshadow")
     ]
     for keyword, type_name in jewelry_types + accessory_types + clothing_types + beauty_types:
-        if re.search(rf"\b{re.escape(keyword)}\b", text):
+        if parsed.has_word(keyword):
             extracted_info["subcategory"] = type_name
             extracted_info["item_type"] = type_name
             break
@@ -339,32 +288,28 @@ def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dic
     # Clothing/Beauty brand detection (when in that domain)
     if domain == "clothing":
         clothing_brands = {"nike": "Nike", "patagonia": "Patagonia", "uniqlo": "Uniqlo"}
-        for key, brand in clothing_brands.items():
-            if re.search(rf"\b{re.escape(key)}\b", text):
-                extracted_info["brand"] = brand
-                break
+        clothing_brand = parsed.first_mapped(clothing_brands)
+        if clothing_brand:
+            extracted_info["brand"] = clothing_brand
     if domain == "beauty":
         beauty_brands = {"nars": "NARS", "colourpop": "ColourPop", "fenty": "Fenty Beauty", "nyx": "NYX"}
-        for key, brand in beauty_brands.items():
-            if re.search(rf"\b{re.escape(key)}\b", text):
-                extracted_info["brand"] = brand
-                break
-        if re.search(r"\bmac\b", text) and "macbook" not in text:  # MAC cosmetics, not Apple
+        beauty_brand = parsed.first_mapped(beauty_brands)
+        if beauty_brand:
+            extracted_info["brand"] = beauty_brand
+        if parsed.has_word("mac") and "macbook" not in text:  # MAC cosmetics, not Apple
             extracted_info["brand"] = "MAC"
 
     # GPU/CPU vendors
-    for key, vendor in GPU_VENDOR_MAP.items():
-        if re.search(rf"\b{re.escape(key)}\b", text):
-            extracted_info["gpu_vendor"] = vendor
-            break
+    gpu_vendor = parsed.first_mapped(GPU_VENDOR_MAP)
+    if gpu_vendor:
+        extracted_info["gpu_vendor"] = gpu_vendor
 
-    for key, vendor in CPU_VENDOR_MAP.items():
-        if re.search(rf"\b{re.escape(key)}\b", text):
-            extracted_info["cpu_vendor"] = vendor
-            break
+    cpu_vendor = parsed.first_mapped(CPU_VENDOR_MAP)
+    if cpu_vendor:
+        extracted_info["cpu_vendor"] = cpu_vendor
 
     # Price
-    price_range = _extract_price_range(text)
+    price_range = parsed.price_range
     if price_range:
         extracted_info["price_range"] = price_range
 
@@ -379,10 +324,9 @@ def is_specific_query(query: str, filters: Dict[str, object]) -> Tuple[bool, Dic
         extracted_info["soft_preferences"] = soft_preferences
 
     # Color
-    for key, color in COLOR_KEYWORDS.items():
-        if re.search(rf"\b{re.escape(key)}\b", text):
-            extracted_info["color"] = color
-            break
+    color = parsed.first_mapped(COLOR_KEYWORDS)
+    if color:
+        extracted_info["color"] = color
 
     # If this is a specific title search for books, skip the interview
     if extracted_info.get("specific_title_search"):
@@ -137,6 +137,10 @@ class SearchProductsRequest(BaseModel):
         None,
         description="Opaque session identifier passed through to backends (e.g., IDSS). MCP itself does not manage conversation state."
     )
+    include_facets: bool = Field(
+        False,
+        description="Also return counts per brand, price band, RAM/storage/screen bucket, storage type and use case"
+    )
 
 
 class GetProductRequest(BaseModel):
@@ -323,6 +327,7 @@ class SearchResultsData(BaseModel):
     products: List[ProductSummary]
     total_count: int
     next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, Any]] = None  # see app.facets; only with include_facets
 
 
 # 
@@ -0,0 +1,48 @@
+"""
+Request coalescing ("single-flight") for expensive cache fills.
+
+When a hot cache key is missing, every concurrent request in the worker
+would otherwise recompute it at once. SingleFlight.run(key, factory) starts
+factory() for the first caller only; callers arriving while it is running
+await the same result (or exception) instead of starting their own.
+
+The shared work is shielded, so a caller that disconnects does not cancel
+the computation for the others. This only coalesces within one event loop;
+across workers, use CacheClient.acquire_refresh_lock() and the search
+cache's stale-while-revalidate entries.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Per-key coalescing of concurrent async computations."""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[int, Hashable], "asyncio.Task"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        task = self._inflight.get(slot)
+        if task is None:
+            self.leaders += 1
+            task = loop.create_task(factory())
+            self._inflight[slot] = task
+            task.add_done_callback(lambda t: self._inflight.pop(slot) if self._inflight.get(slot) is t else None)
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.followers, "in_flight": len(self._inflight)}
+
+
+# Search-page fills in endpoints.search_products
+search_flight = SingleFlight()
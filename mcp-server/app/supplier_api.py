@@ -19,6 +19,8 @@ import uuid
 from app.database import get_db
 from app.models import Product, Price, Inventory, Order
 from app.cache import cache_client
+from app.cache_invalidation import publish_catalog_change
+from app.feed_materializer import feed_materializer
 from app.event_logger import log_event
 from app.schemas import ResponseStatus
 
@@ -96,7 +98,8 @@ async def update_price(
     """
     Push price update from supplier.
     
-    Updates PostgreSQL and invalidates cache.
+    Updates PostgreSQL, invalidates cache and marks the product dirty in
+    the materialized feeds.
     """
     try:
         # Verify product exists
@@ -121,8 +124,11 @@ async def update_price(
         
         db.commit()
         
-        # Invalidate cache
+        # Invalidate cache (here immediately; search pages and other workers
+        # via the catalog event) and re-render this product in the feed snapshots
         cache_client.invalidate_product(request.product_id)
+        publish_catalog_change([request.product_id], [product.category], reason="price")
+        feed_materializer.mark_dirty([request.product_id])
         
         logger.info(f"Price updated for {request.product_id}: {request.price_cents} {request.currency}")
         
@@ -150,7 +156,8 @@ async def update_inventory(
     """
     Push inventory update from supplier.
     
-    Updates PostgreSQL and invalidates cache.
+    Updates PostgreSQL, invalidates cache and marks the product dirty in
+    the materialized feeds.
     """
     try:
         # Verify product exists
@@ -175,8 +182,11 @@ async def update_inventory(
         
         db.commit()
         
-        # Invalidate cache
+        # Invalidate cache (here immediately; search pages and other workers
+        # via the catalog event) and re-render this product in the feed snapshots
         cache_client.invalidate_product(request.product_id)
+        publish_catalog_change([request.product_id], [product.category], reason="inventory")
+        feed_materializer.mark_dirty([request.product_id])
         
         logger.info(f"Inventory updated for {request.product_id}: {request.available_qty} available")
         
@@ -71,6 +71,11 @@ TOOL_SEARCH_PRODUCTS = {
             "cursor": {
                 "type": "string",
                 "description": "Pagination cursor from previous response. Optional."
+            },
+            "include_facets": {
+                "type": "boolean",
+                "description": "Also return result counts per brand, price band, RAM/storage/screen bucket, storage type and use case. Optional.",
+                "default": False
             }
         },
         "required": []
@@ -0,0 +1,317 @@
+"""
+Lightweight span tracing for the chat pipeline.
+
+A /chat turn fans out over regex fast paths, the UniversalAgent (run in a
+worker thread), several LLM calls, product store searches, KG re-ranking and
+bucket formatting. This module records that as a tree of spans so a single
+slow turn can be broken down stage by stage:
+
+    with start_trace("chat", session_id=sid) as root:
+        with span("agent.process_message"):
+            await asyncio.to_thread(agent.process_message, msg)
+
+    @traced("probe_search")
+    def _probe_search(...): ...
+
+    completion = client.chat.completions.create(...)
+    record_llm_usage(completion)          # token counts on the current span
+
+The active span lives in a contextvar, so parent/child links follow the
+code across asyncio tasks and asyncio.to_thread() automatically; for bare
+threads or executors wrap the callable with bind_context().
+
+Sampling (env):
+- TRACE_SAMPLE_RATE: fraction of traces exported (0.0-1.0, default 0)
+- TRACE_SLOW_MS: also export any trace slower than this (default 0 = off)
+
+When both are off, span() returns a shared no-op span and costs one
+contextvar lookup. Finished traces are written as one JSON line each to
+TRACE_LOG_PATH (default logs/chat_traces.jsonl) through the same buffered
+sink the latency log uses; start()/stop() it from the app lifespan.
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.latency_log import BufferedJsonlSink
+
+_DEFAULT_TRACE_PATH = Path(__file__).parent.parent.parent / "logs" / "chat_traces.jsonl"
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "end", "error", "thread")
+
+    def __init__(self, trace: "_Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+        self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.root_start) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "thread": self.thread,
+        }
+        if self.attributes:
+            out["attributes"] = self.attributes
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class _NoopSpan:
+    """Stand-in returned when the current request is not being traced."""
+
+    __slots__ = ()
+    recording = False
+    trace = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Spans collected for one root operation (list.append is thread-safe)."""
+
+    __slots__ = ("trace_id", "sampled", "spans", "root_start", "started_at")
+
+    def __init__(self, sampled: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.root_start = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class Tracer:
+    """Sampling policy plus exporter for finished traces."""
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+        sink: Optional[BufferedJsonlSink] = None,
+    ):
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+        self.slow_ms = slow_ms if slow_ms is not None else float(os.getenv("TRACE_SLOW_MS", "0"))
+        self.sink = sink or BufferedJsonlSink(path=Path(os.getenv("TRACE_LOG_PATH") or _DEFAULT_TRACE_PATH))
+        self.exported = 0
+        self.discarded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def _should_export(self, trace: _Trace, duration_ms: float) -> bool:
+        return trace.sampled or (self.slow_ms > 0 and duration_ms >= self.slow_ms)
+
+    def _export(self, root: Span) -> None:
+        trace = root.trace
+        if not self._should_export(trace, root.duration_ms):
+            self.discarded += 1
+            return
+        spans = sorted(trace.spans, key=lambda s: s.start)
+        record = {
+            "trace_id": trace.trace_id,
+            "name": root.name,
+            "ts": trace.started_at.isoformat(),
+            "duration_ms": round(root.duration_ms, 3),
+            "sampled": trace.sampled,
+            "attributes": root.attributes,
+            "spans": [s.to_dict() for s in spans],
+        }
+        if root.error:
+            record["error"] = root.error
+        self.sink.enqueue(record)
+        self.exported += 1
+
+    def start(self) -> None:
+        if self.enabled:
+            self.sink.start()
+
+    async def stop(self) -> None:
+        await self.sink.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "exported": self.exported,
+            "discarded": self.discarded,
+            "sink": self.sink.stats(),
+        }
+
+
+# Global tracer used by the chat pipeline
+tracer = Tracer()
+
+
+def current_span():
+    """The active span, or NOOP_SPAN when nothing is being traced."""
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def start_trace(name: str, force: bool = False, **attributes: Any) -> Iterator[Any]:
+    """
+    Open the root span of a new trace.
+
+    Nested inside an existing trace this behaves like span(). force=True
+    samples the trace regardless of TRACE_SAMPLE_RATE.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        with span(name, **attributes) as s:
+            yield s
+        return
+    if not (force or tracer.enabled):
+        yield NOOP_SPAN
+        return
+
+    sampled = force or random.random() < tracer.sample_rate
+    root = Span(_Trace(sampled), name, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish()
+        tracer._export(root)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time a child of the current span; no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    s = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        s.finish()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of span() for sync and async functions."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def bind_context(fn: Callable) -> Callable:
+    """
+    Carry the current span into a callable run on another thread.
+
+    asyncio.to_thread() already copies the context; use this for
+    ThreadPoolExecutor.submit() or threading.Thread targets.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Annotate the current span (no-op outside a trace)."""
+    current_span().set_attributes(**attributes)
+
+
+def record_llm_usage(completion: Any, target: Any = None) -> None:
+    """
+    Add model and token counts from an OpenAI completion to a span.
+
+    Works for chat.completions.create() and beta...parse() results. Several
+    calls under one span accumulate (llm.calls counts them); missing usage
+    fields are skipped.
+    """
+    s = target or current_span()
+    if not s.recording or completion is None:
+        return
+    attrs = s.attributes
+    attrs["llm.calls"] = attrs.get("llm.calls", 0) + 1
+    model = getattr(completion, "model", None)
+    if isinstance(model, str):
+        attrs["llm.model"] = model
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            attrs[f"llm.{field}"] = attrs.get(f"llm.{field}", 0) + value
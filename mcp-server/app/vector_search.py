@@ -5,7 +5,10 @@ Reuses IDSS embedding code but adapts it for universal product search.
 Supports: vehicles, e-commerce, real estate, travel, and any future product types.
 """
 
+import os
 import pickle
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 import numpy as np
@@ -27,6 +30,45 @@ from app.structured_logger import StructuredLogger
 
 logger = StructuredLogger("vector_search")
 
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("VECTOR_QUERY_CACHE_SIZE", "1024"))
+
+
+def normalize_query_text(text: str) -> str:
+    """Query-embedding cache key: whitespace collapsed (case kept, the encoder is cased)."""
+    return " ".join(text.split())
+
+
+def build_product_text(product: Dict[str, Any]) -> str:
+    """
+    Text representation a product is embedded from:
+    name, description, category, brand, scalar metadata and product type.
+    """
+    parts = []
+
+    # Core fields
+    if product.get("name"):
+        parts.append(str(product["name"]))
+    if product.get("description"):
+        parts.append(str(product["description"]))
+    if product.get("category"):
+        parts.append(f"category: {product['category']}")
+    if product.get("brand"):
+        parts.append(f"brand: {product['brand']}")
+
+    # Type-specific metadata
+    metadata = product.get("metadata", {})
+    if metadata:
+        for key, value in metadata.items():
+            if value and isinstance(value, (str, int, float)):
+                parts.append(f"{key}: {value}")
+
+    # Product type
+    product_type = product.get("product_type", "")
+    if product_type:
+        parts.append(f"product type: {product_type}")
+
+    return " ".join(parts)
+
 
 class UniversalEmbeddingStore:
     """
@@ -68,6 +110,13 @@ class UniversalEmbeddingStore:
         self._product_ids = []
         self._product_id_to_idx = {}
         self._product_embeddings_cache = {}  # product_id -> embedding
+        # normalized query text -> (1, D) embedding, LRU-bounded
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_size = QUERY_EMBEDDING_CACHE_SIZE
+        self._query_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self.encoded_products = 0  # products embedded at query time (not in cache / index)
         
         # Index directory (for caching)
         self.index_dir = Path(__file__).parent.parent / "vector_indices"
@@ -92,8 +141,10 @@ class UniversalEmbeddingStore:
                     "Run: pip install sentence-transformers"
                 )
             
+            from idss.recommendation.encoder_backend import load_sentence_encoder
+
             logger.info("loading_encoder", f"Loading encoder: {self.model_name}", {"model": self.model_name})
-            self._encoder = SentenceTransformer(self.model_name)
+            self._encoder = load_sentence_encoder(self.model_name)
             embedding_dim = self._encoder.get_sentence_embedding_dimension()
             logger.info("encoder_loaded", f"Encoder loaded: {self.model_name}", {
                 "model": self.model_name,
@@ -115,6 +166,76 @@ class UniversalEmbeddingStore:
         encoder = self._get_encoder()
         embedding = encoder.encode([text], convert_to_numpy=True)
         return embedding.astype(np.float32)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a search query, reusing the embedding of an earlier identical query.
+
+        Keyed by normalize_query_text(); at most VECTOR_QUERY_CACHE_SIZE entries.
+
+        Returns:
+            Embedding vector (1, D); treat as read-only
+        """
+        key = normalize_query_text(query)
+        with self._query_lock:
+            embedding = self._query_embeddings.get(key)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(key)
+                self.query_cache_hits += 1
+                return embedding
+            self.query_cache_misses += 1
+        embedding = self.encode_text(key)
+        if self._query_cache_size > 0:
+            with self._query_lock:
+                self._query_embeddings[key] = embedding
+                self._query_embeddings.move_to_end(key)
+                while len(self._query_embeddings) > self._query_cache_size:
+                    self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def _indexed_embedding(self, product_id: str) -> Optional[np.ndarray]:
+        """Embedding stored in the FAISS index for product_id, if any."""
+        idx = self._product_id_to_idx.get(product_id)
+        if self._index is None or idx is None:
+            return None
+        try:
+            return np.asarray(self._index.reconstruct(int(idx)), dtype=np.float32).reshape(1, -1)
+        except Exception:
+            # IVF indexes without a direct map cannot reconstruct
+            return None
+
+    def get_product_embeddings(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Embeddings for products, one row each (N, D).
+
+        Looks up each product_id in the embedding cache, then in the FAISS
+        index; only products found in neither are encoded, in one batch.
+        """
+        rows: List[Optional[np.ndarray]] = [None] * len(products)
+        missing: List[int] = []
+        for i, product in enumerate(products):
+            product_id = product.get("product_id", "")
+            embedding = self._product_embeddings_cache.get(product_id) if product_id else None
+            if embedding is None and product_id:
+                embedding = self._indexed_embedding(product_id)
+                if embedding is not None and self.use_cache:
+                    self._product_embeddings_cache[product_id] = embedding
+            if embedding is None:
+                missing.append(i)
+            else:
+                rows[i] = embedding
+        if missing:
+            encoder = self._get_encoder()
+            texts = [build_product_text(products[i]) for i in missing]
+            encoded = encoder.encode(texts, convert_to_numpy=True, batch_size=32, show_progress_bar=False)
+            encoded = np.asarray(encoded, dtype=np.float32).reshape(len(missing), -1)
+            self.encoded_products += len(missing)
+            for i, embedding in zip(missing, encoded):
+                rows[i] = embedding.reshape(1, -1)
+                product_id = products[i].get("product_id", "")
+                if self.use_cache and product_id:
+                    self._product_embeddings_cache[product_id] = rows[i]
+        return np.vstack(rows)
     
     def encode_product(self, product: Dict[str, Any]) -> np.ndarray:
         """
@@ -130,33 +251,7 @@ class UniversalEmbeddingStore:
         Returns:
             Embedding vector (1, D)
         """
-        # Build text representation
-        parts = []
-        
-        # Core fields
-        if product.get("name"):
-            parts.append(str(product["name"]))
-        if product.get("description"):
-            parts.append(str(product["description"]))
-        if product.get("category"):
-            parts.append(f"category: {product['category']}")
-        if product.get("brand"):
-            parts.append(f"brand: {product['brand']}")
-        
-        # Type-specific metadata
-        metadata = product.get("metadata", {})
-        if metadata:
-            # Add relevant metadata fields
-            for key, value in metadata.items():
-                if value and isinstance(value, (str, int, float)):
-                    parts.append(f"{key}: {value}")
-        
-        # Product type
-        product_type = product.get("product_type", "")
-        if product_type:
-            parts.append(f"product type: {product_type}")
-        
-        text = " ".join(parts)
+        text = build_product_text(product)
         
         # Check cache
         product_id = product.get("product_id", "")
@@ -208,28 +303,7 @@ class UniversalEmbeddingStore:
             if not product_id:
                 continue
             
-            # Build text representation (same logic as encode_product but without encoding)
-            parts = []
-            if product.get("name"):
-                parts.append(str(product["name"]))
-            if product.get("description"):
-                parts.append(str(product["description"]))
-            if product.get("category"):
-                parts.append(f"category: {product['category']}")
-            if product.get("brand"):
-                parts.append(f"brand: {product['brand']}")
-            
-            metadata = product.get("metadata", {})
-            if metadata:
-                for key, value in metadata.items():
-                    if value and isinstance(value, (str, int, float)):
-                        parts.append(f"{key}: {value}")
-            
-            product_type = product.get("product_type", "")
-            if product_type:
-                parts.append(f"product type: {product_type}")
-            
-            text = " ".join(parts)
+            text = build_product_text(product)
             product_texts.append(text)
             product_ids.append(product_id)
         
@@ -375,7 +449,7 @@ class UniversalEmbeddingStore:
                 return [], []
         
         # Encode query
-        query_embedding = self.encode_text(query)
+        query_embedding = self.encode_query(query)
         
         # Search
         if product_ids:
@@ -454,16 +528,15 @@ class UniversalEmbeddingStore:
         if not products:
             return products
         
-        # Encode query
-        query_embedding = self.encode_text(query)
+        # Stored embeddings where available; only unseen products are encoded
+        query_embedding = self.encode_query(query)
+        product_embeddings = self.get_product_embeddings(products)
         
         # Compute similarities
+        distances = np.linalg.norm(product_embeddings - query_embedding[0], axis=1)
+        similarities = 1.0 / (1.0 + distances)
         scored_products = []
-        for product in products:
-            product_embedding = self.encode_product(product)
-            distance = np.linalg.norm(query_embedding[0] - product_embedding[0])
-            similarity = 1.0 / (1.0 + distance)
-            
+        for product, similarity in zip(products, similarities):
             product_copy = product.copy()
             product_copy["_vector_score"] = float(similarity)
             scored_products.append(product_copy)
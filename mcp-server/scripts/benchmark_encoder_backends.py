@@ -0,0 +1,116 @@
+"""
+Benchmark sentence-encoder backends: float torch vs. torch dynamic int8 vs. ONNX int8.
+
+Encodes the evaluation query corpus (evaluation/recommendations/golden_dataset.json
+and evaluation/agent_response/test_cases.json) with every backend from
+idss.recommendation.encoder_backend and reports, per backend:
+
+- load time
+- cosine parity against the float model on the same texts (mean / p5 / min);
+  stored FAISS and Supabase embeddings come from the float model, so this is
+  what query-time retrieval quality depends on
+- single-query latency (p50 / p95, batch size 1) - the /chat query path
+- throughput at larger batch sizes - index builds and unseen-product batches
+
+Exits non-zero when a quantized backend's p5 cosine falls below --min-cosine.
+
+Usage:
+    cd mcp-server && python scripts/benchmark_encoder_backends.py \
+        [--backends torch torch-int8 onnx-int8] [--batch-sizes 32 128] [--min-cosine 0.98]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from idss.recommendation.encoder_backend import BACKENDS, cosine_parity, load_sentence_encoder
+
+CORPUS_FILES = [
+    os.path.join(REPO_ROOT, "evaluation", "recommendations", "golden_dataset.json"),
+    os.path.join(REPO_ROOT, "evaluation", "agent_response", "test_cases.json"),
+]
+
+
+def load_corpus() -> List[str]:
+    queries: List[str] = []
+    for path in CORPUS_FILES:
+        with open(path) as f:
+            queries.extend(row["user_query"] for row in json.load(f) if row.get("user_query"))
+    return queries
+
+
+def single_latency_ms(encoder, corpus: List[str], repeat: int) -> np.ndarray:
+    timings = []
+    for _ in range(repeat):
+        for q in corpus:
+            start = time.perf_counter()
+            encoder.encode([q], convert_to_numpy=True)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    return np.asarray(timings)
+
+
+def throughput(encoder, corpus: List[str], batch_size: int) -> float:
+    texts = (corpus * (batch_size // len(corpus) + 1))[:batch_size]
+    encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True)  # warm-up
+    start = time.perf_counter()
+    encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return batch_size / (time.perf_counter() - start)
+
+
+def run(model_name: str, backends: List[str], batch_sizes: List[int], repeat: int, min_cosine: float) -> int:
+    corpus = load_corpus()
+    print(f"{model_name}: {len(corpus)} queries, single-query repeat={repeat}")
+    reference = None
+    failed = []
+    rows = []
+    for backend in backends:
+        start = time.perf_counter()
+        encoder = load_sentence_encoder(model_name, backend=backend)
+        load_s = time.perf_counter() - start
+        encoder.encode(corpus[:4], convert_to_numpy=True)  # warm-up
+
+        embeddings = encoder.encode(corpus, convert_to_numpy=True)
+        if reference is None:
+            if backend != "torch":
+                print("WARNING: first backend is not torch; parity is relative to it")
+            reference = embeddings
+        parity = cosine_parity(reference, embeddings)
+        if backend != backends[0] and parity["p5"] < min_cosine:
+            failed.append(backend)
+
+        latency = single_latency_ms(encoder, corpus, repeat)
+        rates = [throughput(encoder, corpus, b) for b in batch_sizes]
+        rows.append((backend, load_s, parity, np.percentile(latency, 50), np.percentile(latency, 95), rates))
+
+    rate_cols = "".join(f" {f'b{b} q/s':>10}" for b in batch_sizes)
+    print(f"{'backend':>11} {'load s':>7} {'cos mean':>9} {'cos p5':>7} {'cos min':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7}{rate_cols}")
+    print("-" * (62 + 11 * len(batch_sizes)))
+    for backend, load_s, parity, p50, p95, rates in rows:
+        rate_vals = "".join(f" {r:>10.1f}" for r in rates)
+        print(f"{backend:>11} {load_s:>7.1f} {parity['mean']:>9.4f} {parity['p5']:>7.4f} {parity['min']:>8.4f} "
+              f"{p50:>7.2f} {p95:>7.2f}{rate_vals}")
+
+    if failed:
+        print(f"FAIL: cosine p5 below {min_cosine} for {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[32, 128])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+    sys.exit(run(args.model, args.backends, args.batch_sizes, args.repeat, args.min_cosine))
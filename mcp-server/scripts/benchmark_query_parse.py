@@ -0,0 +1,226 @@
+"""
+Benchmark query extraction: per-stage regex scans vs. the shared single-pass parse.
+
+Replays the evaluation query corpus (evaluation/recommendations/golden_dataset.json
+and evaluation/agent_response/test_cases.json) through the extraction work one
+search turn performs: spec filters, detect_domain keywords, query_specificity
+domain / brand / vendor / color / subcategory / price (twice, because
+should_ask_followup re-runs is_specific_query) and the /chat compare and
+model-number fast paths. The legacy path re-scans the message in every stage
+with re.search(rf"\\b{kw}\\b"); the unified path builds one ParsedQuery per
+turn (cache cleared, so every turn pays a cold parse). Outputs are checked for
+equality.
+
+Usage:
+    cd mcp-server && python scripts/benchmark_query_parse.py [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.query_parse import (
+    BOOK_KEYWORDS,
+    BRAND_MAP,
+    DESKTOP_PC_PHRASES,
+    LAPTOP_KEYWORDS,
+    PHONE_KEYWORDS,
+    VEHICLE_KEYWORDS,
+    parse_query,
+)
+from app.query_parser import (
+    _extract_min_battery,
+    _extract_min_ram,
+    _extract_min_screen,
+    _extract_min_storage,
+    _extract_use_cases,
+    _extract_year,
+)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CORPUS_FILES = [
+    os.path.join(REPO_ROOT, "evaluation", "recommendations", "golden_dataset.json"),
+    os.path.join(REPO_ROOT, "evaluation", "agent_response", "test_cases.json"),
+]
+
+GPU_VENDOR_MAP = {"nvidia": "NVIDIA", "geforce": "NVIDIA", "rtx": "NVIDIA", "gtx": "NVIDIA",
+                  "amd": "AMD", "radeon": "AMD", "intel": "Intel"}
+CPU_VENDOR_MAP = {"intel": "Intel", "amd": "AMD", "apple": "Apple", "m1": "Apple", "m2": "Apple", "m3": "Apple"}
+COLOR_KEYWORDS = {"black": "black", "white": "white", "silver": "silver", "gray": "gray", "grey": "gray",
+                  "blue": "blue", "red": "red", "gold": "gold", "pink": "pink"}
+ITEM_TYPES = [
+    "necklace", "necklaces", "earrings", "earring", "bracelet", "bracelets", "ring", "rings",
+    "pendant", "pendants", "brooch", "anklet", "charm", "scarf", "scarves", "hat", "hats",
+    "belt", "belts", "bag", "bags", "watch", "watches", "sunglasses", "dress", "dresses",
+    "shirt", "shirts", "blouse", "blouses", "pants", "jeans", "graphic tee", "t-shirt",
+    "tshirt", "shorts", "jacket", "jackets", "top", "tops", "tank", "hoodie", "lipstick",
+    "lip", "eyeshadow", "shadow", "mascara", "foundation", "blush", "skincare",
+    "moisturizer", "serum", "palette",
+]
+SPECIFICITY_DOMAINS = [
+    ("books", ("book", "novel")),
+    ("laptops", ("laptop", "computer", "pc", "notebook")),
+    ("jewelry", ("jewelry", "necklace", "earring", "earrings", "bracelet", "ring", "rings", "pendant")),
+    ("accessories", ("accessory", "accessories", "scarf", "hat", "hats", "belt", "belts",
+                     "watch", "watches", "sunglasses")),
+    ("clothing", ("clothing", "clothes", "apparel", "dress", "dresses", "shirt", "shirts", "pant", "pants")),
+    ("beauty", ("beauty", "cosmetic", "cosmetics", "makeup", "lipstick", "eyeshadow", "skincare")),
+]
+_PRICE_DIGITS = r"(\d{1,3}(?:,\d{3})|\d{2,5})"
+
+
+def load_corpus() -> List[str]:
+    queries: List[str] = []
+    for path in CORPUS_FILES:
+        with open(path) as f:
+            queries.extend(row["user_query"] for row in json.load(f) if row.get("user_query"))
+    return queries
+
+
+#  Legacy: every stage scans the raw text itself
+
+def _legacy_first(text: str, keywords):
+    for kw in keywords:
+        if re.search(rf"\b{re.escape(kw)}\b", text):
+            return kw
+    return None
+
+
+def _legacy_price(text: str):
+    m = re.search(r"no\s+more\s+than\s*\$?" + _PRICE_DIGITS, text)
+    if m:
+        return {"max": int(m.group(1).replace(",", ""))}
+    m = re.search(r"\$?" + _PRICE_DIGITS + r"\s*[-–]\s*\$?" + _PRICE_DIGITS, text)
+    if m:
+        return {"min": int(m.group(1).replace(",", "")), "max": int(m.group(2).replace(",", ""))}
+    m = re.search(r"(under|below|<=)\s*\$?" + _PRICE_DIGITS, text)
+    if m:
+        return {"max": int(m.group(2).replace(",", ""))}
+    m = re.search(r"(over|above|>=)\s*\$?" + _PRICE_DIGITS, text)
+    if m:
+        return {"min": int(m.group(2).replace(",", ""))}
+    m = re.search(r"\$" + _PRICE_DIGITS, text)
+    if m:
+        return {"max": int(m.group(1).replace(",", ""))}
+    m = re.search(r"budget\s+(?:of\s+)?\$?" + _PRICE_DIGITS, text)
+    if m:
+        return {"max": int(m.group(1).replace(",", ""))}
+    return None
+
+
+def _legacy_specs(query: str) -> Dict[str, object]:
+    text = query.strip()
+    out: Dict[str, object] = {}
+    for key, fn in (("min_ram_gb", _extract_min_ram), ("min_storage_gb", _extract_min_storage),
+                    ("min_screen_inches", _extract_min_screen), ("min_battery_hours", _extract_min_battery),
+                    ("min_year", _extract_year)):
+        value = fn(text)
+        if value is not None:
+            out[key] = value
+    use_cases = _extract_use_cases(text)
+    if use_cases:
+        out["use_cases"] = use_cases
+    return out
+
+
+def _legacy_keyword_domain(text: str):
+    if _legacy_first(text, VEHICLE_KEYWORDS):
+        return "keyword_vehicle"
+    if any(p in text for p in DESKTOP_PC_PHRASES):
+        return "keyword_desktop"
+    for reason, kws in (("keyword_laptop", LAPTOP_KEYWORDS), ("keyword_book", BOOK_KEYWORDS),
+                        ("keyword_phone", PHONE_KEYWORDS)):
+        if _legacy_first(text, kws):
+            return reason
+    return None
+
+
+def _legacy_specificity(text: str) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    out["domain"] = next((d for d, kws in SPECIFICITY_DOMAINS if _legacy_first(text, kws)), None)
+    kw = _legacy_first(text, BRAND_MAP)
+    out["brand"] = BRAND_MAP[kw] if kw else None
+    out["item_type"] = _legacy_first(text, ITEM_TYPES)
+    for name, mapping in (("gpu", GPU_VENDOR_MAP), ("cpu", CPU_VENDOR_MAP), ("color", COLOR_KEYWORDS)):
+        kw = _legacy_first(text, mapping)
+        out[name] = mapping[kw] if kw else None
+    out["price"] = _legacy_price(text)
+    return out
+
+
+def legacy_turn(query: str) -> Dict[str, object]:
+    text = query.lower().strip()
+    result = {"specs": _legacy_specs(query), "route": _legacy_keyword_domain(text)}
+    result["specificity"] = _legacy_specificity(text)
+    _legacy_specificity(text)  # should_ask_followup -> is_specific_query again
+    result["model"] = tuple(re.findall(r"\b[A-Za-z]\d{1,4}\b|\b\d{4,}\b", text, re.IGNORECASE))
+    result["compare"] = bool(re.search(r"\bcompar\w*\b", text, re.IGNORECASE))
+    return result
+
+
+#  Unified: one parse per turn, shared by every stage
+
+def _unified_specificity(query: str) -> Dict[str, object]:
+    parsed = parse_query(query)
+    out: Dict[str, object] = {}
+    out["domain"] = next((d for d, kws in SPECIFICITY_DOMAINS if parsed.has_any_word(kws)), None)
+    out["brand"] = parsed.brands[0] if parsed.brands else None
+    out["item_type"] = parsed.first_word(ITEM_TYPES)
+    out["gpu"] = parsed.first_mapped(GPU_VENDOR_MAP)
+    out["cpu"] = parsed.first_mapped(CPU_VENDOR_MAP)
+    out["color"] = parsed.first_mapped(COLOR_KEYWORDS)
+    out["price"] = parsed.price_range
+    return out
+
+
+def unified_turn(query: str) -> Dict[str, object]:
+    parsed = parse_query(query.strip())
+    signals = parsed.domain_signals
+    result = {"specs": parsed.spec_filters, "route": signals[0][1] if signals else None}
+    result["specificity"] = _unified_specificity(query)
+    _unified_specificity(query)
+    result["model"] = parsed.model_numbers
+    result["compare"] = parsed.mentions_compare
+    return result
+
+
+def run(repeat: int) -> None:
+    corpus = load_corpus()
+    mismatches = 0
+    for q in corpus:
+        parse_query.cache_clear()
+        if legacy_turn(q) != unified_turn(q):
+            mismatches += 1
+            print(f"MISMATCH: {q!r}")
+
+    def timed(fn, clear):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for q in corpus:
+                if clear:
+                    parse_query.cache_clear()
+                fn(q)
+        return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+    legacy_us = timed(legacy_turn, clear=False)
+    cold_us = timed(unified_turn, clear=True)
+    warm_us = timed(unified_turn, clear=False)
+    print(f"{len(corpus)} queries x {repeat} repeats, {mismatches} mismatches")
+    print(f"{'path':>22} {'us/turn':>9} {'speedup':>8}")
+    print("-" * 42)
+    print(f"{'legacy per-stage scans':>22} {legacy_us:>9.1f} {'1.0x':>8}")
+    print(f"{'unified (cold parse)':>22} {cold_us:>9.1f} {legacy_us / cold_us:>7.1f}x")
+    print(f"{'unified (cached)':>22} {warm_us:>9.1f} {legacy_us / warm_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.repeat)
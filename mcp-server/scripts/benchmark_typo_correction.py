@@ -0,0 +1,105 @@
+"""
+Benchmark typo correction: linear Levenshtein scan vs. symmetric-delete index.
+
+Builds synthetic vocabularies of increasing size (seeded with the real
+DEFAULT_DICTIONARY), corrects a fixed set of misspelled tokens with both
+implementations, checks they agree, and reports per-token latency.
+
+Usage:
+    cd mcp-server && python scripts/benchmark_typo_correction.py [--sizes 25,1000,10000]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.query_normalizer import (
+    DEFAULT_DICTIONARY,
+    FuzzyIndex,
+    correct_typo,
+    levenshtein_distance,
+    similarity_ratio,
+)
+
+
+def linear_correct_typo(word: str, dictionary: List[str]) -> Optional[str]:
+    """The pre-index implementation: Levenshtein against every word."""
+    word_lower = word.lower()
+    if word_lower in dictionary:
+        return word_lower
+    best_match, best_distance = None, None
+    for candidate in dictionary:
+        dist = levenshtein_distance(word_lower, candidate)
+        if best_distance is None or dist < best_distance:
+            best_distance, best_match = dist, candidate
+    if best_match is not None and best_distance <= 2 and similarity_ratio(word_lower, best_match) >= 0.7:
+        return best_match
+    return None
+
+
+def build_vocab(size: int, rng: random.Random) -> List[str]:
+    vocab = list(DEFAULT_DICTIONARY)
+    seen = set(vocab)
+    while len(vocab) < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        if word not in seen:
+            seen.add(word)
+            vocab.append(word)
+    return vocab[:size]
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    chars = list(word)
+    for _ in range(rng.randint(1, 2)):
+        pos = rng.randrange(len(chars))
+        op = rng.choice("ids")
+        if op == "i":
+            chars.insert(pos, rng.choice(string.ascii_lowercase))
+        elif op == "d" and len(chars) > 2:
+            del chars[pos]
+        else:
+            chars[pos] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def run(sizes: List[int], queries: int) -> None:
+    rng = random.Random(0)
+    print(f"{'dict size':>10} {'build ms':>10} {'linear us/tok':>14} {'index us/tok':>13} {'speedup':>8}")
+    print("-" * 60)
+    for size in sizes:
+        vocab = build_vocab(size, rng)
+        tokens = [misspell(rng.choice(vocab), rng) for _ in range(queries)]
+
+        start = time.perf_counter()
+        index = FuzzyIndex(vocab)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Cap the linear pass on big dictionaries; per-token cost is what matters
+        linear_tokens = tokens[: max(20, queries * 1000 // size)]
+        start = time.perf_counter()
+        expected = [linear_correct_typo(t, vocab) for t in linear_tokens]
+        linear_us = (time.perf_counter() - start) / len(linear_tokens) * 1e6
+
+        start = time.perf_counter()
+        got = [correct_typo(t, index) for t in tokens]
+        index_us = (time.perf_counter() - start) / len(tokens) * 1e6
+
+        mismatches = sum(1 for e, g in zip(expected, got) if e != g)
+        print(
+            f"{size:>10} {build_ms:>10.1f} {linear_us:>14.1f} {index_us:>13.1f} "
+            f"{linear_us / index_us:>7.0f}x" + (f"  MISMATCHES={mismatches}" if mismatches else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="25,1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.queries)
@@ -0,0 +1,133 @@
+"""
+Replay a labelled input set through the tiered validator.
+
+For every case the local classifier either decides on its own (confidence at
+or above the threshold) or defers to the LLM. Reports, per threshold, the
+share of LLM calls avoided and accuracy against the labels (is_valid, plus
+the corrected text for valid inputs) next to LLM-only and the keyword
+fallback (_basic_validation).
+
+Without --live the LLM is an oracle that returns the label, so the accuracy
+change is exactly the cost of the local decisions. With --live (needs
+ANTHROPIC_API_KEY) every case is also sent to Claude.
+
+Usage:
+    cd mcp-server && python scripts/benchmark_validator_fast_path.py [--thresholds 0.8,0.85,0.9] [--live]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.llm_validator import FAST_PATH_THRESHOLD, LLMValidator
+
+REPLAY_SET = os.path.join(os.path.dirname(__file__), "data", "validator_replay.json")
+
+
+def load_cases(path: str = REPLAY_SET) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_correct(result: Dict[str, Any], case: Dict[str, Any]) -> bool:
+    if result["is_valid"] != case["is_valid"]:
+        return False
+    if not case["is_valid"]:
+        return True
+    return result["corrected_input"].strip().lower() == case["corrected"].strip().lower()
+
+
+def oracle_answer(case: Dict[str, Any]) -> Dict[str, Any]:
+    return {"is_valid": case["is_valid"], "corrected_input": case["corrected"]}
+
+
+def replay(
+    cases: List[Dict[str, Any]],
+    validator: LLMValidator,
+    threshold: float,
+    llm_answer: Callable[[Dict[str, Any]], Dict[str, Any]] = oracle_answer,
+) -> Dict[str, Any]:
+    """Tiered decisions for every case; llm_answer stands in for the LLM tier."""
+    local_calls = local_correct = correct = llm_correct = 0
+    local_errors: List[str] = []
+    for case in cases:
+        llm = llm_answer(case)
+        llm_ok = is_correct(llm, case)
+        llm_correct += llm_ok
+        local = validator.classify_locally(case["input"], case.get("context"))
+        if local["confidence"] >= threshold:
+            local_calls += 1
+            ok = is_correct(local, case)
+            local_correct += ok
+            if not ok:
+                local_errors.append(case["input"])
+        else:
+            ok = llm_ok
+        correct += ok
+    total = len(cases)
+    return {
+        "threshold": threshold,
+        "cases": total,
+        "llm_calls_avoided": local_calls,
+        "avoided_ratio": local_calls / total if total else 0.0,
+        "local_accuracy": local_correct / local_calls if local_calls else 1.0,
+        "tiered_accuracy": correct / total if total else 1.0,
+        "llm_only_accuracy": llm_correct / total if total else 1.0,
+        "local_errors": local_errors,
+    }
+
+
+def basic_accuracy(cases: List[Dict[str, Any]], validator: LLMValidator) -> float:
+    hits = sum(is_correct(validator._basic_validation(c["input"]), c) for c in cases)
+    return hits / len(cases) if cases else 1.0
+
+
+def live_answer(validator: LLMValidator) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Every case through the LLM tier, bypassing the fast path (memoised per input)."""
+    memo: Dict[tuple, Dict[str, Any]] = {}
+
+    def answer(case: Dict[str, Any]) -> Dict[str, Any]:
+        key = (case["input"], case.get("context"))
+        if key not in memo:
+            saved, validator.fast_path_threshold = validator.fast_path_threshold, float("inf")
+            try:
+                memo[key] = validator.validate_and_correct(case["input"], case.get("context"))
+            finally:
+                validator.fast_path_threshold = saved
+        return memo[key]
+
+    return answer
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", default=f"0.8,{FAST_PATH_THRESHOLD},0.9")
+    parser.add_argument("--cases", default=REPLAY_SET)
+    parser.add_argument("--live", action="store_true", help="send cases to Claude instead of the label oracle")
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.cases)
+    validator = LLMValidator()
+    llm_answer = oracle_answer
+    if args.live:
+        if not validator.enabled:
+            sys.exit("--live needs the anthropic SDK and ANTHROPIC_API_KEY")
+        llm_answer = live_answer(validator)
+
+    print(f"{len(cases)} labelled inputs, LLM tier: {'Claude' if args.live else 'label oracle'}")
+    print(f"keyword fallback accuracy: {basic_accuracy(cases, validator):.1%}")
+    print(f"{'threshold':>9}  {'avoided':>12}  {'local acc':>9}  {'tiered acc':>10}  {'LLM-only acc':>12}")
+    for threshold in sorted({float(t) for t in args.thresholds.split(",")}):
+        r = replay(cases, validator, threshold, llm_answer)
+        print(f"{threshold:>9.2f}  {r['llm_calls_avoided']:>4} ({r['avoided_ratio']:>5.1%})  "
+              f"{r['local_accuracy']:>9.1%}  {r['tiered_accuracy']:>10.1%}  {r['llm_only_accuracy']:>12.1%}")
+        if r["local_errors"]:
+            print(f"           wrong locally: {', '.join(repr(e) for e in r['local_errors'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,15 @@ Populates the knowledge graph with every product from PostgreSQL:
 - Beauty, Clothing, Art, Food, and all other categories (generic Product nodes)
 
 Follows kg.txt instructions: comprehensive coverage, no artificial limits.
+
+Products and similarity edges are written through the batched UNWIND path
+(app.kg_batch); --batch-size sets the rows per transaction.
+
+Usage:
+    cd mcp-server && python scripts/build_knowledge_graph_all.py [--batch-size 500]
 """
 
+import argparse
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -29,6 +36,7 @@ from app.database import SessionLocal
 from app.models import Product
 from app.neo4j_config import Neo4jConnection
 from app.knowledge_graph import KnowledgeGraphBuilder
+from app.kg_batch import GraphBatch
 import random
 import re
 from datetime import datetime, timedelta
@@ -312,7 +320,7 @@ def sanitize_jewelry_price(price: float, product_name: str, default: float = 49.
     return price
 
 
-def main():
+def main(batch_size: int = 500):
     """Build the complete knowledge graph for all products."""
     print("=" * 80)
     print("BUILDING NEO4J KNOWLEDGE GRAPH - ALL PRODUCTS (1000+)")
@@ -357,99 +365,46 @@ def main():
     print("\n4. Creating genre hierarchy...")
     builder.create_genre_hierarchy(GENRE_HIERARCHY)
 
-    # Process laptops (all)
-    print("\n5. Processing laptops...")
-    laptop_ids = []
-    for i, p in enumerate(laptops):
-        try:
-            price = get_price_from_product(p, 999.99)
-            data = extract_laptop_specs(p)
-            data["price"] = price
-            pid = builder.create_laptop_node(data)
-            laptop_ids.append(pid)
-            if (i + 1) % 50 == 0:
-                print(f"   {i + 1}/{len(laptops)} laptops")
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Laptops: {len(laptop_ids)}")
-
-    # Process books (all)
-    print("\n6. Processing books...")
-    book_ids = []
-    for i, p in enumerate(books):
-        try:
-            price = get_price_from_product(p, 19.99)
-            data = extract_book_metadata(p)
-            data["price"] = price
-            pid = builder.create_book_node(data)
-            book_ids.append(pid)
-            if (i + 1) % 100 == 0:
-                print(f"   {i + 1}/{len(books)} books")
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Books: {len(book_ids)}")
-
-    # Process jewelry (all)
-    print("\n7. Processing jewelry...")
-    jewelry_ids = []
-    for i, p in enumerate(jewelry):
-        try:
-            price = get_price_from_product(p, 49.99)
-            price = sanitize_jewelry_price(price, p.name, 49.99)
-            data = to_jewelry_data(p, price)
-            pid = builder.create_jewelry_node(data)
-            jewelry_ids.append(pid)
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Jewelry: {len(jewelry_ids)}")
-
-    # Process accessories (all)
-    print("\n8. Processing accessories...")
-    accessory_ids = []
-    for i, p in enumerate(accessories):
-        try:
-            price = get_price_from_product(p, 29.99)
-            data = to_accessory_data(p, price)
-            pid = builder.create_accessory_node(data)
-            accessory_ids.append(pid)
-            if (i + 1) % 50 == 0:
-                print(f"   {i + 1}/{len(accessories)} accessories")
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Accessories: {len(accessory_ids)}")
-
-    # Process other electronics (generic Product with category Electronics)
-    print("\n9. Processing other electronics...")
-    other_elec_ids = []
-    for i, p in enumerate(other_electronics):
-        try:
-            price = get_price_from_product(p, 199.99)
-            data = to_generic_product_data(p, price)
-            pid = builder.create_generic_product_node(data)
-            other_elec_ids.append(pid)
-            if (i + 1) % 50 == 0:
-                print(f"   {i + 1}/{len(other_electronics)}")
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Other Electronics: {len(other_elec_ids)}")
-
-    # Process generic (Beauty, Clothing, Art, Food, etc.)
-    print("\n10. Processing other categories (Beauty, Clothing, Art, Food, etc.)...")
-    generic_ids = []
-    for i, p in enumerate(generic):
-        try:
-            price = get_price_from_product(p, 24.99)
-            data = to_generic_product_data(p, price)
-            pid = builder.create_generic_product_node(data)
-            generic_ids.append(pid)
-            if (i + 1) % 100 == 0:
-                print(f"   {i + 1}/{len(generic)}")
-        except Exception as e:
-            print(f"   [WARN] {p.name}: {e}")
-    print(f"Other categories: {len(generic_ids)}")
+    # Decompose every product into label / relationship-type groups
+    print("\n5. Preparing product batches...")
+    batch = GraphBatch()
+
+    def collect(products, default_price, to_data, add):
+        ids = []
+        for p in products:
+            try:
+                ids.append(add(to_data(p, get_price_from_product(p, default_price))))
+            except Exception as e:
+                print(f"   [WARN] {p.name}: {e}")
+        return ids
+
+    laptop_ids = collect(laptops, 999.99, lambda p, price: {**extract_laptop_specs(p), "price": price},
+                         batch.add_laptop)
+    book_ids = collect(books, 19.99, lambda p, price: {**extract_book_metadata(p), "price": price},
+                       batch.add_book)
+    jewelry_ids = collect(jewelry, 49.99,
+                          lambda p, price: to_jewelry_data(p, sanitize_jewelry_price(price, p.name, 49.99)),
+                          batch.add_jewelry)
+    accessory_ids = collect(accessories, 29.99, to_accessory_data, batch.add_accessory)
+    other_elec_ids = collect(other_electronics, 199.99, to_generic_product_data, batch.add_generic_product)
+    generic_ids = collect(generic, 24.99, to_generic_product_data, batch.add_generic_product)
+    print(f"   Laptops: {len(laptop_ids)}, Books: {len(book_ids)}, Jewelry: {len(jewelry_ids)}, "
+          f"Accessories: {len(accessory_ids)}, Other Electronics: {len(other_elec_ids)}, "
+          f"Other categories: {len(generic_ids)}")
+
+    # SIMILAR_TO relationships within categories
+    sim_count = 0
+    for ids, pairs in [(laptop_ids, 30), (book_ids, 40), (jewelry_ids, 15), (accessory_ids, 30)]:
+        for i in range(min(pairs, len(ids) - 1)):
+            batch.add_comparison(ids[i], ids[i + 1], "SIMILAR_TO", random.uniform(0.6, 0.95))
+            sim_count += 1
+
+    print(f"\n6. Writing {len(batch)} nodes and relationships (batch size {batch_size})...")
+    load_stats = builder.bulk_load(batch, batch_size=batch_size)
+    print(f"Similarity relationships: {sim_count}")
 
     # Create reviews (sample for variety)
-    print("\n11. Creating sample reviews...")
+    print("\n7. Creating sample reviews...")
     all_ids = laptop_ids + book_ids + jewelry_ids + accessory_ids + other_elec_ids + generic_ids
     review_count = 0
     sample_ids = all_ids[:min(100, len(all_ids))]
@@ -478,20 +433,8 @@ def main():
                 pass
     print(f"Reviews: {review_count}")
 
-    # Create SIMILAR_TO relationships within categories
-    print("\n12. Creating similarity relationships...")
-    sim_count = 0
-    for ids, batch_size in [(laptop_ids, 30), (book_ids, 40), (jewelry_ids, 15), (accessory_ids, 30)]:
-        for i in range(min(batch_size, len(ids) - 1)):
-            try:
-                builder.create_comparison_relationships(ids[i], ids[i + 1], "SIMILAR_TO", random.uniform(0.6, 0.95))
-                sim_count += 1
-            except Exception:
-                pass
-    print(f"Similarity relationships: {sim_count}")
-
     # Literary connections for books
-    print("\n13. Creating literary connections...")
+    print("\n8. Creating literary connections...")
     lit_count = 0
     for i in range(min(20, len(book_ids) - 1)):
         if random.random() < 0.4:
@@ -507,7 +450,7 @@ def main():
     print(f"Literary connections: {lit_count}")
 
     # Entity resolution: merge duplicate Authors, Manufacturers, Brands
-    print("\n14. Running entity resolution...")
+    print("\n9. Running entity resolution...")
     try:
         merge_counts = builder.run_entity_resolution(similarity_threshold=0.88)
         total_merged = sum(merge_counts.values())
@@ -523,7 +466,9 @@ def main():
     print("KNOWLEDGE GRAPH STATISTICS")
     print("=" * 80)
     stats = builder.get_graph_statistics()
-    print(f"\nTotal Nodes: {stats.get('total_nodes', 'N/A')}")
+    print(f"\nBatch load: {load_stats.rows} rows in {load_stats.seconds:.1f}s "
+          f"({load_stats.rows_per_second:.0f} rows/s, {load_stats.failed_rows} failed)")
+    print(f"Total Nodes: {stats.get('total_nodes', 'N/A')}")
     print(f"Total Relationships: {stats.get('total_relationships', 'N/A')}")
     print(f"\nLaptops: {stats.get('laptops', 0)}")
     print(f"Books: {stats.get('books', 0)}")
@@ -550,4 +495,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the Neo4j knowledge graph for all products")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per UNWIND transaction")
+    args = parser.parse_args()
+    main(batch_size=args.batch_size)
@@ -361,6 +361,76 @@ class TestACPEndpointFunctions:
         assert result is None
 
 
+class TestACPFeedStreaming:
+    @staticmethod
+    def _row(i, inventory=5):
+        row = MagicMock()
+        row.product_id = f"prod-{i}"
+        row.name = f"Laptop {i}, 16GB"
+        row.description = None
+        row.price_value = 999.5
+        row.inventory = inventory
+        row.link = None
+        row.image_url = None
+        row.category = "Electronics"
+        row.brand = "Dell"
+        row.rating = None
+        row.rating_count = None
+        return row
+
+    def _db(self, rows):
+        db = MagicMock()
+        db.query.return_value.filter.return_value.yield_per.return_value = iter(rows)
+        db.query.return_value.filter.return_value.limit.return_value.yield_per.return_value = iter(rows)
+        return db
+
+    def test_stream_json_matches_feed_items(self):
+        import json
+        from app.acp_endpoints import stream_product_feed_json
+        rows = [self._row(0), self._row(1, inventory=0)]
+        doc = json.loads("".join(stream_product_feed_json(self._db(rows))))
+        assert doc["protocol"] == "acp"
+        assert doc["count"] == 2
+        assert doc["items"][0]["id"] == "prod-0"
+        assert doc["items"][1]["availability"] == "out_of_stock"
+
+    def test_stream_csv_quotes_fields(self):
+        from app.acp_endpoints import stream_product_feed_csv, ACP_FEED_CSV_HEADER
+        lines = "".join(stream_product_feed_csv(self._db([self._row(0)]))).split("\n")
+        assert lines[0] == ACP_FEED_CSV_HEADER
+        assert '"Laptop 0, 16GB"' in lines[1]
+
+    def test_stream_uses_server_side_cursor(self):
+        from app.acp_endpoints import iter_product_feed
+        db = self._db([self._row(0)])
+        list(iter_product_feed(db, chunk_size=250))
+        db.query.return_value.filter.return_value.yield_per.assert_called_once_with(250)
+
+    def test_stream_aborts_on_database_error(self):
+        from app.acp_endpoints import stream_product_feed_json
+
+        def rows():
+            yield self._row(0)
+            raise RuntimeError("server closed the connection")
+
+        chunks = []
+        with pytest.raises(RuntimeError):
+            for chunk in stream_product_feed_json(self._db(rows())):
+                chunks.append(chunk)
+        assert '"count"' not in "".join(chunks)
+
+    def test_generate_product_feed_returns_empty_list_on_error(self):
+        from app.acp_endpoints import generate_product_feed
+        db = MagicMock()
+        db.query.side_effect = RuntimeError("database unavailable")
+        assert generate_product_feed(db) == []
+
+    def test_generate_product_feed_still_returns_list(self):
+        from app.acp_endpoints import generate_product_feed
+        items = generate_product_feed(self._db([self._row(0), self._row(1)]), limit=2)
+        assert [i.id for i in items] == ["prod-0", "prod-1"]
+
+
 # ============================================================================
 # Layer 4 — ACP HTTP Routes (TestClient, no real DB)
 # ============================================================================
@@ -539,6 +609,40 @@ class TestACPHTTPRoutes:
         assert resp.status_code == 200
         assert "text/csv" in resp.headers.get("content-type", "")
 
+    def test_feed_json_has_validators_and_honors_if_none_match(self, client):
+        from datetime import datetime, timezone
+        from app.database import get_db
+        from app.main import app
+
+        fingerprint_db = MagicMock()
+        fingerprint_db.query.return_value.one.return_value = (
+            3, datetime(2026, 1, 30, 12, 0, tzinfo=timezone.utc),
+        )
+
+        def override_get_db():
+            yield fingerprint_db
+
+        prev = app.dependency_overrides[get_db]
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            first = client.get("/acp/feed.json")
+            etag = first.headers.get("etag")
+            assert first.status_code == 200
+            assert etag
+            assert first.headers.get("last-modified") == "Fri, 30 Jan 2026 12:00:00 GMT"
+
+            second = client.get("/acp/feed.json", headers={"If-None-Match": etag})
+            assert second.status_code == 304
+            assert second.content == b""
+
+            third = client.get(
+                "/acp/feed.json",
+                headers={"If-Modified-Since": "Fri, 30 Jan 2026 12:00:00 GMT"},
+            )
+            assert third.status_code == 304
+        finally:
+            app.dependency_overrides[get_db] = prev
+
     def test_webhook_returns_received(self, client):
         resp = client.post(
             "/acp/webhooks/orders",
@@ -0,0 +1,119 @@
+"""
+Tests for the serverless API's persistent sessions and embedding cache
+(api/index.py). A cold start is simulated by building a new store on the
+same SQLite file and clearing the in-process embedding LRU.
+"""
+
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+api_index = importlib.import_module("api.index")
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.requests = []
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model, input):
+        self.requests.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t)), 0.5, -1.0]) for t in input])
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / "api.sqlite")
+    monkeypatch.setattr(api_index, "_store", api_index.SQLiteStore(path))
+    monkeypatch.setattr(api_index, "_embedding_memory", api_index.OrderedDict())
+    return path
+
+
+def _cold_start(monkeypatch, path):
+    monkeypatch.setattr(api_index, "_store", api_index.SQLiteStore(path))
+    monkeypatch.setattr(api_index, "_embedding_memory", api_index.OrderedDict())
+
+
+class TestSessions:
+    def test_session_survives_cold_start(self, store, monkeypatch):
+        session = api_index.new_session("s1")
+        session["question_count"] = 2
+        session["filters"]["make"] = "Toyota"
+        api_index.get_store().save_session(session)
+
+        _cold_start(monkeypatch, store)
+        restored = api_index.get_store().get_session("s1")
+        assert restored["filters"] == {"make": "Toyota"} and restored["question_count"] == 2
+        assert api_index.get_store().count_sessions() == 1
+
+    def test_expired_session_not_returned(self, tmp_path):
+        sqlite_store = api_index.SQLiteStore(str(tmp_path / "ttl.sqlite"), ttl_seconds=-1)
+        sqlite_store.save_session(api_index.new_session("old"))
+        assert sqlite_store.get_session("old") is None
+        assert sqlite_store.count_sessions() == 0
+
+    def test_backend_selection(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(api_index, "_store", None)
+        monkeypatch.delenv("UPSTASH_REDIS_URL", raising=False)
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        monkeypatch.setenv("SESSION_BACKEND", "memory")
+        assert isinstance(api_index.get_store(), api_index.MemoryStore)
+
+        monkeypatch.setattr(api_index, "_store", None)
+        monkeypatch.delenv("SESSION_BACKEND")
+        monkeypatch.setenv("SESSION_DB_PATH", str(tmp_path / "default.sqlite"))
+        assert isinstance(api_index.get_store(), api_index.SQLiteStore)
+
+
+class TestEmbeddingCache:
+    def test_repeated_texts_embedded_once(self, store):
+        client = FakeOpenAI()
+        texts = ["Under $30k", "SUV", "Under $30k"]
+        vectors = api_index.get_embeddings(texts, client=client)
+        assert client.requests == [["Under $30k", "SUV"]]
+        assert vectors[0] == vectors[2] == [10.0, 0.5, -1.0]
+
+        api_index.get_embeddings(["SUV", "Sedan"], client=client)
+        assert client.requests[1:] == [["Sedan"]]
+
+    def test_persistent_cache_survives_cold_start(self, store, monkeypatch):
+        client = FakeOpenAI()
+        first = api_index.get_embeddings(["Must have AWD"], client=client)
+        _cold_start(monkeypatch, store)
+        assert api_index.get_embeddings(["Must have AWD"], client=client) == first
+        assert len(client.requests) == 1
+
+    def test_key_depends_on_model_and_text(self):
+        assert api_index.embedding_key("SUV") != api_index.embedding_key("SUV ")
+        assert api_index.embedding_key("SUV") != api_index.embedding_key("SUV", model="other")
+
+    def test_memory_lru_bounded(self, store, monkeypatch):
+        monkeypatch.setattr(api_index, "EMBEDDING_MEMORY_SIZE", 2)
+        api_index.get_embeddings(["a", "b", "c"], client=FakeOpenAI())
+        assert len(api_index._embedding_memory) == 2
+
+
+class DownRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("Error 111 connecting to redis:6379. Connection refused.")
+        return fail
+
+
+class TestRedisOutage:
+    def test_sessions_fall_back_to_memory(self):
+        redis_store = api_index.RedisStore("redis://unused", client=DownRedis())
+        session = api_index.new_session("s1")
+        session["question_count"] = 1
+        redis_store.save_session(session)
+        assert redis_store.get_session("s1")["question_count"] == 1
+        assert redis_store.get_session("missing") is None
+        assert redis_store.count_sessions() == 1
+
+    def test_embedding_cache_outage_still_embeds(self, monkeypatch):
+        monkeypatch.setattr(api_index, "_store", api_index.RedisStore("redis://unused", client=DownRedis()))
+        monkeypatch.setattr(api_index, "_embedding_memory", api_index.OrderedDict())
+        client = FakeOpenAI()
+        assert api_index.get_embeddings(["SUV"], client=client) == [[3.0, 0.5, -1.0]]
+        assert client.requests == [["SUV"]]
@@ -0,0 +1,163 @@
+"""
+Tests for CacheClient's batched product lookups, value compression and
+per-namespace statistics. Uses an in-process fake Redis that counts round
+trips, so no server is needed.
+"""
+
+import json
+
+import pytest
+
+from app.cache import CacheClient, _COMPRESSED_PREFIX
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, name)(*args, _count=False, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.zsets = {}
+        self.round_trips = 0
+        self.fail = False
+
+    def _trip(self, count):
+        if self.fail:
+            raise ConnectionError("redis down")
+        if count:
+            self.round_trips += 1
+
+    def get(self, key, _count=True):
+        self._trip(_count)
+        return self.data.get(key)
+
+    def mget(self, keys, _count=True):
+        self._trip(_count)
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value, _count=True):
+        self._trip(_count)
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def zincrby(self, name, amount, member, _count=True):
+        self._trip(_count)
+        zset = self.zsets.setdefault(name, {})
+        zset[member] = zset.get(member, 0.0) + amount
+        return zset[member]
+
+    def zscore(self, name, member, _count=True):
+        self._trip(_count)
+        return self.zsets.get(name, {}).get(member)
+
+    def pipeline(self, transaction=True):
+        self._trip(False)
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def cache():
+    c = CacheClient(namespace="mcp")
+    c.client = FakeRedis()
+    return c
+
+
+def _store(cache, pid, name="Laptop"):
+    cache.set_product_bundle(
+        pid,
+        {"product_id": pid, "name": name},
+        {"price_cents": 99900, "currency": "USD"},
+        {"available_qty": 4},
+    )
+
+
+class TestProductBundles:
+    def test_round_trip_single_call(self, cache):
+        for pid in ("p1", "p2", "p3"):
+            _store(cache, pid, name=f"Laptop {pid}")
+        cache.client.round_trips = 0
+
+        bundles = cache.get_product_bundles(["p1", "p2", "p3", "missing"])
+        assert cache.client.round_trips == 1
+        assert bundles["p2"]["summary"]["name"] == "Laptop p2"
+        assert bundles["p3"]["price"]["price_cents"] == 99900
+        assert bundles["p1"]["inventory"] == {"available_qty": 4}
+        assert bundles["missing"] == {"summary": None, "price": None, "inventory": None}
+
+    def test_set_bundle_is_one_round_trip(self, cache):
+        _store(cache, "p1")
+        assert cache.client.round_trips == 1
+        assert cache.client.ttls["mcp:price:p1"] == cache.ttl_price
+        assert cache.client.ttls["mcp:inventory:p1"] == cache.ttl_inventory
+
+    def test_record_access_returns_popularity(self, cache):
+        for _ in range(10):
+            bundle = cache.get_product_bundles(["hot"], record_access=True)["hot"]
+        assert bundle["popularity"] == 10.0
+        assert cache.client.round_trips == 10
+
+        cache.set_product_bundle("hot", {"name": "x"}, {"price_cents": 1}, {"available_qty": 1},
+                                 adaptive=True, popularity=bundle["popularity"])
+        assert cache.client.ttls["mcp:prod_summary:hot"] == cache.ttl_product_summary * 3
+
+    def test_matches_single_key_getters(self, cache):
+        _store(cache, "p1")
+        bundle = cache.get_product_bundles(["p1"])["p1"]
+        assert bundle["summary"] == cache.get_product_summary("p1")
+        assert bundle["price"] == cache.get_price("p1")
+        assert bundle["inventory"] == cache.get_inventory("p1")
+
+    def test_redis_error_returns_empty_bundles(self, cache):
+        cache.client.fail = True
+        bundles = cache.get_product_bundles(["p1"])
+        assert bundles["p1"]["summary"] is None
+        assert cache.stats()["by_key_type"]["price"]["errors"] == 1
+        assert cache.set_product_bundle("p1", {}, {}, {}) is False
+
+
+class TestCompression:
+    def test_large_values_compressed_and_restored(self, cache):
+        cache.compress_threshold = 256
+        results = [{"product_id": f"id-{i}", "name": "Gaming laptop 16GB RAM"} for i in range(50)]
+        assert cache.set_search_results("search:k", results)
+        raw = cache.client.data["mcp:search:k"]
+        assert raw.startswith(_COMPRESSED_PREFIX)
+        assert len(raw) < len(json.dumps(results))
+        assert cache.get_search_results("search:k") == results
+
+    def test_small_values_stay_plain(self, cache):
+        _store(cache, "p1")
+        assert cache.client.data["mcp:price:p1"] == json.dumps({"price_cents": 99900, "currency": "USD"})
+
+    def test_plain_values_written_elsewhere_still_readable(self, cache):
+        cache.client.data["mcp:price:legacy"] = json.dumps({"price_cents": 5})
+        assert cache.get_price("legacy") == {"price_cents": 5}
+
+
+class TestStats:
+    def test_hit_ratio_per_key_type(self, cache):
+        _store(cache, "p1")
+        cache.get_product_bundles(["p1", "p2"])
+        cache.get_search_results("nope")
+        stats = cache.stats()
+        assert stats["read_round_trips"] == 2
+        assert stats["by_key_type"]["price"] == {"hits": 1, "misses": 1, "errors": 0, "hit_ratio": 0.5}
+        assert stats["by_key_type"]["search"]["misses"] == 1
+
+        cache.reset_stats()
+        assert cache.stats()["by_key_type"] == {}
@@ -0,0 +1,187 @@
+"""
+Tests for event-driven cache invalidation: catalog change events on a
+(fake) Redis stream, the consumer-group subscriber, and per-category search
+generations folded into search keys.
+"""
+
+import json
+
+import pytest
+
+from app import cache_invalidation
+from app.cache import CacheClient
+from app.cache_invalidation import (
+    CacheInvalidationSubscriber,
+    STREAM_KEY,
+    apply_catalog_change,
+    publish_catalog_change,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    """Strings, INCR and a single-group stream — enough for the invalidator."""
+
+    def __init__(self):
+        self.data = {}
+        self.stream = []
+        self.delivered = 0
+        self.pending = {}
+        self.acked = []
+        self.fail_xadd = False
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        if self.fail_xadd:
+            raise ConnectionError("redis down")
+        message_id = f"{len(self.stream) + 1}-0"
+        self.stream.append((message_id, dict(fields)))
+        return message_id
+
+    def xgroup_create(self, name, group, id="$", mkstream=False):
+        if getattr(self, "_group", None):
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self._group = group
+        self.delivered = len(self.stream) if id == "$" else 0
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        if streams[STREAM_KEY] == "0":
+            return [[STREAM_KEY, sorted(self.pending.items())]]
+        batch = self.stream[self.delivered:self.delivered + (count or len(self.stream))]
+        self.delivered += len(batch)
+        self.pending.update(batch)
+        return [[STREAM_KEY, batch]] if batch else []
+
+    def xack(self, name, group, *ids):
+        for message_id in ids:
+            self.pending.pop(message_id, None)
+            self.acked.append(message_id)
+        return len(ids)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.delenv("CACHE_INVALIDATION_MODE", raising=False)
+    c = CacheClient(namespace="mcp")
+    c.client = FakeRedis()
+    return c
+
+
+def _cache_product(cache, pid):
+    for kind in ("prod_summary", "price", "inventory"):
+        cache.client.setex(f"mcp:{kind}:{pid}", 60, json.dumps({"pid": pid}))
+
+
+class TestSearchGeneration:
+    def test_bump_changes_search_key_for_that_category_only(self, cache):
+        laptops = cache.search_key({"brand": "Dell"}, "Electronics")
+        books = cache.search_key({"genre": "Mystery"}, "Books")
+        cache.bump_search_generation(["Electronics"])
+        assert cache.search_key({"brand": "Dell"}, "Electronics") != laptops
+        assert cache.search_key({"genre": "Mystery"}, "Books") == books
+
+    def test_unknown_category_bumps_everything(self, cache):
+        books = cache.search_key({}, "Books")
+        cache.bump_search_generation([None])
+        assert cache.search_key({}, "Books") != books
+
+    def test_search_without_category_moves_on_every_bump(self, cache):
+        uncategorised = cache.search_key({"brand": "Dell"}, "")
+        cache.bump_search_generation(["Electronics"])
+        after_electronics = cache.search_key({"brand": "Dell"}, "")
+        assert after_electronics != uncategorised
+        cache.bump_search_generation([None])
+        assert cache.search_key({"brand": "Dell"}, "") != after_electronics
+
+    def test_static_key_unchanged_without_generation(self):
+        assert CacheClient.make_search_key({"a": 1}, "Books") == CacheClient.make_search_key({"a": 1}, "Books", generation=0)
+
+
+class TestPublishAndSubscribe:
+    def test_event_applied_once_and_acked(self, cache):
+        _cache_product(cache, "p1")
+        subscriber = CacheInvalidationSubscriber(cache=cache, enabled=True)
+        subscriber.poll_once()  # creates the group at the stream tail
+        key_before = cache.search_key({}, "Electronics")
+
+        assert publish_catalog_change(["p1"], ["Electronics"], reason="price", cache=cache)
+        assert cache.get_price("p1") is not None  # not applied until consumed
+
+        assert subscriber.poll_once() == 1
+        assert cache.get_price("p1") is None and cache.get_product_summary("p1") is None
+        assert cache.search_key({}, "Electronics") != key_before
+        assert cache.client.acked == ["1-0"] and not cache.client.pending
+        assert subscriber.stats["events_applied"] == 1
+        assert subscriber.poll_once() == 0
+
+    def test_pending_events_redelivered(self, cache):
+        subscriber = CacheInvalidationSubscriber(cache=cache, enabled=True)
+        subscriber._ensure_group()
+        publish_catalog_change(["p2"], ["Books"], cache=cache)
+        # Simulate a crash after delivery, before XACK
+        cache.client.xreadgroup("g", "c", {STREAM_KEY: ">"})
+        _cache_product(cache, "p2")
+        assert subscriber.poll_once(pending=True) == 1
+        assert cache.get_inventory("p2") is None
+
+    def test_stream_failure_falls_back_to_direct(self, cache):
+        _cache_product(cache, "p3")
+        cache.client.fail_xadd = True
+        assert publish_catalog_change(["p3"], ["Books"], cache=cache)
+        assert cache.get_price("p3") is None
+
+    def test_direct_mode_skips_stream(self, cache, monkeypatch):
+        monkeypatch.setenv("CACHE_INVALIDATION_MODE", "direct")
+        _cache_product(cache, "p4")
+        publish_catalog_change(["p4"], ["Electronics"], cache=cache)
+        assert cache.client.stream == []
+        assert cache.get_price("p4") is None
+        assert not CacheInvalidationSubscriber(cache=cache).enabled
+
+    def test_off_mode_publishes_nothing(self, cache, monkeypatch):
+        monkeypatch.setenv("CACHE_INVALIDATION_MODE", "off")
+        assert publish_catalog_change(["p5"], ["Books"], cache=cache) is False
+        assert cache.client.stream == []
+
+    def test_apply_batches_many_products(self, cache):
+        for i in range(600):
+            _cache_product(cache, f"p{i}")
+        apply_catalog_change([f"p{i}" for i in range(600)], ["Electronics"], cache=cache)
+        assert not any(k.startswith("mcp:price:") for k in cache.client.data)
+
+
+def test_module_singleton_uses_env_mode(monkeypatch):
+    monkeypatch.setenv("CACHE_INVALIDATION_MODE", "off")
+    assert cache_invalidation.CacheInvalidationSubscriber().enabled is False
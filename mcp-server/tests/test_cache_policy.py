@@ -145,22 +145,22 @@ class TestExistingCacheMethods:
 
 class TestIndexQueries:
     def test_category_index(self, client):
-        # Populate a category set directly in Redis
-        client.client.sadd("category:TestCat", "p1", "p2", "p3")
+        # Populate a candidate-index category set directly in Redis
+        client.client.sadd(client._key("idx:cat:TestCat"), "p1", "p2", "p3")
         result = client.get_product_ids_by_filters(category="TestCat")
         assert result is not None
         assert "p1" in result
         assert len(result) == 3
 
     def test_brand_index(self, client):
-        client.client.sadd("brand:TestBrand", "p1", "p2")
+        client.client.sadd(client._key("idx:brand:testbrand"), "p1", "p2")
         result = client.get_product_ids_by_filters(brand="TestBrand")
         assert result is not None
         assert len(result) == 2
 
     def test_intersection(self, client):
-        client.client.sadd("category:Electronics", "p1", "p2", "p3")
-        client.client.sadd("brand:Dell", "p2", "p3", "p4")
+        client.client.sadd(client._key("idx:cat:Electronics"), "p1", "p2", "p3")
+        client.client.sadd(client._key("idx:brand:dell"), "p2", "p3", "p4")
         result = client.get_product_ids_by_filters(category="Electronics", brand="Dell")
         assert result is not None
         assert result == {"p2", "p3"}
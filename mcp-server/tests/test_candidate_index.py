@@ -0,0 +1,309 @@
+"""
+Tests for the Redis candidate index: index entries, the filter planner,
+set-algebra search (counts, price order, spec thresholds) and incremental
+re-indexing. Uses an in-process fake Redis and a fake session, so neither
+Redis nor Postgres is needed.
+"""
+
+import fnmatch
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app import candidate_index as candidate_index_module
+from app.cache import CacheClient
+from app.cache_invalidation import apply_catalog_change
+from app.candidate_index import CandidateIndex, index_entry
+
+
+def _parse_bound(bound):
+    bound = str(bound)
+    if bound.startswith("("):
+        return float(bound[1:]), True
+    return float(bound), False
+
+
+def _in_range(score, lo, hi):
+    lo_v, lo_ex = _parse_bound(lo)
+    hi_v, hi_ex = _parse_bound(hi)
+    return (score > lo_v if lo_ex else score >= lo_v) and (score < hi_v if hi_ex else score <= hi_v)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        ops, self.ops = self.ops, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in ops]
+
+
+class FakeRedis:
+    """Strings, sets and sorted sets with the commands the index uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value if isinstance(value, str) else None
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def set(self, key, value):
+        self.data[key] = value
+        return True
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+    def scan_iter(self, match="*", count=None):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match)]
+
+    def _members(self, key):
+        value = self.data.get(key)
+        if isinstance(value, dict):
+            return value
+        if isinstance(value, set):
+            return {m: 1.0 for m in value}
+        return {}
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def sunionstore(self, dest, keys):
+        self.data[dest] = set().union(*(self.data.get(k, set()) for k in keys))
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for m in members:
+            self.data.get(key, {}).pop(m, None)
+
+    def _weighted(self, keys):
+        return keys.items() if isinstance(keys, dict) else [(k, 1) for k in keys]
+
+    def zunionstore(self, dest, keys):
+        out = {}
+        for key, weight in self._weighted(keys):
+            for m, score in self._members(key).items():
+                out[m] = out.get(m, 0) + score * weight
+        self.data[dest] = out
+
+    def zinterstore(self, dest, keys):
+        weighted = list(self._weighted(keys))
+        sources = [(self._members(k), w) for k, w in weighted]
+        common = set(sources[0][0]).intersection(*(set(s) for s, _ in sources[1:]))
+        self.data[dest] = {m: sum(s[m] * w for s, w in sources) for m in common}
+
+    def zremrangebyscore(self, key, lo, hi):
+        zset = self.data.get(key, {})
+        for m in [m for m, s in zset.items() if _in_range(s, lo, hi)]:
+            del zset[m]
+
+    def zcount(self, key, lo, hi):
+        return sum(1 for s in self._members(key).values() if _in_range(s, lo, hi))
+
+    def zrangebyscore(self, key, lo, hi, start=None, num=None):
+        ordered = sorted((s, m) for m, s in self._members(key).items() if _in_range(s, lo, hi))
+        members = [m for _, m in ordered]
+        return members[start:start + num] if start is not None else members
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *criteria):
+        return self
+
+    def distinct(self):
+        return FakeQuery(sorted({(r.brand,) for r in self.rows}, key=str))
+
+    def yield_per(self, n):
+        return self
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def query(self, *cols):
+        return FakeQuery(list(self.catalog.values()))
+
+    def close(self):
+        pass
+
+
+def _product(name, price, brand=None, category="Electronics", product_type="laptop", attributes=None, rating=None):
+    return SimpleNamespace(
+        product_id=uuid.uuid4(), name=name, category=category, product_type=product_type,
+        brand=brand, price_value=price, rating=rating, attributes=attributes,
+    )
+
+
+@pytest.fixture
+def catalog():
+    rows = [
+        _product("Dell XPS 13 Laptop", 1200, "Dell", attributes={"ram_gb": 16, "storage_gb": 512}),
+        _product("Dell Inspiron Laptop", 650, "Dell", attributes={"ram_gb": 8}),
+        _product("Refurb Dell Latitude Notebook", 400, "Recertified", attributes={"ram_gb": 16}),
+        _product("HP Pavilion Laptop", 700, "HP", attributes=None),
+        _product("HP Chromebook 14", 250, "HP", attributes={"ram_gb": 4}),
+        _product("Lenovo ThinkPad X1", 1500, "Lenovo", attributes={"gpu_vendor": "NVIDIA", "ram_gb": 32}),
+        _product("Cheap Laptop Sleeve Laptop", 20, "Generic", attributes={}),
+        _product("Gift Card", None, "Store", product_type="gift", attributes={}),
+        _product("The Hobbit", 15, "Tolkien Press", category="Books", product_type="book", attributes={}),
+    ]
+    return {str(r.product_id): r for r in rows}
+
+
+@pytest.fixture
+def index(catalog):
+    cache = CacheClient(namespace="mcp")
+    cache.client = FakeRedis()
+    idx = CandidateIndex(cache=cache, session_factory=lambda: FakeSession(catalog), enabled=True)
+    idx.rebuild()
+    return idx
+
+
+def _names(index, catalog, filters, offset=0, limit=20):
+    result = index.search(filters, offset, limit)
+    if result is None:
+        return None
+    total, ids = result
+    return total, [catalog[pid].name for pid in ids]
+
+
+class TestIndexEntry:
+    def test_memberships(self):
+        row = _product("HP Pavilion 15 Laptop", 699.99, "HP", attributes={"gpu_vendor": "AMD", "ram_gb": "16"}, rating=4.5)
+        sets, zsets = index_entry(row, ["hp", "dell"])
+        assert {"idx:cat:Electronics", "idx:ptype:laptop", "idx:brand:hp", "idx:tok:hp",
+                "idx:gpu:AMD", "idx:hint:laptop"} <= set(sets)
+        assert "idx:tok:dell" not in sets and "idx:noattrs" not in sets
+        assert zsets == {"idx:price": 69999.0, "idx:rating": 4.5, "idx:num:ram_gb": 16.0}
+
+    def test_chromebook_not_in_laptop_hint_and_unpriced_sorts_last(self):
+        sets, zsets = index_entry(_product("Acer Chromebook Laptop", None, attributes=None))
+        assert "idx:hint:laptop" not in sets and "idx:noattrs" in sets
+        assert zsets["idx:price"] == float("inf")
+
+
+class TestPlanner:
+    @pytest.mark.parametrize("filters", [
+        {"brand": ["Dell", "HP"], "_or_operation": True},
+        {"brand": "NVIDIA"},
+        {"brand": "Lenovo Legion"},
+        {"color": "pink"},
+        {"use_cases": ["gaming"]},
+        {"_product_type_hint": "desktop"},
+        {"price_max_cents": None},
+    ])
+    def test_uncovered_filters(self, filters):
+        assert CandidateIndex.plan(filters) is None
+
+    def test_laptop_hint_adds_price_floor(self):
+        plan = CandidateIndex.plan({"category": "Electronics", "_product_type_hint": "laptop", "_soft_preferences": {}})
+        assert plan["sets"] == [["idx:cat:Electronics"], ["idx:hint:laptop"]]
+        assert plan["price"] == (15000, None)
+
+    def test_price_in_dollars_and_cents(self):
+        assert CandidateIndex.plan({"price_min": 500, "price_max_cents": 100000})["price"] == (50000, 100000)
+
+
+class TestSearch:
+    def test_brand_matches_column_or_name_word(self, index, catalog):
+        total, names = _names(index, catalog, {"category": "Electronics", "brand": "dell"})
+        assert total == 3
+        assert names == ["Refurb Dell Latitude Notebook", "Dell Inspiron Laptop", "Dell XPS 13 Laptop"]
+
+    def test_laptop_hint_price_and_paging(self, index, catalog):
+        filters = {"category": "Electronics", "_product_type_hint": "laptop", "price_max_cents": 130000}
+        assert _names(index, catalog, filters, offset=0, limit=2) == (
+            4, ["Refurb Dell Latitude Notebook", "Dell Inspiron Laptop"])
+        assert _names(index, catalog, filters, offset=2, limit=2) == (
+            4, ["HP Pavilion Laptop", "Dell XPS 13 Laptop"])
+
+    def test_spec_threshold_keeps_null_attributes(self, index, catalog):
+        total, names = _names(index, catalog, {"category": "Electronics", "min_ram_gb": 16})
+        assert set(names) == {"Dell XPS 13 Laptop", "Refurb Dell Latitude Notebook",
+                              "Lenovo ThinkPad X1", "HP Pavilion Laptop"}
+
+    def test_gpu_vendor_and_unpriced(self, index, catalog):
+        assert _names(index, catalog, {"gpu_vendor": ["NVIDIA "]}) == (1, ["Lenovo ThinkPad X1"])
+        total, names = _names(index, catalog, {"category": "Electronics"})
+        assert total == 8 and names[-1] == "Gift Card"
+        assert "Gift Card" not in _names(index, catalog, {"category": "Electronics", "price_min_cents": 0})[1]
+
+    def test_temp_keys_removed_in_one_round_trip(self, index, catalog):
+        index.cache.client.round_trips = 0
+        index.search({"category": "Electronics", "brand": "hp", "min_ram_gb": 8}, 0, 10)
+        assert index.cache.client.round_trips == 1
+        assert not any(":idx:tmp:" in k for k in index.cache.client.data)
+
+    def test_no_match_and_not_ready_fall_back(self, index, catalog):
+        assert index.search({"category": "Books", "min_ram_gb": 64, "price_min_cents": 10000}, 0, 10) is None
+        index.cache.client.delete("mcp:idx:meta")
+        assert index.search({"category": "Electronics"}, 0, 10) is None
+        assert index.stats["empty"] == 1 and index.stats["not_ready"] == 1
+
+
+class TestIncrementalUpdates:
+    def test_reindex_moves_and_removes_products(self, index, catalog):
+        inspiron = next(pid for pid, r in catalog.items() if r.name == "Dell Inspiron Laptop")
+        catalog[inspiron].price_value = 2000
+        catalog[inspiron].attributes = {"ram_gb": 64}
+        gift = next(pid for pid, r in catalog.items() if r.name == "Gift Card")
+        del catalog[gift]
+
+        assert index.reindex_products([inspiron, gift]) == 2
+        total, names = _names(index, catalog, {"category": "Electronics", "min_ram_gb": 64})
+        assert names == ["HP Pavilion Laptop", "Dell Inspiron Laptop"]
+        assert gift not in index.cache.client.smembers("mcp:idx:all")
+        assert "mcp:idx:doc:" + gift not in index.cache.client.data
+
+    def test_catalog_change_reindexes(self, index, catalog, monkeypatch):
+        monkeypatch.setattr(candidate_index_module, "_default_session_factory", index.session_factory)
+        hp = next(pid for pid, r in catalog.items() if r.name == "HP Pavilion Laptop")
+        catalog[hp].brand = "Dell"
+        apply_catalog_change([hp], ["Electronics"], cache=index.cache)
+        assert _names(index, catalog, {"category": "Electronics", "brand": "dell"})[0] == 4
+
+    def test_skipped_until_built(self, catalog):
+        cache = CacheClient(namespace="mcp")
+        cache.client = FakeRedis()
+        idx = CandidateIndex(cache=cache, session_factory=lambda: pytest.fail("no DB read expected"), enabled=True)
+        assert idx.reindex_products(list(catalog)) == 0
@@ -0,0 +1,210 @@
+"""
+Tests for idss.data.candidate_pool: results served from the pool must equal
+what LocalVehicleStore returns for the same filters, ordering and limit, and
+stores that cap or sample their results are never pooled.
+"""
+
+import json
+import random
+import sqlite3
+
+import pytest
+
+from idss.data.candidate_pool import CandidatePool, estimate_payload_bytes
+from idss.data.vehicle_store import LocalVehicleStore
+
+COLUMNS = [
+    "raw_json", "price", "mileage", "primary_image_url", "photo_count", "year", "make", "model",
+    "trim", "body_style", "drivetrain", "engine", "fuel_type", "transmission", "doors", "seats",
+    "exterior_color", "interior_color", "dealer_name", "dealer_city", "dealer_state", "dealer_zip",
+    "dealer_latitude", "dealer_longitude", "is_used", "is_cpo", "vdp_url", "carfax_url", "vin",
+    "build_city_mpg", "build_highway_mpg", "norm_body_type", "norm_fuel_type", "norm_is_used",
+]
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("vehicles") / "uni_vehicles.db"
+    rng = random.Random(7)
+    makes = {"Toyota": ["Camry", "RAV4"], "Honda": ["Civic", "CR-V"], "Ford": ["F-150", "Escape"]}
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE unified_vehicle_listings ({', '.join(COLUMNS)})")
+    for i in range(400):
+        make = rng.choice(list(makes))
+        row = dict.fromkeys(COLUMNS)
+        row.update(
+            raw_json=json.dumps({"data_source": "test"}),
+            price=rng.choice([0, rng.randint(8, 60) * 1000]),
+            mileage=rng.randint(0, 12) * 10000,
+            primary_image_url="https://img/x.jpg",
+            year=rng.randint(2012, 2025),
+            make=make,
+            model=rng.choice(makes[make]),
+            body_style=rng.choice(["SUV", "Sedan", "Pickup"]),
+            norm_body_type=rng.choice(["SUV", "Sedan", "Pickup"]),
+            norm_fuel_type=rng.choice(["Gasoline", "Hybrid", "Electric"]),
+            norm_is_used=rng.choice([0, 1]),
+            build_highway_mpg=rng.choice([None, rng.randint(20, 45)]),
+            vin=f"VIN{i:05d}",
+        )
+        conn.execute(
+            f"INSERT INTO unified_vehicle_listings VALUES ({','.join('?' * len(COLUMNS))})",
+            [row[c] for c in COLUMNS],
+        )
+    conn.commit()
+    conn.close()
+    return path
+
+
+class CountingStore(LocalVehicleStore):
+    def __post_init__(self):
+        super().__post_init__()
+        self.calls = 0
+
+    def search_listings(self, *args, **kwargs):
+        self.calls += 1
+        return super().search_listings(*args, **kwargs)
+
+
+@pytest.fixture
+def store(db_path):
+    return CountingStore(db_path=db_path)
+
+
+def _vins(rows):
+    return [r["vin"] for r in rows]
+
+
+REFINEMENTS = [
+    ({"year": "2015-2025"}, {"year": "2018-2022", "make": "Toyota,Honda"}),
+    ({"make": "Toyota,Honda,Ford"}, {"make": "honda", "body_style": "SUV"}),
+    ({"price": "0-40000"}, {"price": "10000-30000", "is_used": True}),
+    ({"body_style": "SUV"}, {"body_style": "SUV", "mileage": "0-50000", "fuel_type": "Hybrid"}),
+    ({"year": "2018-2025"}, {"year": "2020", "highway_mpg": "30"}),
+    ({"is_used": False}, {"is_used": False, "price": "-25000"}),
+]
+
+
+class TestRefinement:
+    @pytest.mark.parametrize("wide,narrow", REFINEMENTS)
+    @pytest.mark.parametrize("order_by,order_dir", [("price", "ASC"), ("year DESC, price ASC", "ASC"), ("mileage", "DESC")])
+    def test_narrowed_filters_served_from_complete_pool(self, store, wide, narrow, order_by, order_dir):
+        pool = CandidatePool(store, min_rows=1)
+        pool.search_listings(wide, limit=1000, order_by=order_by, order_dir=order_dir)
+        got = pool.search_listings(narrow, limit=1000, order_by=order_by, order_dir=order_dir)
+        assert store.calls == 1
+        assert _vins(got) == _vins(store.search_listings(narrow, limit=1000, order_by=order_by, order_dir=order_dir))
+
+    @pytest.mark.parametrize("wide,narrow", REFINEMENTS)
+    def test_complete_pool_reordered_for_other_ordering(self, store, wide, narrow):
+        pool = CandidatePool(store, min_rows=1)
+        pool.search_listings(wide, limit=1000, order_by="year DESC, price ASC")
+        got = pool.search_listings(narrow, limit=500, order_by="price", order_dir="ASC")
+        assert store.calls == 1
+        assert _vins(got) == _vins(store.search_listings(narrow, limit=500, order_by="price", order_dir="ASC"))
+
+    def test_truncated_pool_serves_exact_prefix(self, store):
+        pool = CandidatePool(store, min_rows=10)
+        pool.search_listings({"year": "2012-2025"}, limit=200)
+        got = pool.search_listings({"year": "2016-2025", "make": "Ford"}, limit=200)
+        assert store.calls == 1
+        expected = _vins(store.search_listings({"year": "2016-2025", "make": "Ford"}, limit=200))
+        assert 10 <= len(got) < 200
+        assert _vins(got) == expected[: len(got)]
+
+    def test_truncated_pool_below_threshold_refetches(self, store):
+        pool = CandidatePool(store, min_rows=100)
+        pool.search_listings({"year": "2012-2025"}, limit=100)
+        got = pool.search_listings({"make": "Ford", "body_style": "SUV", "year": "2012-2025"}, limit=100)
+        assert store.calls == 2
+        assert len(got) > 0
+
+    def test_truncated_pool_not_used_for_other_ordering_or_deeper_limit(self, store):
+        pool = CandidatePool(store, min_rows=1)
+        pool.search_listings({"year": "2012-2025"}, limit=100)
+        pool.search_listings({"year": "2014-2025"}, limit=100, order_by="year", order_dir="DESC")
+        pool.search_listings({"year": "2014-2025"}, limit=300)
+        assert store.calls == 3
+
+    @pytest.mark.parametrize("wide,wider", [
+        ({"price": "10000-30000"}, {"price": "5000-30000"}),
+        ({"make": "Honda"}, {"make": "Honda,Toyota"}),
+        ({"make": "Honda"}, {}),
+        ({"is_used": True}, {"is_used": False}),
+        ({"year": "2018-2025"}, {"year": "2018-2025", "drivetrain": "AWD"}),
+    ])
+    def test_widened_or_unrefinable_filters_hit_store(self, store, wide, wider):
+        pool = CandidatePool(store, min_rows=1)
+        pool.search_listings(wide, limit=1000)
+        pool.search_listings(wider, limit=1000)
+        assert store.calls == 2
+
+    def test_exact_repeat_and_uncacheable_requests(self, store):
+        pool = CandidatePool(store)
+        first = pool.search_listings({"make": "Toyota"}, limit=50)
+        assert pool.search_listings({"make": "Toyota", "model": None}, limit=50) == first
+        assert store.calls == 1
+        pool.search_listings({"make": "Toyota"}, limit=50, order_by="random")
+        pool.search_listings({"make": "Toyota"}, limit=50, offset=50)
+        assert store.calls == 3
+
+
+class SamplingStore:
+    """Supabase-shaped store: a shuffled sample of at most 100 matching rows."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+        self.rng = random.Random(3)
+
+    def search_listings(self, filters, limit=200, **kwargs):
+        self.calls += 1
+        rows = self.store.search_listings(filters, limit=1000, **kwargs)
+        return self.rng.sample(rows, min(limit, 100, len(rows)))
+
+
+class TestUnpoolableStore:
+    def test_sampling_store_always_queried(self, store):
+        sampling = SamplingStore(store)
+        pool = CandidatePool(sampling, min_rows=1)
+        assert not pool.enabled
+        pool.search_listings({"year": "2012-2025"}, limit=200)
+        narrow = {"year": "2012-2025", "price": "5000-60000", "make": "HONDA"}
+        got = pool.search_listings(narrow, limit=200)
+        assert sampling.calls == 2 and len(pool) == 0
+        assert len(got) == min(100, len(store.search_listings(narrow, limit=1000)))
+
+    def test_controller_bypasses_pool_for_sampling_store(self, store):
+        from types import SimpleNamespace
+        from idss.core.controller import IDSSController
+
+        config = SimpleNamespace(use_candidate_pool=True)
+        local = SimpleNamespace(config=config, store=store, candidate_pool=CandidatePool(store))
+        assert IDSSController._listing_source(local) is local.candidate_pool
+        sampling = SamplingStore(store)
+        remote = SimpleNamespace(config=config, store=sampling, candidate_pool=CandidatePool(sampling))
+        assert IDSSController._listing_source(remote) is sampling
+
+
+class TestMemoryBudget:
+    def test_lru_eviction_under_budget(self, store):
+        one = estimate_payload_bytes(store.search_listings({"make": "Toyota"}, limit=1000))
+        pool = CandidatePool(store, max_bytes=int(one * 2.5))
+        for make in ("Toyota", "Honda", "Ford"):
+            pool.search_listings({"make": make}, limit=1000)
+        assert len(pool) == 2
+        assert pool.nbytes <= pool.max_bytes
+        calls = store.calls
+        pool.search_listings({"make": "Toyota"}, limit=1000)  # evicted -> refetch
+        assert store.calls == calls + 1
+
+    def test_oversized_result_not_cached(self, store):
+        pool = CandidatePool(store, max_bytes=10)
+        pool.search_listings({"make": "Toyota"}, limit=1000)
+        assert len(pool) == 0 and pool.nbytes == 0
+
+    def test_clear(self, store):
+        pool = CandidatePool(store)
+        pool.search_listings({"make": "Toyota"}, limit=10)
+        pool.clear()
+        assert len(pool) == 0 and pool.nbytes == 0
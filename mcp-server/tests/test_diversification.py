@@ -0,0 +1,207 @@
+"""
+Tests for columnar entropy / bucketing in idss.diversification.
+
+The NumPy path must reproduce the pure-Python bucket boundaries, bucket
+membership and entropies it replaced; the reference implementations below
+are the previous per-vehicle versions.
+"""
+
+import math
+import random
+from collections import Counter, defaultdict
+
+import numpy as np
+import pytest
+
+from idss.diversification.bucketing import (
+    bucket_vehicles_categorical,
+    bucket_vehicles_numerical,
+    compute_quantile_boundaries,
+    generate_label,
+)
+from idss.diversification.entropy import (
+    DIVERSIFIABLE_DIMENSIONS,
+    NUMERICAL_DIMENSIONS,
+    DimensionColumns,
+    bucket_numerical_values,
+    compute_dimension_entropy,
+    compute_entropy_report,
+    compute_shannon_entropy,
+    get_vehicle_value,
+    select_diversification_dimension,
+)
+
+
+#  Reference (pre-vectorization) implementations
+
+def ref_bucket_numerical_values(values, n_buckets=3):
+    if not values:
+        return [], []
+    valid = sorted(v for v in values if v is not None)
+    if not valid:
+        return [0] * len(values), [(0, 0)]
+    n = len(valid)
+    boundaries = [valid[min(int(n * i / n_buckets), n - 1)] for i in range(1, n_buckets)]
+    ranges, prev = [], valid[0]
+    for b in boundaries:
+        ranges.append((prev, b))
+        prev = b
+    ranges.append((prev, valid[-1]))
+    out = []
+    for v in values:
+        if v is None:
+            out.append(0)
+            continue
+        for i, (lo, hi) in enumerate(ranges):
+            last = i == len(ranges) - 1
+            if (last and lo <= v <= hi) or (not last and lo <= v < hi):
+                out.append(i)
+                break
+        else:
+            out.append(len(ranges) - 1)
+    return out, ranges
+
+
+def ref_entropy(values):
+    valid = [v for v in values if v is not None]
+    if not valid:
+        return 0.0
+    total = len(valid)
+    return -sum(c / total * math.log2(c / total) for c in Counter(valid).values())
+
+
+def ref_dimension_entropy(vehicles, dim):
+    values = [get_vehicle_value(v, dim) for v in vehicles]
+    if dim in NUMERICAL_DIMENSIONS:
+        nums = []
+        for v in values:
+            try:
+                nums.append(float(v) if v is not None else None)
+            except (ValueError, TypeError):
+                nums.append(None)
+        values, _ = ref_bucket_numerical_values(nums)
+    return ref_entropy(values)
+
+
+def ref_bucket_vehicles_numerical(vehicles, dim, n_buckets=3, n_per_bucket=3):
+    pairs = []
+    for i, v in enumerate(vehicles):
+        val = get_vehicle_value(v, dim)
+        if val is not None:
+            try:
+                pairs.append((float(val), i))
+            except (ValueError, TypeError):
+                pass
+    if not pairs:
+        return [vehicles[:n_per_bucket]], [f"All ({dim} unknown)"]
+    pairs.sort(key=lambda x: x[0])
+    sorted_values = [v for v, _ in pairs]
+    boundaries = compute_quantile_boundaries(sorted_values, n_buckets)
+    ranges, prev = [], sorted_values[0]
+    for b in boundaries:
+        if prev != b:
+            ranges.append((prev, b))
+        prev = b
+    if not ranges or prev != sorted_values[-1]:
+        ranges.append((prev, sorted_values[-1]))
+    buckets = [[] for _ in ranges]
+    for val, idx in pairs:
+        for bi, (lo, hi) in enumerate(ranges):
+            last = bi == len(ranges) - 1
+            if (last and lo <= val <= hi) or (not last and lo <= val < hi):
+                if len(buckets[bi]) < n_per_bucket:
+                    buckets[bi].append(vehicles[idx])
+                break
+    return buckets, [generate_label(dim, lo, hi) for lo, hi in ranges]
+
+
+def _vehicles(n, seed):
+    rng = random.Random(seed)
+    makes = ["Toyota", "Honda", "Ford", "BMW", None]
+    out = []
+    for i in range(n):
+        inner = {
+            "make": rng.choice(makes),
+            "year": rng.choice([2015, 2018, 2018, 2020, "2022", None]),
+            "bodyStyle": rng.choice(["SUV", "Sedan", None]),
+            "fuel": rng.choice(["Gas", "Hybrid"]),
+            "mileage": rng.choice([None, rng.randint(0, 5) * 10000]),
+            "drivetrain": "AWD",
+        }
+        vehicle = {"vehicle": inner, "retailListing": {"price": rng.choice([15000, 20000, 20000, 31000, rng.randint(9, 60) * 1000])}}
+        if i % 7 == 0:
+            vehicle = {**inner, "price": 25000.0}  # flat payload
+        out.append(vehicle)
+    return out
+
+
+class TestNumericalBucketing:
+    @pytest.mark.parametrize("seed", range(20))
+    @pytest.mark.parametrize("n_buckets", [1, 2, 3, 5])
+    def test_bucket_numerical_values_matches_reference(self, seed, n_buckets):
+        rng = random.Random(seed)
+        values = [rng.choice([None, float(rng.randint(0, 6))]) for _ in range(rng.randint(1, 40))]
+        assert bucket_numerical_values(values, n_buckets) == ref_bucket_numerical_values(values, n_buckets)
+
+    def test_all_missing(self):
+        assert bucket_numerical_values([None, None]) == ([0, 0], [(0, 0)])
+        assert bucket_numerical_values([]) == ([], [])
+
+    @pytest.mark.parametrize("seed", range(10))
+    @pytest.mark.parametrize("dim", sorted(NUMERICAL_DIMENSIONS))
+    def test_bucket_vehicles_numerical_matches_reference(self, seed, dim):
+        vehicles = _vehicles(60, seed)
+        got_buckets, got_labels = bucket_vehicles_numerical(vehicles, dim, 3, 4)
+        ref_buckets, ref_labels = ref_bucket_vehicles_numerical(vehicles, dim, 3, 4)
+        assert got_labels == ref_labels
+        assert [[id(v) for v in b] for b in got_buckets] == [[id(v) for v in b] for b in ref_buckets]
+
+    def test_unknown_dimension_values(self):
+        vehicles = [{"vehicle": {"make": "Ford"}}] * 4
+        assert bucket_vehicles_numerical(vehicles, "mileage", 3, 2) == ([vehicles[:2]], ["All (mileage unknown)"])
+
+
+class TestEntropy:
+    def test_shannon_entropy(self):
+        assert compute_shannon_entropy(["a", "b", "a", None]) == pytest.approx(ref_entropy(["a", "b", "a"]))
+        assert compute_shannon_entropy([None]) == 0.0
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_dimension_entropies_match_reference(self, seed):
+        vehicles = _vehicles(100, seed)
+        columns = DimensionColumns(vehicles)
+        report = compute_entropy_report(vehicles, list(DIVERSIFIABLE_DIMENSIONS), columns=columns)
+        for dim in DIVERSIFIABLE_DIMENSIONS:
+            expected = ref_dimension_entropy(vehicles, dim)
+            assert report[dim] == pytest.approx(expected, abs=1e-12)
+            assert compute_dimension_entropy(vehicles, dim) == pytest.approx(expected, abs=1e-12)
+
+    def test_columns_reused_only_for_same_list(self):
+        vehicles = _vehicles(30, 1)
+        columns = DimensionColumns(vehicles)
+        other = vehicles[:10]
+        # Columns built for a different list must not leak into the result
+        assert compute_dimension_entropy(other, "make", columns=columns) == pytest.approx(
+            ref_dimension_entropy(other, "make")
+        )
+        assert select_diversification_dimension(vehicles, {"price": "x"}, columns=columns) == \
+            select_diversification_dimension(vehicles, {"price": "x"})
+
+    def test_numeric_column_marks_missing_as_nan(self):
+        columns = DimensionColumns([{"year": "2020"}, {"year": "n/a"}, {}])
+        assert np.isnan(columns.numeric("year")[1:]).all()
+        assert columns.numeric("year")[0] == 2020.0
+        assert columns.non_null_count("year") == 2
+
+
+class TestCategoricalBucketing:
+    def test_matches_per_vehicle_grouping(self):
+        vehicles = _vehicles(50, 3)
+        buckets, labels = bucket_vehicles_categorical(vehicles, "make", 3, 2, columns=DimensionColumns(vehicles))
+        by_value = defaultdict(list)
+        for v in vehicles:
+            if get_vehicle_value(v, "make") is not None:
+                by_value[str(get_vehicle_value(v, "make"))].append(v)
+        top = sorted(by_value.items(), key=lambda x: len(x[1]), reverse=True)[:3]
+        assert labels == [k for k, _ in top]
+        assert buckets == [vs[:2] for _, vs in top]
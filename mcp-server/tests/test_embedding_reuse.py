@@ -0,0 +1,177 @@
+"""
+Tests for embedding reuse at query time: UniversalEmbeddingStore.rank_products
+and DenseEmbeddingStore.search_by_vins must use stored embeddings and cached
+query embeddings instead of running the encoder again.
+
+A deterministic fake encoder stands in for the sentence transformer so the
+tests run without the model; it counts forward passes.
+"""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from app.vector_search import UniversalEmbeddingStore, build_product_text
+from idss.recommendation.dense_embedding_store import DenseEmbeddingStore
+
+DIM = 8
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = 0
+        self.texts = []
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        self.calls += 1
+        self.texts.extend(texts)
+        rows = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            rows.append(np.random.default_rng(seed).normal(size=DIM))
+        return np.asarray(rows, dtype=np.float32)
+
+
+class FakeIndex:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def reconstruct(self, idx):
+        return self.embeddings[idx]
+
+
+def _products(n, prefix="P"):
+    return [
+        {"product_id": f"{prefix}{i}", "name": f"Laptop {i}", "brand": "Dell" if i % 2 else "HP",
+         "category": "electronics", "metadata": {"ram": f"{8 * (i + 1)}GB"}}
+        for i in range(n)
+    ]
+
+
+def _reference_rank(encoder, products, query):
+    """Previous implementation: encode query and every product per call."""
+    q = encoder.encode([query])[0]
+    scored = []
+    for p in products:
+        e = encoder.encode([build_product_text(p)])[0]
+        scored.append((p["product_id"], float(1.0 / (1.0 + np.linalg.norm(q - e)))))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(UniversalEmbeddingStore, "_load_index", lambda self, *a, **k: False)
+    s = UniversalEmbeddingStore(use_cache=True)
+    s._encoder = FakeEncoder()
+    return s
+
+
+def _index_products(store, products):
+    encoder = FakeEncoder()
+    embeddings = encoder.encode([build_product_text(p) for p in products])
+    store._index = FakeIndex(embeddings)
+    store._product_ids = [p["product_id"] for p in products]
+    store._product_id_to_idx = {pid: i for i, pid in enumerate(store._product_ids)}
+
+
+class TestRankProducts:
+    def test_scores_match_per_product_encoding(self, store):
+        products = _products(12)
+        got = store.rank_products(products, "laptop for video editing")
+        expected = _reference_rank(FakeEncoder(), products, "laptop for video editing")
+        assert [(p["product_id"], pytest.approx(p["_vector_score"], rel=1e-6)) for p in got] == \
+            [(pid, pytest.approx(score, rel=1e-6)) for pid, score in expected]
+
+    def test_indexed_products_not_encoded(self, store):
+        indexed = _products(10)
+        _index_products(store, indexed)
+        unseen = _products(3, prefix="NEW")
+        store.rank_products(indexed + unseen, "gaming laptop")
+        # One query pass plus one batch for the three unseen products
+        assert store._encoder.calls == 2
+        assert store.encoded_products == 3
+        assert all("Laptop" in t for t in store._encoder.texts[1:])
+
+    def test_warm_rerank_needs_no_forward_pass(self, store):
+        products = _products(10)
+        _index_products(store, products)
+        store.rank_products(products, "gaming  laptop ")
+        calls = store._encoder.calls
+        store.rank_products(list(reversed(products)), "gaming laptop")
+        assert store._encoder.calls == calls
+        assert store.query_cache_hits == 1
+
+    def test_products_without_id_always_encoded(self, store):
+        products = [{"name": "No id A"}, {"name": "No id B"}]
+        store.rank_products(products, "q")
+        store.rank_products(products, "q")
+        assert store.encoded_products == 4
+
+
+class TestQueryCache:
+    def test_lru_bound(self, store):
+        store._query_cache_size = 2
+        for q in ("a", "b", "c"):
+            store.encode_query(q)
+        assert list(store._query_embeddings) == ["b", "c"]
+        store.encode_query("a")
+        assert store.query_cache_misses == 4
+
+    def test_normalization_collapses_whitespace_only(self, store):
+        assert store.encode_query("  Gaming\tlaptop ") is store.encode_query("Gaming laptop")
+        assert store.encode_query("gaming laptop") is not store.encode_query("Gaming laptop")
+
+
+class FakeSupabase:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.requests = []
+
+    def select(self, table, filters=None, select="*", limit=None, order=None):
+        self.requests.append(filters["vin"])
+        value = filters["vin"]
+        if value.startswith("in.("):
+            vins = value[4:-1].split(",")
+        else:
+            vins = [value[3:]]
+        return [{"vin": v, "embedding": str(self.embeddings[v].tolist())} for v in vins if v in self.embeddings]
+
+
+@pytest.fixture
+def dense_store(monkeypatch):
+    monkeypatch.setattr(DenseEmbeddingStore, "_load_index", lambda self: None)
+    s = DenseEmbeddingStore(use_supabase=False)
+    s._encoder = FakeEncoder()
+    rng = np.random.default_rng(0)
+    s.use_supabase = True
+    s.supabase = FakeSupabase({f"VIN{i}": rng.normal(size=DIM).astype(np.float32) for i in range(250)})
+    return s
+
+
+class TestDenseStore:
+    def test_candidate_embeddings_fetched_in_batches(self, dense_store):
+        vins = [f"VIN{i}" for i in range(230)] + ["MISSING1"]
+        got_vins, scores = dense_store.search_by_vins(vins, ["SUV body style", "AWD drivetrain"])
+        assert len(dense_store.supabase.requests) == 3
+        assert all(r.startswith("in.(") for r in dense_store.supabase.requests)
+        assert dict(zip(got_vins, scores))["MISSING1"] == 0.0
+
+        q = dense_store.encode_features(["SUV body style", "AWD drivetrain"])[0]
+        expected = sorted(((v, float(np.dot(q, dense_store.supabase.embeddings[v]))) for v in vins[:-1]),
+                          key=lambda x: x[1], reverse=True)
+        assert got_vins[:5] == [v for v, _ in expected[:5]]
+
+    def test_repeat_query_uses_cache(self, dense_store):
+        vins = [f"VIN{i}" for i in range(20)]
+        dense_store.search_by_vins(vins, ["SUV body style"])
+        dense_store.search_by_vins(vins, "Vehicle: Toyota RAV4.", method="concat")
+        calls, requests = dense_store._encoder.calls, len(dense_store.supabase.requests)
+        dense_store.search_by_vins(vins, [" SUV  body style"])
+        dense_store.search_by_vins(vins, "Vehicle: Toyota  RAV4.", method="concat")
+        assert dense_store._encoder.calls == calls
+        assert len(dense_store.supabase.requests) == requests
@@ -0,0 +1,104 @@
+"""
+Tests for sentence-encoder backend selection (idss.recommendation.encoder_backend).
+
+The loaders are monkeypatched so the tests run without sentence-transformers,
+torch or onnxruntime installed.
+"""
+
+import numpy as np
+import pytest
+
+from idss.recommendation import encoder_backend
+from idss.recommendation.encoder_backend import (
+    configured_backend,
+    cosine_parity,
+    load_sentence_encoder,
+    onnx_quantized_file,
+)
+
+FLOAT_MODEL = object()
+
+
+@pytest.fixture
+def loaders(monkeypatch):
+    calls = []
+
+    def fake_torch(model_name, **kwargs):
+        calls.append(("torch", model_name))
+        return FLOAT_MODEL
+
+    monkeypatch.setattr(encoder_backend, "_load_torch", fake_torch)
+    return calls
+
+
+class TestBackendSelection:
+    def test_default_and_unknown_backend(self, monkeypatch):
+        monkeypatch.delenv("SENTENCE_ENCODER_BACKEND", raising=False)
+        assert configured_backend() == "torch"
+        monkeypatch.setenv("SENTENCE_ENCODER_BACKEND", " ONNX-INT8 ")
+        assert configured_backend() == "onnx-int8"
+        monkeypatch.setenv("SENTENCE_ENCODER_BACKEND", "tensorrt")
+        assert configured_backend() == "torch"
+
+    def test_onnx_file_names(self):
+        assert onnx_quantized_file("avx512_vnni") == "onnx/model_qint8_avx512_vnni.onnx"
+        assert onnx_quantized_file("arm64") == "onnx/model_qint8_arm64.onnx"
+        assert onnx_quantized_file("avx2") == "onnx/model_quint8_avx2.onnx"
+
+    def test_onnx_backend_used(self, monkeypatch, loaders, tmp_path):
+        seen = {}
+
+        def fake_onnx(model_name, quantization, onnx_dir):
+            seen.update(model=model_name, quantization=quantization, onnx_dir=onnx_dir)
+            return "onnx-model"
+
+        monkeypatch.setattr(encoder_backend, "_load_onnx_int8", fake_onnx)
+        monkeypatch.setenv("SENTENCE_ENCODER_QUANTIZATION", "avx2")
+        monkeypatch.setenv("SENTENCE_ENCODER_ONNX_DIR", str(tmp_path))
+        assert load_sentence_encoder("all-mpnet-base-v2", backend="onnx-int8") == "onnx-model"
+        assert seen == {"model": "all-mpnet-base-v2", "quantization": "avx2", "onnx_dir": tmp_path}
+        assert loaders == []
+
+    def test_failing_onnx_falls_back_to_float(self, monkeypatch, loaders):
+        def broken(*args):
+            raise RuntimeError("onnxruntime missing")
+
+        monkeypatch.setattr(encoder_backend, "_load_onnx_int8", broken)
+        monkeypatch.setenv("SENTENCE_ENCODER_BACKEND", "onnx-int8")
+        assert load_sentence_encoder("all-mpnet-base-v2") is FLOAT_MODEL
+        assert loaders == [("torch", "all-mpnet-base-v2")]
+
+    def test_failing_torch_int8_falls_back_to_float(self, monkeypatch, loaders):
+        def broken(model_name):
+            raise RuntimeError("no quantized engine")
+
+        monkeypatch.setattr(encoder_backend, "_load_torch_int8", broken)
+        assert load_sentence_encoder("m", backend="torch-int8") is FLOAT_MODEL
+
+    def test_missing_sentence_transformers_propagates(self, monkeypatch, loaders):
+        def missing(model_name):
+            raise ImportError("No module named 'sentence_transformers'")
+
+        monkeypatch.setattr(encoder_backend, "_load_torch_int8", missing)
+        with pytest.raises(ImportError):
+            load_sentence_encoder("m", backend="torch-int8")
+
+
+class TestCosineParity:
+    def test_identical_and_scaled_rows(self):
+        rng = np.random.default_rng(0)
+        ref = rng.normal(size=(20, 16))
+        parity = cosine_parity(ref, ref * 3.0)
+        assert parity["n"] == 20
+        assert parity["mean"] == pytest.approx(1.0) and parity["min"] == pytest.approx(1.0)
+
+    def test_perturbed_rows(self):
+        ref = np.array([[1.0, 0.0], [0.0, 1.0]])
+        cand = np.array([[1.0, 1.0], [0.0, 1.0]])
+        parity = cosine_parity(ref, cand)
+        assert parity["min"] == pytest.approx(np.sqrt(0.5))
+        assert parity["mean"] == pytest.approx((np.sqrt(0.5) + 1.0) / 2)
+
+    def test_shape_mismatch(self):
+        with pytest.raises(ValueError):
+            cosine_parity(np.zeros((3, 4)), np.zeros((3, 5)))
@@ -0,0 +1,121 @@
+"""
+Tests for distribution-based question selection in
+idss.interview.entropy_question_selector: entropies and LLM context computed
+from (cached) distributions must match the per-candidate computation.
+"""
+
+import random
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+from idss.diversification.entropy import NUMERICAL_DIMENSIONS, compute_shannon_entropy
+from idss.interview.entropy_question_selector import (
+    DIMENSION_EXTRACTORS,
+    QUESTIONABLE_DIMENSIONS,
+    DistributionCache,
+    compute_candidate_distributions,
+    compute_dimension_entropy,
+    get_dimension_context,
+    select_question_dimension,
+)
+
+
+def ref_dimension_entropy(candidates, dimension, n_buckets=5):
+    """Per-candidate implementation the distributions replaced."""
+    values = [DIMENSION_EXTRACTORS[dimension](v) for v in candidates]
+    values = [v for v in values if v is not None]
+    if not values:
+        return 0.0
+    if dimension in NUMERICAL_DIMENSIONS:
+        numeric_values = [float(v) for v in values]
+        if len(numeric_values) < 2:
+            return 0.0
+        lo, hi = min(numeric_values), max(numeric_values)
+        size = (hi - lo) / n_buckets if hi > lo else 1
+        values = [f"bucket_{min(int((v - lo) / size), n_buckets - 1)}" for v in numeric_values]
+    return compute_shannon_entropy(values)
+
+
+def _vehicles(n, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        out.append({
+            "vehicle": {
+                "make": rng.choice(["Toyota", "Honda", "Ford", None]),
+                "year": rng.choice([2016, 2019, 2019, 2023]),
+                "norm_body_type": rng.choice(["SUV", "Sedan"]),
+                "norm_fuel_type": "Gasoline",
+                "drivetrain": rng.choice(["AWD", "FWD", None]),
+                "norm_is_used": rng.choice([0, 1]),
+            },
+            "retailListing": {"price": rng.randint(10, 50) * 1000, "miles": rng.choice([None, rng.randint(0, 90000)])},
+        })
+    return out
+
+
+class TestDistributions:
+    @pytest.mark.parametrize("seed", range(8))
+    def test_entropies_match_per_candidate_computation(self, seed):
+        candidates = _vehicles(60, seed)
+        distributions = compute_candidate_distributions(candidates)
+        for dim in QUESTIONABLE_DIMENSIONS:
+            expected = ref_dimension_entropy(candidates, dim)
+            assert distributions.dimensions[dim].entropy == expected
+            assert compute_dimension_entropy(candidates, dim) == expected
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_selection_and_context_from_distributions(self, seed):
+        candidates = _vehicles(40, seed)
+        distributions = compute_candidate_distributions(candidates)
+        filters, asked = {"make": "Toyota"}, {"price"}
+        expected = select_question_dimension(candidates, filters, asked, 0.3)
+        assert select_question_dimension([], filters, asked, 0.3, distributions=distributions) == expected
+        for dim in QUESTIONABLE_DIMENSIONS:
+            assert get_dimension_context(dim, [], distributions=distributions) == get_dimension_context(dim, candidates)
+
+    def test_categorical_context_top_values(self):
+        candidates = _vehicles(50, 1)
+        context = get_dimension_context("make", candidates)
+        makes = Counter(v["vehicle"]["make"] for v in candidates if v["vehicle"]["make"])
+        assert context["top_values"] == [m for m, _ in makes.most_common(5)]
+        assert context["values_present"] == sum(makes.values())
+
+    def test_no_candidates(self):
+        assert select_question_dimension([], {}, set()) is None
+
+
+class TestDistributionCache:
+    def test_keyed_by_domain_and_filter_set(self):
+        cache = DistributionCache(maxsize=4)
+        cache.put("vehicles", {"make": "Honda", "model": None, "year": "2018-2025"}, "a")
+        assert cache.get("vehicles", {"year": "2018-2025", "make": "Honda"}) == "a"
+        assert cache.get("laptops", {"year": "2018-2025", "make": "Honda"}) is None
+        assert cache.get("vehicles", {"make": "Honda"}) is None
+
+    def test_unhashable_filter_values(self):
+        cache = DistributionCache()
+        cache.put("vehicles", {"avoid_vehicles": [{"make": "Ford"}]}, "x")
+        assert cache.get("vehicles", {"avoid_vehicles": [{"make": "Ford"}]}) == "x"
+
+    def test_lru_eviction(self):
+        cache = DistributionCache(maxsize=2)
+        cache.put("d", {"a": 1}, 1)
+        cache.put("d", {"a": 2}, 2)
+        cache.get("d", {"a": 1})
+        cache.put("d", {"a": 3}, 3)
+        assert len(cache) == 2
+        assert cache.get("d", {"a": 2}) is None
+        assert cache.get("d", {"a": 1}) == 1
+
+    def test_ttl_expiry(self):
+        cache = DistributionCache(ttl_seconds=10)
+        with patch("idss.interview.entropy_question_selector.time.monotonic", return_value=100.0):
+            cache.put("d", {}, "v")
+        with patch("idss.interview.entropy_question_selector.time.monotonic", return_value=105.0):
+            assert cache.get("d", {}) == "v"
+        with patch("idss.interview.entropy_question_selector.time.monotonic", return_value=111.0):
+            assert cache.get("d", {}) is None
+        assert len(cache) == 0
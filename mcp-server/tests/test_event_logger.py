@@ -1,7 +1,194 @@
-from app.event_logger import log_event, hash_input
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import event_logger
+from app.event_logger import EventLogWriter, build_event_row, log_event, hash_input
+from app.schemas import ResponseStatus
 
 def test_event_logger_basic():
     assert callable(log_event)
     assert callable(hash_input)
 
-# Add latency, accuracy, and error handling tests here
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute(self, statement, rows):
+        if self.engine.fail:
+            raise RuntimeError("relation mcp_events does not exist")
+        if self.engine.down:
+            raise OperationalError("INSERT", {}, Exception("could not connect to server"))
+        if any(r["request_id"] in self.engine.bad_ids for r in rows):
+            raise RuntimeError("invalid input syntax for type json")
+        self.engine.statements.append(str(statement))
+        self.engine.rows.extend(rows)
+        self.engine.batch_sizes.append(len(rows))
+
+
+class FakeEngine:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.down = False
+        self.bad_ids = set()
+        self.statements = []
+        self.rows = []
+        self.batch_sizes = []
+
+    @contextmanager
+    def begin(self):
+        yield FakeConnection(self)
+
+
+class FakeSession(FakeConnection):
+    def __init__(self):
+        super().__init__(FakeEngine())
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _log(db, i=0):
+    log_event(
+        db=db,
+        request_id=f"req-{i}",
+        tool_name="search_products",
+        endpoint_path="/api/search-products",
+        request_data={"query": "laptop", "filters": {"brand": "Dell"}, "payment_method_id": "pm_1"},
+        response_status=ResponseStatus.OK,
+        response_data={"status": "OK", "data": {"products": [{"product_id": "p1"}]}},
+        trace={"timings_ms": {"total": 12.5}, "cache_hit": True, "sources": ["postgres"]},
+        version={"catalog_version": "1.0.0"},
+    )
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    w = EventLogWriter(engine=FakeEngine(), batch_size=3, flush_interval_s=0.01)
+    monkeypatch.setattr(event_logger, "event_log_writer", w)
+    return w
+
+
+def test_build_event_row_redacts_and_hashes():
+    row = build_event_row(
+        "req-1", "add_to_cart", "/api/cart/add",
+        {"cart_id": "c1", "product_id": "p1", "address": "1 Main St"},
+        ResponseStatus.OK, {"status": "OK"}, {"timings_ms": {}},
+    )
+    assert set(row) == set(event_logger.EVENT_COLUMNS)
+    assert row["trace_id"] == row["request_id"] == "req-1"
+    assert row["cart_id"] == "c1" and row["product_ids"] == ["p1"]
+    assert "1 Main St" not in row["input_summary"]
+    assert row["input_hash"] == hash_input({"cart_id": "c1", "product_id": "p1", "address": "1 Main St"})
+
+
+class TestEventLogWriter:
+    def test_sync_fallback_when_writer_not_running(self, writer):
+        db = FakeSession()
+        _log(db)
+        assert db.commits == 1 and len(db.engine.rows) == 1
+        assert writer.stats()["enqueued"] == 0
+
+    def test_running_writer_group_commits_off_request_path(self, writer):
+        db = FakeSession()
+
+        async def go():
+            writer.start()
+            for i in range(7):
+                _log(db, i)
+            assert db.commits == 0 and writer.stats()["backlog"] == 7
+            await writer.stop()
+
+        asyncio.run(go())
+        engine = writer.engine
+        assert [r["request_id"] for r in engine.rows] == [f"req-{i}" for i in range(7)]
+        assert engine.batch_sizes == [3, 3, 1]
+        assert all(s.startswith("INSERT INTO mcp_events") for s in engine.statements)
+        stats = writer.stats()
+        assert stats["written"] == 7 and stats["batches"] == 3 and stats["backlog"] == 0
+        assert stats["max_lag_ms"] >= stats["last_lag_ms"] >= 0.0
+
+    def test_background_flush_without_stop(self, writer):
+        async def go():
+            writer.start()
+            _log(FakeSession())
+            await asyncio.sleep(0.1)
+            written = writer.stats()["written"]
+            await writer.stop()
+            return written
+
+        assert asyncio.run(go()) == 1
+
+    def test_full_queue_falls_back_to_sync_insert(self, writer):
+        writer.capacity = 2
+        db = FakeSession()
+
+        async def go():
+            writer.start()
+            for i in range(4):
+                _log(db, i)
+            await writer.stop()
+
+        asyncio.run(go())
+        assert writer.stats()["overflow_sync"] == 2
+        assert db.commits == 2
+        assert len(writer.engine.rows) + len(db.engine.rows) == 4
+
+    def test_failed_batch_counted_not_raised(self, writer):
+        writer._engine = FakeEngine(fail=True)
+
+        async def go():
+            writer.start()
+            _log(FakeSession())
+            await writer.stop()
+
+        asyncio.run(go())
+        stats = writer.stats()
+        assert stats["failed_events"] == 1 and stats["write_errors"] == 1 and stats["written"] == 0
+
+    def test_failed_batch_retried_row_by_row(self, writer):
+        writer.engine.bad_ids = {"req-1"}
+        for i in range(3):
+            writer._buffer.append((0.0, {"request_id": f"req-{i}"}))
+        writer.flush()
+        stats = writer.stats()
+        assert [r["request_id"] for r in writer.engine.rows] == ["req-0", "req-2"]
+        assert stats["written"] == 2 and stats["failed_events"] == 1 and stats["write_errors"] == 1
+
+    def test_unreachable_database_requeues_batch(self, writer):
+        writer.engine.down = True
+        for i in range(5):
+            writer._buffer.append((0.0, {"request_id": f"req-{i}"}))
+        writer.flush()
+        stats = writer.stats()
+        assert stats["backlog"] == 5 and stats["failed_events"] == 0 and stats["requeued_events"] == 3
+
+        writer.engine.down = False
+        writer.flush()
+        assert [r["request_id"] for r in writer.engine.rows] == [f"req-{i}" for i in range(5)]
+        assert writer.stats()["backlog"] == 0
+
+    def test_enqueue_from_worker_threads(self, writer):
+        writer.batch_size = 50
+
+        async def go():
+            writer.start()
+            threads = [threading.Thread(target=lambda: [_log(FakeSession(), i) for i in range(25)])
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            await writer.stop()
+
+        asyncio.run(go())
+        assert writer.stats()["written"] == 100
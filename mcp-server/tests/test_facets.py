@@ -0,0 +1,146 @@
+"""
+Tests for facet counts: the in-memory bitmap facet index (same filter
+semantics as the candidate index), the one-query GROUP BY fallback and
+its row folding.
+"""
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app.facets import FacetIndex, bucket, facet_counts_for_query, fold_facet_rows, RAM_EDGES, RAM_LABELS
+from app.models import Product
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def yield_per(self, n):
+        return self
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *cols):
+        return FakeQuery(self.rows)
+
+    def close(self):
+        pass
+
+
+def _product(name, price, brand, attributes=None, category="Electronics", product_type="laptop"):
+    return SimpleNamespace(
+        product_id=uuid.uuid4(), name=name, category=category, product_type=product_type,
+        brand=brand, price_value=price, rating=None, attributes=attributes,
+    )
+
+
+CATALOG = [
+    _product("Dell XPS 13 Laptop", 1200, "Dell", {"ram_gb": 16, "storage_gb": 512, "good_for_programming": True}),
+    _product("Dell Inspiron Laptop", 650, "Dell", {"ram_gb": 8, "storage_gb": 256, "storage_type": "SSD"}),
+    _product("Refurb Dell Latitude", 400, "Recertified", {"ram_gb": 16, "good_for_linux": "true"}),
+    _product("HP Pavilion Laptop", 700, "HP", None),
+    _product("Lenovo ThinkPad X1", 1500, "Lenovo", {"ram_gb": 32, "storage_gb": 1024, "good_for_ml": 1}),
+    _product("Gift Card", None, "Store", {}, product_type="gift"),
+    _product("The Hobbit", 15, "Tolkien Press", {}, category="Books", product_type="book"),
+]
+
+
+@pytest.fixture
+def index():
+    idx = FacetIndex(session_factory=lambda: FakeSession(CATALOG), enabled=True)
+    idx.rebuild()
+    return idx
+
+
+class TestFacetIndex:
+    def test_counts_for_category(self, index):
+        facets = index.counts({"category": "Electronics"})
+        assert facets["total"] == 6
+        assert facets["brand"] == {"Dell": 2, "Recertified": 1, "HP": 1, "Lenovo": 1, "Store": 1}
+        assert facets["price_band"] == {"under_500": 1, "500_1000": 2, "1000_1500": 1, "1500_2000": 1}
+        assert facets["ram_gb"] == {"8_15gb": 1, "16_31gb": 2, "32gb_plus": 1}
+        assert facets["storage_gb"] == {"256_511gb": 1, "512_1023gb": 1, "1tb_plus": 1}
+        assert facets["storage_type"] == {"SSD": 1}
+        assert facets["use_case"] == {"programming": 1, "linux": 1, "ml": 1}
+
+    def test_brand_price_and_spec_filters(self, index):
+        # brand matches the column or a name word; min RAM keeps NULL attributes
+        assert index.counts({"brand": "dell", "price_max": 1000})["total"] == 2
+        assert index.counts({"category": "Electronics", "min_ram_gb": 16})["total"] == 4
+        assert index.counts({"product_type": "laptop", "price_min_cents": 60000, "price_max_cents": 120000})["total"] == 3
+
+    def test_top_brands_fold_into_other(self, index):
+        index.top_brands = 2
+        assert index.counts({"category": "Electronics"})["brand"] == {"Dell": 2, "HP": 1, "other": 3}
+
+    def test_uncovered_filters_and_not_built(self):
+        idx = FacetIndex(session_factory=lambda: FakeSession(CATALOG), enabled=True)
+        idx._last_attempt = float("inf")  # no background build in this test
+        assert idx.counts({"category": "Electronics"}) is None
+        assert idx.stats["not_ready"] == 1
+        idx.rebuild()
+        assert idx.counts({"color": "pink"}) is None
+        assert idx.stats["ineligible"] == 1
+
+    def test_mark_stale_triggers_background_rebuild(self, index, monkeypatch):
+        started = []
+        monkeypatch.setattr("app.facets.threading.Thread",
+                            lambda target, **kw: SimpleNamespace(start=lambda: started.append(target)))
+        index.counts({})
+        assert started == []
+        index.mark_stale()
+        index._last_attempt = 0
+        index.counts({})
+        assert len(started) == 1
+
+
+class TestSqlFacets:
+    def test_single_group_by_query(self):
+        compiled = []
+
+        class CompilingQuery:
+            def __init__(self, q):
+                self.q = q
+
+            def __getattr__(self, name):
+                return lambda *args: CompilingQuery(getattr(self.q, name)(*args))
+
+            def all(self):
+                compiled.append(str(self.q.statement.compile(dialect=postgresql.dialect())))
+                return []
+
+        facets = facet_counts_for_query(CompilingQuery(Query([Product]).filter(Product.category == "Electronics")))
+        assert facets["total"] == 0 and facets["brand"] == {}
+        (sql,) = compiled
+        assert sql.count("SELECT") == 1 and "GROUP BY" in sql
+        assert sql.count("FILTER (WHERE") == 6
+
+    def test_fold_rows(self):
+        rows = [
+            ("Dell", "500_1000", "8_15gb", "256_511gb", None, "SSD", 3, 0, 0, 1, 0, 0, 2),
+            (" Dell ", "1000_1500", "16_31gb", None, "13_14in", "", 2, 1, 0, 0, 0, 0, 0),
+            (None, None, None, None, None, None, 1, 0, 0, 0, 0, 0, 0),
+        ]
+        facets = fold_facet_rows(rows)
+        assert facets["total"] == 6
+        assert facets["brand"] == {"Dell": 5}
+        assert facets["price_band"] == {"500_1000": 3, "1000_1500": 2}
+        assert facets["storage_type"] == {"SSD": 3}
+        assert facets["screen_size"] == {"13_14in": 2}
+        assert facets["use_case"] == {"ml": 1, "gaming": 1, "programming": 2}
+
+
+def test_bucket_edges_are_upper_exclusive():
+    assert [bucket(v, RAM_EDGES, RAM_LABELS) for v in (4, 8, 15.9, 16, 64)] == [
+        "under_8gb", "8_15gb", "8_15gb", "16_31gb", "32gb_plus"]
+    assert bucket(None, RAM_EDGES, RAM_LABELS) is None
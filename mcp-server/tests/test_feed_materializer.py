@@ -0,0 +1,267 @@
+"""
+Unit tests for the feed materializer (precomputed feed snapshots).
+
+Uses an in-memory fake session so no Postgres is required.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.feed_materializer import FEED_SPECS, FeedBuildError, FeedMaterializer, append_dirty_journal
+
+
+def _product(name="Laptop", price=999.0, inventory=5):
+    return SimpleNamespace(
+        product_id=uuid.uuid4(),
+        name=name,
+        description="A product",
+        price_value=price,
+        inventory=inventory,
+        link=None,
+        image_url=None,
+        category="Electronics",
+        brand="Dell",
+        rating=4.5,
+        rating_count=10,
+        product_type="laptop",
+        metadata=None,
+        created_at=datetime(2026, 1, 1),
+        updated_at=datetime(2026, 1, 1),
+    )
+
+
+class _FakeQuery:
+    def __init__(self, rows):
+        self._rows = rows
+        self._ids = None
+
+    def yield_per(self, n):
+        return iter(list(self._rows))
+
+    def filter(self, clause):
+        self._ids = set(clause.right.value)
+        return self
+
+    def all(self):
+        return [r for r in self._rows if r.product_id in self._ids]
+
+
+class _FakeSession:
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def query(self, model):
+        return _FakeQuery(self.catalog)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def catalog():
+    return [_product(f"Laptop {i}") for i in range(3)]
+
+
+@pytest.fixture
+def materializer(tmp_path, catalog):
+    return FeedMaterializer(
+        artifact_dir=tmp_path,
+        session_factory=lambda: _FakeSession(catalog),
+        enabled=True,
+    )
+
+
+def _read(artifact):
+    with gzip.open(artifact.path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+class TestFeedMaterializer:
+    def test_disabled_serves_nothing(self, tmp_path, catalog):
+        m = FeedMaterializer(artifact_dir=tmp_path, session_factory=lambda: _FakeSession(catalog), enabled=False)
+        assert m.latest("acp.json") is None
+
+    def test_rebuild_publishes_every_feed(self, materializer, catalog):
+        materializer.rebuild()
+        for name in FEED_SPECS:
+            assert materializer.latest(name) is not None
+        doc = json.loads(_read(materializer.latest("acp.json")))
+        assert doc["count"] == 3
+        assert [i["id"] for i in doc["items"]] == [str(p.product_id) for p in catalog]
+        merchant = json.loads(_read(materializer.latest("merchant.json")))
+        assert merchant["total_count"] == 3
+
+    def test_incremental_refresh_rerenders_only_dirty_products(self, materializer, catalog):
+        materializer.rebuild()
+        acp_v1 = materializer.latest("acp.json").version
+        merchant_v1 = materializer.latest("merchant.json").version
+
+        catalog[1].price_value = 1299.0
+        materializer.mark_dirty([str(catalog[1].product_id)])
+        materializer.refresh()
+
+        acp = materializer.latest("acp.json")
+        assert acp.version > acp_v1
+        prices = [i["price_dollars"] for i in json.loads(_read(acp))["items"]]
+        assert prices == [999.0, 1299.0, 999.0]
+        merchant = materializer.latest("merchant.json")
+        assert merchant.version > merchant_v1
+        assert [p["price"]["value"] for p in json.loads(_read(merchant))["products"]] == [999.0, 1299.0, 999.0]
+        assert materializer.stats["products_rerendered"] == 1
+
+        # link is only part of the ACP feed, so the merchant feeds are not rewritten
+        catalog[1].link = "https://shop.example/laptop-1"
+        materializer.mark_dirty([str(catalog[1].product_id)])
+        materializer.refresh()
+        assert materializer.latest("acp.json").version > acp.version
+        assert materializer.latest("merchant.json").version == merchant.version
+
+    def test_refresh_drops_deleted_products(self, materializer, catalog):
+        materializer.rebuild()
+        gone = catalog.pop(0)
+        materializer.mark_dirty([str(gone.product_id)])
+        materializer.refresh()
+        doc = json.loads(_read(materializer.latest("acp.json")))
+        assert doc["count"] == 2
+        assert str(gone.product_id) not in {i["id"] for i in doc["items"]}
+
+    def test_refresh_drains_cross_process_journal(self, materializer, catalog, tmp_path):
+        materializer.rebuild()
+        catalog[2].inventory = 0
+        append_dirty_journal([str(catalog[2].product_id)], artifact_dir=tmp_path)
+        materializer.refresh()
+        items = json.loads(_read(materializer.latest("acp.json")))["items"]
+        assert items[2]["availability"] == "out_of_stock"
+        assert not (tmp_path / "dirty.journal").exists()
+
+    def test_render_error_keeps_previous_artifacts(self, materializer, catalog):
+        materializer.rebuild()
+        published = {name: materializer.latest(name) for name in FEED_SPECS}
+
+        catalog[0].price_value = "n/a"
+        materializer.mark_dirty([str(catalog[0].product_id)])
+        with pytest.raises(FeedBuildError):
+            materializer.refresh()
+        with pytest.raises(FeedBuildError):
+            materializer.rebuild()
+
+        assert {name: materializer.latest(name) for name in FEED_SPECS} == published
+        assert materializer.stats["failed_builds"] == 2
+        assert str(catalog[0].product_id) in materializer._dirty  # retried once fixed
+
+        catalog[0].price_value = 899.0
+        materializer.refresh()
+        items = json.loads(_read(materializer.latest("acp.json")))["items"]
+        assert items[0]["price_dollars"] == 899.0
+
+    def test_empty_feed_from_non_empty_catalog_is_not_published(self, materializer, monkeypatch):
+        monkeypatch.setitem(FEED_SPECS, "merchant.csv", FEED_SPECS["merchant.csv"]._replace(render=lambda p: None))
+        with pytest.raises(FeedBuildError):
+            materializer.rebuild()
+        assert materializer.latest("acp.json") is None
+
+    def test_merchant_feeds_render_catalog_columns(self, materializer, catalog):
+        catalog[2].inventory = 0
+        materializer.rebuild()
+        merchant = json.loads(_read(materializer.latest("merchant.json")))
+        assert [p["id"] for p in merchant["products"]] == [str(p.product_id) for p in catalog]
+        assert merchant["products"][0]["price"] == {"value": 999.0, "currency": "USD"}
+        assert [p["availability"] for p in merchant["products"]] == ["in stock", "in stock", "out of stock"]
+        xml = _read(materializer.latest("merchant.xml"))
+        assert f"<g:id>{catalog[0].product_id}</g:id>" in xml and "999.0 USD" in xml
+
+    def test_old_versions_are_pruned(self, materializer, catalog, tmp_path):
+        materializer.keep_versions = 2
+        for _ in range(4):
+            materializer.rebuild()
+        assert len(list(tmp_path.glob("acp.json.*.gz"))) == 2
+
+    def test_manifest_reloaded_by_fresh_instance(self, materializer, catalog, tmp_path):
+        materializer.rebuild()
+        fresh = FeedMaterializer(artifact_dir=tmp_path, enabled=True)
+        assert fresh.latest("acp.csv").etag == materializer.latest("acp.csv").etag
+
+    def test_background_loop_builds_then_wakes_on_dirty(self, materializer, catalog):
+        materializer.refresh_interval_s = 60  # only mark_dirty should wake it
+
+        async def scenario():
+            materializer.start()
+            for _ in range(100):
+                if materializer.latest("acp.json"):
+                    break
+                await asyncio.sleep(0.01)
+            catalog[0].inventory = 0
+            materializer.mark_dirty([str(catalog[0].product_id)])
+            for _ in range(100):
+                if materializer.stats["incremental_refreshes"]:
+                    break
+                await asyncio.sleep(0.01)
+            await materializer.stop()
+
+        asyncio.run(scenario())
+        assert materializer.stats["full_builds"] == 1
+        assert materializer.stats["incremental_refreshes"] == 1
+        items = json.loads(_read(materializer.latest("acp.json")))["items"]
+        assert items[0]["availability"] == "out_of_stock"
+
+
+class TestArtifactEndpoints:
+    @pytest.fixture
+    def client(self, materializer, monkeypatch):
+        from fastapi.testclient import TestClient
+        import app.main as main
+        from app.database import get_db
+
+        materializer.rebuild()
+        monkeypatch.setattr(main, "feed_materializer", materializer)
+
+        def override_get_db():
+            yield MagicMock()
+
+        prev = main.app.dependency_overrides.get(get_db)
+        main.app.dependency_overrides[get_db] = override_get_db
+        yield TestClient(main.app)
+        if prev is not None:
+            main.app.dependency_overrides[get_db] = prev
+        else:
+            main.app.dependency_overrides.pop(get_db, None)
+
+    def test_serves_latest_artifact(self, client, materializer):
+        resp = client.get("/acp/feed.json")
+        assert resp.status_code == 200
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["x-feed-version"] == str(materializer.latest("acp.json").version)
+        assert resp.json()["count"] == 3
+
+    def test_identity_clients_get_decompressed_body(self, client, materializer):
+        resp = client.get("/acp/feed.csv", headers={"Accept-Encoding": "identity"})
+        assert resp.status_code == 200
+        assert "content-encoding" not in resp.headers
+        assert resp.text == _read(materializer.latest("acp.csv"))
+
+    def test_conditional_get_returns_304(self, client):
+        etag = client.get("/export/merchant-feed?format=xml").headers["etag"]
+        resp = client.get("/export/merchant-feed?format=xml", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_range_request_returns_partial_artifact(self, client, materializer):
+        raw = materializer.latest("acp.json").path.read_bytes()
+        with client.stream("GET", "/acp/feed.json", headers={"Range": "bytes=0-9"}) as resp:
+            body = b"".join(resp.iter_raw())
+        assert resp.status_code == 206
+        assert body == raw[:10]
+
+    def test_filtered_feed_bypasses_snapshot(self, client):
+        resp = client.get("/acp/feed.json?limit=5")
+        assert "x-feed-version" not in resp.headers
@@ -0,0 +1,152 @@
+"""Unit tests for batched knowledge-graph ingestion (app.kg_batch)."""
+
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from app.kg_batch import GraphBatch, KGBatchLoader, edge_query, node_query
+from app.knowledge_graph import KnowledgeGraphBuilder
+
+
+def _make_mock_connection():
+    """Mock Neo4j connection whose session.execute_write is recorded."""
+    mock_conn = Mock()
+    mock_session = MagicMock()
+    mock_conn.driver.session.return_value.__enter__ = Mock(return_value=mock_session)
+    mock_conn.driver.session.return_value.__exit__ = Mock(return_value=False)
+    mock_conn.database = "neo4j"
+    return mock_conn, mock_session
+
+
+def _jewelry(product_id, **overrides):
+    data = {
+        "product_id": product_id, "name": "Ring", "brand": "Acme", "price": 49.99,
+        "description": "", "image_url": None, "subcategory": "Rings", "color": "gold",
+        "available": True, "material": "gold", "item_type": "ring",
+    }
+    data.update(overrides)
+    return data
+
+
+def _book(product_id, **overrides):
+    data = {
+        "product_id": product_id, "title": "Dune", "name": "Dune", "price": 9.99, "description": "",
+        "image_url": None, "isbn": "123", "pages": 412, "language": "English", "publication_year": 1965,
+        "edition": "1st", "format": "Paperback", "available": True, "author": "Frank Herbert",
+        "author_nationality": "American", "author_birth_year": 1920, "author_biography": "",
+        "author_awards": [], "publisher": "Chilton", "publisher_country": "USA",
+        "publisher_founded": 1904, "publisher_website": None, "genre": "Sci-Fi",
+        "genre_description": "", "themes": ["power", "ecology"],
+        "series_name": "Dune", "series_position": 1, "series_total_books": 6,
+    }
+    data.update(overrides)
+    return data
+
+
+class TestGraphBatch:
+    def test_entities_deduplicated_across_products(self):
+        batch = GraphBatch()
+        batch.add_jewelry(_jewelry("j1"))
+        batch.add_jewelry(_jewelry("j2"))
+        brand_rows = batch.nodes[("Brand", ("name",))]
+        assert list(brand_rows) == [("Acme",)]
+        assert len(batch.nodes[("Jewelry:Product", ("product_id",))]) == 2
+        branded = [g for g in batch.edges if g[0] == "BRANDED_BY"]
+        assert len(branded) == 1 and len(batch.edges[branded[0]]) == 2
+
+    def test_later_properties_win(self):
+        batch = GraphBatch()
+        batch.add_node("Author", {"name": "A"}, {"nationality": "UK", "birth_year": 1900})
+        batch.add_node("Author", {"name": "A"}, {"nationality": "US"})
+        row = batch.nodes[("Author", ("name",))][("A",)]
+        assert row == {"key": {"name": "A"}, "props": {"nationality": "US", "birth_year": 1900}}
+
+    def test_empty_optional_entities_skipped(self):
+        batch = GraphBatch()
+        batch.add_jewelry(_jewelry("j1", brand="", material=None, item_type="ring"))
+        labels = {g[0] for g in batch.nodes}
+        assert labels == {"Jewelry:Product", "ItemType"}
+        assert {g[0] for g in batch.edges} == {"IS_TYPE"}
+
+    def test_null_key_entity_skipped(self):
+        batch = GraphBatch()
+        batch.add_book(_book("b1", genre=None))
+        assert not any(g[0] == "Genre" for g in batch.nodes)
+        assert not any(g[0] == "BELONGS_TO_GENRE" for g in batch.edges)
+
+    def test_relationship_merge_properties(self):
+        batch = GraphBatch()
+        batch.add_book(_book("b1"))
+        published = next(g for g in batch.edges if g[0] == "PUBLISHED_BY")
+        assert published[3] == ("year",)
+        assert batch.edges[published][0]["merge"] == {"year": 1965}
+        themes = next(g for g in batch.edges if g[0] == "EXPLORES_THEME")
+        assert [r["dst"] for r in batch.edges[themes]] == [{"name": "power"}, {"name": "ecology"}]
+
+    def test_invalid_identifier_rejected(self):
+        with pytest.raises(ValueError):
+            GraphBatch().add_node("Brand) DETACH DELETE (x", {"name": "x"})
+        with pytest.raises(ValueError):
+            GraphBatch().add_node("Brand", {"name": "x"}, {"bad key": 1})
+
+
+class TestQueries:
+    def test_node_query(self):
+        assert node_query(("RAM", ("capacity_gb", "type")), stamp="created_at") == (
+            "UNWIND $rows AS row\n"
+            "MERGE (n:RAM {capacity_gb: row.key.capacity_gb, type: row.key.type})\n"
+            "SET n += row.props, n.created_at = datetime()"
+        )
+
+    def test_edge_query_matches_products_by_constraint(self):
+        query = edge_query(("PUBLISHED_BY", ("Book:Product", ("product_id",)), ("Publisher", ("name",)), ("year",)))
+        assert "MATCH (a:Product {product_id: row.src.product_id})" in query
+        assert "MATCH (b:Publisher {name: row.dst.name})" in query
+        assert "MERGE (a)-[r:PUBLISHED_BY {year: row.merge.year}]->(b)" in query
+
+
+class TestKGBatchLoader:
+    def test_nodes_written_before_edges_in_chunks(self):
+        conn, session = _make_mock_connection()
+        batch = GraphBatch()
+        for i in range(5):
+            batch.add_jewelry(_jewelry(f"j{i}", brand=f"B{i}", material=None, item_type=None))
+        stats = KGBatchLoader(conn, batch_size=2, progress=None).load(batch)
+
+        queries = [c.args[1] for c in session.execute_write.call_args_list]
+        sizes = [len(c.args[2]) for c in session.execute_write.call_args_list]
+        first_edge = next(i for i, q in enumerate(queries) if "MATCH" in q)
+        assert all("MATCH" not in q for q in queries[:first_edge])
+        assert sizes == [2, 2, 1] * 3
+        assert stats.rows == 15 and stats.batches == 9 and stats.failed_rows == 0
+
+    def test_failed_chunk_retried_row_by_row(self):
+        conn, session = _make_mock_connection()
+
+        def execute_write(fn, query, rows):
+            if len(rows) > 1 or rows[0]["key"]["name"] == "bad":
+                raise RuntimeError("constraint violation")
+
+        session.execute_write.side_effect = execute_write
+        batch = GraphBatch()
+        for name in ("a", "bad", "c"):
+            batch.add_node("Brand", {"name": name})
+        lines = []
+        stats = KGBatchLoader(conn, batch_size=3, progress=lines.append).load(batch)
+        assert stats.rows == 2 and stats.failed_rows == 1
+        assert any("retrying row by row" in line for line in lines)
+
+    def test_builder_bulk_load_creates_and_awaits_indexes(self):
+        conn, session = _make_mock_connection()
+        batch = GraphBatch()
+        batch.add_node("Brand", {"name": "Acme"})
+        stats = KnowledgeGraphBuilder(conn).bulk_load(batch, batch_size=10)
+        run_queries = [c.args[0] for c in session.run.call_args_list]
+        assert any("CREATE INDEX brand_name" in q for q in run_queries)
+        assert run_queries[-1] == "CALL db.awaitIndexes(300)"
+        assert stats.rows == 1
+
+    def test_rejects_non_positive_batch_size(self):
+        conn, _ = _make_mock_connection()
+        with pytest.raises(ValueError):
+            KGBatchLoader(conn, batch_size=0)
@@ -0,0 +1,137 @@
+"""Tests for latency-budgeted KG re-ranking (app.kg_rerank)."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.kg_rerank import KGReranker
+
+
+def _mock_kg(ids=("p1", "p2"), delay=0.0, available=True, release=None):
+    kg = MagicMock()
+    kg.is_available.return_value = available
+
+    def search_candidates(query, filters, limit):
+        if release is not None:
+            release.wait(2)
+        if delay:
+            time.sleep(delay)
+        return list(ids), {"query": query}
+
+    kg.search_candidates.side_effect = search_candidates
+    return kg
+
+
+def _run(reranker, kg, query="gaming laptop", filters=None, limit=9):
+    async def go():
+        lookup = reranker.start(query, filters or {"category": "Electronics"}, limit)
+        return await reranker.collect(lookup)
+
+    with patch("app.kg_service.get_kg_service", return_value=kg):
+        return asyncio.run(go())
+
+
+def _wait_idle(reranker):
+    deadline = time.monotonic() + 2
+    while reranker.stats()["inflight"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+class TestBudget:
+    def test_result_within_budget_is_merged(self):
+        reranker = KGReranker(budget_ms=1000)
+        assert _run(reranker, _mock_kg()) == ["p1", "p2"]
+        stats = reranker.stats()
+        assert stats["on_time"] == 1 and stats["budget_expired"] == 0
+
+    def test_slow_lookup_expires_and_is_cached_for_next_query(self):
+        reranker = KGReranker(budget_ms=20)
+        kg = _mock_kg(delay=0.15)
+        started = time.monotonic()
+        assert _run(reranker, kg) == []
+        assert time.monotonic() - started < 0.12
+        assert reranker.stats()["budget_expired"] == 1
+
+        _wait_idle(reranker)
+        assert _run(reranker, kg) == ["p1", "p2"]
+        stats = reranker.stats()
+        assert stats["cache_hits"] == 1 and stats["late_completions"] == 1
+        assert kg.search_candidates.call_count == 1
+        assert stats["budget_expired_rate"] == pytest.approx(0.5)
+
+    def test_budget_counts_from_start(self):
+        """Time spent on the store search is charged against the budget."""
+        reranker = KGReranker(budget_ms=50)
+        kg = _mock_kg(delay=0.03)
+
+        async def go():
+            lookup = reranker.start("q", {}, 5)
+            await asyncio.sleep(0.08)  # store search longer than KG
+            return await reranker.collect(lookup)
+
+        with patch("app.kg_service.get_kg_service", return_value=kg):
+            assert asyncio.run(go()) == ["p1", "p2"]
+
+
+class TestFailures:
+    def test_unavailable_kg_not_cached(self):
+        reranker = KGReranker(budget_ms=1000)
+        assert _run(reranker, _mock_kg(available=False)) == []
+        assert _run(reranker, _mock_kg()) == ["p1", "p2"]
+
+    def test_search_error_returns_empty(self):
+        reranker = KGReranker(budget_ms=1000)
+        kg = MagicMock()
+        kg.is_available.return_value = True
+        kg.search_candidates.side_effect = ConnectionError("Neo4j down")
+        assert _run(reranker, kg) == []
+        _wait_idle(reranker)
+        assert reranker.stats()["errors"] == 1 and reranker.stats()["cached_queries"] == 0
+
+    def test_error_explanation_not_cached(self):
+        reranker = KGReranker(budget_ms=1000)
+        kg = MagicMock()
+        kg.is_available.return_value = True
+        kg.search_candidates.return_value = ([], {"error": "timeout"})
+        assert _run(reranker, kg) == []
+        _wait_idle(reranker)
+        assert reranker.stats()["cached_queries"] == 0
+
+    def test_busy_workers_skip_new_lookups(self):
+        release = threading.Event()
+        reranker = KGReranker(budget_ms=10, max_workers=1)
+        kg = _mock_kg(release=release)
+        try:
+            assert _run(reranker, kg, query="a") == []
+            assert _run(reranker, kg, query="b") == []
+            assert reranker.stats()["skipped_busy"] == 1
+        finally:
+            release.set()
+        _wait_idle(reranker)
+        assert kg.search_candidates.call_count == 1
+
+
+class TestCache:
+    def test_key_includes_filters_and_limit(self):
+        reranker = KGReranker(budget_ms=1000)
+        kg = _mock_kg()
+        _run(reranker, kg, filters={"brand": "Dell"})
+        _run(reranker, kg, filters={"brand": "HP"})
+        _run(reranker, kg, filters={"brand": "Dell"}, limit=27)
+        _run(reranker, kg, filters={"brand": "Dell"})
+        assert kg.search_candidates.call_count == 3
+
+    def test_ttl_and_lru_bound(self):
+        reranker = KGReranker(budget_ms=1000, cache_ttl_s=0.0)
+        kg = _mock_kg()
+        _run(reranker, kg)
+        _run(reranker, kg)
+        assert kg.search_candidates.call_count == 2
+
+        reranker = KGReranker(budget_ms=1000, cache_size=2)
+        for q in ("a", "b", "c"):
+            _run(reranker, kg, query=q)
+        assert reranker.stats()["cached_queries"] == 2
@@ -1,9 +1,11 @@
 """Tests for KnowledgeGraphService (Neo4j KG integration)."""
 
 import os
+from unittest.mock import MagicMock
+
 import pytest
 
-from app.kg_service import KnowledgeGraphService, NEO4J_AVAILABLE
+from app.kg_service import KnowledgeGraphService, NEO4J_AVAILABLE, fulltext_phrase
 
 
 NEO4J_ENV_READY = all(
@@ -84,9 +86,12 @@ def test_build_cypher_query_soft_constraints_become_case_when():
     # Hard WHERE should NOT contain the use-case flag as a bare condition
     where_part = cypher.split("WHERE")[1].split("WITH")[0] if "WITH" in cypher else cypher
     assert "p.good_for_gaming = true" not in where_part
-    # Connectivity bonus via OPTIONAL MATCH
-    assert "OPTIONAL MATCH" in cypher
-    assert "SIMILAR_TO" in cypher
+    # Text match is a full-text index lookup, connectivity a materialized property
+    assert "db.index.fulltext.queryNodes('product_text', $q_fulltext)" in cypher
+    assert "CASE WHEN p IN text_hits THEN 3" in cypher
+    assert "coalesce(p.connectivity, 0)" in cypher
+    assert "OPTIONAL MATCH" not in cypher
+    assert "CONTAINS" not in cypher
     svc.close()
 
 
@@ -98,11 +103,78 @@ def test_build_cypher_query_no_soft_constraints_uses_connectivity():
         filters={"category": "Electronics"},
         limit=5,
     )
-    assert "OPTIONAL MATCH" in cypher
-    assert "connectivity" in cypher
+    assert "ORDER BY connectivity DESC" in cypher
+    assert "p.connectivity" in cypher
+    assert "fulltext" not in cypher
+    svc.close()
+
+
+def test_build_cypher_query_unindexed_fallback():
+    """Graphs without the search indexes keep the CONTAINS + OPTIONAL MATCH query."""
+    svc = KnowledgeGraphService(password=None)
+    cypher = svc._build_cypher_query(
+        query="gaming laptop",
+        filters={"category": "Electronics"},
+        limit=10,
+        fulltext=False,
+        materialized_connectivity=False,
+    )
+    assert "CONTAINS $q" in cypher
+    assert "OPTIONAL MATCH (p)-[:SIMILAR_TO]->(nb:Product)" in cypher
+    assert "count(nb) AS connectivity" in cypher
+    assert "text_hits" not in cypher
     svc.close()
 
 
+def test_build_cypher_query_skips_fulltext_for_punctuation_only_query():
+    svc = KnowledgeGraphService(password=None)
+    cypher = svc._build_cypher_query(query="??", filters={}, limit=5)
+    assert "text_hits" not in cypher and "CONTAINS" not in cypher
+    svc.close()
+
+
+def test_fulltext_phrase_escapes_lucene_syntax():
+    assert fulltext_phrase("gaming laptop") == '"gaming laptop"'
+    assert fulltext_phrase('rtx 4070 (16") a/b') == '"rtx 4070 \\(16\\"\\) a\\/b"'
+
+
+def test_search_capabilities_probe_and_fallback():
+    """search_candidates picks the indexed query only when the indexes are online."""
+    svc = KnowledgeGraphService(password=None)
+    session = MagicMock()
+    svc.driver = MagicMock()
+    svc.driver.session.return_value.__enter__.return_value = session
+
+    def run(cypher, params=None):
+        if cypher.startswith("SHOW INDEXES"):
+            return [{"name": "product_text"}, {"name": "product_connectivity"}]
+        if "IS NOT NULL" in cypher:
+            probe = MagicMock()
+            probe.single.return_value = {"p.product_id": "x"}
+            return probe
+        return [{"product_id": "p1", "score": 3.2}]
+
+    session.run.side_effect = run
+    ids, _ = svc.search_candidates("gaming laptop", {"category": "Electronics"}, limit=5)
+    assert ids == ["p1"]
+    search_call = session.run.call_args_list[-1]
+    assert "text_hits" in search_call.args[0]
+    assert search_call.args[1]["q_fulltext"] == '"gaming laptop"'
+
+    # Cached: a second search does not re-probe
+    session.run.reset_mock()
+    svc.search_candidates("gaming laptop", {}, limit=5)
+    assert len(session.run.call_args_list) == 1
+
+    # Probe failure falls back to the unindexed query
+    svc._capabilities = None
+    session.run.side_effect = lambda cypher, params=None: (
+        (_ for _ in ()).throw(RuntimeError("no SHOW")) if cypher.startswith("SHOW") else []
+    )
+    svc.search_candidates("gaming laptop", {}, limit=5)
+    assert "OPTIONAL MATCH" in session.run.call_args_list[-1].args[0]
+
+
 # ---------------------------------------------------------------------------
 # Diversity score helper (no Neo4j required)
 # ---------------------------------------------------------------------------
@@ -363,5 +363,43 @@ class TestKnowledgeGraphBuilder:
         assert mock_session.run.call_count >= 3  # fetch + redirect + delete
 
 
+
+class TestConnectivity:
+    """Materialized SIMILAR_TO connectivity used by candidate search."""
+
+    def test_similar_to_updates_source_connectivity(self):
+        mock_conn, mock_session = _make_mock_connection()
+        KnowledgeGraphBuilder(mock_conn).create_comparison_relationships("a", "b", "SIMILAR_TO", 0.8)
+        query = mock_session.run.call_args[0][0]
+        assert "SET p1.connectivity = size([(p1)-[:SIMILAR_TO]->(:Product) | 1])" in query
+
+    def test_other_comparisons_leave_connectivity(self):
+        mock_conn, mock_session = _make_mock_connection()
+        KnowledgeGraphBuilder(mock_conn).create_comparison_relationships("a", "b", "BETTER_THAN", 0.8)
+        assert "connectivity" not in mock_session.run.call_args[0][0]
+
+    def test_refresh_connectivity_scoped_and_full(self):
+        mock_conn, mock_session = _make_mock_connection()
+        mock_session.run.return_value.single.return_value = {"updated": 2}
+        builder = KnowledgeGraphBuilder(mock_conn)
+        assert builder.refresh_connectivity(["a", "b"]) == 2
+        query, params = mock_session.run.call_args[0]
+        assert "UNWIND $product_ids" in query and params == {"product_ids": ["a", "b"]}
+        builder.refresh_connectivity()
+        assert "UNWIND" not in mock_session.run.call_args[0][0]
+
+    def test_bulk_load_refreshes_similar_to_sources(self):
+        from app.kg_batch import GraphBatch
+
+        mock_conn, mock_session = _make_mock_connection()
+        mock_session.run.return_value.single.return_value = {"updated": 1}
+        batch = GraphBatch()
+        batch.add_comparison("a", "b", "SIMILAR_TO", 0.9)
+        batch.add_comparison("a", "c", "SIMILAR_TO", 0.7)
+        KnowledgeGraphBuilder(mock_conn).bulk_load(batch)
+        query, params = mock_session.run.call_args[0]
+        assert "p.connectivity" in query and params == {"product_ids": ["a"]}
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
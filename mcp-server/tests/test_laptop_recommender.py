@@ -0,0 +1,94 @@
+"""
+Tests for LaptopRecommender: the columnar scorer used by rank_laptops must
+reproduce the per-laptop score_* methods exactly, across use cases, brand
+preferences and awkward inputs (missing prices, metadata as dict or bad
+JSON, no GPU).
+"""
+
+import json
+import random
+
+import pytest
+
+from app.laptop_recommender import LaptopRecommender, UserPreferences
+
+
+NAME_PARTS = ["Dell XPS 13", "ASUS ROG Strix G16", "MacBook Air M3", "MacBook Pro 14", "Lenovo ThinkPad X1",
+              "HP EliteBook 840", "Acer Predator 17-inch", "HP ZBook Studio", "Acer Chromebook Student 15",
+              "Razer Blade gaming 17\"", "Surface Laptop Slim", "Generic Notebook"]
+DESCRIPTIONS = [None, "", "Thin and light laptop with all-day battery life", "Business ultrabook, 16GB RAM, 512GB SSD",
+                "Gaming rig with i9-13900 and 32GB", "Education edition, portable", "Ryzen 7 creator laptop 1TB"]
+GPUS = [None, "", "RTX 4070", "NVIDIA GeForce RTX 3050 Ti", "Radeon RX 6700", "Apple M3 Max", "Intel Iris"]
+CPUS = [None, "Intel Core i7", "i5-1235U", "AMD Ryzen 9 7940HS", "Apple M2", "Celeron"]
+
+
+def _catalog(seed, size=300):
+    rng = random.Random(seed)
+    laptops = []
+    for _ in range(size):
+        laptop = {
+            "name": rng.choice(NAME_PARTS) + rng.choice(["", " 8GB", " 2TB", " 64GB"]),
+            "brand": rng.choice(["Dell", "ASUS", "Apple", "Lenovo", "HP", "Acer", None]),
+            "price_cents": rng.choice([0, 9999, 49999, 50000, 89999, 150000, 249999, 399999]),
+            "subcategory": rng.choice([None, "Gaming", "Work", "School"]),
+            "description": rng.choice(DESCRIPTIONS),
+        }
+        gpu = rng.choice(GPUS)
+        if gpu is not None:
+            laptop["gpu_model"] = gpu
+            laptop["gpu_vendor"] = rng.choice(["NVIDIA", "AMD", "Apple", "Intel", ""])
+        cpu = rng.choice(CPUS)
+        if cpu is not None:
+            metadata = {"cpu": cpu}
+            laptop["metadata"] = rng.choice([json.dumps(metadata), metadata, "{not json"])
+        laptops.append(laptop)
+    return laptops
+
+
+def _reference_total(recommender, laptop, prefs):
+    total = (
+        recommender.score_use_case_match(laptop, prefs) * 0.30 +
+        recommender.score_specs(laptop) * 0.25 +
+        recommender.score_value_for_money(laptop) * 0.20 +
+        recommender.score_portability(laptop) * prefs.portability_importance * 0.15 +
+        50 * 0.10
+    )
+    if prefs.brand_preference and laptop.get("brand") == prefs.brand_preference:
+        total += 5
+    return total
+
+
+@pytest.mark.parametrize("use_case", ["gaming", "work", "school", "creative", "Gaming", "travel"])
+@pytest.mark.parametrize("brand_preference", [None, "Dell"])
+def test_vectorized_scores_match_per_laptop_scores(use_case, brand_preference):
+    recommender = LaptopRecommender()
+    laptops = _catalog(seed=len(use_case) * 2 + bool(brand_preference))
+    prefs = UserPreferences(use_case=use_case, brand_preference=brand_preference, portability_importance=0.7)
+
+    scores = recommender.score_features(recommender.extract_features(laptops), prefs)
+
+    for i, laptop in enumerate(laptops):
+        assert scores["use_case"][i] == recommender.score_use_case_match(laptop, prefs)
+        assert scores["specs"][i] == recommender.score_specs(laptop)
+        assert scores["value"][i] == recommender.score_value_for_money(laptop)
+        assert scores["portability"][i] == recommender.score_portability(laptop)
+        assert scores["total"][i] == _reference_total(recommender, laptop, prefs)
+
+
+def test_rank_laptops_orders_by_total_with_breakdown():
+    recommender = LaptopRecommender()
+    laptops = _catalog(seed=7, size=50)
+    prefs = UserPreferences(use_case="gaming")
+
+    ranked = recommender.rank_laptops(laptops, prefs)
+
+    expected = sorted(laptops, key=lambda l: _reference_total(recommender, l, prefs), reverse=True)
+    assert [r["name"] for r in ranked] == [l["name"] for l in expected]
+    top = ranked[0]
+    assert isinstance(top["_recommendation_score"], float)
+    assert top["_score_breakdown"]["total"] == top["total_score"] == round(top["_recommendation_score"], 1)
+    assert "_score_breakdown" not in laptops[0]
+
+
+def test_rank_empty_pool():
+    assert LaptopRecommender().rank_laptops([], UserPreferences(use_case="work")) == []
@@ -0,0 +1,80 @@
+"""
+Unit tests for the buffered latency log sink.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.latency_log import BufferedJsonlSink
+
+
+def _entry(i):
+    return {"path": f"/p/{i}", "status": 200, "duration_ms": float(i)}
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestBufferedJsonlSink:
+    def test_enqueue_does_no_io(self, tmp_path):
+        sink = BufferedJsonlSink(path=tmp_path / "lat.jsonl")
+        assert sink.enqueue(_entry(1)) is True
+        assert not (tmp_path / "lat.jsonl").exists()
+        assert sink.stats()["backlog"] == 1
+
+    def test_overflow_drops_and_counts(self, tmp_path):
+        sink = BufferedJsonlSink(path=tmp_path / "lat.jsonl", capacity=3)
+        results = [sink.enqueue(_entry(i)) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert sink.stats()["dropped"] == 2
+        assert sink.stats()["backlog"] == 3
+
+    def test_flush_writes_in_batches(self, tmp_path):
+        path = tmp_path / "lat.jsonl"
+        sink = BufferedJsonlSink(path=path, batch_size=4)
+        for i in range(10):
+            sink.enqueue(_entry(i))
+        sink.flush()
+        assert [e["path"] for e in _lines(path)] == [f"/p/{i}" for i in range(10)]
+        assert sink.stats()["batches"] == 3
+        assert sink.stats()["written"] == 10
+        assert sink.stats()["backlog"] == 0
+
+    def test_size_based_rotation(self, tmp_path):
+        path = tmp_path / "lat.jsonl"
+        sink = BufferedJsonlSink(path=path, batch_size=1, max_bytes=120, backup_count=2)
+        for i in range(12):
+            sink.enqueue(_entry(i))
+            sink.flush()
+        assert sink.stats()["rotations"] >= 2
+        assert path.stat().st_size <= 120
+        assert (tmp_path / "lat.jsonl.1").exists()
+        assert (tmp_path / "lat.jsonl.2").exists()
+        assert not (tmp_path / "lat.jsonl.3").exists()
+        # Newest entry is always in the live file
+        assert _lines(path)[-1]["path"] == "/p/11"
+
+    def test_background_drain_and_flush_on_stop(self, tmp_path):
+        path = tmp_path / "lat.jsonl"
+        sink = BufferedJsonlSink(path=path, batch_size=5, flush_interval_s=60)
+
+        async def scenario():
+            sink.start()
+            for i in range(5):  # a full batch wakes the drain task early
+                sink.enqueue(_entry(i))
+            for _ in range(100):
+                if sink.stats()["written"] == 5:
+                    break
+                await asyncio.sleep(0.01)
+            written_before_stop = sink.stats()["written"]
+            sink.enqueue(_entry(5))  # partial batch: only flushed by stop()
+            await sink.stop()
+            return written_before_stop
+
+        assert asyncio.run(scenario()) == 5
+        assert len(_lines(path)) == 6
@@ -0,0 +1,93 @@
+"""
+Tests for the tiered LLM validator: clean input is decided by the local
+classifier, unclear input still goes to the LLM, and the labelled replay set
+(scripts/data/validator_replay.json) keeps its calls-avoided / accuracy
+numbers. The Anthropic client is an in-file fake; no API key is needed.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm_validator import LLMValidator
+from scripts.benchmark_validator_fast_path import load_cases, replay
+
+
+class FakeMessages:
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+
+LLM_REPLY = """VALID: yes
+CORRECTED: book
+INTENT: domain_selection
+CONFIDENCE: 0.75
+SUGGESTIONS: none
+ERROR: none"""
+
+
+@pytest.fixture
+def validator():
+    v = LLMValidator()
+    v.client = SimpleNamespace(messages=FakeMessages(LLM_REPLY))
+    v.enabled = True
+    v.fast_path_threshold = 0.85
+    return v
+
+
+def _llm_calls(v):
+    return len(v.client.messages.calls)
+
+
+class TestFastPath:
+    @pytest.mark.parametrize("text, intent", [
+        ("gaming laptop under $1500", "domain_selection"),
+        ("Dell", "brand"),
+        ("$500", "price"),
+        ("hi", "greeting"),
+        ("paperback", "genre"),
+    ])
+    def test_clean_input_skips_llm(self, validator, text, intent):
+        result = validator.validate_and_correct(text, context="laptops")
+        assert result["is_valid"] and result["detected_intent"] == intent
+        assert result["corrected_input"] == text
+        assert _llm_calls(validator) == 0
+        assert validator.stats["local"] == 1
+
+    def test_one_edit_typos_corrected_locally(self, validator):
+        assert validator.validate_and_correct("gaming lptop")["corrected_input"] == "gaming laptop"
+        assert validator.validate_and_correct("laaaaptop")["corrected_input"] == "laptop"
+        assert _llm_calls(validator) == 0
+
+    def test_strict_gibberish_rejected_locally(self, validator):
+        result = validator.validate_and_correct("asdfghjkl")
+        assert not result["is_valid"] and result["detected_intent"] == "gibberish"
+        assert _llm_calls(validator) == 0
+
+    @pytest.mark.parametrize("text", ["buk", "vheicle", "necklace for my wife", "show me something", "xyz"])
+    def test_unclear_input_goes_to_llm(self, validator, text):
+        result = validator.validate_and_correct(text)
+        assert _llm_calls(validator) == 1 and validator.stats["llm"] == 1
+        assert result["corrected_input"] == "book"  # the LLM's answer, not the local one
+
+    def test_short_answers_need_a_conversation(self, validator):
+        assert validator.classify_locally("yes", context="laptops: asked to confirm")["confidence"] >= 0.85
+        assert validator.classify_locally("yes")["confidence"] < 0.85
+
+    def test_disabled_llm_keeps_basic_validation(self):
+        v = LLMValidator()
+        v.enabled = False
+        assert v.validate_and_correct("hp") == v._basic_validation("hp")
+
+
+def test_replay_set_avoids_most_llm_calls_without_accuracy_loss(validator):
+    cases = load_cases()
+    result = replay(cases, validator, validator.fast_path_threshold)
+    assert result["avoided_ratio"] >= 0.7
+    assert result["local_errors"] == []
+    assert result["tiered_accuracy"] == result["llm_only_accuracy"]
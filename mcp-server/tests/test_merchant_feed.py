@@ -8,13 +8,14 @@ import pytest
 import json
 import xml.etree.ElementTree as ET
 from datetime import datetime
+from decimal import Decimal
 from unittest.mock import Mock
 import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.merchant_feed import MerchantFeedExporter
+from app.merchant_feed import MerchantFeedExporter, stream_feed
 
 
 class TestMerchantFeedExporter:
@@ -43,14 +44,8 @@ class TestMerchantFeedExporter:
                 "sku": f"SKU-{i:03d}",
                 "primary_image": f"https://test.com/images/prod-{i}.jpg"
             }
-            
-            # Mock relationships
-            product.price_info = Mock()
-            product.price_info.price_cents = 9999
-            product.price_info.currency = "USD"
-            
-            product.inventory_info = Mock()
-            product.inventory_info.available_qty = 10 if i < 2 else 0  # Last one out of stock
+            product.price_value = Decimal("99.99")
+            product.inventory = 10 if i < 2 else 0  # Last one out of stock
             
             products.append(product)
         
@@ -193,6 +188,83 @@ class TestMerchantFeedExporter:
         # Should have quotes around the description
         assert '"Test, with comma"' in lines[1]
     
+    # ========================================================================
+    # Test Streaming Export
+    # ========================================================================
+    
+    def test_iter_json_matches_export_json(self):
+        """Streamed JSON parses to the same products as the in-memory feed."""
+        streamed = json.loads("".join(
+            self.exporter.iter_json(iter(self.mock_products), include_metadata=True)
+        ))
+        feed = self.exporter.export_json(self.mock_products, include_metadata=True)
+        
+        assert streamed["total_count"] == 3
+        assert streamed["products"] == json.loads(json.dumps(feed["products"], default=str))
+    
+    def test_iter_json_empty(self):
+        """Streaming an empty catalog still yields a valid document."""
+        streamed = json.loads("".join(self.exporter.iter_json(iter([]))))
+        assert streamed["products"] == []
+        assert streamed["total_count"] == 0
+    
+    def test_iter_xml_matches_export_xml(self):
+        """Streamed XML has the same entries as the in-memory feed."""
+        ns = {
+            "atom": "http://www.w3.org/2005/Atom",
+            "g": "http://base.google.com/ns/1.0"
+        }
+        streamed = ET.fromstring("".join(self.exporter.iter_xml(iter(self.mock_products))))
+        built = ET.fromstring(self.exporter.export_xml(self.mock_products))
+        
+        streamed_ids = [e.find("g:id", ns).text for e in streamed.findall("atom:entry", ns)]
+        built_ids = [e.find("g:id", ns).text for e in built.findall("atom:entry", ns)]
+        assert streamed_ids == built_ids == ["PROD-000", "PROD-001", "PROD-002"]
+        assert streamed.find("atom:title", ns).text == "MCP Product Feed"
+    
+    def test_iter_csv_matches_export_csv(self):
+        """Streamed CSV lines join to exactly the in-memory CSV."""
+        streamed = "".join(self.exporter.iter_csv(iter(self.mock_products)))
+        assert streamed == self.exporter.export_csv(self.mock_products)
+    
+    def test_iter_csv_is_lazy(self):
+        """Rows are pulled from the source only as chunks are consumed."""
+        pulled = []
+        
+        def source():
+            for product in self.mock_products:
+                pulled.append(product.product_id)
+                yield product
+        
+        chunks = self.exporter.iter_csv(source())
+        next(chunks)  # header
+        assert pulled == []
+        next(chunks)
+        assert pulled == ["PROD-000"]
+    
+    def test_stream_feed_completes_for_every_format(self):
+        """stream_feed renders catalog rows to a complete document in each format."""
+        db = Mock()
+        for fmt, parse in (("json", json.loads), ("xml", ET.fromstring), ("csv", str.splitlines)):
+            db.query.return_value.yield_per.return_value = iter(self.mock_products)
+            body = "".join(stream_feed(db, format=fmt))
+            assert parse(body)
+            assert "PROD-002" in body and "99.99" in body
+    
+    def test_stream_feed_propagates_database_errors(self):
+        """A cursor failure aborts the stream instead of closing the document."""
+        def rows():
+            yield self.mock_products[0]
+            raise RuntimeError("server closed the connection")
+        
+        db = Mock()
+        db.query.return_value.yield_per.return_value = rows()
+        chunks = []
+        with pytest.raises(RuntimeError):
+            for chunk in stream_feed(db, format="json"):
+                chunks.append(chunk)
+        assert "total_count" not in "".join(chunks)
+    
     # ========================================================================
     # Test Feed Validation
     # ========================================================================
@@ -0,0 +1,150 @@
+"""
+Unit tests for histogram-based latency metrics and Prometheus exposition.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.metrics import (
+    LATENCY_BUCKETS_MS,
+    LatencyHistogram,
+    MetricsCollector,
+    merge_snapshots,
+    render_prometheus,
+)
+
+
+def _exact_percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100.0), len(ordered) - 1)]
+
+
+class TestLatencyHistogram:
+    def test_bounds_are_sorted_and_span_range(self):
+        assert list(LATENCY_BUCKETS_MS) == sorted(LATENCY_BUCKETS_MS)
+        assert LATENCY_BUCKETS_MS[0] == 0.1
+        assert LATENCY_BUCKETS_MS[-1] == 60_000.0
+
+    def test_bucket_is_upper_bound_inclusive(self):
+        hist = LatencyHistogram((1.0, 10.0))
+        for v in (1.0, 1.5, 10.0, 11.0):
+            hist.record(v)
+        assert hist.counts == [1, 2, 1]
+        assert hist.cumulative_buckets() == [(1.0, 1), (10.0, 3), (float("inf"), 4)]
+
+    def test_quantiles_track_exact_values(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(3, 1) for _ in range(5000)]
+        hist = LatencyHistogram()
+        for v in values:
+            hist.record(v)
+        for pct in (50, 95, 99):
+            exact = _exact_percentile(values, pct)
+            assert hist.quantile(pct / 100.0) == pytest.approx(exact, rel=0.1)
+        assert hist.mean() == pytest.approx(sum(values) / len(values))
+
+    def test_merge_matches_single_histogram(self):
+        values = [float(i) for i in range(1, 400)]
+        whole, a, b = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, v in enumerate(values):
+            whole.record(v)
+            (a if i % 2 else b).record(v)
+        merged = a.copy().merge(b)
+        assert merged.counts == whole.counts
+        assert merged.count == whole.count
+        assert merged.quantile(0.95) == whole.quantile(0.95)
+
+    def test_merge_rejects_different_bounds(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram((1.0,)).merge(LatencyHistogram((2.0,)))
+
+
+class TestMetricsCollector:
+    def test_percentile_needs_ten_samples(self):
+        collector = MetricsCollector()
+        for _ in range(9):
+            collector.record_latency("get_product", 5.0)
+        assert collector.get_percentile("get_product", 50) is None
+        collector.record_latency("get_product", 5.0)
+        assert collector.get_percentile("get_product", 50) == 5.0
+        assert collector.get_percentile("missing", 50) is None
+
+    def test_summary_includes_endpoints_and_stages(self):
+        collector = MetricsCollector()
+        for i in range(20):
+            collector.record_latency("search_products", 10.0 + i)
+            collector.record_stage("db", 2.0)
+        collector.record_error("search_products")
+        summary = collector.get_summary()
+        endpoint = summary["endpoints"]["search_products"]
+        assert endpoint["total_requests"] == 20
+        assert endpoint["error_rate_pct"] == 5.0
+        assert endpoint["latency_avg_ms"] == 19.5
+        assert 10.0 <= endpoint["latency_p50_ms"] <= endpoint["latency_p99_ms"] <= 29.0
+        assert summary["stages"]["db"]["count"] == 20
+        assert summary["stages"]["db"]["latency_p95_ms"] == 2.0
+
+    def test_snapshots_merge_across_workers(self):
+        workers = [MetricsCollector() for _ in range(3)]
+        for n, collector in enumerate(workers):
+            for i in range(50):
+                collector.record_latency("get_product", float(i + n * 50))
+            collector.record_cache_hit()
+        merged = merge_snapshots(c.snapshot() for c in workers)
+        assert merged["requests"] == {"get_product": 150}
+        assert merged["cache_hits"] == 3
+        hist = LatencyHistogram.from_dict(merged["endpoints"]["get_product"])
+        assert hist.count == 150
+        assert hist.quantile(0.5) == pytest.approx(75, rel=0.15)
+
+    def test_reset_clears_histograms(self):
+        collector = MetricsCollector()
+        collector.record_latency("checkout", 1.0)
+        collector.record_stage("cache", 1.0)
+        collector.reset()
+        assert collector.get_summary()["endpoints"] == {}
+        assert collector.get_summary()["stages"] == {}
+
+
+class TestPrometheusExposition:
+    def test_histogram_series(self):
+        collector = MetricsCollector(buckets_ms=(1.0, 10.0))
+        collector.record_latency("get_product", 0.5)
+        collector.record_latency("get_product", 5.0)
+        collector.record_stage("kg", 50.0)
+        text = collector.render_prometheus()
+        assert "# TYPE mcp_request_latency_seconds histogram" in text
+        assert 'mcp_request_latency_seconds_bucket{endpoint="get_product",le="0.001"} 1' in text
+        assert 'mcp_request_latency_seconds_bucket{endpoint="get_product",le="0.01"} 2' in text
+        assert 'mcp_request_latency_seconds_bucket{endpoint="get_product",le="+Inf"} 2' in text
+        assert 'mcp_request_latency_seconds_count{endpoint="get_product"} 2' in text
+        assert 'mcp_request_latency_seconds_sum{endpoint="get_product"} 0.0055' in text
+        assert 'mcp_stage_latency_seconds_bucket{stage="kg",le="+Inf"} 1' in text
+        assert 'mcp_requests_total{endpoint="get_product"} 2' in text
+        assert text.endswith("\n")
+
+    def test_label_values_are_escaped(self):
+        collector = MetricsCollector()
+        collector.record_latency('we"ird', 1.0)
+        assert 'endpoint="we\\"ird"' in render_prometheus(collector.snapshot())
+
+    def test_endpoint_serves_text_format(self):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.metrics import metrics_collector, record_request_metrics
+
+        record_request_metrics(
+            "get_product", 12.0, cache_hit=False,
+            stages={"cache": 1.0, "db": 8.0, "total": 12.0, "parse_ms": 0.4},
+        )
+        resp = TestClient(app).get("/metrics/prometheus")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'mcp_stage_latency_seconds_count{stage="db"}' in resp.text
+        assert 'stage="parse_ms"' not in resp.text
+        assert "db" in metrics_collector.stage_latencies
@@ -2,8 +2,13 @@
 Unit tests for query normalization (typo correction & synonym expansion).
 """
 
+import random
+import string
+
 import pytest
 from app.query_normalizer import (
+    DEFAULT_DICTIONARY,
+    FuzzyIndex,
     normalize_query,
     correct_typo,
     expand_synonyms,
@@ -90,6 +95,74 @@ class TestCorrectTypo:
         assert correct_typo("NvIdIa", dictionary) == "nvidia"
 
 
+def _linear_correct_typo(word, dictionary):
+    """Reference: the original full-dictionary Levenshtein scan."""
+    word_lower = word.lower()
+    dictionary = [w.lower() for w in dictionary]
+    if word_lower in dictionary:
+        return word_lower
+    best_match, best_distance = None, None
+    for candidate in dictionary:
+        dist = levenshtein_distance(word_lower, candidate)
+        if best_distance is None or dist < best_distance:
+            best_distance, best_match = dist, candidate
+    if best_distance <= 2 and similarity_ratio(word_lower, best_match) >= 0.7:
+        return best_match
+    return None
+
+
+def _mutate(word, rng):
+    """Apply 0-3 random edits (insert/delete/substitute)."""
+    chars = list(word)
+    for _ in range(rng.randint(0, 3)):
+        op = rng.choice("ids")
+        pos = rng.randrange(len(chars) + 1)
+        if op == "i":
+            chars.insert(pos, rng.choice(string.ascii_lowercase))
+        elif chars and pos < len(chars):
+            if op == "d":
+                del chars[pos]
+            else:
+                chars[pos] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+class TestFuzzyIndex:
+    """Symmetric-delete index must agree with the linear scan."""
+
+    def test_matches_linear_scan_on_default_dictionary(self):
+        rng = random.Random(42)
+        for _ in range(2000):
+            word = _mutate(rng.choice(DEFAULT_DICTIONARY), rng) or "x"
+            assert correct_typo(word, DEFAULT_DICTIONARY) == _linear_correct_typo(word, DEFAULT_DICTIONARY), word
+
+    def test_matches_linear_scan_on_large_dictionary(self):
+        rng = random.Random(7)
+        vocab = list(dict.fromkeys(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+            for _ in range(600)
+        ))
+        index = FuzzyIndex(vocab)
+        for _ in range(100):
+            word = _mutate(rng.choice(vocab), rng) or "x"
+            assert correct_typo(word, index) == _linear_correct_typo(word, vocab), word
+
+    def test_lookup_is_bounded_and_sorted(self):
+        index = FuzzyIndex(["laptop", "laptops", "lapdog"])
+        assert index.lookup("laptop") == [("laptop", 0)]
+        assert index.lookup("laptp") == [("laptop", 1), ("laptops", 2)]
+        assert index.lookup("laptp", max_distance=1) == [("laptop", 1)]
+        assert index.lookup("zzzzzz") == []
+
+    def test_frequency_breaks_distance_ties(self):
+        words = ["dell", "bell"]
+        assert FuzzyIndex(words).lookup("xell")[0][0] == "dell"
+        weighted = FuzzyIndex(words, frequencies={"bell": 10})
+        assert weighted.lookup("xell")[0][0] == "bell"
+        # Distance still dominates frequency
+        assert weighted.lookup("del")[0][0] == "dell"
+
+
 class TestNormalizeTypos:
     """Test pattern-based typo normalization."""
     
@@ -0,0 +1,98 @@
+"""
+Tests for query_parse: the shared single-pass parse must agree with the
+per-stage regex scans it replaced.
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.query_parse import (
+    BRAND_MAP,
+    COMPARE_RE,
+    LAPTOP_KEYWORDS,
+    MODEL_NUMBER_RE,
+    VEHICLE_KEYWORDS,
+    ParsedQuery,
+    extract_price_range,
+    parse_query,
+)
+from app.query_parser import enhance_search_request
+
+
+QUERIES = [
+    "Need an HP laptop for everyday use under $650. Prefer a 15.6-inch touchscreen with at least 16GB RAM.",
+    "compare the Dell XPS 13 vs MacBook Air M3",
+    "gaming PC with an RTX 4070, budget of 2,000",
+    "I want a notebook-style planner, not a computer",
+    "looking for books by Brandon Sanderson",
+    "fuel  efficient family suv under $30k",
+    "no HP, no Dell — ThinkPad X1 or Lenovo Yoga, $800-$1,200",
+    "Comparing phones: Pixel 8 vs iPhone 15 (cell phone for my mom)",
+    "t-shirt and jeans, tiffany & co necklace",
+    "laptop_bag for my macbook",
+    "",
+    "   ",
+]
+
+
+def _legacy_has_word(text, kw):
+    return re.search(rf"\b{re.escape(kw)}\b", text.lower().strip()) is not None
+
+
+class TestParsedQuery:
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_has_word_matches_word_boundary_regex(self, query):
+        parsed = ParsedQuery(query)
+        keywords = VEHICLE_KEYWORDS + LAPTOP_KEYWORDS + list(BRAND_MAP) + [
+            "tiffany & co", "t-shirt", "cell phone", "fuel efficient", "bag", "laptop", "x1",
+        ]
+        for kw in keywords:
+            assert parsed.has_word(kw) == _legacy_has_word(query, kw), kw
+
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_model_numbers_and_compare(self, query):
+        parsed = ParsedQuery(query)
+        lower = query.lower().strip()
+        assert parsed.model_numbers == tuple(MODEL_NUMBER_RE.findall(lower))
+        assert parsed.mentions_compare == bool(COMPARE_RE.search(lower))
+
+    def test_brands_in_brand_map_order(self):
+        parsed = ParsedQuery("macbook or dell, maybe apple")
+        assert parsed.brands == ("Apple", "Dell")
+
+    def test_domain_signals_priority(self):
+        assert ParsedQuery("gaming pc for my car").domain_signals[0] == ("vehicles", "keyword_vehicle")
+        signals = ParsedQuery("gaming pc or a laptop").domain_signals
+        assert signals[:2] == (("laptops", "keyword_desktop"), ("laptops", "keyword_laptop"))
+        # "book" must not fire inside "notebook"
+        assert ParsedQuery("notebook").domain_signals == (("laptops", "keyword_laptop"),)
+
+    def test_price_range(self):
+        assert extract_price_range("no more than $2,000") == {"max": 2000}
+        assert extract_price_range("$800-$1,200 please") == {"min": 800, "max": 1200}
+        assert extract_price_range("budget of 1500") == {"max": 1500}
+        assert extract_price_range("model 2000") is None
+
+
+class TestParseCache:
+    def test_same_text_shares_parse(self):
+        assert parse_query("16gb laptop") is parse_query("16gb laptop")
+
+    def test_dict_fields_are_copies(self):
+        parsed = parse_query("laptop for ml under $900 with 16GB RAM")
+        parsed.price_range["max"] = 1
+        specs = parsed.spec_filters
+        specs["use_cases"].append("gaming")
+        assert parsed.price_range == {"max": 900}
+        assert parsed.spec_filters == {"min_ram_gb": 16, "use_cases": ["ml"]}
+
+    def test_enhance_search_request_returns_fresh_dicts(self):
+        _, first = enhance_search_request("32GB RAM for deep learning", {})
+        first["min_ram_gb"] = 0
+        _, second = enhance_search_request("32GB RAM for deep learning", {})
+        assert second == {"min_ram_gb": 32, "use_cases": ["ml"]}
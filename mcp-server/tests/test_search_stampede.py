@@ -0,0 +1,169 @@
+"""
+Tests for search-cache stampede protection: stale-while-revalidate entries,
+probabilistic early refresh, the cross-worker refresh lock and per-key
+request coalescing (SingleFlight).
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app import cache as cache_module
+from app.cache import CacheClient
+from app.single_flight import SingleFlight
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+
+@pytest.fixture
+def cache():
+    c = CacheClient(namespace="mcp")
+    c.client = FakeRedis()
+    return c
+
+
+RESULTS = [{"product_id": "p1", "name": "ThinkPad"}]
+
+
+class TestStaleWhileRevalidate:
+    def test_fresh_entry_not_due(self, cache):
+        cache.set_search_results("search:k", RESULTS)
+        assert cache.get_search_entry("search:k") == (RESULTS, False)
+        assert cache.client.ttls["mcp:search:k"] == cache.ttl_search + cache.search_stale_window
+
+    def test_expired_entry_served_stale(self, cache, monkeypatch):
+        cache.set_search_results("search:k", RESULTS)
+        monkeypatch.setattr(cache_module.time, "time", lambda: time.time_ns() / 1e9 + cache.ttl_search + 1)
+        assert cache.get_search_entry("search:k") == (RESULTS, True)
+        assert cache.get_search_results("search:k") == RESULTS
+        assert cache.stats()["by_key_type"]["search"]["stale"] == 2
+
+    def test_early_refresh_scales_with_compute_time(self, cache, monkeypatch):
+        monkeypatch.setattr(cache_module.random, "random", lambda: 0.99)  # -ln(0.01) ≈ 4.6
+        cache.set_search_results("search:slow", RESULTS, compute_s=cache.ttl_search / 4)
+        cache.set_search_results("search:fast", RESULTS, compute_s=0.01)
+        assert cache.get_search_entry("search:slow") == (RESULTS, True)
+        assert cache.get_search_entry("search:fast") == (RESULTS, False)
+
+    def test_plain_list_entries_still_read(self, cache):
+        cache.client.data["mcp:search:old"] = '[{"product_id": "p1"}]'
+        assert cache.get_search_entry("search:old") == ([{"product_id": "p1"}], False)
+
+
+class TestRefreshLock:
+    def test_only_one_holder(self, cache):
+        token = cache.acquire_refresh_lock("search:k")
+        assert token
+        assert cache.acquire_refresh_lock("search:k") is None
+        cache.release_refresh_lock("search:k", token)
+        assert cache.acquire_refresh_lock("search:k")
+
+    def test_release_ignores_other_holders_lock(self, cache):
+        cache.acquire_refresh_lock("search:k")
+        cache.release_refresh_lock("search:k", "someone-else")
+        assert cache.acquire_refresh_lock("search:k") is None
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_computation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return RESULTS
+
+        async def main():
+            return await asyncio.gather(*(flight.run("search:k", compute) for _ in range(20)))
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(r is RESULTS for r in results)
+        assert flight.stats() == {"leaders": 1, "coalesced": 19, "in_flight": 0}
+
+    def test_exception_reaches_every_caller_and_clears_key(self):
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0)
+            raise RuntimeError("db down")
+
+        async def main():
+            outcomes = await asyncio.gather(*(flight.run("k", boom) for _ in range(3)), return_exceptions=True)
+            again = await flight.run("k", lambda: asyncio.sleep(0, result="ok"))
+            return outcomes, again
+
+        outcomes, again = asyncio.run(main())
+        assert all(isinstance(o, RuntimeError) for o in outcomes)
+        assert again == "ok"
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def main():
+            first = asyncio.ensure_future(flight.run("k", compute))
+            second = asyncio.ensure_future(flight.run("k", compute))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(main()) == "done"
+
+
+class TestPageBuildSession:
+    def test_page_built_on_private_session_bound_to_request_engine(self, monkeypatch):
+        from app import database
+        from app.endpoints import _build_page_on_own_session
+
+        engine = object()
+        request_session = type("RequestSession", (), {"get_bind": lambda self: engine})()
+        opened = []
+
+        class FakeSession:
+            def __init__(self, bind):
+                self.bind, self.closed = bind, False
+                opened.append(self)
+
+            def close(self):
+                self.closed = True
+
+        class FakeQuery:
+            def __init__(self, session):
+                self.session = session
+
+            def with_session(self, session):
+                return FakeQuery(session)
+
+        monkeypatch.setattr(database, "SessionLocal", lambda bind: FakeSession(bind))
+        used = _build_page_on_own_session(lambda q: q.session, FakeQuery(request_session))
+
+        assert used is opened[0] and used is not request_session
+        assert used.bind is engine and used.closed
@@ -228,6 +228,148 @@ class TestSessionStore:
         _asyncio.run(_run())
 
 
+class TestInMemorySessionStore:
+    def test_ttl_expiry_issues_new_session(self):
+        from channels.session_store import InMemorySessionStore
+        store = InMemorySessionStore(ttl_seconds=0.05)
+        s1 = store.get_or_create_sync("slack", "U1")
+        assert store.get_or_create_sync("slack", "U1") == s1
+        time.sleep(0.06)
+        assert store.get_or_create_sync("slack", "U1") != s1
+
+    def test_access_slides_expiry_and_sweep_drops_expired(self):
+        from channels.session_store import InMemorySessionStore
+        store = InMemorySessionStore(ttl_seconds=0.08)
+        s1 = store.get_or_create_sync("slack", "U1")
+        store.get_or_create_sync("slack", "U2")
+        for _ in range(3):
+            time.sleep(0.04)
+            assert store.get_or_create_sync("slack", "U1") == s1
+        assert store.sweep() == 1 and len(store) == 1
+
+    def test_threads_agree_on_one_session_per_user(self):
+        import threading
+        from channels.session_store import InMemorySessionStore
+        store = InMemorySessionStore(stripes=4)
+        seen = [[] for _ in range(8)]
+
+        def worker(i):
+            for u in range(200):
+                seen[i].append(store.get_or_create_sync("slack", f"U{u}"))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert all(s == seen[0] for s in seen) and len(set(seen[0])) == 200
+
+
+class _FakeAsyncRedis:
+    """Minimal redis.asyncio stand-in: GETEX / SET NX EX / GET / SCAN / DEL."""
+
+    def __init__(self, fail=False):
+        self.data: Dict[str, str] = {}
+        self.fail = fail
+        self.race_value = None  # simulate another worker winning SET NX
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("Connection refused")
+
+    async def getex(self, key, ex=None):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        self._check()
+        if self.race_value is not None:
+            self.data[key], self.race_value = self.race_value, None
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestRedisSessionStore:
+    def test_get_or_create_is_stable_and_shared(self):
+        from channels.session_store import RedisSessionStore
+        client = _FakeAsyncRedis()
+        worker_a, worker_b = RedisSessionStore(client=client), RedisSessionStore(client=client)
+
+        async def _run():
+            s1 = await worker_a.get_or_create("slack", "U1")
+            assert await worker_b.get_or_create("slack", "U1") == s1
+            assert client.data == {"channel_session:slack:U1": s1}
+        _asyncio.run(_run())
+
+    def test_lost_set_nx_race_returns_winner(self):
+        from channels.session_store import RedisSessionStore
+        client = _FakeAsyncRedis()
+        client.race_value = "winner-session"
+        store = RedisSessionStore(client=client)
+        assert _asyncio.run(store.get_or_create("slack", "U1")) == "winner-session"
+
+    def test_clear_by_channel(self):
+        from channels.session_store import RedisSessionStore
+        client = _FakeAsyncRedis()
+        store = RedisSessionStore(client=client)
+
+        async def _run():
+            await store.get_or_create("slack", "U1")
+            await store.get_or_create("telegram", "U1")
+            await store.clear("slack")
+            assert list(client.data) == ["channel_session:telegram:U1"]
+        _asyncio.run(_run())
+
+    def test_unreachable_redis_falls_back_to_memory(self):
+        from channels.session_store import RedisSessionStore
+        store = RedisSessionStore(client=_FakeAsyncRedis(fail=True))
+
+        async def _run():
+            s1 = await store.get_or_create("slack", "U1")
+            assert await store.get_or_create("slack", "U1") == s1
+        _asyncio.run(_run())
+        assert store.redis_errors == 1 and store.redis_skipped == 1
+
+    def test_breaker_skips_redis_during_cooldown_then_probes(self, monkeypatch):
+        from channels import session_store
+        client = _FakeAsyncRedis(fail=True)
+        store = session_store.RedisSessionStore(client=client, cooldown_seconds=30)
+        now = [1000.0]
+        monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+
+        async def _run():
+            fallback_id = await store.get_or_create("slack", "U1")
+            assert store.breaker_open
+            client.fail = False  # Redis is back, but the breaker is still open
+            assert await store.get_or_create("slack", "U1") == fallback_id
+            assert client.data == {} and store.redis_skipped == 1
+
+            now[0] += 31  # half-open: the next lookup probes Redis
+            redis_id = await store.get_or_create("slack", "U1")
+            assert client.data == {"channel_session:slack:U1": redis_id}
+            assert not store.breaker_open
+
+            client.fail = True
+            await store.get_or_create("slack", "U2")
+            assert store.breaker_open and store.redis_errors == 2
+        _asyncio.run(_run())
+
+
 # ===========================================================================
 # Webhook endpoint (FastAPI TestClient)
 # ===========================================================================
@@ -0,0 +1,131 @@
+"""
+Unit tests for span tracing of the chat pipeline.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.tracing as tracing
+from app.latency_log import BufferedJsonlSink
+from app.tracing import (
+    NOOP_SPAN,
+    Tracer,
+    bind_context,
+    current_span,
+    record_llm_usage,
+    span,
+    start_trace,
+    traced,
+)
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """Install a tracer that exports every trace to a temp file."""
+    path = tmp_path / "traces.jsonl"
+    t = Tracer(sample_rate=1.0, slow_ms=0, sink=BufferedJsonlSink(path=path))
+    monkeypatch.setattr(tracing, "tracer", t)
+
+    def read():
+        t.sink.flush()
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    read.tracer = t
+    return read
+
+
+def _by_name(trace):
+    return {s["name"]: s for s in trace["spans"]}
+
+
+def _completion(prompt, completion):
+    return SimpleNamespace(
+        model="gpt-4o-mini",
+        usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion),
+    )
+
+
+class TestTracing:
+    def test_disabled_tracer_is_noop(self, monkeypatch):
+        monkeypatch.setattr(tracing, "tracer", Tracer(sample_rate=0, slow_ms=0))
+        with start_trace("chat") as root:
+            with span("child") as child:
+                assert root is NOOP_SPAN and child is NOOP_SPAN
+                record_llm_usage(_completion(1, 1))
+        assert tracing.tracer.exported == 0
+
+    def test_parent_child_links_across_threads_and_tasks(self, trace_file):
+        @traced("worker")
+        def blocking_work():
+            with span("llm.call") as s:
+                record_llm_usage(_completion(100, 20), s)
+                record_llm_usage(_completion(50, 5), s)
+
+        async def child_task():
+            with span("task"):
+                await asyncio.sleep(0)
+
+        def plain_thread_target():
+            with span("thread"):
+                pass
+
+        async def scenario():
+            with start_trace("chat", session_id="s1"):
+                await asyncio.to_thread(blocking_work)
+                await asyncio.create_task(child_task())
+                t = threading.Thread(target=bind_context(plain_thread_target))
+                t.start()
+                t.join()
+
+        asyncio.run(scenario())
+        [trace] = trace_file()
+        spans = _by_name(trace)
+        root = spans["chat"]
+        assert root["parent_id"] is None
+        assert trace["attributes"] == {"session_id": "s1"}
+        assert spans["worker"]["parent_id"] == root["span_id"]
+        assert spans["llm.call"]["parent_id"] == spans["worker"]["span_id"]
+        assert spans["worker"]["thread"] != root["thread"]
+        assert spans["task"]["parent_id"] == root["span_id"]
+        assert spans["thread"]["parent_id"] == root["span_id"]
+        llm = spans["llm.call"]["attributes"]
+        assert llm["llm.calls"] == 2
+        assert llm["llm.prompt_tokens"] == 150
+        assert llm["llm.total_tokens"] == 175
+        assert llm["llm.model"] == "gpt-4o-mini"
+
+    def test_errors_are_recorded_and_reraised(self, trace_file):
+        with pytest.raises(ValueError):
+            with start_trace("chat"):
+                with span("search"):
+                    raise ValueError("boom")
+        [trace] = trace_file()
+        assert _by_name(trace)["search"]["error"] == "ValueError: boom"
+        assert trace["error"] == "ValueError: boom"
+
+    def test_slow_traces_exported_when_not_sampled(self, trace_file):
+        t = trace_file.tracer
+        t.sample_rate = 0.0
+        t.slow_ms = 5.0
+        with start_trace("fast"):
+            pass
+        with start_trace("slow"):
+            with span("sleep"):
+                threading.Event().wait(0.01)
+        traces = trace_file()
+        assert [tr["name"] for tr in traces] == ["slow"]
+        assert traces[0]["sampled"] is False
+        assert t.discarded == 1
+
+    def test_current_span_outside_trace(self):
+        assert current_span() is NOOP_SPAN
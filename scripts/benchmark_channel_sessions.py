@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Channel Session Store Concurrency Benchmark
+============================================
+Replays a burst of Slack-style events (many workspaces x users, mostly
+returning users) through channels.session_store and reports events/s and
+per-call latency.
+
+Stores compared:
+  1. legacy   — the previous dict guarded by one global asyncio.Lock
+  2. memory   — InMemorySessionStore (lock-free reads, striped writes)
+  3. memory, N threads — one event loop per thread sharing the store
+                 (the legacy asyncio.Lock cannot be shared across loops)
+  4. redis, N processes — RedisSessionStore from several worker processes
+                 racing on the same users; checks that every process got
+                 the same session_id per user (needs --redis)
+
+Usage:
+    python scripts/benchmark_channel_sessions.py
+    python scripts/benchmark_channel_sessions.py --events 200000 --threads 8
+    REDIS_HOST=localhost python scripts/benchmark_channel_sessions.py --redis --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from channels.session_store import InMemorySessionStore, RedisSessionStore
+
+
+class LegacyStore:
+    """The pre-striping implementation, kept here for comparison."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._store = {}
+
+    async def get_or_create(self, channel, user_id):
+        key = (channel, user_id)
+        async with self._lock:
+            if key not in self._store:
+                self._store[key] = str(uuid.uuid4())
+            return self._store[key]
+
+
+def make_events(n, workspaces, users, seed=0):
+    rng = random.Random(seed)
+    return [(f"slack:{rng.randrange(workspaces)}", f"U{rng.randrange(users)}") for _ in range(n)]
+
+
+async def drive(store, events, concurrency):
+    """Run events through store.get_or_create from `concurrency` tasks."""
+    latencies = []
+
+    async def worker(chunk):
+        for channel, user in chunk:
+            start = time.perf_counter()
+            await store.get_or_create(channel, user)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            await asyncio.sleep(0)  # yield like a real handler would
+
+    chunks = [events[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(c) for c in chunks))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, n, elapsed, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(f"{name:<28} {n / elapsed:>12,.0f} {statistics.median(latencies):>9.1f} {p99:>9.1f}")
+
+
+def run_threads(store, events, threads, concurrency):
+    results = [None] * threads
+
+    def target(i):
+        results[i] = asyncio.run(drive(store, events[i::threads], concurrency))
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, [lat for _, lats in results for lat in lats]
+
+
+def _redis_worker(events, concurrency, queue):
+    async def go():
+        store = RedisSessionStore()
+        elapsed, latencies = await drive(store, events, concurrency)
+        seen = {}
+        for channel, user in set(events):
+            seen[f"{channel}/{user}"] = await store.get_or_create(channel, user)
+        return elapsed, latencies, seen, store.redis_errors
+
+    queue.put(asyncio.run(go()))
+
+
+def run_redis(events, processes, concurrency):
+    asyncio.run(RedisSessionStore().clear("bench"))
+    events = [("bench", f"{c}-{u}") for c, u in events]
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_redis_worker, args=(events[i::processes] + events[:100], concurrency, queue))
+             for i in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    merged, conflicts, errors = {}, 0, 0
+    for _, _, seen, redis_errors in results:
+        errors += redis_errors
+        for user, session_id in seen.items():
+            if merged.setdefault(user, session_id) != session_id:
+                conflicts += 1
+    asyncio.run(RedisSessionStore().clear("bench"))
+    return elapsed, [lat for _, lats, _, _ in results for lat in lats], conflicts, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Channel session store concurrency benchmark")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--workspaces", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=200, help="tasks per event loop")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--redis", action="store_true", help="also benchmark the Redis backend")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.workspaces, args.users)
+    print(f"{args.events:,} events, {args.workspaces} workspaces x {args.users:,} users, "
+          f"{args.concurrency} tasks per loop")
+    print(f"{'store':<28} {'events/s':>12} {'p50 us':>9} {'p99 us':>9}")
+    print("-" * 61)
+
+    elapsed, lat = asyncio.run(drive(LegacyStore(), events, args.concurrency))
+    report("legacy global lock", len(events), elapsed, lat)
+
+    elapsed, lat = asyncio.run(drive(InMemorySessionStore(), events, args.concurrency))
+    report("memory (striped)", len(events), elapsed, lat)
+
+    elapsed, lat = run_threads(InMemorySessionStore(), events, args.threads, args.concurrency)
+    report(f"memory, {args.threads} loops/threads", len(events), elapsed, lat)
+
+    if args.redis:
+        redis_events = events[: max(len(events) // 10, 1)]
+        elapsed, lat, conflicts, errors = run_redis(redis_events, args.processes, args.concurrency)
+        report(f"redis, {args.processes} processes", len(lat), elapsed, lat)
+        print(f"redis: {conflicts} session_id conflicts across processes, {errors} Redis errors")
+        if conflicts or errors:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()